@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Analytics View Worker
+Refreshes the materialized CRM analytics views when they are stale or old
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from apps.api.database import get_database_connection
+from apps.api.analytics_views import VIEWS, due_views, refresh_view
+
+logger = logging.getLogger(__name__)
+
+class AnalyticsViewWorker:
+    """Polls the view freshness table and refreshes due views"""
+
+    def __init__(self, interval: float = 10):
+        self.interval = interval
+        self.running = False
+        self.last_run: Optional[datetime] = None
+        self.refreshes = 0
+
+    async def run_once(self, force: bool = False) -> int:
+        """Refresh due views (all views when ``force``); returns how many were refreshed"""
+        db = await get_database_connection()
+        try:
+            names = VIEWS if force else await due_views(db.connection)
+            refreshed = 0
+            for name in names:
+                if await refresh_view(db.connection, name):
+                    refreshed += 1
+            self.refreshes += refreshed
+            self.last_run = datetime.now()
+            return refreshed
+        finally:
+            await db.close()
+
+    async def run_continuous(self):
+        """Check for due views every ``interval`` seconds"""
+        logger.info(f"Starting analytics view worker (every {self.interval} seconds)")
+        self.running = True
+
+        while self.running:
+            try:
+                refreshed = await self.run_once()
+                if refreshed:
+                    logger.info(f"Refreshed {refreshed} analytics views")
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                logger.info("Analytics view worker cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Error in analytics view worker: {e}")
+                await asyncio.sleep(self.interval)
+
+    def stop(self):
+        """Stop the worker"""
+        logger.info("Stopping analytics view worker...")
+        self.running = False
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get current worker status"""
+        return {
+            "running": self.running,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "interval_seconds": self.interval,
+            "refreshes": self.refreshes
+        }
+
+# Global worker instance
+analytics_view_worker = None
+analytics_view_task = None
+
+async def start_analytics_view_worker():
+    """Start the analytics view worker as a background task"""
+    global analytics_view_worker, analytics_view_task
+
+    try:
+        analytics_view_worker = AnalyticsViewWorker(interval=float(os.getenv("ANALYTICS_REFRESH_POLL_SECONDS", "10")))
+        analytics_view_task = asyncio.create_task(analytics_view_worker.run_continuous())
+        logger.info("Analytics view worker started successfully")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to start analytics view worker: {e}")
+        return False
+
+async def stop_analytics_view_worker():
+    """Stop the analytics view worker"""
+    if analytics_view_worker:
+        analytics_view_worker.stop()
+    if analytics_view_task:
+        analytics_view_task.cancel()
+        try:
+            await analytics_view_task
+        except asyncio.CancelledError:
+            pass
+    logger.info("Analytics view worker stopped")
+    return True
+
+async def main():
+    """Run the analytics view worker as a standalone process"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    worker = AnalyticsViewWorker(interval=float(os.getenv("ANALYTICS_REFRESH_POLL_SECONDS", "10")))
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down...")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    if "--once" in sys.argv:
+        await worker.run_once(force=True)
+    else:
+        await worker.run_continuous()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""
+Analytics Views Module
+C&C CRM - Materialized CRM analytics and their freshness
+
+The views in prisma/crm_analytics_views.sql summarize quotes, leads and
+sales activities per client. Writes flag the affected views stale; the
+refresher rebuilds a stale view at most every MIN_REFRESH_SECONDS and every
+view at least every MAX_VIEW_AGE_SECONDS. Reads report how old the data is.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+QUOTE_PIPELINE = "QuotePipelineView"
+QUOTE_CONVERSION = "QuoteConversionView"
+LEAD_BREAKDOWN = "LeadBreakdownView"
+ACTIVITY_BREAKDOWN = "SalesActivityBreakdownView"
+
+VIEWS = (QUOTE_PIPELINE, QUOTE_CONVERSION, LEAD_BREAKDOWN, ACTIVITY_BREAKDOWN)
+
+MIN_REFRESH_SECONDS = float(os.getenv("ANALYTICS_MIN_REFRESH_SECONDS", "30"))
+MAX_VIEW_AGE_SECONDS = float(os.getenv("ANALYTICS_MAX_VIEW_AGE_SECONDS", "900"))
+
+# ===== REFRESH =====
+
+async def refresh_view(connection, name: str) -> bool:
+    """Rebuild one view without blocking readers.
+
+    Returns False when another process is already refreshing it. The stale
+    flag is cleared before the rebuild, so writes that land during it mark
+    the view stale again.
+    """
+    if name not in VIEWS:
+        raise ValueError(f"Unknown analytics view: {name}")
+    if not await connection.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", name):
+        return False
+    try:
+        started = await connection.fetchval(
+            """
+            UPDATE "AnalyticsViewRefresh" SET stale = FALSE, "staleSince" = NULL
+            WHERE name = $1
+            RETURNING NOW()
+            """,
+            name
+        )
+        began = time.perf_counter()
+        try:
+            await connection.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY "{name}"')
+        except Exception:
+            await connection.execute(
+                'UPDATE "AnalyticsViewRefresh" SET stale = TRUE, "staleSince" = NOW() WHERE name = $1',
+                name
+            )
+            raise
+        await connection.execute(
+            'UPDATE "AnalyticsViewRefresh" SET "refreshedAt" = $2, "durationMs" = $3 WHERE name = $1',
+            name, started, int((time.perf_counter() - began) * 1000)
+        )
+        return True
+    finally:
+        await connection.execute("SELECT pg_advisory_unlock(hashtext($1))", name)
+
+async def due_views(connection) -> List[str]:
+    """Views that are stale and past the minimum interval, or past the maximum age"""
+    rows = await connection.fetch(
+        """
+        SELECT name FROM "AnalyticsViewRefresh"
+        WHERE (stale AND "refreshedAt" < NOW() - make_interval(secs => $1))
+           OR "refreshedAt" < NOW() - make_interval(secs => $2)
+        ORDER BY "refreshedAt"
+        """,
+        MIN_REFRESH_SECONDS, MAX_VIEW_AGE_SECONDS
+    )
+    return [row["name"] for row in rows if row["name"] in VIEWS]
+
+# ===== FRESHNESS =====
+
+async def get_freshness(db, *names: str) -> Dict[str, Any]:
+    """How current the given views are, for an endpoint's ``freshness`` field"""
+    row = await db.fetch_one(
+        """
+        SELECT MIN("refreshedAt") AS "asOf", BOOL_OR(stale) AS stale, MIN("staleSince") AS "staleSince"
+        FROM "AnalyticsViewRefresh"
+        WHERE name = ANY($1::text[])
+        """,
+        list(names)
+    )
+    as_of: Optional[datetime] = (row or {}).get("asOf")
+    if as_of is None:
+        return {"asOf": None, "staleSeconds": None, "pendingChanges": True}
+    now = datetime.now(timezone.utc)
+    return {
+        "asOf": as_of.isoformat(),
+        "staleSeconds": round((now - as_of).total_seconds(), 1),
+        "pendingChanges": bool(row["stale"]),
+        "changedSince": row["staleSince"].isoformat() if row["staleSince"] else None
+    }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Events Fan-out Benchmark
+Journey event delivery to 10k concurrent WebSocket subscribers
+
+Each simulated socket runs the real Subscriber sender loop. Sockets are
+spread over journey channels, and a tenth of them also watch a location
+channel. Events are published at a steady rate, with a quarter of them on
+one busy location. One percent of the sockets misbehave. Half of those
+stall on every send. The other half watch the busy location but can only
+take 10 sends/s. The benchmark reports publish-to-send latency for the
+healthy sockets and what happened to the bad ones.
+With --redis the events go through RedisBroker over two hubs sharing a
+FakeRedisPubSub server, as two API workers would. Run from the
+repository root:
+    python -m apps.api.benchmarks.events_fanout [sockets] [events/s] [seconds] [--redis]
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from apps.api.pubsub import (
+    EventHub, FakeRedisPubSub, MemoryBroker, RedisBroker, Subscriber,
+    journey_channel, location_channel
+)
+
+JOURNEYS = 1000
+LOCATIONS = 66
+BAD_SHARE = 0.01
+HOT_LOCATION = "loc_0"
+STALL_SECONDS = 60
+LAGGING_SEND_SECONDS = 0.1
+TICK_SECONDS = 0.01
+
+class FakeSocket:
+    def __init__(self, send_seconds: float = 0):
+        self.send_seconds = send_seconds
+        self.latencies = []
+
+    @property
+    def healthy(self) -> bool:
+        return self.send_seconds == 0
+
+    async def send_text(self, payload: str) -> None:
+        if self.send_seconds:
+            await asyncio.sleep(self.send_seconds)
+        if self.healthy and '"sentAt"' in payload:
+            sent_at = float(payload.rsplit('"sentAt": ', 1)[1].rstrip("}"))
+            self.latencies.append((time.perf_counter() - sent_at) * 1000)
+
+async def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    sockets = int(args[0]) if args else 10000
+    rate = int(args[1]) if len(args) > 1 else 1000
+    seconds = float(args[2]) if len(args) > 2 else 5
+    use_redis = "--redis" in sys.argv
+
+    if use_redis:
+        server = FakeRedisPubSub()
+        hubs = [EventHub(RedisBroker(FakeRedisPubSub(server.server))) for _ in range(2)]
+    else:
+        hubs = [EventHub(MemoryBroker())]
+    for hub in hubs:
+        await hub.start()
+
+    subscribers = []
+    tasks = []
+    for i in range(sockets):
+        bad = random.random() < BAD_SHARE
+        socket = FakeSocket(random.choice((STALL_SECONDS, LAGGING_SEND_SECONDS)) if bad else 0)
+        subscriber = Subscriber(socket.send_text, send_timeout=1.0)
+        hub = hubs[i % len(hubs)]
+        hub.subscribe(subscriber, journey_channel(f"tj_{i % JOURNEYS}"))
+        if socket.send_seconds == LAGGING_SEND_SECONDS:
+            hub.subscribe(subscriber, location_channel(HOT_LOCATION))
+        elif i % 10 == 0:
+            hub.subscribe(subscriber, location_channel(f"loc_{i % LOCATIONS}"))
+        subscribers.append((socket, subscriber))
+        tasks.append(asyncio.create_task(subscriber.run_sender()))
+    # Let every sender loop reach its first wait before timing starts
+    await asyncio.sleep(0.5)
+
+    mode = "redis (2 hubs, fake server)" if use_redis else "memory"
+    print(f"{sockets} sockets, {JOURNEYS} journeys, {LOCATIONS} locations, {mode}")
+    print(f"Publishing {rate} events/s for {seconds:.0f}s "
+          f"(each to a journey and a location; half are coalesced positions)...")
+
+    publisher = hubs[0]
+    publish_time = 0.0
+    events = 0
+    started = time.perf_counter()
+    per_tick = max(1, int(rate * TICK_SECONDS))
+    for tick in range(int(seconds / TICK_SECONDS)):
+        tick_started = time.perf_counter()
+        for _ in range(per_tick):
+            journey = f"tj_{random.randrange(JOURNEYS)}"
+            location = HOT_LOCATION if events % 4 == 0 else f"loc_{random.randrange(1, LOCATIONS)}"
+            key = f"position:{journey}" if events % 2 else None
+            event = {"type": "position" if key else "status_changed", "sentAt": time.perf_counter()}
+            await publisher.publish(journey_channel(journey), event, key)
+            await publisher.publish(location_channel(location), event, key)
+            events += 1
+        publish_time += time.perf_counter() - tick_started
+        await asyncio.sleep(max(0, started + (tick + 1) * TICK_SECONDS - time.perf_counter()))
+    publish_seconds = time.perf_counter() - started
+
+    # Drain the healthy sockets
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        if all(s.queued == 0 for socket, s in subscribers if socket.healthy):
+            break
+        await asyncio.sleep(0.01)
+    total_seconds = time.perf_counter() - started
+
+    for _, subscriber in subscribers:
+        subscriber.close("benchmark done")
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for hub in hubs:
+        await hub.stop()
+
+    healthy = [s for socket, s in subscribers if socket.healthy]
+    latencies = sorted(l for socket, _ in subscribers for l in socket.latencies)
+    print(f"published {events * 2:,} in {publish_seconds:.2f}s, "
+          f"{publish_time * 1000 / (events * 2):.3f} ms per publish "
+          f"({publish_time / publish_seconds:.0%} of the loop)")
+    print(f"sent to healthy sockets: {len(latencies):,} "
+          f"({len(latencies) / total_seconds:,.0f} sends/s, drained {total_seconds - publish_seconds:.2f}s after)")
+    if latencies:
+        print(f"latency ms  p50 {statistics.median(latencies):.2f}  "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f}  "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f}  max {latencies[-1]:.2f}")
+    print(f"healthy ({len(healthy)}): dropped {sum(s.dropped for s in healthy)}, "
+          f"coalesced {sum(s.coalesced for s in healthy)}, "
+          f"disconnected {sum(1 for s in healthy if s.close_reason != 'benchmark done')}")
+    for label, send_seconds in (("stalled", STALL_SECONDS), ("lagging", LAGGING_SEND_SECONDS)):
+        group = [s for socket, s in subscribers if socket.send_seconds == send_seconds]
+        reasons = {}
+        for s in group:
+            reasons[s.close_reason] = reasons.get(s.close_reason, 0) + 1
+        print(f"{label} ({len(group)}): dropped {sum(s.dropped for s in group)}, "
+              f"coalesced {sum(s.coalesced for s in group)}, closed {reasons}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
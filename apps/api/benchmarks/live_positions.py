@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Live Positions Benchmark
+Nearest-truck and viewport queries at 5k active trucks
+
+Times the in-memory grid index against a linear scan of the same
+positions. With DATABASE_URL set, it also seeds a scratch schema
+(``live_bench``) and times the SQL fallback. Run from the repository root:
+    python -m apps.api.benchmarks.live_positions [trucks] [iterations]
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+from apps.api.live_positions import (
+    LivePosition, LivePositionIndex, haversine_m, nearest_sql, within_sql
+)
+
+SCHEMA = "live_bench"
+CLIENT = "client_1"
+# Greater Toronto Area, roughly
+SOUTH, NORTH, WEST, EAST = 43.40, 44.00, -79.90, -79.00
+
+SETUP = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA}, public;
+
+CREATE TABLE "TruckJourney" (
+    id text PRIMARY KEY, "clientId" text, "locationId" text, "truckNumber" text, status text
+);
+CREATE TABLE "GpsPoint" (
+    "journeyId" text, "recordedAt" timestamptz, lat float8, lng float8, speed real, accuracy real,
+    heading real, "receivedAt" timestamptz DEFAULT NOW(), PRIMARY KEY ("journeyId", "recordedAt")
+);
+
+INSERT INTO "TruckJourney"
+SELECT 'tj_' || g, 'client_' || (g % 4 + 1), 'loc_' || (g % 66), 'T-' || g, 'EN_ROUTE'
+FROM generate_series(1, $1::int * 4) g;
+
+INSERT INTO "GpsPoint" ("journeyId", "recordedAt", lat, lng)
+SELECT 'tj_' || g, NOW() - (s * 5) * interval '1 second',
+       {SOUTH} + random() * {NORTH - SOUTH}, {WEST} + random() * {EAST - WEST}
+FROM generate_series(1, $1::int * 4) g, generate_series(0, 11) s;
+
+CREATE INDEX ON "GpsPoint" USING brin ("receivedAt")
+"""
+
+def random_point():
+    return SOUTH + random.random() * (NORTH - SOUTH), WEST + random.random() * (EAST - WEST)
+
+def viewport():
+    lat, lng = random_point()
+    return lat - 0.05, lng - 0.07, lat + 0.05, lng + 0.07
+
+def linear_nearest(positions, lat, lng, k):
+    return sorted(positions, key=lambda p: haversine_m(lat, lng, p.lat, p.lng))[:k]
+
+def linear_within(positions, south, west, north, east):
+    return [p for p in positions if south <= p.lat <= north and west <= p.lng <= east]
+
+def time_sync(func, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+async def time_async(func, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+class _Db:
+    """The fetch_all slice of DatabaseConnection over a bare asyncpg connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def fetch_all(self, query, *args):
+        return [dict(row) for row in await self.conn.fetch(query, *args)]
+
+async def main():
+    trucks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    now = datetime.now(timezone.utc)
+    index = LivePositionIndex()
+    positions = []
+    for i in range(trucks):
+        lat, lng = random_point()
+        position = LivePosition(f"tj_{i}", CLIENT, f"loc_{i % 66}", f"T-{i}", lat, lng, now)
+        index.update(position)
+        positions.append(position)
+
+    print(f"{trucks} live trucks, {len(index._clients[CLIENT].cells)} occupied cells")
+    print(f"{'query':<16}{'method':<10}{'p50 ms':>10}{'p95 ms':>10}")
+    for k in (1, 10):
+        p50, p95 = time_sync(lambda: index.nearest(CLIENT, *random_point(), k), iterations)
+        print(f"{f'nearest k={k}':<16}{'grid':<10}{p50:>10.3f}{p95:>10.3f}")
+        p50, p95 = time_sync(lambda: linear_nearest(positions, *random_point(), k), iterations)
+        print(f"{f'nearest k={k}':<16}{'linear':<10}{p50:>10.3f}{p95:>10.3f}")
+    p50, p95 = time_sync(lambda: index.within(CLIENT, *viewport()), iterations)
+    print(f"{'viewport':<16}{'grid':<10}{p50:>10.3f}{p95:>10.3f}")
+    p50, p95 = time_sync(lambda: linear_within(positions, *viewport()), iterations)
+    print(f"{'viewport':<16}{'linear':<10}{p50:>10.3f}{p95:>10.3f}")
+
+    if not os.environ.get("DATABASE_URL"):
+        print("DATABASE_URL not set; skipping the SQL fallback")
+        return
+
+    import asyncpg
+    conn = await asyncpg.connect(os.environ["DATABASE_URL"])
+    try:
+        print(f"Seeding {trucks} trucks per client (4 clients, 12 pings each) into schema {SCHEMA}...")
+        for statement in filter(str.strip, SETUP.split(";\n")):
+            if "$1" in statement:
+                await conn.execute(statement, trucks)
+            else:
+                await conn.execute(statement)
+        await conn.execute("ANALYZE")
+
+        db = _Db(conn)
+        sql_iterations = max(10, iterations // 10)
+        p50, p95 = await time_async(lambda: nearest_sql(db, CLIENT, *random_point(), 10), sql_iterations)
+        print(f"{'nearest k=10':<16}{'sql':<10}{p50:>10.3f}{p95:>10.3f}")
+        p50, p95 = await time_async(lambda: within_sql(db, CLIENT, *viewport()), sql_iterations)
+        print(f"{'viewport':<16}{'sql':<10}{p50:>10.3f}{p95:>10.3f}")
+    finally:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
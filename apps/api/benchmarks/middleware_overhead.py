@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Middleware Overhead Benchmark
+Per-request cost of AuthMiddleware + TenantMiddleware vs AuthTenantMiddleware
+
+Run from the repository root:
+    python -m apps.api.benchmarks.middleware_overhead [iterations]
+"""
+
+import asyncio
+import sys
+import time
+
+from apps.api.middleware.auth import AuthMiddleware, create_access_token
+from apps.api.middleware.tenant import TenantMiddleware
+from apps.api.middleware.auth_tenant import AuthTenantMiddleware
+
+async def endpoint(scope, receive, send):
+    """No-op ASGI app so only middleware cost is measured"""
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+async def send(message):
+    pass
+
+def make_scope(path: str, token: str = None):
+    headers = [
+        (b"host", b"api.example.com"),
+        (b"user-agent", b"bench"),
+        (b"accept", b"application/json"),
+        (b"accept-encoding", b"gzip"),
+    ]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {"type": "http", "method": "GET", "path": path, "headers": headers}
+
+async def measure(app, scope_factory, iterations: int) -> float:
+    """Return mean microseconds per request"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(scope_factory(), receive, send)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+async def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    token = create_access_token({
+        "sub": "usr_bench",
+        "email": "bench@example.com",
+        "role": "DISPATCHER",
+        "company_id": "clm_bench",
+        "location_id": "loc_bench"
+    })
+
+    stacked = AuthMiddleware(TenantMiddleware(endpoint))
+    merged = AuthTenantMiddleware(endpoint)
+
+    cases = [
+        ("public route", lambda: make_scope("/super-admin/companies")),
+        ("authenticated", lambda: make_scope("/journey/active", token)),
+        ("missing token", lambda: make_scope("/journey/active")),
+    ]
+
+    print(f"Middleware overhead, {iterations} requests per case (µs/request)")
+    print(f"{'case':<16}{'stacked':>12}{'merged':>12}{'speedup':>10}")
+    for name, factory in cases:
+        before = await measure(stacked, factory, iterations)
+        after = await measure(merged, factory, iterations)
+        print(f"{name:<16}{before:>12.2f}{after:>12.2f}{before / after:>9.2f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
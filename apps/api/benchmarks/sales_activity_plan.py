@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Sales Activity Plan Check
+EXPLAIN regression check for the SalesActivity tenant predicate
+
+Seeds a scratch schema (``activity_bench``) with prisma/sales_activity_client.sql
+applied, then EXPLAINs the activity list query with the old OR/IN-subquery
+predicate and with ``sa.clientId = $1``. Exits non-zero unless the new plan
+reaches "SalesActivity" through an index. Point DATABASE_URL at a disposable
+database. Run from the repository root:
+    python -m apps.api.benchmarks.sales_activity_plan [activities]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+
+SCHEMA = "activity_bench"
+CLIENTS = 50
+MIGRATION = Path(__file__).resolve().parents[3] / "prisma" / "sales_activity_client.sql"
+
+SETUP = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA};
+
+CREATE TABLE "User" (id text PRIMARY KEY, name text);
+CREATE TABLE "Customer" (id text PRIMARY KEY, clientId text, firstName text, lastName text, email text, phone text);
+CREATE TABLE "Lead" (id text PRIMARY KEY, customerId text);
+CREATE TABLE "SalesActivity" (
+    id text PRIMARY KEY, leadId text, customerId text, userId text, type text, subject text,
+    description text, outcome text, nextAction text, scheduledDate timestamp, completedDate timestamp,
+    duration integer, cost numeric, notes text, createdAt timestamp DEFAULT NOW(), updatedAt timestamp DEFAULT NOW()
+);
+
+INSERT INTO "User" SELECT 'usr_' || g, 'User ' || g FROM generate_series(1, 500) g;
+INSERT INTO "Customer" SELECT 'cus_' || g, 'client_' || (g % {CLIENTS} + 1), 'F', 'L', 'e', 'p' FROM generate_series(1, 50000) g;
+INSERT INTO "Lead" SELECT 'lead_' || g, 'cus_' || (g % 50000 + 1) FROM generate_series(1, 50000) g;
+
+INSERT INTO "SalesActivity" (id, leadId, customerId, userId, type, description, createdAt)
+SELECT 'sa_' || g,
+       CASE WHEN g % 2 = 0 THEN 'lead_' || (g % 50000 + 1) END,
+       CASE WHEN g % 2 = 1 THEN 'cus_' || (g % 50000 + 1) END,
+       'usr_' || (g % 500 + 1),
+       (ARRAY['CALL', 'EMAIL', 'MEETING', 'NOTE'])[g % 4 + 1],
+       'seeded', NOW() - (g % 720) * interval '1 hour'
+FROM generate_series(1, $1::int) g;
+
+CREATE INDEX ON "Lead"(customerId);
+CREATE INDEX ON "Customer"(clientId);
+CREATE INDEX ON "SalesActivity"(customerId);
+CREATE INDEX ON "SalesActivity"(leadId)
+"""
+
+_LIST = """
+    SELECT sa.id, sa.type, sa.subject, sa.createdAt, u.name AS userName, c.firstName AS customerFirstName
+    FROM "SalesActivity" sa
+    LEFT JOIN "User" u ON sa.userId = u.id
+    LEFT JOIN "Customer" c ON sa.customerId = c.id
+    {joins}
+    WHERE {predicate}
+    ORDER BY sa.createdAt DESC
+    LIMIT 100 OFFSET 0
+"""
+
+LEGACY = _LIST.format(
+    joins='LEFT JOIN "Lead" l ON sa.leadId = l.id',
+    predicate='(c.clientId = $1 OR l.customerId IN (SELECT id FROM "Customer" WHERE clientId = $1))',
+)
+DENORMALIZED = _LIST.format(joins="", predicate="sa.clientId = $1")
+
+def activity_scans(plan: dict) -> list:
+    """Node types used to read "SalesActivity" anywhere in a JSON plan"""
+    found = []
+    if plan.get("Relation Name") == "SalesActivity":
+        found.append(plan["Node Type"])
+    for child in plan.get("Plans", []):
+        found.extend(activity_scans(child))
+    return found
+
+async def explain(conn, sql: str, client_id: str):
+    raw = await conn.fetchval(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", client_id)
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+    return activity_scans(plan["Plan"]), plan["Execution Time"]
+
+async def main():
+    activities = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+
+    conn = await asyncpg.connect(os.environ["DATABASE_URL"])
+    try:
+        print(f"Seeding {activities} activities into schema {SCHEMA}...")
+        for statement in filter(str.strip, SETUP.split(";\n")):
+            if "$1" in statement:
+                await conn.execute(statement, activities)
+            else:
+                await conn.execute(statement)
+        started = time.perf_counter()
+        await conn.execute(MIGRATION.read_text())
+        print(f"Applied {MIGRATION.name} in {time.perf_counter() - started:.1f}s")
+        await conn.execute("ANALYZE")
+
+        print(f"{'predicate':<14}{'SalesActivity access':<40}{'ms':>10}")
+        for name, sql in (("or-subquery", LEGACY), ("clientId", DENORMALIZED)):
+            scans, elapsed = await explain(conn, sql, "client_7")
+            print(f"{name:<14}{', '.join(scans):<40}{elapsed:>10.2f}")
+
+        scans, _ = await explain(conn, DENORMALIZED, "client_7")
+        if not scans or any(scan == "Seq Scan" for scan in scans):
+            print(f"FAIL: clientId predicate reads SalesActivity with {scans}")
+            sys.exit(1)
+        print("OK: clientId predicate uses an index")
+    finally:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
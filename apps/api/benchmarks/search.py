@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Search Benchmark
+Latency of the /search statement against the 50 ms target
+
+Seeds a scratch schema (``search_bench``) with customers, leads and journeys,
+applies prisma/search_indexes.sql, then times prefix, substring (phone, job
+number) and typo queries through apps.api.search. Point DATABASE_URL at a
+disposable database. Run from the repository root:
+    python -m apps.api.benchmarks.search [customers] [iterations]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import asyncpg
+
+from apps.api.search import ENTITIES, like_pattern, prefix_tsquery, search_sql
+
+SCHEMA = "search_bench"
+CLIENTS = 20
+TARGET_MS = 50
+MIGRATION = Path(__file__).resolve().parents[3] / "prisma" / "search_indexes.sql"
+
+SETUP = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA}, public;
+
+CREATE TABLE "Customer" (
+    id text PRIMARY KEY, clientId text, firstName text, lastName text, email text, phone text
+);
+CREATE TABLE "Lead" (id text PRIMARY KEY, customerId text, status text, source text);
+CREATE TABLE "TruckJourney" (
+    id text PRIMARY KEY, "clientId" text, date timestamp, status text,
+    "truckNumber" text, "moveSourceId" text, quoteid text, notes text
+);
+
+INSERT INTO "Customer"
+SELECT 'cus_' || g, 'client_' || (g % {CLIENTS} + 1),
+       (ARRAY['John', 'Maria', 'Wei', 'Aisha', 'Pierre', 'Olga', 'Raj', 'Sofia'])[g % 8 + 1] || (g % 997),
+       (ARRAY['Smith', 'Garcia', 'Chen', 'Khan', 'Dubois', 'Ivanova', 'Patel', 'Rossi'])[g % 7 + 1] || (g % 1009),
+       'user' || g || '@example.com',
+       '+1 (416) ' || lpad((g % 10000000)::text, 7, '0')
+FROM generate_series(1, $1::int) g;
+
+INSERT INTO "Lead"
+SELECT 'lead_' || g, 'cus_' || (g * 3), 'NEW', 'WEBSITE'
+FROM generate_series(1, $1::int / 3) g;
+
+INSERT INTO "TruckJourney"
+SELECT 'tj_' || g, 'client_' || (g % {CLIENTS} + 1), NOW() - (g % 365) * interval '1 day', 'COMPLETED',
+       'T-' || (g % 400), 'SM-' || (100000 + g), 'quote_' || g, 'seeded'
+FROM generate_series(1, $1::int / 2) g;
+
+CREATE INDEX ON "Lead"(customerId)
+"""
+
+QUERIES = (
+    ("prefix", "john12 smi"),
+    ("email", "user4242"),
+    ("phone", "(416) 000-42"),
+    ("job number", "SM-1004"),
+    ("typo", "pirre dubos"),
+)
+
+async def time_it(func, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+async def main():
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    conn = await asyncpg.connect(os.environ["DATABASE_URL"])
+    try:
+        print(f"Seeding {customers} customers into schema {SCHEMA}...")
+        for statement in filter(str.strip, SETUP.split(";\n")):
+            if "$1" in statement:
+                await conn.execute(statement, customers)
+            else:
+                await conn.execute(statement)
+        started = time.perf_counter()
+        await conn.execute(MIGRATION.read_text())
+        print(f"Applied {MIGRATION.name} in {time.perf_counter() - started:.1f}s")
+        await conn.execute("ANALYZE")
+
+        entities = list(ENTITIES.values())
+        slow = []
+        print(f"{'query':<14}{'text':<16}{'rows':>6}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, text in QUERIES:
+            pattern = like_pattern(text)
+            sql = search_sql(entities, pattern is not None)
+            args = ["client_7", text.lower(), prefix_tsquery(text), 20] + ([pattern] if pattern else [])
+            rows = await conn.fetch(sql, *args)
+            p50, p95 = await time_it(lambda: conn.fetch(sql, *args), iterations)
+            print(f"{name:<14}{text:<16}{len(rows):>6}{p50:>10.2f}{p95:>10.2f}")
+            if p95 > TARGET_MS:
+                slow.append(name)
+
+        if slow:
+            print(f"FAIL: p95 above {TARGET_MS} ms for {', '.join(slow)}")
+            sys.exit(1)
+        print(f"OK: every query under {TARGET_MS} ms at p95")
+    finally:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Stats Engine Benchmark
+Round-trips and latency of per-count queries vs one FILTER aggregate
+
+Seeds a scratch schema (``stats_bench``) with the columns the dashboard and
+operational-status panels read, then times both query shapes. Point
+DATABASE_URL at a disposable database. Run from the repository root:
+    python -m apps.api.benchmarks.stats_engine [journeys] [iterations]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+import asyncpg
+
+from apps.api.stats_engine import (
+    ACTIVE_JOURNEY_STATUSES, DASHBOARD_STATS, OPERATIONAL_STATUS, compile_stats, day_bounds
+)
+
+SCHEMA = "stats_bench"
+CLIENTS = 20
+LOCATIONS_PER_CLIENT = 5
+
+SETUP = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA};
+
+CREATE TABLE "Location" (id text PRIMARY KEY, "clientId" text NOT NULL);
+CREATE TABLE "User" (id text PRIMARY KEY, "clientId" text, "locationId" text, role text, status text);
+CREATE TABLE "TruckJourney" (id text PRIMARY KEY, "clientId" text, "locationId" text, date timestamp, status text);
+CREATE TABLE "CompanyIntegration" (id text PRIMARY KEY, "clientId" text);
+CREATE TABLE "CompanyBranch" (id text PRIMARY KEY, "companyIntegrationId" text);
+CREATE TABLE "Job" (id text PRIMARY KEY, "branchId" text, status text);
+CREATE TABLE "JobAssignment" (id text PRIMARY KEY, "jobId" text);
+
+INSERT INTO "Location"
+SELECT 'loc_' || c || '_' || l, 'client_' || c
+FROM generate_series(1, {CLIENTS}) c, generate_series(1, {LOCATIONS_PER_CLIENT}) l;
+
+INSERT INTO "User"
+SELECT 'usr_' || g, 'client_' || (g % {CLIENTS} + 1), 'loc_' || (g % {CLIENTS} + 1) || '_' || (g % {LOCATIONS_PER_CLIENT} + 1),
+       (ARRAY['DRIVER', 'MOVER', 'DISPATCHER', 'ADMIN'])[g % 4 + 1],
+       CASE WHEN g % 10 = 0 THEN 'INACTIVE' ELSE 'ACTIVE' END
+FROM generate_series(1, 20000) g;
+
+INSERT INTO "TruckJourney"
+SELECT 'tj_' || g, 'client_' || (g % {CLIENTS} + 1), 'loc_' || (g % {CLIENTS} + 1) || '_' || (g % {LOCATIONS_PER_CLIENT} + 1),
+       current_date - (g % 365) * interval '1 day' + (g % 12) * interval '1 hour',
+       (ARRAY['MORNING_PREP', 'ON_ROAD', 'ON_SITE', 'RETURNING', 'COMPLETED', 'AUDITED'])[g % 6 + 1]
+FROM generate_series(1, $1::int) g;
+
+INSERT INTO "CompanyIntegration" SELECT 'ci_' || c, 'client_' || c FROM generate_series(1, {CLIENTS}) c;
+INSERT INTO "CompanyBranch" SELECT 'br_' || g, 'ci_' || (g % {CLIENTS} + 1) FROM generate_series(1, 200) g;
+INSERT INTO "Job"
+SELECT 'job_' || g, 'br_' || (g % 200 + 1), CASE WHEN g % 3 = 0 THEN 'Completed' ELSE 'Scheduled' END
+FROM generate_series(1, 100000) g;
+INSERT INTO "JobAssignment" SELECT 'ja_' || g, 'job_' || g FROM generate_series(1, 100000, 2) g;
+
+CREATE INDEX ON "User"("clientId", "locationId", status);
+CREATE INDEX ON "TruckJourney"("clientId", "locationId", date);
+CREATE INDEX ON "TruckJourney"("clientId", "locationId", status);
+CREATE INDEX ON "Location"("clientId");
+CREATE INDEX ON "CompanyIntegration"("clientId");
+CREATE INDEX ON "CompanyBranch"("companyIntegrationId");
+CREATE INDEX ON "Job"("branchId");
+CREATE INDEX ON "JobAssignment"("jobId");
+ANALYZE;
+"""
+
+_ACTIVE = ", ".join(f"'{status}'" for status in ACTIVE_JOURNEY_STATUSES)
+_JOBS = ('"Job" j JOIN "CompanyBranch" b ON b.id = j."branchId" '
+         'JOIN "CompanyIntegration" ci ON ci.id = b."companyIntegrationId" WHERE ci."clientId" = $1')
+
+# One statement per count, as the routes issued them before the stats engine
+LEGACY_DASHBOARD = [
+    ('SELECT COUNT(*) FROM "User" WHERE "locationId" = $1 AND status = \'ACTIVE\'', ("location_id",)),
+    (f'SELECT COUNT(*) FROM "TruckJourney" WHERE "locationId" = $1 AND date >= $2 AND date < $3 AND status IN ({_ACTIVE})',
+     ("location_id", "day_start", "day_end")),
+    ('SELECT COUNT(*) FROM "TruckJourney" WHERE "locationId" = $1 AND date >= $2 AND date < $3 AND status = \'COMPLETED\'',
+     ("location_id", "day_start", "day_end")),
+    (f'SELECT COUNT(*) FROM {_JOBS} AND NOT EXISTS (SELECT 1 FROM "JobAssignment" ja WHERE ja."jobId" = j.id)', ("client_id",)),
+    ('SELECT COUNT(*) FROM "Location" WHERE "clientId" = $1', ("client_id",)),
+    ('SELECT COUNT(*) FROM "User" WHERE "locationId" = $1 AND role = \'DRIVER\' AND status = \'ACTIVE\'', ("location_id",)),
+]
+
+LEGACY_OPERATIONAL = [
+    (f'SELECT COUNT(*) FROM "TruckJourney" WHERE "clientId" = $1 AND "locationId" = $2 AND status IN ({_ACTIVE})', ("client_id", "location_id")),
+    ('SELECT COUNT(*) FROM "TruckJourney" WHERE "clientId" = $1 AND "locationId" = $2 AND status IN (\'ON_ROAD\', \'ON_SITE\')', ("client_id", "location_id")),
+    (f'SELECT COUNT(*) FROM {_JOBS} AND j.status = \'Scheduled\'', ("client_id",)),
+    ('SELECT COUNT(*) FROM "User" WHERE "clientId" = $1 AND "locationId" = $2 AND status = \'ACTIVE\' AND role IN (\'DRIVER\', \'MOVER\')',
+     ("client_id", "location_id")),
+]
+
+async def run_legacy(conn, queries, params):
+    for sql, names in queries:
+        await conn.fetchval(sql, *(params[name] for name in names))
+
+async def run_engine(conn, specs, params):
+    sql, args = compile_stats(specs, params)
+    await conn.fetchrow(sql, *args)
+
+async def time_it(func, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+async def main():
+    journeys = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    conn = await asyncpg.connect(os.environ["DATABASE_URL"])
+    try:
+        print(f"Seeding {journeys} journeys into schema {SCHEMA}...")
+        for statement in filter(str.strip, SETUP.split(";\n")):
+            if "$1" in statement:
+                await conn.execute(statement, journeys)
+            else:
+                await conn.execute(statement)
+
+        day_start, day_end = day_bounds(date.today())
+        params = {"client_id": "client_1", "location_id": "loc_1_1", "day_start": day_start, "day_end": day_end}
+
+        print(f"{'panel':<22}{'shape':<10}{'round-trips':>12}{'p50 ms':>10}{'p95 ms':>10}")
+        for panel, legacy, specs in (
+            ("dashboard.stats", LEGACY_DASHBOARD, DASHBOARD_STATS),
+            ("operational_status", LEGACY_OPERATIONAL, OPERATIONAL_STATUS),
+        ):
+            p50, p95 = await time_it(lambda: run_legacy(conn, legacy, params), iterations)
+            print(f"{panel:<22}{'per-count':<10}{len(legacy):>12}{p50:>10.2f}{p95:>10.2f}")
+            p50, p95 = await time_it(lambda: run_engine(conn, specs, params), iterations)
+            print(f"{panel:<22}{'engine':<10}{1:>12}{p50:>10.2f}{p95:>10.2f}")
+    finally:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
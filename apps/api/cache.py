@@ -0,0 +1,440 @@
+"""
+Cache Module
+C&C CRM - Shared cache abstraction with in-process and Redis backends
+
+Backends store JSON-compatible values under namespaced keys, support
+tag-based invalidation, and keep hit/miss counters for the metrics endpoint.
+"""
+
+import asyncio
+import fnmatch
+import functools
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, Awaitable, Hashable, Iterable, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ===== METRICS =====
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a backend or namespace"""
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    deletes: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "deletes": self.deletes,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hit_ratio, 4)
+        }
+
+# ===== BACKENDS =====
+
+class CacheBackend:
+    """Interface shared by cache backends.
+
+    ``get`` returns ``(found, value)`` so cached ``None`` values are
+    distinguishable from misses.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        raise NotImplementedError
+
+    async def delete(self, *keys: str) -> int:
+        raise NotImplementedError
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+    def size(self) -> Optional[int]:
+        """Number of entries, when cheaply known"""
+        return None
+
+@dataclass
+class _MemoryEntry:
+    value: Any
+    expires_at: Optional[float]
+    tags: Tuple[str, ...]
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process cache bounded by entry count (LRU) with per-entry TTL"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000, default_ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, _MemoryEntry]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return False, None
+        if entry.expires_at is not None and entry.expires_at <= self._clock():
+            self._remove(key)
+            self.stats.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return True, entry.value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        ttl = ttl if ttl is not None else self.default_ttl
+        if key in self._entries:
+            self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = _MemoryEntry(value, self._clock() + ttl if ttl else None, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        self.stats.sets += 1
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    async def delete(self, *keys: str) -> int:
+        removed = sum(self._remove(key) for key in keys)
+        self.stats.deletes += removed
+        return removed
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        keys = set()
+        for tag in tags:
+            keys |= self._tags.pop(tag, set())
+        return await self.delete(*keys)
+
+    async def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def size(self) -> Optional[int]:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return True
+
+class RedisCacheBackend(CacheBackend):
+    """Cache on any client speaking the redis.asyncio command subset.
+
+    Values are JSON encoded. Each tag is a Redis set of member keys whose
+    TTL is extended to outlive the entries it points at.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "cnc", default_ttl: Optional[float] = None):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def _tag(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        raw = await self.client.get(self._key(key))
+        if raw is None:
+            self.stats.misses += 1
+            return False, None
+        self.stats.hits += 1
+        return True, json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        ttl = ttl if ttl is not None else self.default_ttl
+        seconds = max(1, int(ttl + 0.999)) if ttl else None
+        redis_key = self._key(key)
+        await self.client.set(redis_key, json.dumps(value, default=str), ex=seconds)
+        for tag in tags:
+            tag_key = self._tag(tag)
+            await self.client.sadd(tag_key, redis_key)
+            if seconds and await self.client.ttl(tag_key) < seconds:
+                await self.client.expire(tag_key, seconds)
+        self.stats.sets += 1
+
+    async def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        removed = await self.client.delete(*(self._key(key) for key in keys))
+        self.stats.deletes += removed
+        return removed
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        removed = 0
+        for tag in tags:
+            tag_key = self._tag(tag)
+            members = await self.client.smembers(tag_key)
+            if members:
+                removed += await self.client.delete(*members)
+            await self.client.delete(tag_key)
+        self.stats.deletes += removed
+        return removed
+
+    async def clear(self):
+        keys = [key async for key in self.client.scan_iter(match=f"{self.prefix}:*")]
+        if keys:
+            await self.client.delete(*keys)
+
+class FakeRedis:
+    """In-memory stand-in for redis.asyncio.Redis.
+
+    Implements only the commands RedisCacheBackend uses, with the same
+    bytes-in/bytes-out behaviour, so the backend can be exercised locally
+    without a Redis server.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._data: Dict[bytes, Any] = {}
+        self._expires: Dict[bytes, float] = {}
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def _live(self, key: bytes) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= self._clock():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    async def get(self, key):
+        key = self._encode(key)
+        return self._data[key] if self._live(key) else None
+
+    async def set(self, key, value, ex: Optional[int] = None):
+        key = self._encode(key)
+        self._data[key] = self._encode(value)
+        self._expires.pop(key, None)
+        if ex:
+            self._expires[key] = self._clock() + ex
+        return True
+
+    async def delete(self, *keys) -> int:
+        removed = 0
+        for key in map(self._encode, keys):
+            if self._live(key):
+                removed += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return removed
+
+    async def sadd(self, key, *members) -> int:
+        key = self._encode(key)
+        if not self._live(key):
+            self._data[key] = set()
+        current = self._data[key]
+        added = {self._encode(member) for member in members} - current
+        current |= added
+        return len(added)
+
+    async def smembers(self, key) -> Set[bytes]:
+        key = self._encode(key)
+        return set(self._data[key]) if self._live(key) else set()
+
+    async def expire(self, key, seconds: int) -> bool:
+        key = self._encode(key)
+        if not self._live(key):
+            return False
+        self._expires[key] = self._clock() + seconds
+        return True
+
+    async def ttl(self, key) -> int:
+        key = self._encode(key)
+        if not self._live(key):
+            return -2
+        if key not in self._expires:
+            return -1
+        return int(self._expires[key] - self._clock())
+
+    async def scan_iter(self, match: str = "*"):
+        for key in list(self._data):
+            if self._live(key) and fnmatch.fnmatchcase(key.decode(), match):
+                yield key
+
+# ===== NAMESPACED FACADE =====
+
+class Cache:
+    """Namespaced view over a shared backend.
+
+    Keys and tags are prefixed with the namespace so reference-data and
+    response caches can share one backend without collisions.
+    """
+
+    def __init__(self, backend: CacheBackend, namespace: str):
+        self.backend = backend
+        self.namespace = namespace
+        self.stats = CacheStats()
+
+    def key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def tag(self, tag: str) -> str:
+        return f"{self.namespace}#{tag}"
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        found, value = await self.backend.get(self.key(key))
+        if found:
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+        return found, value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()):
+        await self.backend.set(self.key(key), value, ttl, [self.tag(tag) for tag in tags])
+        self.stats.sets += 1
+
+    async def delete(self, *keys: str) -> int:
+        removed = await self.backend.delete(*(self.key(key) for key in keys))
+        self.stats.deletes += removed
+        return removed
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        removed = await self.backend.invalidate_tags(*(self.tag(tag) for tag in tags))
+        self.stats.deletes += removed
+        return removed
+
+    async def get_or_set(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = ()
+    ) -> Any:
+        """Return the cached value or compute, store and return it"""
+        found, value = await self.get(key)
+        if found:
+            return value
+        value = await compute()
+        await self.set(key, value, ttl, tags)
+        return value
+
+# ===== REQUEST COALESCING =====
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key.
+
+    The call runs as its own task and callers await it through
+    ``asyncio.shield``, so one caller being cancelled does not cancel the
+    upstream request for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``func`` unless a call for ``key`` is already in flight"""
+        future = self._calls.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(functools.partial(self._finish, key))
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Retrieve the error so a call whose callers all went away doesn't log a warning
+        if not future.cancelled():
+            future.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+# ===== SHARED INSTANCES =====
+
+_backend: Optional[CacheBackend] = None
+_namespaces: Dict[str, Cache] = {}
+
+def create_backend_from_env() -> CacheBackend:
+    """Build the backend selected by CACHE_BACKEND (memory or redis)"""
+    kind = os.getenv("CACHE_BACKEND", "memory").lower()
+    if kind == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+            client = redis_asyncio.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+            return RedisCacheBackend(client, prefix=os.getenv("CACHE_PREFIX", "cnc"))
+        except ImportError:
+            logger.warning("CACHE_BACKEND=redis but the redis package is not installed; using in-process cache")
+    return MemoryCacheBackend(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "10000")))
+
+def get_cache_backend() -> CacheBackend:
+    """Get the process-wide cache backend"""
+    global _backend
+    if _backend is None:
+        _backend = create_backend_from_env()
+    return _backend
+
+def set_cache_backend(backend: CacheBackend):
+    """Swap the process-wide backend (e.g. a FakeRedis-backed one locally)"""
+    global _backend
+    _backend = backend
+    for cache in _namespaces.values():
+        cache.backend = backend
+
+def get_cache(namespace: str) -> Cache:
+    """Get the shared cache for a namespace"""
+    cache = _namespaces.get(namespace)
+    if cache is None:
+        cache = _namespaces[namespace] = Cache(get_cache_backend(), namespace)
+    return cache
+
+def cache_metrics() -> Dict[str, Any]:
+    """Hit-ratio metrics for the backend and each namespace"""
+    backend = get_cache_backend()
+    return {
+        "backend": backend.name,
+        "entries": backend.size(),
+        "totals": backend.stats.as_dict(),
+        "namespaces": {name: cache.stats.as_dict() for name, cache in sorted(_namespaces.items())}
+    }
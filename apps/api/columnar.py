@@ -0,0 +1,56 @@
+"""
+Columnar Summaries Module
+C&C CRM - Time-bucketed column arrays for long analytics windows
+
+Long windows are summarized as parallel arrays ({"period": [...], "cost":
+[...]}) rather than one object per row. The inputs are daily rollup rows,
+at most a few hundred per column, so the bucketing is a single pass in
+plain Python.
+"""
+
+import logging
+from datetime import date
+from typing import Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Windows longer than this get a monthly series by default
+COLUMNAR_WINDOW_DAYS = 92
+
+def default_granularity(start: date, end: date) -> str:
+    """Monthly buckets for multi-month windows, otherwise none"""
+    return "monthly" if (end - start).days > COLUMNAR_WINDOW_DAYS else ""
+
+def _month_key(day: date) -> int:
+    return day.year * 12 + day.month - 1
+
+def _month_label(key: int) -> str:
+    return f"{key // 12:04d}-{key % 12 + 1:02d}"
+
+def bucket_columns(days: Sequence[date], columns: Dict[str, Sequence[float]], granularity: str) -> Dict[str, List]:
+    """Sum day-sorted columns into daily or monthly buckets.
+
+    Returns ``{"period": labels, <column>: sums, ...}``.
+    """
+    if granularity == "daily":
+        result = {"period": [day.isoformat() for day in days]}
+        for name, values in columns.items():
+            result[name] = [round(float(value), 2) for value in values]
+        return result
+
+    if not days:
+        return {"period": [], **{name: [] for name in columns}}
+
+    labels: List[str] = []
+    sums: Dict[str, List[float]] = {name: [] for name in columns}
+    last_key = None
+    for index, day in enumerate(days):
+        key = _month_key(day)
+        if key != last_key:
+            labels.append(_month_label(key))
+            for name in columns:
+                sums[name].append(0.0)
+            last_key = key
+        for name, values in columns.items():
+            sums[name][-1] += float(values[index])
+    return {"period": labels, **{name: [round(v, 2) for v in values] for name, values in sums.items()}}
@@ -0,0 +1,97 @@
+"""
+Crew Scoreboard Module
+C&C CRM - Ranked crew leaderboards from the per-crew daily rollup
+
+Metrics come from "CrewDailyRollup" (see rollups.CREW): settled days are
+read from the rollup and today or re-queued days from the raw journeys, so
+a leaderboard reflects a journey as soon as it is completed. Ranking and the
+top-K cut happen in SQL.
+"""
+
+import logging
+from datetime import date
+from typing import Optional, Dict, Any, List, Tuple
+
+from .rollups import CREW, read_sql
+
+logger = logging.getLogger(__name__)
+
+# metric -> (ORDER BY expression over the summed row, direction)
+SCOREBOARD_METRICS: Dict[str, Tuple[str, str]] = {
+    "jobs": ('s."jobs"', "DESC"),
+    "onTimeRate": ('s."onTimeJobs"::numeric / NULLIF(s."timedJobs", 0)', "DESC NULLS LAST"),
+    "hours": ('s."hours"', "DESC"),
+    "revenue": ('s."revenue"', "DESC"),
+    "damageIncidents": ('s."damageIncidents"', "ASC"),
+}
+
+CREW_ROLES = ("DRIVER", "MOVER")
+
+def scoreboard_sql(metric: str, by_location: bool) -> str:
+    """Top-K crew members by ``metric`` within each location.
+
+    Parameters follow ``rollups.read_sql`` ($1 client, $2 today, $3 end,
+    $4 start[, $5 location]), then the role list and K.
+    """
+    order, direction = SCOREBOARD_METRICS[metric]
+    roles = 6 if by_location else 5
+    home = ' AND u."locationId" = $5' if by_location else ""
+    return f"""
+        SELECT * FROM (
+            SELECT s.dimension AS "userId", u.name, u.role::text AS role, u."locationId",
+                   s."jobs", s."onTimeJobs", s."timedJobs", s."hours", s."damageIncidents", s."revenue",
+                   ROW_NUMBER() OVER (
+                       PARTITION BY u."locationId"
+                       ORDER BY {order} {direction}, s."jobs" DESC, s.dimension
+                   ) AS rank
+            FROM ({read_sql(CREW, by_location, True)}) s
+            JOIN "User" u ON u.id = s.dimension
+            WHERE u.role::text = ANY(${roles}::text[]){home}
+        ) ranked
+        WHERE rank <= ${roles + 1}
+        ORDER BY "locationId", rank
+    """
+
+def _entry(row: Dict[str, Any]) -> Dict[str, Any]:
+    timed = int(row["timedJobs"] or 0)
+    return {
+        "rank": int(row["rank"]),
+        "userId": row["userId"],
+        "name": row["name"],
+        "role": row["role"],
+        "jobs": int(row["jobs"] or 0),
+        "onTimeRate": round(int(row["onTimeJobs"] or 0) / timed, 3) if timed else None,
+        "hours": round(float(row["hours"] or 0), 2),
+        "damageIncidents": int(row["damageIncidents"] or 0),
+        "revenue": round(float(row["revenue"] or 0), 2),
+    }
+
+async def get_scoreboard(
+    db,
+    client_id: str,
+    start: date,
+    end: date,
+    location_id: Optional[str] = None,
+    metric: str = "jobs",
+    roles: Tuple[str, ...] = CREW_ROLES,
+    limit: int = 10,
+    today: Optional[date] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """{locationId: top ``limit`` crew members} for [start, end].
+
+    Crew are ranked within the location they belong to; ``location_id``
+    restricts both the journeys counted and the boards returned.
+    """
+    if metric not in SCOREBOARD_METRICS:
+        raise ValueError(f"Unknown scoreboard metric: {metric}")
+
+    args: List[Any] = [client_id, today or date.today(), end, start]
+    if location_id is not None:
+        args.append(location_id)
+    args.extend([list(roles), limit])
+
+    rows = await db.fetch_all(scoreboard_sql(metric, location_id is not None), *args)
+    boards: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        boards.setdefault(row["locationId"], []).append(_entry(row))
+    return boards
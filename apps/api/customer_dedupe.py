@@ -0,0 +1,114 @@
+"""
+Customer Dedupe Job
+C&C CRM - Merge active customers sharing a normalized email or phone
+
+Within a client, the oldest active customer of each duplicate group
+survives. The others' leads, sales activities and quotes move to it, and
+they are deactivated with ``mergedIntoId`` pointing at it. Merges are
+written in batches, one transaction each. Once no duplicates remain, the
+unique contact indexes from prisma/customer_dedupe.sql are created.
+
+Run from the repository root:
+    python -m apps.api.customer_dedupe [--client ID] [--batch-size N] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from typing import Optional, Dict, Any, List, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_KEYS = ("normalizedEmail", "normalizedPhone")
+
+# Tables whose customerId follows a merged customer to its survivor
+CUSTOMER_CHILDREN = ('"Lead"', '"SalesActivity"', '"Quote"')
+
+DUPLICATES_SQL = """
+    SELECT id, survivor FROM (
+        SELECT id, first_value(id) OVER (
+            PARTITION BY clientId, {key} ORDER BY createdAt, id
+        ) AS survivor
+        FROM "Customer"
+        WHERE isActive = true AND {key} IS NOT NULL {client_filter}
+    ) ranked
+    WHERE id <> survivor
+"""
+
+async def find_duplicates(connection, key: str, client_id: Optional[str] = None) -> List[Tuple[str, str]]:
+    """(duplicate id, survivor id) pairs for one normalized contact column"""
+    if key not in DEDUPE_KEYS:
+        raise ValueError(f"Unknown dedupe key: {key}")
+    sql = DUPLICATES_SQL.format(key=key, client_filter="AND clientId = $1" if client_id else "")
+    rows = await connection.fetch(sql, *([client_id] if client_id else []))
+    return [(row["id"], row["survivor"]) for row in rows]
+
+async def merge_batch(connection, pairs: List[Tuple[str, str]]) -> None:
+    """Move children to the survivors and deactivate the duplicates, atomically"""
+    ids = [duplicate for duplicate, _ in pairs]
+    survivors = [survivor for _, survivor in pairs]
+    async with connection.transaction():
+        for table in CUSTOMER_CHILDREN:
+            await connection.execute(
+                f"""
+                UPDATE {table} t SET customerId = m.survivor, updatedAt = NOW()
+                FROM unnest($1::text[], $2::text[]) AS m(id, survivor)
+                WHERE t.customerId = m.id
+                """,
+                ids, survivors
+            )
+        await connection.execute(
+            """
+            UPDATE "Customer" c SET isActive = false, mergedIntoId = m.survivor, updatedAt = NOW()
+            FROM unnest($1::text[], $2::text[]) AS m(id, survivor)
+            WHERE c.id = m.id
+            """,
+            ids, survivors
+        )
+
+async def dedupe_customers(
+    connection,
+    client_id: Optional[str] = None,
+    batch_size: int = 500,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """Merge duplicates by email, then by phone; returns counts per key"""
+    merged: Dict[str, int] = {}
+    for key in DEDUPE_KEYS:
+        pairs = await find_duplicates(connection, key, client_id)
+        merged[key] = len(pairs)
+        if dry_run:
+            continue
+        for start in range(0, len(pairs), batch_size):
+            await merge_batch(connection, pairs[start:start + batch_size])
+            logger.info(f"Merged {min(start + batch_size, len(pairs))}/{len(pairs)} duplicates by {key}")
+
+    indexed = False
+    if not dry_run:
+        indexed = await connection.fetchval("SELECT ensure_customer_contact_indexes()")
+    return {"merged": merged, "dryRun": dry_run, "uniqueIndexes": indexed}
+
+async def main():
+    """Run the dedupe job as a standalone process"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Merge duplicate customers")
+    parser.add_argument("--client", help="Only dedupe this client")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Count duplicates without merging")
+    args = parser.parse_args()
+
+    connection = await asyncpg.connect(os.environ["DATABASE_URL"])
+    try:
+        result = await dedupe_customers(connection, args.client, args.batch_size, args.dry_run)
+        logger.info(f"Dedupe finished: {result}")
+    finally:
+        await connection.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -79,6 +79,10 @@ class DatabaseConnection:
             logger.error(f"Error in fetch_many: {e}")
             raise
     
+    async def fetch_all(self, query: str, *args) -> List[Dict[str, Any]]:
+        """Fetch multiple rows (alias used by the service layer)"""
+        return await self.fetch_many(query, *args)
+    
     async def fetch_val(self, query: str, *args) -> Any:
         """Fetch a single value"""
         try:
@@ -97,11 +101,17 @@ class DatabaseConnection:
     
     async def close(self):
         """Release the connection back to the pool"""
-        await self.connection.release()
+        if _pool is not None:
+            await _pool.release(self.connection)
+        else:
+            await self.connection.close()
 
 @asynccontextmanager
 async def get_db_transaction():
     """Get database transaction context manager"""
     conn = await get_database_connection()
-    async with conn.connection.transaction():
-        yield conn 
\ No newline at end of file
+    try:
+        async with conn.connection.transaction():
+            yield conn
+    finally:
+        await conn.close() 
\ No newline at end of file
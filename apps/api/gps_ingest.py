@@ -0,0 +1,131 @@
+"""
+GPS Ingest Module
+C&C CRM - Buffered, batched writes of journey GPS points
+
+Requests hand their points to a process-wide buffer and wait for the flush
+that writes them (group commit). The buffer flushes when it reaches
+GPS_FLUSH_POINTS or GPS_FLUSH_SECONDS after its first point, whichever comes
+first, as one multi-row INSERT into "GpsPoint". Points already stored under
+the same (journeyId, recordedAt) key are skipped, so retries are harmless.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+from .database import get_database_connection
+
+logger = logging.getLogger(__name__)
+
+GPS_FLUSH_POINTS = int(os.getenv("GPS_FLUSH_POINTS", "5000"))
+GPS_FLUSH_SECONDS = float(os.getenv("GPS_FLUSH_SECONDS", "0.5"))
+
+# (journeyId, recordedAt, lat, lng, speed, accuracy, heading)
+GpsRow = Tuple[str, datetime, float, float, Optional[float], Optional[float], Optional[float]]
+
+INSERT_POINTS_SQL = """
+    INSERT INTO "GpsPoint" ("journeyId", "recordedAt", lat, lng, speed, accuracy, heading)
+    SELECT * FROM unnest($1::text[], $2::timestamptz[], $3::float8[], $4::float8[],
+                         $5::real[], $6::real[], $7::real[])
+    ON CONFLICT ("journeyId", "recordedAt") DO NOTHING
+"""
+
+async def write_points(rows: List[GpsRow]) -> int:
+    """Insert rows in one statement; returns how many were new"""
+    columns = [list(column) for column in zip(*rows)]
+    db = await get_database_connection()
+    try:
+        status = await db.execute(INSERT_POINTS_SQL, *columns)
+    finally:
+        await db.close()
+    return int(status.split()[-1])
+
+class GpsIngestBuffer:
+    """Collects points from concurrent requests into shared flushes"""
+
+    def __init__(self, max_points: int = GPS_FLUSH_POINTS, max_delay: float = GPS_FLUSH_SECONDS):
+        self.max_points = max_points
+        self.max_delay = max_delay
+        self._rows: List[GpsRow] = []
+        self._waiters: List[asyncio.Future] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._flushing: Set[asyncio.Task] = set()
+        self._write_lock = asyncio.Lock()
+        self.flushes = 0
+        self.points_written = 0
+        self.points_skipped = 0
+
+    async def submit(self, rows: List[GpsRow]) -> None:
+        """Queue rows and return once the flush containing them has committed"""
+        if not rows:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._rows.extend(rows)
+        self._waiters.append(waiter)
+        if len(self._rows) >= self.max_points:
+            # Its own task, so a cancelled request can't strand the other waiters
+            task = asyncio.create_task(self.flush())
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        await waiter
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything queued so far"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        rows, waiters = self._rows, self._waiters
+        self._rows, self._waiters = [], []
+        if not rows:
+            return
+
+        try:
+            # One writer at a time keeps a burst from draining the pool
+            async with self._write_lock:
+                inserted = await write_points(rows)
+        except Exception as e:
+            logger.error(f"GPS flush of {len(rows)} points failed: {e}")
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        except BaseException:
+            # Cancelled mid-write (shutdown); nobody may be left waiting
+            for waiter in waiters:
+                waiter.cancel()
+            raise
+
+        self.flushes += 1
+        self.points_written += inserted
+        self.points_skipped += len(rows) - inserted
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "queuedPoints": len(self._rows),
+            "flushes": self.flushes,
+            "pointsWritten": self.points_written,
+            "duplicatesSkipped": self.points_skipped,
+            "maxPoints": self.max_points,
+            "maxDelaySeconds": self.max_delay,
+        }
+
+# Global buffer instance
+gps_buffer = GpsIngestBuffer()
+
+async def stop_gps_buffer():
+    """Flush points still queued at shutdown"""
+    await gps_buffer.flush()
+    if gps_buffer._flushing:
+        await asyncio.gather(*gps_buffer._flushing, return_exceptions=True)
@@ -0,0 +1,289 @@
+"""
+GPS Track Module
+C&C CRM - Compact journey tracks, simplification and polyline encoding
+
+A track is a dict of parallel columns: "t" (epoch milliseconds), "lat",
+"lng", "speed", "accuracy" and "heading". Closed hours are stored in
+"GpsTrackSegment" as one delta-encoded blob per journey hour. Recent points
+are still read from "GpsPoint". Map views ask for a Douglas–Peucker
+simplified track, optionally as a Google encoded polyline.
+"""
+
+import logging
+import math
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+TRACK_COLUMNS = ("t", "lat", "lng", "speed", "accuracy", "heading")
+
+SEGMENT_VERSION = 1
+# Delta-encoded, zigzag varints: ms, micro-degrees (~0.1 m)
+DELTA_COLUMNS = (("t", 1), ("lat", 1_000_000), ("lng", 1_000_000))
+# Nullable tenths as plain varints, 0 meaning null
+TENTHS_COLUMNS = ("speed", "accuracy", "heading")
+
+EARTH_RADIUS_M = 6_371_000
+
+def empty_track() -> Dict[str, List]:
+    return {name: [] for name in TRACK_COLUMNS}
+
+# ===== SEGMENT ENCODING =====
+
+def _put_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _get_varint(data: bytes, pos: int):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def encode_segment(track: Dict[str, Sequence]) -> bytes:
+    """Pack a time-sorted track; about 6-10 bytes per point"""
+    out = bytearray([SEGMENT_VERSION])
+    _put_varint(out, len(track["t"]))
+    for name, scale in DELTA_COLUMNS:
+        previous = 0
+        for value in track[name]:
+            quantized = round(value * scale)
+            delta = quantized - previous
+            _put_varint(out, delta * 2 if delta >= 0 else -delta * 2 - 1)
+            previous = quantized
+    for name in TENTHS_COLUMNS:
+        for value in track[name]:
+            # Devices report -1 for "unknown"
+            _put_varint(out, 0 if value is None or value < 0 else round(value * 10) + 1)
+    return bytes(out)
+
+def decode_segment(data: bytes) -> Dict[str, List]:
+    if data[0] != SEGMENT_VERSION:
+        raise ValueError(f"Unsupported GPS segment version: {data[0]}")
+    count, pos = _get_varint(data, 1)
+    track = {}
+    for name, scale in DELTA_COLUMNS:
+        values, previous = [], 0
+        for _ in range(count):
+            encoded, pos = _get_varint(data, pos)
+            previous += (encoded >> 1) ^ -(encoded & 1)
+            values.append(previous if scale == 1 else previous / scale)
+        track[name] = values
+    for name in TENTHS_COLUMNS:
+        values = []
+        for _ in range(count):
+            encoded, pos = _get_varint(data, pos)
+            values.append(None if encoded == 0 else (encoded - 1) / 10)
+        track[name] = values
+    return track
+
+def track_from_rows(rows: Sequence[Dict[str, Any]]) -> Dict[str, List]:
+    """Columns from "GpsPoint" rows"""
+    track = empty_track()
+    for row in rows:
+        track["t"].append(int(row["recordedAt"].timestamp() * 1000))
+        track["lat"].append(row["lat"])
+        track["lng"].append(row["lng"])
+        for name in TENTHS_COLUMNS:
+            track[name].append(row[name])
+    return track
+
+def merge_tracks(*tracks: Dict[str, Sequence]) -> Dict[str, List]:
+    """Time-sorted union; the first track wins when timestamps repeat"""
+    points = {}
+    for track in tracks:
+        for row in zip(*(track[name] for name in TRACK_COLUMNS)):
+            points.setdefault(row[0], row)
+    merged = empty_track()
+    for key in sorted(points):
+        for name, value in zip(TRACK_COLUMNS, points[key]):
+            merged[name].append(value)
+    return merged
+
+def slice_track(track: Dict[str, Sequence], indices: Sequence[int]) -> Dict[str, List]:
+    return {name: [track[name][i] for i in indices] for name in TRACK_COLUMNS}
+
+# ===== SIMPLIFICATION =====
+
+def douglas_peucker(lat: Sequence[float], lng: Sequence[float], tolerance_m: float) -> List[int]:
+    """Indices of the points to keep so no dropped point is further than
+    ``tolerance_m`` metres from the simplified line.
+
+    Distances use a local equirectangular projection, which is accurate to
+    well under a metre at city scale. Iterative, so long tracks can't hit
+    the recursion limit.
+    """
+    n = len(lat)
+    if n < 3 or tolerance_m <= 0:
+        return list(range(n))
+
+    kx = math.radians(1) * EARTH_RADIUS_M * math.cos(math.radians(sum(lat) / n))
+    ky = math.radians(1) * EARTH_RADIUS_M
+    x = [value * kx for value in lng]
+    y = [value * ky for value in lat]
+    tolerance2 = tolerance_m * tolerance_m
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = x[first], y[first]
+        dx, dy = x[last] - ax, y[last] - ay
+        length2 = dx * dx + dy * dy
+        farthest, farthest2 = -1, tolerance2
+        for i in range(first + 1, last):
+            px, py = x[i] - ax, y[i] - ay
+            if length2:
+                # Distance to the segment, not the infinite line, so a
+                # round trip back to the depot keeps its far end
+                along = max(0.0, min(1.0, (px * dx + py * dy) / length2))
+                px, py = px - along * dx, py - along * dy
+            distance2 = px * px + py * py
+            if distance2 > farthest2:
+                farthest, farthest2 = i, distance2
+        if farthest >= 0:
+            keep[farthest] = True
+            stack.append((first, farthest))
+            stack.append((farthest, last))
+    return [i for i in range(n) if keep[i]]
+
+def encode_polyline(lat: Sequence[float], lng: Sequence[float], precision: int = 5) -> str:
+    """Google encoded polyline (precision 5 is what map SDKs expect by default)"""
+    factor = 10 ** precision
+    chunks: List[str] = []
+    previous_lat = previous_lng = 0
+    for latitude, longitude in zip(lat, lng):
+        current_lat, current_lng = round(latitude * factor), round(longitude * factor)
+        for delta in (current_lat - previous_lat, current_lng - previous_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous_lat, previous_lng = current_lat, current_lng
+    return "".join(chunks)
+
+def track_summary(track: Dict[str, Sequence]) -> Dict[str, Any]:
+    lat, lng = track["lat"], track["lng"]
+    distance = 0.0
+    for i in range(1, len(lat)):
+        phi1, phi2 = math.radians(lat[i - 1]), math.radians(lat[i])
+        a = (math.sin((phi2 - phi1) / 2) ** 2 +
+             math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng[i] - lng[i - 1]) / 2) ** 2)
+        distance += 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+    return {
+        "points": len(lat),
+        "firstAt": iso_timestamps(track["t"][:1])[0] if lat else None,
+        "lastAt": iso_timestamps(track["t"][-1:])[0] if lat else None,
+        "distanceKm": round(distance / 1000, 2),
+    }
+
+def iso_timestamps(milliseconds: Sequence[int]) -> List[str]:
+    return [datetime.fromtimestamp(ms / 1000, tz=timezone.utc).isoformat() for ms in milliseconds]
+
+# ===== STORE =====
+
+async def read_track(
+    db,
+    journey_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, List]:
+    """Compacted segments plus not-yet-compacted points, within [start, end)"""
+    segments = await db.fetch_all(
+        """
+        SELECT track FROM "GpsTrackSegment"
+        WHERE "journeyId" = $1
+          AND ($2::timestamptz IS NULL OR "lastAt" >= $2)
+          AND ($3::timestamptz IS NULL OR "firstAt" < $3)
+        ORDER BY "segmentStart"
+        """,
+        journey_id, start, end
+    )
+    rows = await db.fetch_all(
+        """
+        SELECT "recordedAt", lat, lng, speed, accuracy, heading FROM "GpsPoint"
+        WHERE "journeyId" = $1
+          AND ($2::timestamptz IS NULL OR "recordedAt" >= $2)
+          AND ($3::timestamptz IS NULL OR "recordedAt" < $3)
+        ORDER BY "recordedAt"
+        """,
+        journey_id, start, end
+    )
+    track = merge_tracks(*(decode_segment(segment["track"]) for segment in segments), track_from_rows(rows))
+    if start is None and end is None:
+        return track
+
+    low = int(start.timestamp() * 1000) if start else None
+    high = int(end.timestamp() * 1000) if end else None
+    return slice_track(track, [
+        i for i, ms in enumerate(track["t"])
+        if (low is None or ms >= low) and (high is None or ms < high)
+    ])
+
+async def compact_hour(connection, journey_id: str, hour: datetime) -> int:
+    """Fold one journey hour of raw points into its segment; returns points moved.
+
+    Passes over the same hour are serialized with an advisory lock: with no
+    segment row yet, two overlapping passes would both build from nothing
+    and the second upsert would drop the first pass's points.
+    """
+    async with connection.transaction():
+        await connection.execute(
+            "SELECT pg_advisory_xact_lock(hashtext($1 || '@' || $2::timestamptz::text))", journey_id, hour
+        )
+        rows = await connection.fetch(
+            """
+            DELETE FROM "GpsPoint"
+            WHERE "journeyId" = $1 AND "recordedAt" >= $2 AND "recordedAt" < $2 + interval '1 hour'
+            RETURNING "recordedAt", lat, lng, speed, accuracy, heading
+            """,
+            journey_id, hour
+        )
+        if not rows:
+            return 0
+        existing = await connection.fetchval(
+            'SELECT track FROM "GpsTrackSegment" WHERE "journeyId" = $1 AND "segmentStart" = $2 FOR UPDATE',
+            journey_id, hour
+        )
+        tracks = [decode_segment(existing)] if existing else []
+        track = merge_tracks(*tracks, track_from_rows(rows))
+        first_at, last_at = (datetime.fromtimestamp(ms / 1000, tz=timezone.utc) for ms in (track["t"][0], track["t"][-1]))
+        await connection.execute(
+            """
+            INSERT INTO "GpsTrackSegment" ("journeyId", "segmentStart", "firstAt", "lastAt", "pointCount", track)
+            VALUES ($1, $2, $3, $4, $5, $6)
+            ON CONFLICT ("journeyId", "segmentStart") DO UPDATE SET
+                "firstAt" = EXCLUDED."firstAt", "lastAt" = EXCLUDED."lastAt",
+                "pointCount" = EXCLUDED."pointCount", track = EXCLUDED.track, "updatedAt" = NOW()
+            """,
+            journey_id, hour, first_at, last_at, len(track["t"]), encode_segment(track)
+        )
+        return len(rows)
+
+async def compact_tracks(connection, grace_seconds: float = 300, limit: int = 500) -> int:
+    """Compact journey hours that closed more than ``grace_seconds`` ago.
+
+    Points arriving later for a compacted hour are merged in on a later pass.
+    Returns the number of raw points moved.
+    """
+    hours = await connection.fetch(
+        """
+        SELECT DISTINCT "journeyId", date_trunc('hour', "recordedAt") AS hour FROM "GpsPoint"
+        WHERE "recordedAt" < date_trunc('hour', NOW() - make_interval(secs => $1))
+        LIMIT $2
+        """,
+        grace_seconds, limit
+    )
+    moved = 0
+    for row in hours:
+        moved += await compact_hour(connection, row["journeyId"], row["hour"])
+    return moved
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+GPS Track Worker
+Compacts closed hours of raw GPS points into delta-encoded track segments
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from apps.api.database import get_database_connection
+from apps.api.gps_track import compact_tracks
+
+logger = logging.getLogger(__name__)
+
+class GpsTrackWorker:
+    """Periodically folds "GpsPoint" rows into "GpsTrackSegment" """
+
+    def __init__(self, interval: float = 300, grace_seconds: float = 300):
+        self.interval = interval
+        self.grace_seconds = grace_seconds
+        self.running = False
+        self.last_run: Optional[datetime] = None
+        self.points_compacted = 0
+
+    async def run_once(self) -> int:
+        """Compact until no closed hours remain; returns points moved"""
+        db = await get_database_connection()
+        try:
+            total = 0
+            while True:
+                moved = await compact_tracks(db.connection, self.grace_seconds)
+                total += moved
+                if not moved:
+                    break
+            self.points_compacted += total
+            self.last_run = datetime.now()
+            return total
+        finally:
+            await db.close()
+
+    async def run_continuous(self):
+        """Compact every ``interval`` seconds"""
+        logger.info(f"Starting GPS track worker (every {self.interval} seconds)")
+        self.running = True
+
+        while self.running:
+            try:
+                moved = await self.run_once()
+                if moved:
+                    logger.info(f"Compacted {moved} GPS points into track segments")
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                logger.info("GPS track worker cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Error in GPS track worker: {e}")
+                await asyncio.sleep(self.interval)
+
+    def stop(self):
+        """Stop the worker"""
+        logger.info("Stopping GPS track worker...")
+        self.running = False
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get current worker status"""
+        return {
+            "running": self.running,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "interval_seconds": self.interval,
+            "points_compacted": self.points_compacted
+        }
+
+def _worker_from_env() -> GpsTrackWorker:
+    return GpsTrackWorker(
+        interval=float(os.getenv("GPS_COMPACTION_POLL_SECONDS", "300")),
+        grace_seconds=float(os.getenv("GPS_COMPACTION_GRACE_SECONDS", "300"))
+    )
+
+# Global worker instance
+gps_track_worker = None
+gps_track_task = None
+
+async def start_gps_track_worker():
+    """Start the GPS track worker as a background task"""
+    global gps_track_worker, gps_track_task
+
+    try:
+        gps_track_worker = _worker_from_env()
+        gps_track_task = asyncio.create_task(gps_track_worker.run_continuous())
+        logger.info("GPS track worker started successfully")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to start GPS track worker: {e}")
+        return False
+
+async def stop_gps_track_worker():
+    """Stop the GPS track worker"""
+    if gps_track_worker:
+        gps_track_worker.stop()
+    if gps_track_task:
+        gps_track_task.cancel()
+        try:
+            await gps_track_task
+        except asyncio.CancelledError:
+            pass
+    logger.info("GPS track worker stopped")
+    return True
+
+async def main():
+    """Run the GPS track worker as a standalone process"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    worker = _worker_from_env()
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down...")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    if "--once" in sys.argv:
+        await worker.run_once()
+    else:
+        await worker.run_continuous()
+
+if __name__ == "__main__":
+    asyncio.run(main())
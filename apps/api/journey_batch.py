@@ -0,0 +1,201 @@
+"""
+Journey Batch Module
+C&C CRM - Bulk crew assignment and status transitions for dispatch
+
+Morning dispatch touches hundreds of journeys. A batch is checked in one
+pass: every journey, user and existing assignment it mentions is loaded
+with one query each, and the affected journeys are locked. If any item is
+invalid, nothing is written and every error is reported. Otherwise the
+batch is written in the same transaction with one multi-row statement per
+table. Assigning someone who is already on the journey is skipped, so a
+retried batch is harmless.
+"""
+
+import json
+import uuid
+from typing import Dict, Any, List, Tuple
+
+MAX_BATCH = 500
+
+DISPATCH_ROLES = ("ADMIN", "MANAGER", "DISPATCHER")
+USER_ROLES = ("ADMIN", "MANAGER", "DRIVER", "MOVER", "DISPATCHER", "AUDITOR")
+
+# Each stage may only move to the next one
+TRANSITIONS = {
+    "MORNING_PREP": ("EN_ROUTE",),
+    "EN_ROUTE": ("ONSITE",),
+    "ONSITE": ("COMPLETED",),
+    "COMPLETED": ("AUDITED",),
+    "AUDITED": (),
+}
+CLOSED_STAGES = ("COMPLETED", "AUDITED")
+
+class BatchValidationError(ValueError):
+    """One or more batch items are invalid; ``errors`` lists them all"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f"{len(errors)} invalid batch items")
+        self.errors = errors
+
+def _error(kind: str, index: int, item: Dict[str, Any], message: str) -> Dict[str, Any]:
+    return {"kind": kind, "index": index, "journeyId": item.get("journeyId"), "error": message}
+
+async def _load(connection, client_id: str, assignments: List[Dict[str, Any]],
+                transitions: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any], set]:
+    journey_ids = sorted({item["journeyId"] for item in assignments + transitions})
+    # Locked in id order so two overlapping batches can't deadlock
+    journeys = {
+        row["id"]: dict(row) for row in await connection.fetch(
+            """
+            SELECT id, "locationId", status::text AS status FROM "TruckJourney"
+            WHERE id = ANY($1::text[]) AND "clientId" = $2
+            ORDER BY id
+            FOR UPDATE
+            """,
+            journey_ids, client_id
+        )
+    }
+    users = {
+        row["id"]: dict(row) for row in await connection.fetch(
+            """
+            SELECT id, name, status::text AS status FROM "User"
+            WHERE id = ANY($1::text[]) AND "clientId" = $2
+            """,
+            list({item["userId"] for item in assignments}), client_id
+        )
+    }
+    assigned = {
+        (row["journeyId"], row["userId"]) for row in await connection.fetch(
+            'SELECT "journeyId", "userId" FROM "AssignedCrew" WHERE "journeyId" = ANY($1::text[])',
+            list(journeys)
+        )
+    }
+    return journeys, users, assigned
+
+def _validate(journeys: Dict[str, Any], users: Dict[str, Any], assignments: List[Dict[str, Any]],
+              transitions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    errors = []
+    seen = set()
+    for index, item in enumerate(assignments):
+        journey = journeys.get(item["journeyId"])
+        user = users.get(item["userId"])
+        if not journey:
+            errors.append(_error("assignment", index, item, "Journey not found"))
+        elif journey["status"] in CLOSED_STAGES:
+            errors.append(_error("assignment", index, item, f"Journey is {journey['status']}"))
+        if not user:
+            errors.append(_error("assignment", index, item, f"User {item['userId']} not found"))
+        elif user["status"] != "ACTIVE":
+            errors.append(_error("assignment", index, item, f"User {item['userId']} is {user['status']}"))
+        if item["role"] not in USER_ROLES:
+            errors.append(_error("assignment", index, item, f"role must be one of {', '.join(USER_ROLES)}"))
+        pair = (item["journeyId"], item["userId"])
+        if pair in seen:
+            errors.append(_error("assignment", index, item, f"User {item['userId']} appears twice for this journey"))
+        seen.add(pair)
+
+    moved = set()
+    for index, item in enumerate(transitions):
+        journey = journeys.get(item["journeyId"])
+        if not journey:
+            errors.append(_error("transition", index, item, "Journey not found"))
+        elif item["status"] not in TRANSITIONS:
+            errors.append(_error("transition", index, item, f"status must be one of {', '.join(TRANSITIONS)}"))
+        elif item["status"] not in TRANSITIONS[journey["status"]]:
+            errors.append(_error(
+                "transition", index, item, f"Cannot move from {journey['status']} to {item['status']}"
+            ))
+        if item["journeyId"] in moved:
+            errors.append(_error("transition", index, item, "Journey has more than one transition"))
+        moved.add(item["journeyId"])
+    return errors
+
+async def apply_batch(connection, user: Dict[str, Any], assignments: List[Dict[str, Any]],
+                      transitions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Validate and write a dispatch batch atomically.
+
+    ``connection`` is a raw asyncpg connection. Raises BatchValidationError
+    without writing anything if any item is invalid. Returns the counts
+    and, per affected journey, what changed (for events and cache
+    invalidation).
+    """
+    if len(assignments) + len(transitions) > MAX_BATCH:
+        raise ValueError(f"A batch holds at most {MAX_BATCH} items")
+
+    async with connection.transaction():
+        journeys, users, assigned = await _load(connection, user["clientId"], assignments, transitions)
+        errors = _validate(journeys, users, assignments, transitions)
+        if errors:
+            raise BatchValidationError(errors)
+
+        new_crew = [item for item in assignments if (item["journeyId"], item["userId"]) not in assigned]
+        skipped = [
+            {"journeyId": item["journeyId"], "userId": item["userId"]}
+            for item in assignments if (item["journeyId"], item["userId"]) in assigned
+        ]
+        crew_ids = [f"crew_{uuid.uuid4().hex}" for _ in new_crew]
+        if new_crew:
+            await connection.execute(
+                """
+                INSERT INTO "AssignedCrew" (id, "journeyId", "userId", role, "createdAt", "updatedAt")
+                SELECT v.id, v."journeyId", v."userId", v.role::"UserRole", NOW(), NOW()
+                FROM unnest($1::text[], $2::text[], $3::text[], $4::text[]) AS v(id, "journeyId", "userId", role)
+                """,
+                crew_ids, [item["journeyId"] for item in new_crew],
+                [item["userId"] for item in new_crew], [item["role"] for item in new_crew]
+            )
+
+        if transitions:
+            await connection.execute(
+                """
+                UPDATE "TruckJourney" t SET
+                    status = v.status::"JourneyStage",
+                    "startTime" = CASE WHEN v.status = 'EN_ROUTE' THEN COALESCE(t."startTime", NOW()) ELSE t."startTime" END,
+                    "endTime" = CASE WHEN v.status = 'COMPLETED' THEN COALESCE(t."endTime", NOW()) ELSE t."endTime" END,
+                    "updatedAt" = NOW()
+                FROM unnest($1::text[], $2::text[]) AS v(id, status)
+                WHERE t.id = v.id
+                """,
+                [item["journeyId"] for item in transitions], [item["status"] for item in transitions]
+            )
+            # The journey timeline records each transition like a single status update would
+            await connection.execute(
+                """
+                INSERT INTO "JourneyEntry" (id, "journeyId", "createdBy", type, data, timestamp)
+                SELECT v.id, v."journeyId", $4, 'STATUS_UPDATE', v.data::jsonb, NOW()
+                FROM unnest($1::text[], $2::text[], $3::text[]) AS v(id, "journeyId", data)
+                """,
+                [f"entry_{uuid.uuid4().hex}" for _ in transitions],
+                [item["journeyId"] for item in transitions],
+                [
+                    json.dumps({
+                        "from": journeys[item["journeyId"]]["status"], "to": item["status"],
+                        "notes": item.get("notes"), "batch": True
+                    })
+                    for item in transitions
+                ],
+                user["id"]
+            )
+
+    changes: Dict[str, Dict[str, Any]] = {}
+    def change(journey_id: str) -> Dict[str, Any]:
+        if journey_id not in changes:
+            changes[journey_id] = {
+                "journeyId": journey_id, "locationId": journeys[journey_id]["locationId"],
+                "status": None, "crewAssigned": []
+            }
+        return changes[journey_id]
+
+    for crew_id, item in zip(crew_ids, new_crew):
+        change(item["journeyId"])["crewAssigned"].append({
+            "id": crew_id, "userId": item["userId"], "name": users[item["userId"]]["name"], "role": item["role"]
+        })
+    for item in transitions:
+        change(item["journeyId"])["status"] = {"from": journeys[item["journeyId"]]["status"], "to": item["status"]}
+
+    return {
+        "assigned": len(new_crew),
+        "skipped": skipped,
+        "transitioned": len(transitions),
+        "journeys": list(changes.values()),
+    }
@@ -0,0 +1,192 @@
+"""
+Journey Chat Module
+C&C CRM - Journey message store with sync cursors and read watermarks
+
+Messages are numbered per journey. Clients keep the highest seq they have
+and ask for "since=<seq>" to fetch only what is new. Each participant has
+one read watermark per journey, so the unread count is a subtraction, not
+a count over the history. A batch of messages (a mobile outbox, say) is
+written with one multi-row INSERT. Messages carrying a clientMessageId
+the sender has already stored are returned as-is instead of being stored
+twice.
+"""
+
+from typing import Optional, Dict, Any, List
+
+MAX_BATCH = 100
+
+MESSAGE_COLUMNS = """
+    m."journeyId", m.seq, m."userId", u.name AS "userName", u.role::text AS "userRole",
+    m."clientMessageId", m.type, m.message, m."createdAt" AS timestamp
+"""
+
+def _message(row) -> Dict[str, Any]:
+    message = dict(row)
+    message["id"] = f"{message['journeyId']}:{message['seq']}"
+    return message
+
+async def post_messages(connection, journey_id: str, user: Dict[str, Any],
+                        messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Store a batch of messages from one user in order.
+
+    ``connection`` is a raw asyncpg connection. Posting also moves the
+    sender's read watermark past their own messages.
+    """
+    async with connection.transaction():
+        await connection.execute(
+            'INSERT INTO "JourneyChat" ("journeyId") VALUES ($1) ON CONFLICT ("journeyId") DO NOTHING',
+            journey_id
+        )
+        # The row lock orders concurrent writers, so seqs commit in order
+        last_seq = await connection.fetchval(
+            'SELECT "lastSeq" FROM "JourneyChat" WHERE "journeyId" = $1 FOR UPDATE', journey_id
+        )
+
+        client_ids = [m["clientMessageId"] for m in messages if m.get("clientMessageId")]
+        existing = []
+        if client_ids:
+            existing = await connection.fetch(
+                f"""
+                SELECT {MESSAGE_COLUMNS}
+                FROM "JourneyMessage" m LEFT JOIN "User" u ON u.id = m."userId"
+                WHERE m."journeyId" = $1 AND m."userId" = $2 AND m."clientMessageId" = ANY($3::text[])
+                """,
+                journey_id, user["id"], client_ids
+            )
+        seen = {row["clientMessageId"] for row in existing}
+        new = []
+        for message in messages:
+            client_id = message.get("clientMessageId")
+            if client_id:
+                if client_id in seen:
+                    continue
+                seen.add(client_id)
+            new.append(message)
+
+        inserted = []
+        if new:
+            inserted = await connection.fetch(
+                f"""
+                WITH m AS (
+                    INSERT INTO "JourneyMessage" ("journeyId", seq, "userId", "clientMessageId", type, message)
+                    SELECT $1, $2::bigint + n, $3, client_id, type, message
+                    FROM unnest($4::text[], $5::text[], $6::text[]) WITH ORDINALITY AS t(client_id, type, message, n)
+                    RETURNING *
+                )
+                SELECT {MESSAGE_COLUMNS}
+                FROM m LEFT JOIN "User" u ON u.id = m."userId"
+                ORDER BY m.seq
+                """,
+                journey_id, last_seq, user["id"],
+                [m.get("clientMessageId") for m in new],
+                [m.get("type") or "TEXT" for m in new],
+                [m["message"] for m in new]
+            )
+            last_seq += len(new)
+            await connection.execute(
+                'UPDATE "JourneyChat" SET "lastSeq" = $2, "lastMessageAt" = NOW() WHERE "journeyId" = $1',
+                journey_id, last_seq
+            )
+            await connection.execute(
+                """
+                INSERT INTO "JourneyChatRead" ("journeyId", "userId", "lastReadSeq")
+                VALUES ($1, $2, $3)
+                ON CONFLICT ("journeyId", "userId") DO UPDATE SET
+                    "lastReadSeq" = GREATEST("JourneyChatRead"."lastReadSeq", EXCLUDED."lastReadSeq"),
+                    "readAt" = NOW()
+                """,
+                journey_id, user["id"], last_seq
+            )
+
+    return {
+        "messages": [_message(row) for row in sorted([*existing, *inserted], key=lambda row: row["seq"])],
+        "created": len(inserted),
+        "lastSeq": last_seq
+    }
+
+async def list_messages(db, journey_id: str, user_id: str, since: Optional[int] = None,
+                        before: Optional[int] = None, limit: int = 50) -> Dict[str, Any]:
+    """One page of messages plus the caller's unread count.
+
+    With ``since`` the page holds the oldest messages after that seq
+    (catching up). Otherwise it holds the newest messages, or the newest
+    before ``before`` (scrolling back). Messages are always in seq order.
+    """
+    if since is not None:
+        rows = await db.fetch_all(
+            f"""
+            SELECT {MESSAGE_COLUMNS}
+            FROM "JourneyMessage" m LEFT JOIN "User" u ON u.id = m."userId"
+            WHERE m."journeyId" = $1 AND m.seq > $2
+            ORDER BY m.seq
+            LIMIT $3
+            """,
+            journey_id, since, limit + 1
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        rows = await db.fetch_all(
+            f"""
+            SELECT {MESSAGE_COLUMNS}
+            FROM "JourneyMessage" m LEFT JOIN "User" u ON u.id = m."userId"
+            WHERE m."journeyId" = $1 AND ($2::bigint IS NULL OR m.seq < $2)
+            ORDER BY m.seq DESC
+            LIMIT $3
+            """,
+            journey_id, before, limit + 1
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+
+    state = await db.fetch_one(
+        """
+        SELECT c."lastSeq", COALESCE(r."lastReadSeq", 0) AS "lastReadSeq"
+        FROM "JourneyChat" c
+        LEFT JOIN "JourneyChatRead" r ON r."journeyId" = c."journeyId" AND r."userId" = $2
+        WHERE c."journeyId" = $1
+        """,
+        journey_id, user_id
+    ) or {"lastSeq": 0, "lastReadSeq": 0}
+
+    return {
+        "messages": [_message(row) for row in rows],
+        # Pass back as since= to continue; unchanged when nothing is new
+        "cursor": rows[-1]["seq"] if rows else (since if since is not None else state["lastSeq"]),
+        "hasMore": has_more,
+        "lastSeq": state["lastSeq"],
+        "lastReadSeq": state["lastReadSeq"],
+        "unreadCount": max(0, state["lastSeq"] - state["lastReadSeq"])
+    }
+
+async def mark_read(db, journey_id: str, user_id: str, seq: int) -> Dict[str, Any]:
+    """Move the user's read watermark forward to ``seq``; it never moves back"""
+    state = await db.fetch_one(
+        """
+        WITH c AS (
+            SELECT "lastSeq" FROM "JourneyChat" WHERE "journeyId" = $1
+        ), r AS (
+            INSERT INTO "JourneyChatRead" ("journeyId", "userId", "lastReadSeq")
+            SELECT $1, $2, LEAST($3, c."lastSeq") FROM c
+            ON CONFLICT ("journeyId", "userId") DO UPDATE SET
+                "lastReadSeq" = GREATEST("JourneyChatRead"."lastReadSeq", EXCLUDED."lastReadSeq"),
+                "readAt" = NOW()
+            RETURNING "lastReadSeq"
+        )
+        SELECT c."lastSeq", r."lastReadSeq" FROM c, r
+        """,
+        journey_id, user_id, seq
+    ) or {"lastSeq": 0, "lastReadSeq": 0}
+    return {**state, "unreadCount": max(0, state["lastSeq"] - state["lastReadSeq"])}
+
+async def list_participants(db, journey_id: str) -> List[Dict[str, Any]]:
+    """Everyone who has posted in or read the journey's chat"""
+    return await db.fetch_all(
+        """
+        SELECT r."userId", u.name, u.role::text AS role, r."lastReadSeq", r."readAt"
+        FROM "JourneyChatRead" r LEFT JOIN "User" u ON u.id = r."userId"
+        WHERE r."journeyId" = $1
+        ORDER BY r."readAt" DESC
+        """,
+        journey_id
+    )
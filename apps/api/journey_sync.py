@@ -0,0 +1,118 @@
+"""
+Journey Sync Module
+C&C CRM - Freshness watermark and on-demand background SmartMoving sync
+
+Journey reads are served from the database and report when the last full
+SmartMoving sync finished. When that is older than SYNC_MAX_AGE_SECONDS a
+read triggers one background sync. The "SyncWatermark" lease ensures only one
+sync runs across processes; within a process, the running task is reused.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Optional, Dict, Any
+
+from .database import get_database_connection
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "smartmoving"
+
+SYNC_MAX_AGE_SECONDS = float(os.getenv("JOURNEY_SYNC_MAX_AGE_SECONDS", "900"))
+# A claimed sync that has not finished by then is presumed dead
+SYNC_LEASE_SECONDS = float(os.getenv("JOURNEY_SYNC_LEASE_SECONDS", "1800"))
+
+_sync_task: Optional[asyncio.Task] = None
+
+# ===== WATERMARK =====
+
+async def get_watermark(db) -> Dict[str, Any]:
+    """When the last full sync finished, and whether that is too long ago"""
+    row = await db.fetch_one(
+        """
+        SELECT "syncedAt", "syncedAt" IS NULL OR "syncedAt" < NOW() - make_interval(secs => $2) AS stale
+        FROM "SyncWatermark" WHERE source = $1
+        """,
+        SOURCE, SYNC_MAX_AGE_SECONDS
+    )
+    return row or {"syncedAt": None, "stale": True}
+
+async def claim_sync(db) -> bool:
+    """Take the sync lease if the data is stale and no live sync holds it"""
+    claimed = await db.fetch_val(
+        """
+        INSERT INTO "SyncWatermark" (source, "startedAt") VALUES ($1, NOW())
+        ON CONFLICT (source) DO UPDATE SET "startedAt" = NOW()
+        WHERE ("SyncWatermark"."syncedAt" IS NULL
+               OR "SyncWatermark"."syncedAt" < NOW() - make_interval(secs => $2))
+          AND ("SyncWatermark"."startedAt" IS NULL
+               OR "SyncWatermark"."startedAt" < NOW() - make_interval(secs => $3))
+        RETURNING true
+        """,
+        SOURCE, SYNC_MAX_AGE_SECONDS, SYNC_LEASE_SECONDS
+    )
+    return bool(claimed)
+
+async def record_sync(duration_ms: int, error: Optional[str] = None) -> None:
+    """Release the lease, advancing the watermark unless the sync failed"""
+    db = await get_database_connection()
+    try:
+        await db.execute(
+            """
+            INSERT INTO "SyncWatermark" (source, "syncedAt", "durationMs", "lastError")
+            VALUES ($1, CASE WHEN $3::text IS NULL THEN NOW() END, $2, $3)
+            ON CONFLICT (source) DO UPDATE SET
+                "syncedAt" = CASE WHEN $3::text IS NULL THEN NOW() ELSE "SyncWatermark"."syncedAt" END,
+                "startedAt" = NULL,
+                "durationMs" = $2,
+                "lastError" = $3
+            """,
+            SOURCE, duration_ms, error
+        )
+    finally:
+        await db.close()
+
+# ===== BACKGROUND SYNC =====
+
+async def _run_sync() -> None:
+    from .services.smartmoving_sync_service import SmartMovingSyncService
+
+    started = time.perf_counter()
+    try:
+        # A full sync records the watermark itself
+        async with SmartMovingSyncService() as sync_service:
+            await sync_service.sync_today_and_tomorrow_jobs()
+    except Exception as e:
+        logger.error(f"Background SmartMoving sync failed: {e}")
+        await record_sync(int((time.perf_counter() - started) * 1000), str(e))
+
+async def ensure_fresh(db) -> Dict[str, Any]:
+    """Freshness of the synced journeys, starting a background sync if stale.
+
+    Never waits for the sync; callers serve what the database has now.
+    """
+    global _sync_task
+
+    watermark = await get_watermark(db)
+    synced_at, stale = watermark["syncedAt"], watermark["stale"]
+    syncing = _sync_task is not None and not _sync_task.done()
+    if stale and not syncing and await claim_sync(db):
+        logger.info("Journey data is stale, starting background SmartMoving sync")
+        _sync_task = asyncio.create_task(_run_sync())
+        syncing = True
+    return {
+        "dataAsOf": synced_at.isoformat() if synced_at else None,
+        "stale": stale,
+        "syncInProgress": syncing,
+    }
+
+async def cancel_background_sync() -> None:
+    """Cancel a sync started by this process; its lease expires on its own"""
+    if _sync_task and not _sync_task.done():
+        _sync_task.cancel()
+        try:
+            await _sync_task
+        except asyncio.CancelledError:
+            pass
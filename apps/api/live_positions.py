@@ -0,0 +1,384 @@
+"""
+Live Positions Module
+C&C CRM - Spatial index of the latest position of each active journey
+
+Each process keeps a per-client grid of fixed-size lat/lng cells, which
+answers k-nearest (ring search outward from the query cell) and
+bounding-box queries without touching the database. The GPS ingest route
+updates it as batches commit. Points ingested by other processes are pulled
+in by an incremental refresh at most every LIVE_INDEX_REFRESH_SECONDS.
+With LIVE_INDEX=sql, or if the index can't be refreshed, the same
+queries run in SQL over "GpsPoint".
+"""
+
+import heapq
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+from .cache import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+LIVE_INDEX_MODE = os.getenv("LIVE_INDEX", "memory")
+# ~2.2 km of latitude per cell
+CELL_DEGREES = float(os.getenv("LIVE_INDEX_CELL_DEGREES", "0.02"))
+# Positions older than this are not "live"
+POSITION_TTL_SECONDS = float(os.getenv("LIVE_POSITION_TTL_SECONDS", "900"))
+REFRESH_SECONDS = float(os.getenv("LIVE_INDEX_REFRESH_SECONDS", "2"))
+
+INACTIVE_STATUSES = ("COMPLETED", "AUDITED")
+
+EARTH_RADIUS_M = 6_371_000
+METERS_PER_DEGREE = math.radians(1) * EARTH_RADIUS_M
+
+@dataclass
+class LivePosition:
+    journey_id: str
+    client_id: str
+    location_id: Optional[str]
+    truck_number: Optional[str]
+    lat: float
+    lng: float
+    recorded_at: datetime
+    speed: Optional[float] = None
+    heading: Optional[float] = None
+
+    def to_dict(self, distance_m: Optional[float] = None) -> Dict[str, Any]:
+        result = {
+            "journeyId": self.journey_id,
+            "locationId": self.location_id,
+            "truckNumber": self.truck_number,
+            "lat": self.lat,
+            "lng": self.lng,
+            "recordedAt": self.recorded_at.isoformat(),
+            "speed": self.speed,
+            "heading": self.heading,
+        }
+        if distance_m is not None:
+            result["distanceKm"] = round(distance_m / 1000, 3)
+        return result
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+# ===== GRID INDEX =====
+
+class _ClientGrid:
+    def __init__(self):
+        self.positions: Dict[str, LivePosition] = {}
+        self.cells: Dict[Tuple[int, int], Set[str]] = {}
+
+class LivePositionIndex:
+    """Latest position per journey, bucketed into grid cells per client"""
+
+    def __init__(self, cell_degrees: float = CELL_DEGREES, ttl_seconds: float = POSITION_TTL_SECONDS):
+        self.cell_degrees = cell_degrees
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._clients: Dict[str, _ClientGrid] = {}
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def update(self, position: LivePosition) -> bool:
+        """Store ``position`` unless a newer one is already indexed"""
+        grid = self._clients.setdefault(position.client_id, _ClientGrid())
+        current = grid.positions.get(position.journey_id)
+        if current is not None:
+            if current.recorded_at >= position.recorded_at:
+                return False
+            self._unlink(grid, current)
+        grid.positions[position.journey_id] = position
+        grid.cells.setdefault(self._cell(position.lat, position.lng), set()).add(position.journey_id)
+        return True
+
+    def remove(self, journey_id: str) -> None:
+        for grid in self._clients.values():
+            position = grid.positions.pop(journey_id, None)
+            if position is not None:
+                self._unlink(grid, position)
+
+    def _unlink(self, grid: _ClientGrid, position: LivePosition) -> None:
+        cell = self._cell(position.lat, position.lng)
+        members = grid.cells.get(cell)
+        if members is not None:
+            members.discard(position.journey_id)
+            if not members:
+                del grid.cells[cell]
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        """Drop positions older than the TTL; returns how many"""
+        cutoff = (now or datetime.now(timezone.utc)) - self.ttl
+        expired = [
+            position.journey_id
+            for grid in self._clients.values()
+            for position in grid.positions.values()
+            if position.recorded_at < cutoff
+        ]
+        for journey_id in expired:
+            self.remove(journey_id)
+        return len(expired)
+
+    def size(self, client_id: Optional[str] = None) -> int:
+        if client_id is not None:
+            grid = self._clients.get(client_id)
+            return len(grid.positions) if grid else 0
+        return sum(len(grid.positions) for grid in self._clients.values())
+
+    def nearest(
+        self,
+        client_id: str,
+        lat: float,
+        lng: float,
+        k: int,
+        radius_m: Optional[float] = None
+    ) -> List[Tuple[float, LivePosition]]:
+        """Up to ``k`` (distance in metres, position) pairs, nearest first.
+
+        Searches rings of cells outward from the query cell, stopping once
+        the next ring can't hold anything closer than the current k-th hit.
+        """
+        grid = self._clients.get(client_id)
+        if grid is None or not grid.positions or k <= 0:
+            return []
+
+        cutoff = datetime.now(timezone.utc) - self.ttl
+        # Narrowest cell side in metres, so ring r is at least (r - 1) sides away
+        cell_m = self.cell_degrees * METERS_PER_DEGREE * max(
+            0.01, math.cos(math.radians(min(89.0, abs(lat) + self.cell_degrees)))
+        )
+        origin_lat, origin_lng = self._cell(lat, lng)
+        best: List[Tuple[float, str]] = []  # max-heap via negated distance
+
+        def consider(journey_ids):
+            for journey_id in journey_ids:
+                position = grid.positions[journey_id]
+                if position.recorded_at < cutoff:
+                    continue
+                distance = haversine_m(lat, lng, position.lat, position.lng)
+                if radius_m is not None and distance > radius_m:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, journey_id))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, journey_id))
+
+        seen = 0
+        ring = 0
+        while seen < len(grid.positions):
+            ring_floor = max(0, ring - 1) * cell_m
+            if radius_m is not None and ring_floor > radius_m:
+                break
+            if len(best) == k and ring_floor > -best[0][0]:
+                break
+            if (2 * ring + 1) ** 2 > 8 * len(grid.cells):
+                # Mostly empty rings from here on: checking every position is cheaper
+                best.clear()
+                consider(grid.positions)
+                break
+            for cell in self._ring(origin_lat, origin_lng, ring):
+                members = grid.cells.get(cell)
+                if members:
+                    seen += len(members)
+                    consider(members)
+            ring += 1
+        return [(-negated, grid.positions[journey_id]) for negated, journey_id in sorted(best, reverse=True)]
+
+    @staticmethod
+    def _ring(row: int, col: int, ring: int):
+        if ring == 0:
+            yield (row, col)
+            return
+        for dc in range(-ring, ring + 1):
+            yield (row - ring, col + dc)
+            yield (row + ring, col + dc)
+        for dr in range(-ring + 1, ring):
+            yield (row + dr, col - ring)
+            yield (row + dr, col + ring)
+
+    def within(self, client_id: str, south: float, west: float, north: float, east: float) -> List[LivePosition]:
+        """Live positions inside a bounding box (no antimeridian wrap)"""
+        grid = self._clients.get(client_id)
+        if grid is None:
+            return []
+        cutoff = datetime.now(timezone.utc) - self.ttl
+        row_min, col_min = self._cell(south, west)
+        row_max, col_max = self._cell(north, east)
+
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(grid.cells):
+            candidates = [member for members in grid.cells.values() for member in members]
+        else:
+            candidates = [
+                member
+                for row in range(row_min, row_max + 1)
+                for col in range(col_min, col_max + 1)
+                for member in grid.cells.get((row, col), ())
+            ]
+        results = []
+        for journey_id in candidates:
+            position = grid.positions[journey_id]
+            if (position.recorded_at >= cutoff and south <= position.lat <= north
+                    and west <= position.lng <= east):
+                results.append(position)
+        return results
+
+# ===== REFRESH =====
+
+LATEST_POSITIONS_SQL = """
+    SELECT DISTINCT ON (p."journeyId")
+           p."journeyId", tj."clientId", tj."locationId", tj."truckNumber",
+           p.lat, p.lng, p."recordedAt", p.speed, p.heading
+    FROM "GpsPoint" p
+    JOIN "TruckJourney" tj ON tj.id = p."journeyId"
+    WHERE p."receivedAt" > $1 AND tj.status::text <> ALL($2::text[])
+    ORDER BY p."journeyId", p."recordedAt" DESC
+"""
+
+class LiveIndexRefresher:
+    """Pulls positions committed since the last refresh into the index"""
+
+    def __init__(self, index: LivePositionIndex, interval: float = REFRESH_SECONDS):
+        self.index = index
+        self.interval = interval
+        self._since: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        self._flight = SingleFlight()
+
+    @property
+    def warm(self) -> bool:
+        return self._since is not None
+
+    async def maybe_refresh(self, db) -> None:
+        if time.monotonic() - self._refreshed_at < self.interval:
+            return
+        await self._flight.do("refresh", lambda: self._refresh(db))
+
+    async def _refresh(self, db) -> None:
+        now = await db.fetch_val("SELECT NOW()")
+        since = self._since or now - self.index.ttl
+        # Overlap by a second so commits racing the previous refresh aren't missed
+        rows = await db.fetch_all(LATEST_POSITIONS_SQL, since - timedelta(seconds=1), list(INACTIVE_STATUSES))
+        for row in rows:
+            self.index.update(_position_from_row(row))
+        if self._since is not None:
+            finished = await db.fetch_all(
+                'SELECT id FROM "TruckJourney" WHERE "updatedAt" > $1 AND status::text = ANY($2::text[])',
+                since.replace(tzinfo=None), list(INACTIVE_STATUSES)
+            )
+            for row in finished:
+                self.index.remove(row["id"])
+        self.index.expire(now)
+        self._since = now
+        self._refreshed_at = time.monotonic()
+
+def _position_from_row(row: Dict[str, Any]) -> LivePosition:
+    return LivePosition(
+        journey_id=row["journeyId"],
+        client_id=row["clientId"],
+        location_id=row["locationId"],
+        truck_number=row["truckNumber"],
+        lat=row["lat"],
+        lng=row["lng"],
+        recorded_at=row["recordedAt"],
+        speed=row["speed"],
+        heading=row["heading"],
+    )
+
+# ===== SQL FALLBACK =====
+
+_CLIENT_LATEST_SQL = """
+    WITH latest AS (
+        SELECT DISTINCT ON (p."journeyId")
+               p."journeyId", tj."clientId", tj."locationId", tj."truckNumber",
+               p.lat, p.lng, p."recordedAt", p.speed, p.heading
+        FROM "GpsPoint" p
+        JOIN "TruckJourney" tj ON tj.id = p."journeyId"
+        WHERE tj."clientId" = $1 AND tj.status::text <> ALL($2::text[])
+          AND p."receivedAt" > NOW() - make_interval(secs => $3)
+        ORDER BY p."journeyId", p."recordedAt" DESC
+    )
+"""
+
+async def nearest_sql(db, client_id: str, lat: float, lng: float, k: int,
+                      radius_m: Optional[float] = None) -> List[Tuple[float, LivePosition]]:
+    rows = await db.fetch_all(
+        _CLIENT_LATEST_SQL + """
+        SELECT *, 2 * $6 * asin(sqrt(least(1,
+                   sin(radians(lat - $4) / 2) ^ 2 +
+                   cos(radians($4)) * cos(radians(lat)) * sin(radians(lng - $5) / 2) ^ 2))) AS distance
+        FROM latest
+        ORDER BY distance
+        LIMIT $7
+        """,
+        client_id, list(INACTIVE_STATUSES), POSITION_TTL_SECONDS, lat, lng, float(EARTH_RADIUS_M), k
+    )
+    return [
+        (row["distance"], _position_from_row(row)) for row in rows
+        if radius_m is None or row["distance"] <= radius_m
+    ]
+
+async def within_sql(db, client_id: str, south: float, west: float, north: float, east: float) -> List[LivePosition]:
+    rows = await db.fetch_all(
+        _CLIENT_LATEST_SQL + """
+        SELECT * FROM latest WHERE lat BETWEEN $4 AND $5 AND lng BETWEEN $6 AND $7
+        """,
+        client_id, list(INACTIVE_STATUSES), POSITION_TTL_SECONDS, south, north, west, east
+    )
+    return [_position_from_row(row) for row in rows]
+
+# ===== QUERIES =====
+
+# Global index instance
+live_index = LivePositionIndex()
+live_refresher = LiveIndexRefresher(live_index)
+
+async def _use_index(db) -> bool:
+    if LIVE_INDEX_MODE != "memory":
+        return False
+    try:
+        await live_refresher.maybe_refresh(db)
+        return True
+    except Exception as e:
+        logger.error(f"Live position index refresh failed, using SQL: {e}")
+        return False
+
+async def find_nearest(db, client_id: str, lat: float, lng: float, k: int,
+                       radius_m: Optional[float] = None) -> Dict[str, Any]:
+    if await _use_index(db):
+        hits, source = live_index.nearest(client_id, lat, lng, k, radius_m), "memory"
+    else:
+        hits, source = await nearest_sql(db, client_id, lat, lng, k, radius_m), "sql"
+    return {"trucks": [position.to_dict(distance) for distance, position in hits], "source": source}
+
+async def find_within(db, client_id: str, south: float, west: float, north: float, east: float) -> Dict[str, Any]:
+    if await _use_index(db):
+        hits, source = live_index.within(client_id, south, west, north, east), "memory"
+    else:
+        hits, source = await within_sql(db, client_id, south, west, north, east), "sql"
+    return {"trucks": [position.to_dict() for position in hits], "source": source}
+
+def record_ingested(journey: Dict[str, Any], rows: List[tuple]) -> None:
+    """Index the newest of a just-committed batch of GPS rows (gps_ingest.GpsRow)"""
+    if not rows or journey.get("status") in INACTIVE_STATUSES:
+        return
+    journey_id, recorded_at, lat, lng, speed, _, heading = max(rows, key=lambda row: row[1])
+    if recorded_at.tzinfo is None:
+        recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+    live_index.update(LivePosition(
+        journey_id=journey_id,
+        client_id=journey["clientId"],
+        location_id=journey.get("locationId"),
+        truck_number=journey.get("truckNumber"),
+        lat=lat,
+        lng=lng,
+        recorded_at=recorded_at,
+        speed=speed,
+        heading=heading,
+    ))
@@ -17,7 +17,48 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Application lifecycle management"""
     logger.info("🚀 Starting C&C CRM API...")
+    # The rollup worker can also run as its own process: python -m apps.api.rollup_worker
+    run_rollups = os.getenv("ROLLUP_WORKER_INLINE", "false").lower() == "true"
+    if run_rollups:
+        from apps.api.rollup_worker import start_rollup_worker
+        await start_rollup_worker()
+    # Likewise: python -m apps.api.analytics_view_worker
+    run_view_refresh = os.getenv("ANALYTICS_REFRESH_INLINE", "false").lower() == "true"
+    if run_view_refresh:
+        from apps.api.analytics_view_worker import start_analytics_view_worker
+        await start_analytics_view_worker()
+    # And: python -m apps.api.gps_track_worker
+    run_gps_compaction = os.getenv("GPS_COMPACTION_INLINE", "false").lower() == "true"
+    if run_gps_compaction:
+        from apps.api.gps_track_worker import start_gps_track_worker
+        await start_gps_track_worker()
+    # And: python -m apps.api.media_worker
+    run_media_worker = os.getenv("MEDIA_WORKER_INLINE", "false").lower() == "true"
+    if run_media_worker:
+        from apps.api.media_worker import start_media_worker
+        await start_media_worker()
+    # With PUBSUB_BACKEND=redis this subscribes before the first socket connects
+    from apps.api.pubsub import event_hub
+    await event_hub.start()
     yield
+    if run_rollups:
+        from apps.api.rollup_worker import stop_rollup_worker
+        await stop_rollup_worker()
+    if run_view_refresh:
+        from apps.api.analytics_view_worker import stop_analytics_view_worker
+        await stop_analytics_view_worker()
+    if run_gps_compaction:
+        from apps.api.gps_track_worker import stop_gps_track_worker
+        await stop_gps_track_worker()
+    if run_media_worker:
+        from apps.api.media_worker import stop_media_worker
+        await stop_media_worker()
+    # A stale /journey/active read may have started a SmartMoving sync
+    from apps.api.journey_sync import cancel_background_sync
+    await cancel_background_sync()
+    from apps.api.gps_ingest import stop_gps_buffer
+    await stop_gps_buffer()
+    await event_hub.stop()
     logger.info("🛑 Shutting down C&C CRM API...")
 
 # ===== FASTAPI APP INITIALIZATION =====
@@ -147,6 +188,30 @@ try:
 except Exception as e:
     logger.error(f"❌ Operations routes failed: {e}")
 
+try:
+    # Dispatch: live truck positions
+    from apps.api.routes import dispatch
+    app.include_router(dispatch.router, prefix="/dispatch", tags=["Dispatch"])
+    logger.info("✅ Dispatch routes loaded")
+except Exception as e:
+    logger.error(f"❌ Dispatch routes failed: {e}")
+
+try:
+    # Live journey/location events over WebSocket
+    from apps.api.routes import events
+    app.include_router(events.router, prefix="/events", tags=["Events"])
+    logger.info("✅ Event routes loaded")
+except Exception as e:
+    logger.error(f"❌ Event routes failed: {e}")
+
+try:
+    # Global search
+    from apps.api.routes import search
+    app.include_router(search.router, prefix="/search", tags=["Search"])
+    logger.info("✅ Search routes loaded")
+except Exception as e:
+    logger.error(f"❌ Search routes failed: {e}")
+
 # ===== ERROR HANDLERS =====
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
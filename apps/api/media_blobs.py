@@ -0,0 +1,228 @@
+"""
+Media Blobs Module
+C&C CRM - Content-addressed, reference-counted storage for journey media
+
+A file is stored once per SHA-256, however many journeys or variants use
+it. A client that sends the hash up front is told when its own client
+already stores the file, and then uploads nothing. An upload that turns out to be
+a copy is dropped after it lands. Either way the journey gets a "Media"
+row pointing at the shared blob, or the existing row if that journey
+already has the file. Blobs left unreferenced for BLOB_GC_GRACE_HOURS are
+deleted by collect_garbage. The grace period keeps a blob registered
+moments ago safe until its first reference is recorded.
+"""
+
+import json
+import logging
+import os
+from typing import Optional, Dict, Any, List, Tuple
+
+from .media_storage import MediaStorage
+
+logger = logging.getLogger(__name__)
+
+BLOB_GC_GRACE_HOURS = float(os.getenv("MEDIA_BLOB_GC_GRACE_HOURS", "24"))
+
+MEDIA_COLUMNS = """
+    m.id, m."journeyId", m."uploadedBy", m.type::text AS type, m.url, m.filename, m.size,
+    m.metadata, m."createdAt"
+"""
+
+async def register_blob(db, storage: MediaStorage, sha256: str, storage_key: str, size: int,
+                        mime_type: Optional[str]) -> str:
+    """Record a freshly stored object as the blob for its hash.
+
+    If the hash was already stored, the new copy is deleted, and the
+    existing blob's key is returned and should be used instead.
+    """
+    canonical = await db.fetch_val(
+        """
+        INSERT INTO "MediaBlob" (sha256, "storageKey", size, "mimeType")
+        VALUES ($1, $2, $3, $4)
+        ON CONFLICT (sha256) DO UPDATE SET "lastReferencedAt" = NOW()
+        RETURNING "storageKey"
+        """,
+        sha256, storage_key, size, mime_type
+    )
+    if canonical != storage_key:
+        await db.execute(
+            'UPDATE "MediaBlob" SET "duplicatesDropped" = "duplicatesDropped" + 1 WHERE sha256 = $1', sha256
+        )
+        await storage.delete(storage_key)
+    return canonical
+
+async def attach_media(db, storage: MediaStorage, sha256: str, journey_id: str, user_id: str,
+                       media_id: str, media_type: str, filename: Optional[str],
+                       metadata: Dict[str, Any], skipped_transfer: bool = False,
+                       size: Optional[int] = None, client_id: Optional[str] = None) -> Optional[Tuple[Dict[str, Any], bool]]:
+    """Point a journey at a stored blob.
+
+    Returns (media, duplicate). ``duplicate`` is true when the journey
+    already had this file and its existing row is returned. Returns None
+    when no blob with that hash (and ``size``, if given) is stored.
+
+    Knowing a hash doesn't prove having the file. A caller that hasn't
+    uploaded the bytes must pass ``client_id``: only blobs already used by
+    that client's journeys are attached, so one client can't read (or
+    confirm the existence of) another client's files by hash.
+    """
+    async with db.connection.transaction():
+        # The blob row lock orders concurrent attaches and garbage collection
+        blob = await db.fetch_one(
+            'SELECT "storageKey", size, "mimeType" FROM "MediaBlob" WHERE sha256 = $1 FOR UPDATE', sha256
+        )
+        if not blob or (size is not None and blob["size"] != size):
+            return None
+        if client_id is not None:
+            owned = await db.fetch_val(
+                """
+                SELECT 1 FROM "MediaBlobRef" r JOIN "TruckJourney" t ON t.id = r."journeyId"
+                WHERE r.sha256 = $1 AND t."clientId" = $2
+                LIMIT 1
+                """,
+                sha256, client_id
+            )
+            if not owned:
+                return None
+        existing = await db.fetch_one(
+            f"""
+            SELECT {MEDIA_COLUMNS}
+            FROM "MediaBlobRef" r JOIN "Media" m ON m.id = r."mediaId"
+            WHERE r.sha256 = $1 AND r."journeyId" = $2
+            """,
+            sha256, journey_id
+        )
+        if skipped_transfer:
+            await db.execute(
+                'UPDATE "MediaBlob" SET "transfersSkipped" = "transfersSkipped" + 1 WHERE sha256 = $1', sha256
+            )
+        if existing:
+            return existing, True
+
+        metadata = {
+            **metadata, "sha256": sha256, "storageKey": blob["storageKey"],
+            "mimeType": metadata.get("mimeType") or blob["mimeType"]
+        }
+        media = await db.fetch_one(
+            f"""
+            WITH m AS (
+                INSERT INTO "Media" (id, "journeyId", "uploadedBy", type, url, filename, size, metadata, "createdAt")
+                VALUES ($1, $2, $3, $4::"MediaType", $5, $6, $7, $8::jsonb, NOW())
+                RETURNING *
+            ), ref AS (
+                INSERT INTO "MediaBlobRef" (sha256, "journeyId", "mediaId") VALUES ($9, $2, $1)
+            ), blob AS (
+                UPDATE "MediaBlob" SET "refCount" = "refCount" + 1, "lastReferencedAt" = NOW() WHERE sha256 = $9
+            ), job AS (
+                -- Thumbnails and EXIF extraction, see media_processing.py
+                INSERT INTO "MediaJob" ("mediaId") VALUES ($1)
+            )
+            SELECT {MEDIA_COLUMNS} FROM m
+            """,
+            media_id, journey_id, user_id, media_type, storage.url(blob["storageKey"]), filename,
+            blob["size"], json.dumps(metadata), sha256
+        )
+        return media, False
+
+async def retain(db, hashes: List[str]) -> None:
+    """Add one reference per entry (repeats count more than once)"""
+    if hashes:
+        await db.execute(
+            """
+            UPDATE "MediaBlob" b SET "refCount" = b."refCount" + h.n, "lastReferencedAt" = NOW()
+            FROM (SELECT sha256, COUNT(*) AS n FROM unnest($1::text[]) sha256 GROUP BY sha256) h
+            WHERE b.sha256 = h.sha256
+            """,
+            hashes
+        )
+
+async def release(db, hashes: List[str]) -> None:
+    """Drop one reference per entry; a blob at zero becomes collectable"""
+    if hashes:
+        await db.execute(
+            """
+            UPDATE "MediaBlob" b SET "refCount" = GREATEST(b."refCount" - h.n, 0), "lastReferencedAt" = NOW()
+            FROM (SELECT sha256, COUNT(*) AS n FROM unnest($1::text[]) sha256 GROUP BY sha256) h
+            WHERE b.sha256 = h.sha256
+            """,
+            hashes
+        )
+
+async def delete_media(db, journey_id: str, media_id: str) -> bool:
+    """Remove a media row and release its original and variants"""
+    async with db.connection.transaction():
+        media = await db.fetch_one(
+            """
+            DELETE FROM "Media" WHERE id = $1 AND "journeyId" = $2
+            RETURNING metadata->>'sha256' AS sha256
+            """,
+            media_id, journey_id
+        )
+        if not media:
+            return False
+        variants = await db.fetch_all(
+            'DELETE FROM "MediaVariant" WHERE "mediaId" = $1 RETURNING sha256', media_id
+        )
+        await db.execute('DELETE FROM "MediaBlobRef" WHERE "mediaId" = $1', media_id)
+        await db.execute('DELETE FROM "MediaJob" WHERE "mediaId" = $1', media_id)
+        await release(db, [h for h in [media["sha256"], *(v["sha256"] for v in variants)] if h])
+    return True
+
+async def collect_garbage(db, storage: MediaStorage, grace_hours: float = BLOB_GC_GRACE_HOURS,
+                          limit: int = 500, dry_run: bool = False) -> Dict[str, Any]:
+    """Delete blobs unreferenced for ``grace_hours``; returns count and bytes freed"""
+    if dry_run:
+        row = await db.fetch_one(
+            """
+            SELECT COUNT(*) AS blobs, COALESCE(SUM(size), 0) AS bytes FROM "MediaBlob"
+            WHERE "refCount" <= 0 AND "lastReferencedAt" < NOW() - make_interval(secs => $1)
+            """,
+            grace_hours * 3600
+        )
+        return {"blobs": row["blobs"], "bytes": int(row["bytes"]), "dryRun": True}
+
+    deleted = await db.fetch_all(
+        """
+        DELETE FROM "MediaBlob" WHERE sha256 IN (
+            SELECT sha256 FROM "MediaBlob"
+            WHERE "refCount" <= 0 AND "lastReferencedAt" < NOW() - make_interval(secs => $1)
+            ORDER BY "lastReferencedAt"
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING sha256, "storageKey", size
+        """,
+        grace_hours * 3600, limit
+    )
+    freed = 0
+    for blob in deleted:
+        try:
+            await storage.delete(blob["storageKey"])
+            freed += blob["size"]
+        except Exception as e:
+            # The row is gone, so the object is orphaned; log it for cleanup
+            logger.error(f"Failed to delete blob {blob['sha256']} at {blob['storageKey']}: {e}")
+    return {"blobs": len(deleted), "bytes": freed, "dryRun": False}
+
+async def storage_savings(db) -> Dict[str, Any]:
+    """Bytes referenced versus bytes stored, across all journeys"""
+    row = await db.fetch_one(
+        """
+        SELECT
+            (SELECT COALESCE(SUM(size), 0) FROM "Media" WHERE metadata ? 'sha256') AS "originalBytes",
+            (SELECT COALESCE(SUM(size), 0) FROM "MediaVariant") AS "variantBytes",
+            COUNT(*) AS blobs,
+            COALESCE(SUM(size), 0) AS "storedBytes",
+            COALESCE(SUM(size) FILTER (WHERE "refCount" <= 0), 0) AS "unreferencedBytes",
+            COALESCE(SUM("transfersSkipped"), 0) AS "transfersSkipped",
+            COALESCE(SUM(size * "transfersSkipped"), 0) AS "transferBytesSkipped",
+            COALESCE(SUM("duplicatesDropped"), 0) AS "duplicatesDropped"
+        FROM "MediaBlob"
+        """
+    )
+    stats = {key: int(value) for key, value in row.items()}
+    referenced = stats["originalBytes"] + stats["variantBytes"]
+    stats["referencedBytes"] = referenced
+    stats["savedBytes"] = max(0, referenced - stats["storedBytes"])
+    stats["savedRatio"] = round(stats["savedBytes"] / referenced, 4) if referenced else 0.0
+    return stats
@@ -0,0 +1,345 @@
+"""
+Media Processing Module
+C&C CRM - Thumbnails, EXIF extraction and video posters for journey media
+
+Each uploaded photo gets a "thumb" and a "medium" size, plus a
+"display" copy. All three are re-encoded without EXIF, so galleries never
+leak a customer's GPS position, and are rotated per the EXIF orientation.
+The EXIF capture time, GPS position and camera are copied into the media
+row's metadata so they can be validated against the journey; the media
+listing returns them without the position. Videos get a
+"poster" frame (ffmpeg) with the same sizes derived from it.
+
+The image work is CPU-bound, so it runs in a process pool. The functions
+it calls take and return file paths and plain dicts. Outputs are
+reference-counted blobs (see media_blobs.py) stored under their SHA-256
+("variants/ab/abcdef....jpg"), so an output that already exists is not
+stored again.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from .media_blobs import register_blob, retain, release
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# name -> longest edge in pixels
+IMAGE_VARIANTS = {"thumb": 256, "medium": 1024, "display": 2048}
+JPEG_QUALITY = 82
+MAX_ATTEMPTS = 5
+# A claimed job not finished by then is presumed dead and retried
+JOB_LEASE_SECONDS = 600
+
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+TAG_MAKE, TAG_MODEL = 271, 272
+TAG_DATETIME, TAG_DATETIME_ORIGINAL = 306, 36867
+
+# ===== IMAGE WORK (runs in the process pool) =====
+
+def _ratio(value) -> float:
+    return float(value[0]) / float(value[1]) if isinstance(value, tuple) else float(value)
+
+def _gps_coordinate(dms, ref) -> Optional[float]:
+    if not dms or len(dms) != 3:
+        return None
+    degrees = _ratio(dms[0]) + _ratio(dms[1]) / 60 + _ratio(dms[2]) / 3600
+    return round(-degrees if ref in ("S", "W") else degrees, 7)
+
+def extract_exif(image) -> Dict[str, Any]:
+    """Capture time, GPS position and camera from an image's EXIF, where present"""
+    exif = image.getexif()
+    if not exif:
+        return {}
+    details = exif.get_ifd(EXIF_IFD)
+    gps = exif.get_ifd(GPS_IFD)
+    result: Dict[str, Any] = {}
+    taken = details.get(TAG_DATETIME_ORIGINAL) or exif.get(TAG_DATETIME)
+    if taken:
+        try:
+            result["takenAt"] = datetime.strptime(str(taken).strip("\x00 "), "%Y:%m:%d %H:%M:%S").isoformat()
+        except ValueError:
+            pass
+    if gps:
+        try:
+            lat = _gps_coordinate(gps.get(2), gps.get(1))
+            lng = _gps_coordinate(gps.get(4), gps.get(3))
+            if lat is not None and lng is not None:
+                result["lat"], result["lng"] = lat, lng
+        except (TypeError, ValueError, ZeroDivisionError):
+            pass
+    for tag, name in ((TAG_MAKE, "make"), (TAG_MODEL, "model")):
+        if exif.get(tag):
+            result[name] = str(exif[tag]).strip("\x00 ")
+    return result
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def render_image_variants(source: str, out_dir: str, variants: Dict[str, int] = IMAGE_VARIANTS) -> Dict[str, Any]:
+    """Resize one image into ``variants`` without metadata; returns files and EXIF"""
+    if Image is None:
+        raise RuntimeError("Pillow is not installed")
+    with Image.open(source) as original:
+        exif = extract_exif(original)
+        image = ImageOps.exif_transpose(original)
+        width, height = image.size
+        keep_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if keep_alpha else "RGB")
+        outputs = []
+        for name, edge in variants.items():
+            copy = image.copy()
+            copy.thumbnail((edge, edge), Image.LANCZOS)
+            # Signatures and other transparent images stay PNG
+            extension, mime_type = (".png", "image/png") if keep_alpha else (".jpg", "image/jpeg")
+            path = os.path.join(out_dir, f"{name}{extension}")
+            if keep_alpha:
+                copy.save(path, "PNG", optimize=True)
+            else:
+                copy.save(path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            outputs.append({
+                "name": name, "path": path, "mimeType": mime_type, "width": copy.width,
+                "height": copy.height, "size": os.path.getsize(path), "sha256": _file_digest(path)
+            })
+    return {"width": width, "height": height, "exif": exif, "variants": outputs}
+
+def render_video_poster(source: str, out_dir: str) -> Dict[str, Any]:
+    """Grab a frame near the start of a video and size it like a photo"""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg is not installed")
+    frame = os.path.join(out_dir, "frame.png")
+    # One second in skips black lead-in frames; very short clips use the first frame
+    for seek in ("1", "0"):
+        subprocess.run(
+            [ffmpeg, "-v", "error", "-y", "-ss", seek, "-i", source, "-frames:v", "1", frame],
+            check=False, capture_output=True, timeout=120
+        )
+        if os.path.exists(frame) and os.path.getsize(frame):
+            break
+    else:
+        raise RuntimeError("ffmpeg could not extract a frame")
+
+    result = render_image_variants(frame, out_dir, {"poster": IMAGE_VARIANTS["display"],
+                                                    "thumb": IMAGE_VARIANTS["thumb"],
+                                                    "medium": IMAGE_VARIANTS["medium"]})
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        probe = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", source],
+            capture_output=True, text=True, timeout=60
+        )
+        try:
+            result["duration"] = round(float(probe.stdout.strip()), 2)
+        except ValueError:
+            pass
+    return result
+
+def render_variants(media_type: str, source: str, out_dir: str) -> Dict[str, Any]:
+    """Process-pool entry point"""
+    if media_type == "VIDEO":
+        return render_video_poster(source, out_dir)
+    return render_image_variants(source, out_dir)
+
+def variant_key(sha256: str, mime_type: str) -> str:
+    extension = ".png" if mime_type == "image/png" else ".jpg"
+    return f"variants/{sha256[:2]}/{sha256}{extension}"
+
+# ===== QUEUE =====
+
+async def enqueue(db, media_ids: List[str]) -> None:
+    await db.execute(
+        """
+        INSERT INTO "MediaJob" ("mediaId") SELECT unnest($1::text[])
+        ON CONFLICT ("mediaId") DO UPDATE SET
+            status = 'PENDING', attempts = 0, "availableAt" = NOW(), error = NULL, "finishedAt" = NULL
+        """,
+        media_ids
+    )
+
+async def claim_jobs(db, limit: int) -> List[Dict[str, Any]]:
+    """Lease up to ``limit`` ready jobs, with the media rows they need.
+
+    An expired lease means the worker died mid-job; one that has already
+    used its attempts is marked FAILED instead of being retried.
+    """
+    return await db.fetch_all(
+        """
+        WITH abandoned AS (
+            UPDATE "MediaJob" SET status = 'FAILED', error = 'Worker died while processing',
+                "finishedAt" = NOW()
+            WHERE status = 'RUNNING' AND "lockedUntil" < NOW() AND attempts >= $3
+        ), claimed AS (
+            UPDATE "MediaJob" SET
+                status = 'RUNNING', attempts = attempts + 1,
+                "lockedUntil" = NOW() + make_interval(secs => $2)
+            WHERE "mediaId" IN (
+                SELECT "mediaId" FROM "MediaJob"
+                WHERE (status = 'PENDING' AND "availableAt" <= NOW())
+                   OR (status = 'RUNNING' AND "lockedUntil" < NOW() AND attempts < $3)
+                ORDER BY "availableAt"
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING "mediaId", attempts
+        )
+        SELECT c."mediaId", c.attempts, m.type::text AS type,
+               m.metadata->>'storageKey' AS "storageKey", m.metadata->>'sha256' AS sha256
+        FROM claimed c JOIN "Media" m ON m.id = c."mediaId"
+        """,
+        limit, float(JOB_LEASE_SECONDS), MAX_ATTEMPTS
+    )
+
+async def finish_job(db, media_id: str, error: Optional[str] = None, attempts: int = 0) -> None:
+    if error is None:
+        await db.execute(
+            """UPDATE "MediaJob" SET status = 'DONE', error = NULL, "finishedAt" = NOW() WHERE "mediaId" = $1""",
+            media_id
+        )
+    elif attempts >= MAX_ATTEMPTS:
+        await db.execute(
+            """UPDATE "MediaJob" SET status = 'FAILED', error = $2, "finishedAt" = NOW() WHERE "mediaId" = $1""",
+            media_id, error
+        )
+    else:
+        # Back off 30s, 2m, 4.5m, ...
+        await db.execute(
+            """
+            UPDATE "MediaJob" SET status = 'PENDING', error = $2,
+                "availableAt" = NOW() + make_interval(secs => 30 * $3 * $3)
+            WHERE "mediaId" = $1
+            """,
+            media_id, error, attempts
+        )
+
+async def release_job(db, media_id: str) -> None:
+    """Requeue a job right away without counting the attempt it was claimed with"""
+    await db.execute(
+        """
+        UPDATE "MediaJob" SET status = 'PENDING', attempts = GREATEST(attempts - 1, 0),
+            "availableAt" = NOW(), "lockedUntil" = NULL
+        WHERE "mediaId" = $1
+        """,
+        media_id
+    )
+
+# ===== PROCESSING =====
+
+async def _sibling_render(db, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Variants already rendered for another media row with the same original"""
+    if not job["sha256"]:
+        return None
+    sibling = await db.fetch_one(
+        """
+        SELECT m.id, m.metadata FROM "Media" m JOIN "MediaJob" j ON j."mediaId" = m.id
+        WHERE m.metadata->>'sha256' = $1 AND m.id <> $2 AND j.status = 'DONE'
+        LIMIT 1
+        """,
+        job["sha256"], job["mediaId"]
+    )
+    if not sibling:
+        return None
+    variants = await db.fetch_all(
+        """
+        SELECT name, sha256, "storageKey", "mimeType", width, height, size
+        FROM "MediaVariant" WHERE "mediaId" = $1
+        """,
+        sibling["id"]
+    )
+    metadata = json.loads(sibling["metadata"] or "{}")
+    return {**{key: metadata[key] for key in ("width", "height", "exif", "duration") if key in metadata},
+            "variants": variants}
+
+async def process_media(db, storage, pool, job: Dict[str, Any]) -> Dict[str, Any]:
+    """Render, store and record the variants of one media item.
+
+    A re-uploaded original reuses the variants rendered the first time.
+    """
+    if not job["storageKey"]:
+        raise ValueError("Media has no stored original")
+    work_dir = await asyncio.to_thread(tempfile.mkdtemp, prefix="cnc-media-")
+    try:
+        written = 0
+        result = await _sibling_render(db, job)
+        if result is None:
+            source = os.path.join(work_dir, "original")
+            await storage.download(job["storageKey"], source)
+            result = await asyncio.get_running_loop().run_in_executor(
+                pool, render_variants, job["type"], source, work_dir
+            )
+            stored = {
+                row["sha256"]: row["storageKey"] for row in await db.fetch_all(
+                    'SELECT sha256, "storageKey" FROM "MediaBlob" WHERE sha256 = ANY($1::text[])',
+                    [v["sha256"] for v in result["variants"]]
+                )
+            }
+            for variant in result["variants"]:
+                if variant["sha256"] in stored:
+                    variant["storageKey"] = stored[variant["sha256"]]
+                    continue
+                key = variant_key(variant["sha256"], variant["mimeType"])
+                await storage.put(key, variant["path"], variant["mimeType"])
+                variant["storageKey"] = stored[variant["sha256"]] = await register_blob(
+                    db, storage, variant["sha256"], key, variant["size"], variant["mimeType"]
+                )
+                written += 1
+
+        variants = result["variants"]
+        details = {key: result[key] for key in ("width", "height", "exif", "duration") if key in result}
+        details["processedAt"] = datetime.utcnow().isoformat()
+        async with db.connection.transaction():
+            replaced = await db.fetch_all(
+                'DELETE FROM "MediaVariant" WHERE "mediaId" = $1 RETURNING sha256', job["mediaId"]
+            )
+            await db.execute(
+                """
+                WITH variants AS (
+                    INSERT INTO "MediaVariant" ("mediaId", name, sha256, "storageKey", "mimeType", width, height, size)
+                    SELECT $1::text, * FROM unnest($2::text[], $3::text[], $4::text[], $5::text[],
+                                             $6::int[], $7::int[], $8::int[])
+                )
+                UPDATE "Media" SET metadata = COALESCE(metadata, '{}'::jsonb) || $9::jsonb WHERE id = $1
+                """,
+                job["mediaId"],
+                [v["name"] for v in variants], [v["sha256"] for v in variants],
+                [v["storageKey"] for v in variants], [v["mimeType"] for v in variants],
+                [v["width"] for v in variants], [v["height"] for v in variants], [v["size"] for v in variants],
+                json.dumps(details)
+            )
+            await retain(db, [v["sha256"] for v in variants])
+            await release(db, [row["sha256"] for row in replaced])
+        return {"variants": len(variants), "written": written}
+    finally:
+        await asyncio.to_thread(shutil.rmtree, work_dir, True)
+
+async def list_variants(db, media_ids: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Variants per media id, keyed by variant name"""
+    rows = await db.fetch_all(
+        """
+        SELECT "mediaId", name, "storageKey", "mimeType", width, height, size
+        FROM "MediaVariant" WHERE "mediaId" = ANY($1::text[])
+        """,
+        media_ids
+    )
+    variants: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for row in rows:
+        variants.setdefault(row.pop("mediaId"), {})[row.pop("name")] = row
+    return variants
@@ -0,0 +1,291 @@
+"""
+Media Storage Module
+C&C CRM - Where uploaded journey media lives: local disk or an S3-style store
+
+An upload is opened with ``begin``. It then receives numbered chunks in any
+order, several at once, and ``complete`` turns it into an object under its
+final key. Chunks are streamed straight through, with at most
+WRITE_BUFFER_BYTES held in memory per request. Each chunk's SHA-256 is
+computed as it streams so the caller can verify it.
+
+MEDIA_STORAGE=local (default) writes under MEDIA_ROOT. MEDIA_STORAGE=s3 uses
+boto3 multipart uploads into MEDIA_S3_BUCKET. It falls back to local disk
+when boto3 isn't installed.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Optional, AsyncIterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+@dataclass
+class ChunkWrite:
+    """What one chunk write stored"""
+    size: int
+    sha256: str
+    # Backend-specific proof of the part (the S3 ETag), needed to complete
+    token: Optional[str] = None
+
+class ChunkLengthError(ValueError):
+    """The request body did not match the chunk's expected length"""
+
+class MediaStorage:
+    """Interface shared by media storage backends"""
+
+    name = "base"
+
+    async def begin(self, key: str, size: int) -> str:
+        """Open an upload of ``size`` bytes for ``key``; returns a storage ref"""
+        raise NotImplementedError
+
+    async def write_chunk(self, ref: str, index: int, offset: int, length: int,
+                          stream: AsyncIterator[bytes]) -> ChunkWrite:
+        """Store bytes [offset, offset + length) of the upload.
+
+        Writing the same chunk again replaces it. That makes a retry after
+        a checksum mismatch or a dropped connection safe.
+        """
+        raise NotImplementedError
+
+    async def complete(self, ref: str, key: str, tokens: List[Optional[str]]) -> Tuple[int, str]:
+        """Publish the assembled upload under ``key``; returns (size, sha256)"""
+        raise NotImplementedError
+
+    async def abort(self, ref: str) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def read(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    async def download(self, key: str, path: str) -> None:
+        """Copy an object to a local file"""
+        raise NotImplementedError
+
+    async def put(self, key: str, path: str, content_type: Optional[str] = None) -> None:
+        """Store a local file under ``key``, replacing any existing object"""
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        base = os.getenv("MEDIA_PUBLIC_URL", "/media").rstrip("/")
+        return f"{base}/{key}"
+
+async def _buffered(stream: AsyncIterator[bytes], length: int):
+    """Re-chunk a request stream into WRITE_BUFFER_BYTES blocks, enforcing length"""
+    buffer = bytearray()
+    received = 0
+    async for data in stream:
+        received += len(data)
+        if received > length:
+            raise ChunkLengthError(f"Chunk is longer than {length} bytes")
+        buffer += data
+        if len(buffer) >= WRITE_BUFFER_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if received != length:
+        raise ChunkLengthError(f"Chunk ended after {received} of {length} bytes")
+    if buffer:
+        yield bytes(buffer)
+
+def _file_sha256(path: str) -> Tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while block := f.read(WRITE_BUFFER_BYTES):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+class LocalMediaStorage(MediaStorage):
+    """Files under a root directory.
+
+    An upload is a preallocated file. Each chunk is written in place at its
+    offset, so concurrent chunks assemble themselves and completing is a
+    rename.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, "objects", key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid media key: {key}")
+        return path
+
+    def _upload_path(self, ref: str) -> str:
+        return os.path.join(self.root, "uploads", os.path.basename(ref))
+
+    async def begin(self, key: str, size: int) -> str:
+        ref = f"{os.urandom(12).hex()}.part"
+        path = self._upload_path(ref)
+
+        def allocate():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.truncate(size)
+
+        await asyncio.to_thread(allocate)
+        return ref
+
+    async def write_chunk(self, ref: str, index: int, offset: int, length: int,
+                          stream: AsyncIterator[bytes]) -> ChunkWrite:
+        path = self._upload_path(ref)
+        digest = hashlib.sha256()
+        fd = await asyncio.to_thread(os.open, path, os.O_WRONLY)
+        try:
+            position = offset
+            async for block in _buffered(stream, length):
+                digest.update(block)
+                await asyncio.to_thread(os.pwrite, fd, block, position)
+                position += len(block)
+        finally:
+            await asyncio.to_thread(os.close, fd)
+        return ChunkWrite(length, digest.hexdigest())
+
+    async def complete(self, ref: str, key: str, tokens: List[Optional[str]]) -> Tuple[int, str]:
+        source, target = self._upload_path(ref), self._path(key)
+
+        def publish():
+            size, sha256 = _file_sha256(source)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+            return size, sha256
+
+        return await asyncio.to_thread(publish)
+
+    async def abort(self, ref: str) -> None:
+        try:
+            await asyncio.to_thread(os.remove, self._upload_path(ref))
+        except FileNotFoundError:
+            pass
+
+    async def delete(self, key: str) -> None:
+        try:
+            await asyncio.to_thread(os.remove, self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def read(self, key: str) -> bytes:
+        def load():
+            with open(self._path(key), "rb") as f:
+                return f.read()
+
+        return await asyncio.to_thread(load)
+
+    async def download(self, key: str, path: str) -> None:
+        await asyncio.to_thread(shutil.copyfile, self._path(key), path)
+
+    async def put(self, key: str, path: str, content_type: Optional[str] = None) -> None:
+        target = self._path(key)
+
+        def store():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temporary = f"{target}.{os.urandom(6).hex()}.tmp"
+            shutil.copyfile(path, temporary)
+            os.replace(temporary, target)
+
+        await asyncio.to_thread(store)
+
+class S3MediaStorage(MediaStorage):
+    """S3 (or any S3-compatible store) through boto3 multipart uploads.
+
+    A chunk becomes part ``index + 1``. It is spooled to a temporary file
+    while its hash is computed, because a part upload needs the whole body
+    up front. Every chunk except the last must be at least 5 MiB.
+    """
+
+    name = "s3"
+
+    def __init__(self, client, bucket: str):
+        self.client = client
+        self.bucket = bucket
+
+    async def begin(self, key: str, size: int) -> str:
+        response = await asyncio.to_thread(self.client.create_multipart_upload, Bucket=self.bucket, Key=key)
+        return f"{key}\n{response['UploadId']}"
+
+    async def write_chunk(self, ref: str, index: int, offset: int, length: int,
+                          stream: AsyncIterator[bytes]) -> ChunkWrite:
+        key, upload_id = ref.split("\n", 1)
+        digest = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=WRITE_BUFFER_BYTES) as spool:
+            async for block in _buffered(stream, length):
+                digest.update(block)
+                await asyncio.to_thread(spool.write, block)
+            spool.seek(0)
+            response = await asyncio.to_thread(
+                self.client.upload_part, Bucket=self.bucket, Key=key, UploadId=upload_id,
+                PartNumber=index + 1, Body=spool, ContentLength=length
+            )
+        return ChunkWrite(length, digest.hexdigest(), response["ETag"])
+
+    async def complete(self, ref: str, key: str, tokens: List[Optional[str]]) -> Tuple[int, str]:
+        _, upload_id = ref.split("\n", 1)
+        await asyncio.to_thread(
+            self.client.complete_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": i + 1, "ETag": etag} for i, etag in enumerate(tokens)]}
+        )
+
+        def checksum():
+            body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+            digest = hashlib.sha256()
+            size = 0
+            for block in iter(lambda: body.read(WRITE_BUFFER_BYTES), b""):
+                digest.update(block)
+                size += len(block)
+            return size, digest.hexdigest()
+
+        return await asyncio.to_thread(checksum)
+
+    async def abort(self, ref: str) -> None:
+        key, upload_id = ref.split("\n", 1)
+        await asyncio.to_thread(self.client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    async def read(self, key: str) -> bytes:
+        def load():
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+        return await asyncio.to_thread(load)
+
+    async def download(self, key: str, path: str) -> None:
+        await asyncio.to_thread(self.client.download_file, self.bucket, key, path)
+
+    async def put(self, key: str, path: str, content_type: Optional[str] = None) -> None:
+        extra = {"ContentType": content_type} if content_type else None
+        await asyncio.to_thread(self.client.upload_file, path, self.bucket, key, ExtraArgs=extra)
+
+    def url(self, key: str) -> str:
+        if os.getenv("MEDIA_PUBLIC_URL"):
+            return super().url(key)
+        return f"https://{self.bucket}.s3.amazonaws.com/{key}"
+
+def create_storage_from_env() -> MediaStorage:
+    """Build the backend selected by MEDIA_STORAGE (local or s3)"""
+    kind = os.getenv("MEDIA_STORAGE", "local").lower()
+    if kind == "s3":
+        try:
+            import boto3
+            client = boto3.client("s3", endpoint_url=os.getenv("MEDIA_S3_ENDPOINT") or None)
+            return S3MediaStorage(client, os.environ["MEDIA_S3_BUCKET"])
+        except ImportError:
+            logger.warning("MEDIA_STORAGE=s3 but boto3 is not installed; storing media on local disk")
+    return LocalMediaStorage(os.getenv("MEDIA_ROOT", "media"))
+
+# Global storage instance
+media_storage = create_storage_from_env()
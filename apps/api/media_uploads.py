@@ -0,0 +1,295 @@
+"""
+Media Uploads Module
+C&C CRM - Chunked, resumable journey media uploads
+
+Modeled on the tus protocol. A client creates an upload, then PATCHes
+fixed-size chunks at offsets that are multiples of chunkSize, each with an
+optional "Upload-Checksum: sha256 <base64>" header. Chunks may be sent in
+parallel, in any order, and retried. A HEAD reports Upload-Offset as the
+contiguous prefix received so far plus the missing chunks, so a client can
+resume after a dropped connection. Once every chunk is in, the upload is
+RECEIVED and the media worker assembles it into a "Media" row (COMPLETE,
+with mediaId), sharing storage with any earlier upload of the same bytes. Uploads left unfinished past
+MEDIA_UPLOAD_EXPIRY_HOURS are removed by: python -m apps.api.media_uploads
+"""
+
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import os
+import uuid
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+
+from .media_storage import MediaStorage, ChunkWrite
+from .media_blobs import register_blob, attach_media
+
+logger = logging.getLogger(__name__)
+
+# S3 multipart needs every part but the last to be at least 5 MiB
+CHUNK_SIZE = int(os.getenv("MEDIA_CHUNK_BYTES", str(8 * 1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MEDIA_MAX_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+UPLOAD_EXPIRY_HOURS = int(os.getenv("MEDIA_UPLOAD_EXPIRY_HOURS", "24"))
+# An assembly still running after this is presumed dead
+ASSEMBLY_LEASE_SECONDS = int(os.getenv("MEDIA_ASSEMBLY_LEASE_SECONDS", "1800"))
+
+MEDIA_TYPES = ("PHOTO", "VIDEO", "SIGNATURE")
+
+class ChecksumMismatch(ValueError):
+    """A chunk or the finished file didn't match the checksum the client sent"""
+
+class OffsetMismatch(ValueError):
+    """A chunk was sent at an offset that isn't a chunk boundary of the upload"""
+
+def parse_checksum(header: Optional[str]) -> Optional[str]:
+    """Hex SHA-256 from a tus "Upload-Checksum: sha256 <base64>" header"""
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(" ")
+    if algorithm.lower() != "sha256":
+        raise ValueError(f"Unsupported checksum algorithm: {algorithm}")
+    try:
+        digest = base64.b64decode(value.strip(), validate=True)
+    except binascii.Error:
+        raise ValueError("Upload-Checksum is not valid base64")
+    if len(digest) != 32:
+        raise ValueError("Upload-Checksum is not a SHA-256 digest")
+    return digest.hex()
+
+def new_media_id() -> str:
+    return f"media_{uuid.uuid4().hex}"
+
+def media_key(journey_id: str, media_id: str, filename: Optional[str]) -> str:
+    extension = os.path.splitext(filename or "")[1].lower()[:10]
+    return f"journeys/{journey_id}/{media_id}{extension}"
+
+def upload_state(upload: Dict[str, Any], received: List[int]) -> Dict[str, Any]:
+    """Client-facing progress of an upload"""
+    have = set(received)
+    missing = [i for i in range(upload["chunkCount"]) if i not in have]
+    contiguous = missing[0] if missing else upload["chunkCount"]
+    return {
+        "id": upload["id"],
+        "status": upload["status"],
+        "size": upload["size"],
+        "chunkSize": upload["chunkSize"],
+        "chunkCount": upload["chunkCount"],
+        "offset": min(contiguous * upload["chunkSize"], upload["size"]),
+        "receivedChunks": len(have),
+        "missingChunks": missing,
+        "mediaId": upload["mediaId"] if upload["status"] == "COMPLETE" else None,
+        "error": upload.get("error"),
+        "expiresAt": upload["expiresAt"],
+    }
+
+async def create_upload(db, storage: MediaStorage, journey_id: str, user_id: str, filename: Optional[str],
+                        mime_type: Optional[str], media_type: str, size: int,
+                        checksum: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Open an upload of ``size`` bytes and return its row"""
+    if media_type not in MEDIA_TYPES:
+        raise ValueError(f"media_type must be one of {', '.join(MEDIA_TYPES)}")
+    if size <= 0 or size > MAX_UPLOAD_BYTES:
+        raise ValueError(f"Upload size must be between 1 and {MAX_UPLOAD_BYTES} bytes")
+
+    upload_id = uuid.uuid4().hex
+    media_id = new_media_id()
+    key = media_key(journey_id, media_id, filename)
+    chunk_count = -(-size // CHUNK_SIZE)
+    ref = await storage.begin(key, size)
+    upload = await db.fetch_one(
+        """
+        INSERT INTO "MediaUpload" (
+            id, "journeyId", "uploadedBy", "mediaId", "mediaType", filename, "mimeType", size,
+            "chunkSize", "chunkCount", checksum, metadata, "storageKey", "storageRef", "expiresAt"
+        )
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12::jsonb, $13, $14,
+                NOW() + make_interval(hours => $15))
+        RETURNING *
+        """,
+        upload_id, journey_id, user_id, media_id, media_type, filename, mime_type, size,
+        CHUNK_SIZE, chunk_count, checksum, json.dumps(metadata or {}), key, ref, UPLOAD_EXPIRY_HOURS
+    )
+    return {**upload, "received": []}
+
+async def get_upload(db, journey_id: str, upload_id: str) -> Optional[Dict[str, Any]]:
+    """The upload row and its received chunk indexes, or None"""
+    upload = await db.fetch_one(
+        """
+        SELECT u.*, COALESCE(array_agg(c."chunkIndex") FILTER (WHERE c."chunkIndex" IS NOT NULL), '{}') AS received
+        FROM "MediaUpload" u
+        LEFT JOIN "MediaUploadChunk" c ON c."uploadId" = u.id
+        WHERE u.id = $1 AND u."journeyId" = $2
+        GROUP BY u.id
+        """,
+        upload_id, journey_id
+    )
+    if upload:
+        upload["received"] = list(upload["received"])
+    return upload
+
+async def write_chunk(storage: MediaStorage, upload: Dict[str, Any], offset: int,
+                      stream: AsyncIterator[bytes], checksum: Optional[str]) -> Tuple[int, ChunkWrite]:
+    """Stream one chunk into storage and verify it; returns (index, write).
+
+    Needs no database connection, so a slow mobile upload doesn't hold
+    one of the pool's connections while it trickles in.
+    """
+    if upload["status"] != "UPLOADING":
+        raise OffsetMismatch(f"Upload is {upload['status'].lower()}")
+    index, remainder = divmod(offset, upload["chunkSize"])
+    if remainder or index >= upload["chunkCount"]:
+        raise OffsetMismatch(f"Upload-Offset must be a multiple of {upload['chunkSize']} below {upload['size']}")
+    length = min(upload["chunkSize"], upload["size"] - offset)
+
+    written = await storage.write_chunk(upload["storageRef"], index, offset, length, stream)
+    if checksum and written.sha256 != checksum:
+        # Not recorded, so the chunk stays missing and a retry overwrites it
+        raise ChecksumMismatch(f"Chunk {index} failed its checksum")
+    return index, written
+
+async def record_chunk(db, upload: Dict[str, Any], index: int, written: ChunkWrite) -> Dict[str, Any]:
+    """Mark a stored chunk received and return the upload state.
+
+    The chunk that completes the set moves the upload to RECEIVED. The
+    media worker then assembles it (see claim_received_uploads).
+    """
+    async with db.connection.transaction():
+        # Serializes chunks of one upload, so the last two can't both miss each other
+        status = await db.fetch_val('SELECT status FROM "MediaUpload" WHERE id = $1 FOR UPDATE', upload["id"])
+        if status != "UPLOADING":
+            raise OffsetMismatch(f"Upload is {str(status).lower()}")
+        await db.execute(
+            """
+            INSERT INTO "MediaUploadChunk" ("uploadId", "chunkIndex", sha256, token)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT ("uploadId", "chunkIndex") DO UPDATE SET
+                sha256 = EXCLUDED.sha256, token = EXCLUDED.token, "receivedAt" = NOW()
+            """,
+            upload["id"], index, written.sha256, written.token
+        )
+        received = list(await db.fetch_val(
+            'SELECT array_agg("chunkIndex") FROM "MediaUploadChunk" WHERE "uploadId" = $1', upload["id"]
+        ) or [])
+        if len(received) == upload["chunkCount"]:
+            await db.execute("""UPDATE "MediaUpload" SET status = 'RECEIVED' WHERE id = $1""", upload["id"])
+            upload = {**upload, "status": "RECEIVED"}
+    return upload_state(upload, received)
+
+async def claim_received_uploads(db, limit: int) -> List[Dict[str, Any]]:
+    """Lease up to ``limit`` fully received uploads for assembly"""
+    return await db.fetch_all(
+        """
+        UPDATE "MediaUpload" SET status = 'ASSEMBLING', "lockedUntil" = NOW() + make_interval(secs => $2)
+        WHERE id IN (
+            SELECT id FROM "MediaUpload" WHERE status = 'RECEIVED'
+            ORDER BY "createdAt"
+            LIMIT $1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *
+        """,
+        limit, float(ASSEMBLY_LEASE_SECONDS)
+    )
+
+async def complete_upload(db, storage: MediaStorage, upload: Dict[str, Any]) -> Dict[str, Any]:
+    """Assemble an upload claimed by claim_received_uploads into a Media row.
+
+    Hashing the assembled file reads it back in full (a whole download on
+    S3), which is why this runs in the media worker, not in a request.
+    The file is registered as a blob (see media_blobs.py). If the same
+    bytes were already stored, the new copy is dropped and the media
+    points at the existing blob.
+    """
+    try:
+        tokens = await db.fetch_all(
+            'SELECT token FROM "MediaUploadChunk" WHERE "uploadId" = $1 ORDER BY "chunkIndex"', upload["id"]
+        )
+        size, sha256 = await storage.complete(upload["storageRef"], upload["storageKey"], [t["token"] for t in tokens])
+        if upload["checksum"] and sha256 != upload["checksum"]:
+            await storage.delete(upload["storageKey"])
+            raise ChecksumMismatch("Assembled file failed its checksum")
+        canonical = await register_blob(db, storage, sha256, upload["storageKey"], size, upload["mimeType"])
+        if canonical != upload["storageKey"]:
+            logger.info(f"Upload {upload['id']} duplicated blob {sha256}; kept the stored copy")
+        attached = await attach_media(
+            db, storage, sha256, upload["journeyId"], upload["uploadedBy"], upload["mediaId"],
+            upload["mediaType"], upload["filename"],
+            {**json.loads(upload["metadata"] or "{}"), "mimeType": upload["mimeType"]}
+        )
+        if attached is None:
+            # Only collect_garbage deletes blobs, and it skips ones referenced this recently
+            raise RuntimeError(f"Blob {sha256} disappeared while attaching upload")
+        media, _ = attached
+        # A journey that already had this file gets its existing item back
+        await db.execute(
+            """UPDATE "MediaUpload" SET status = 'COMPLETE', "mediaId" = $2 WHERE id = $1""",
+            upload["id"], media["id"]
+        )
+        await db.execute('DELETE FROM "MediaUploadChunk" WHERE "uploadId" = $1', upload["id"])
+        return media
+    except Exception as e:
+        logger.error(f"Assembling upload {upload['id']} failed: {e}")
+        await db.execute(
+            """UPDATE "MediaUpload" SET status = 'FAILED', error = $2 WHERE id = $1""", upload["id"], str(e)
+        )
+        raise
+
+async def abort_upload(db, storage: MediaStorage, upload: Dict[str, Any]) -> None:
+    """Discard an unfinished upload and its stored bytes"""
+    try:
+        await storage.abort(upload["storageRef"])
+    except Exception as e:
+        # Already completed or aborted (S3 NoSuchUpload); the row must still go
+        logger.info(f"Nothing to abort for upload {upload['id']}: {e}")
+    if upload["status"] in ("FAILED", "ASSEMBLING"):
+        # Assembly may have published the object; keep it only if it became a blob
+        is_blob = await db.fetch_val(
+            'SELECT 1 FROM "MediaBlob" WHERE "storageKey" = $1', upload["storageKey"]
+        )
+        if not is_blob:
+            await storage.delete(upload["storageKey"])
+    await db.execute('DELETE FROM "MediaUpload" WHERE id = $1 AND status <> \'COMPLETE\'', upload["id"])
+
+async def purge_expired_uploads(db, storage: MediaStorage, limit: int = 500) -> int:
+    """Abort uploads nobody finished before they expired; returns how many"""
+    # An assembly whose lease ran out died with its worker
+    await db.execute(
+        """
+        UPDATE "MediaUpload" SET status = 'FAILED', error = 'Assembly was interrupted'
+        WHERE status = 'ASSEMBLING' AND "lockedUntil" < NOW()
+        """
+    )
+    expired = await db.fetch_all(
+        """
+        SELECT id, status, "storageRef", "storageKey" FROM "MediaUpload"
+        WHERE status IN ('UPLOADING', 'FAILED') AND "expiresAt" < NOW()
+        ORDER BY "expiresAt"
+        LIMIT $1
+        """,
+        limit
+    )
+    for upload in expired:
+        try:
+            await abort_upload(db, storage, upload)
+        except Exception as e:
+            logger.error(f"Failed to purge upload {upload['id']}: {e}")
+    return len(expired)
+
+async def main():
+    """Purge expired uploads; meant for a periodic job"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    from .database import get_database_connection
+    from .media_storage import media_storage
+    db = await get_database_connection()
+    try:
+        purged = await purge_expired_uploads(db, media_storage)
+        logger.info(f"Purged {purged} expired uploads")
+    finally:
+        await db.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Media Worker
+Assembles fully received uploads into media, renders thumbnails, EXIF-free
+copies and video posters for them, and garbage-collects media blobs
+nothing references any more
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from apps.api.database import get_database_connection
+from apps.api.media_storage import media_storage
+from apps.api.media_processing import claim_jobs, finish_job, process_media, release_job
+from apps.api.media_blobs import collect_garbage
+from apps.api.media_uploads import claim_received_uploads, complete_upload, purge_expired_uploads
+from apps.api.pubsub import journey_events
+
+logger = logging.getLogger(__name__)
+
+class MediaWorker:
+    """Drains "MediaJob" into a process pool, ``processes`` items at a time"""
+
+    def __init__(self, interval: float = 2, processes: int = 2, gc_interval: float = 3600):
+        self.interval = interval
+        self.processes = processes
+        self.gc_interval = gc_interval
+        self.running = False
+        self.last_run: Optional[datetime] = None
+        self.last_gc: Optional[datetime] = None
+        self.assembled = 0
+        self.processed = 0
+        self.failed = 0
+        self.variants_written = 0
+        self.blobs_collected = 0
+        self.bytes_collected = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a pool whose child process died; the next job starts a fresh one"""
+        if self._pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        db = await get_database_connection()
+        try:
+            pool = self.pool
+            try:
+                result = await process_media(db, media_storage, pool, job)
+            except BrokenProcessPool:
+                # A child died (e.g. OOM), failing every job in flight with it
+                logger.error(f"Process pool broke while processing media {job['mediaId']}; requeueing")
+                self._reset_pool(pool)
+                await release_job(db, job["mediaId"])
+                return
+            except Exception as e:
+                logger.error(f"Processing media {job['mediaId']} failed (attempt {job['attempts']}): {e}")
+                await finish_job(db, job["mediaId"], str(e), job["attempts"])
+                self.failed += 1
+                return
+            await finish_job(db, job["mediaId"])
+            self.processed += 1
+            self.variants_written += result["written"]
+        finally:
+            await db.close()
+
+    async def _assemble(self, upload: Dict[str, Any]) -> None:
+        db = await get_database_connection()
+        try:
+            try:
+                media = await complete_upload(db, media_storage, upload)
+            except Exception:
+                # complete_upload has logged it and marked the upload FAILED
+                self.failed += 1
+                return
+        finally:
+            await db.close()
+        self.assembled += 1
+        await journey_events.media_uploaded(upload["journeyId"], [media], upload["uploadedBy"])
+
+    async def assemble_uploads(self) -> int:
+        """Assemble received uploads until none are left; returns how many ran"""
+        total = 0
+        while True:
+            db = await get_database_connection()
+            try:
+                uploads = await claim_received_uploads(db, self.processes)
+            finally:
+                await db.close()
+            if not uploads:
+                return total
+            await asyncio.gather(*(self._assemble(upload) for upload in uploads))
+            total += len(uploads)
+
+    async def run_once(self) -> int:
+        """Assemble received uploads, then process ready jobs until none are left; returns how many ran"""
+        total = await self.assemble_uploads()
+        while True:
+            db = await get_database_connection()
+            try:
+                jobs = await claim_jobs(db, self.processes)
+            finally:
+                await db.close()
+            if not jobs:
+                break
+            await asyncio.gather(*(self._process(job) for job in jobs))
+            total += len(jobs)
+        self.last_run = datetime.now()
+        return total
+
+    async def collect_garbage(self) -> Dict[str, Any]:
+        """Delete expired uploads, and media blobs unreferenced past the grace period"""
+        db = await get_database_connection()
+        try:
+            purged = await purge_expired_uploads(db, media_storage)
+            if purged:
+                logger.info(f"Purged {purged} expired uploads")
+            result = await collect_garbage(db, media_storage)
+        finally:
+            await db.close()
+        self.last_gc = datetime.now()
+        self.blobs_collected += result["blobs"]
+        self.bytes_collected += result["bytes"]
+        return result
+
+    def _gc_due(self) -> bool:
+        return self.last_gc is None or (datetime.now() - self.last_gc).total_seconds() >= self.gc_interval
+
+    async def run_continuous(self):
+        """Poll for jobs every ``interval`` seconds"""
+        logger.info(f"Starting media worker ({self.processes} processes, polling every {self.interval} seconds)")
+        self.running = True
+
+        while self.running:
+            try:
+                processed = await self.run_once()
+                if processed:
+                    logger.info(f"Processed {processed} media items")
+                if self._gc_due():
+                    collected = await self.collect_garbage()
+                    if collected["blobs"]:
+                        logger.info(f"Collected {collected['blobs']} media blobs ({collected['bytes']} bytes)")
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                logger.info("Media worker cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Error in media worker: {e}")
+                await asyncio.sleep(self.interval)
+        self.shutdown()
+
+    def stop(self):
+        """Stop the worker"""
+        logger.info("Stopping media worker...")
+        self.running = False
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get current worker status"""
+        return {
+            "running": self.running,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "interval_seconds": self.interval,
+            "processes": self.processes,
+            "assembled": self.assembled,
+            "processed": self.processed,
+            "failed": self.failed,
+            "variants_written": self.variants_written,
+            "last_gc": self.last_gc.isoformat() if self.last_gc else None,
+            "blobs_collected": self.blobs_collected,
+            "bytes_collected": self.bytes_collected
+        }
+
+def _worker_from_env() -> MediaWorker:
+    return MediaWorker(
+        interval=float(os.getenv("MEDIA_WORKER_POLL_SECONDS", "2")),
+        processes=int(os.getenv("MEDIA_WORKER_PROCESSES", str(min(4, os.cpu_count() or 1)))),
+        gc_interval=float(os.getenv("MEDIA_BLOB_GC_SECONDS", "3600"))
+    )
+
+# Global worker instance
+media_worker = None
+media_task = None
+
+async def start_media_worker():
+    """Start the media worker as a background task"""
+    global media_worker, media_task
+
+    try:
+        media_worker = _worker_from_env()
+        media_task = asyncio.create_task(media_worker.run_continuous())
+        logger.info("Media worker started successfully")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to start media worker: {e}")
+        return False
+
+async def stop_media_worker():
+    """Stop the media worker"""
+    if media_worker:
+        media_worker.stop()
+    if media_task:
+        media_task.cancel()
+        try:
+            await media_task
+        except asyncio.CancelledError:
+            pass
+    if media_worker:
+        media_worker.shutdown()
+    logger.info("Media worker stopped")
+    return True
+
+async def main():
+    """Run the media worker as a standalone process"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    worker = _worker_from_env()
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down...")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    try:
+        if "--once" in sys.argv:
+            await worker.run_once()
+            await worker.collect_garbage()
+        else:
+            await worker.run_continuous()
+    finally:
+        worker.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,8 +6,9 @@ JWT-based authentication with role-based access control
 from fastapi import Request, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Pattern
 import logging
+import re
 from datetime import datetime, timedelta
 import os
 
@@ -52,6 +53,47 @@ def verify_token(token: str) -> Dict[str, Any]:
             detail="Invalid authentication credentials"
         )
 
+# ===== PUBLIC ROUTE TABLE =====
+
+# Paths served without authentication (exact match)
+PUBLIC_PATHS = (
+    "/health",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/smartmoving/test",
+    "/smartmoving/status",
+)
+
+# Path prefixes served without authentication. /super-admin/ routes carry
+# their own auth (middleware/super_admin_auth.py).
+PUBLIC_PREFIXES = (
+    "/mobile/health",
+    "/setup/",
+    "/auth/",
+    "/mobile/auth/",
+    "/super-admin/",
+)
+
+def compile_public_routes(paths: Iterable[str], prefixes: Iterable[str]) -> Pattern:
+    """Compile the public route table into a single anchored regex"""
+    exact = "|".join(re.escape(p) for p in paths)
+    prefix = "|".join(re.escape(p) for p in prefixes)
+    return re.compile(rf"(?:{exact})\Z|(?:{prefix})")
+
+PUBLIC_ROUTE_PATTERN = compile_public_routes(PUBLIC_PATHS, PUBLIC_PREFIXES)
+
+def principal_from_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a JWT payload to the user structure used across the API"""
+    return {
+        "id": payload.get("sub"),
+        "email": payload.get("email"),
+        "role": payload.get("role"),
+        "client_id": payload.get("company_id"),  # Map company_id to client_id
+        "location_id": payload.get("location_id"),
+        "status": "ACTIVE"
+    }
+
 # ===== USER MODEL =====
 
 class AuthenticatedUser:
@@ -210,47 +252,11 @@ class AuthMiddleware:
     async def __call__(self, scope, receive, send):
         """Process request through authentication middleware"""
         if scope["type"] == "http":
-            # Skip auth for health check, docs, and CORS preflight
+            # Skip auth for CORS preflight and the public route table
             path = scope.get("path", "")
             method = scope.get("method", "")
             
-            # Allow OPTIONS requests (CORS preflight) without authentication
-            if method == "OPTIONS":
-                await self.app(scope, receive, send)
-                return
-            
-            # Skip auth for public endpoints
-            if path in ["/health", "/docs", "/redoc", "/openapi.json"] or path.startswith("/mobile/health"):
-                await self.app(scope, receive, send)
-                return
-            
-            # Allow unauthenticated access to setup endpoints
-            if path.startswith("/setup/"):
-                await self.app(scope, receive, send)
-                return
-            
-            # Allow unauthenticated access to auth endpoints
-            if path.startswith("/auth/"):
-                await self.app(scope, receive, send)
-                return
-            
-            # Allow unauthenticated access to mobile auth endpoints
-            if path.startswith("/mobile/auth/"):
-                await self.app(scope, receive, send)
-                return
-            
-            # Allow unauthenticated access to super admin auth endpoints
-            if path.startswith("/super-admin/auth/"):
-                await self.app(scope, receive, send)
-                return
-            
-            # Skip auth for all super admin endpoints (they have their own auth)
-            if path.startswith("/super-admin/"):
-                await self.app(scope, receive, send)
-                return
-            
-            # Allow unauthenticated access to SmartMoving test endpoints
-            if path in ["/smartmoving/test", "/smartmoving/status"]:
+            if method == "OPTIONS" or PUBLIC_ROUTE_PATTERN.match(path):
                 await self.app(scope, receive, send)
                 return
             
@@ -273,17 +279,7 @@ class AuthMiddleware:
                 token = auth_header.split(" ")[1]
                 payload = verify_token(token)
                 
-                # Map payload to expected user structure
-                user_info = {
-                    "id": payload.get("sub"),
-                    "email": payload.get("email"),
-                    "role": payload.get("role"),
-                    "client_id": payload.get("company_id"),  # Map company_id to client_id
-                    "location_id": payload.get("location_id"),
-                    "status": "ACTIVE"
-                }
-                
-                scope["user"] = user_info
+                scope["user"] = principal_from_payload(payload)
                 await self.app(scope, receive, send)
             except Exception as e:
                 response = {
@@ -0,0 +1,107 @@
+"""
+Auth + Tenant Middleware for C&C CRM
+Single pure-ASGI pass: public-route check, one JWT decode, tenant context
+"""
+
+import json
+import logging
+from typing import Optional, Dict, Any, Pattern
+
+from .auth import verify_token, principal_from_payload, PUBLIC_ROUTE_PATTERN
+from .tenant import TenantContext
+
+logger = logging.getLogger(__name__)
+
+# ===== HELPERS =====
+
+def _authorization_header(scope) -> Optional[bytes]:
+    """Find the Authorization header without building a headers dict"""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            return value
+    return None
+
+# ===== MIDDLEWARE CLASS =====
+
+class AuthTenantMiddleware:
+    """Merged authentication and tenant middleware.
+
+    Replaces stacking AuthMiddleware and TenantMiddleware: the public-route
+    table is compiled once, the bearer token is decoded once, and the
+    principal is stored in ``scope["user"]`` (plus ``scope["tenant_context"]``),
+    where AuthMiddleware keeps it too.
+
+    Opt-in: main.py doesn't mount it, since the routes authenticate through
+    ``routes.auth.verify_token``.
+    """
+
+    def __init__(self, app, public_routes: Optional[Pattern] = None):
+        self.app = app
+        self.public_routes = public_routes or PUBLIC_ROUTE_PATTERN
+
+    async def __call__(self, scope, receive, send):
+        """Process request through authentication and tenant scoping"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # CORS preflight and public endpoints skip authentication
+        if scope.get("method") == "OPTIONS" or self.public_routes.match(scope.get("path", "")):
+            await self.app(scope, receive, send)
+            return
+
+        auth_header = _authorization_header(scope)
+        if not auth_header or not auth_header.startswith(b"Bearer "):
+            await self.send_error_response(send, 401, {
+                "success": False,
+                "error": "Authentication required",
+                "message": "Bearer token required"
+            })
+            return
+
+        try:
+            payload = verify_token(auth_header[7:].decode())
+        except Exception as e:
+            await self.send_error_response(send, 401, {
+                "success": False,
+                "error": "Invalid token",
+                "message": getattr(e, "detail", str(e))
+            })
+            return
+
+        user_info = principal_from_payload(payload)
+        scope["user"] = user_info
+
+        client_id = user_info["client_id"]
+        location_id = user_info["location_id"]
+        user_id = user_info["id"]
+
+        if not (client_id and location_id and user_id):
+            await self.send_error_response(send, 400, {
+                "success": False,
+                "error": "Missing tenant information",
+                "message": "User must be associated with a client and location"
+            })
+            return
+
+        tenant_context = TenantContext(client_id, location_id, user_id)
+        scope["tenant_context"] = tenant_context
+
+        with tenant_context:
+            await self.app(scope, receive, send)
+
+    async def send_error_response(self, send, status: int, response: Dict[str, Any]):
+        """Send a JSON error response"""
+        body = json.dumps(response).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+        })
+        await send({
+            "type": "http.response.body",
+            "body": body
+        })
@@ -4,7 +4,7 @@ Multi-tenant data isolation and scoping
 """
 
 from fastapi import Request, HTTPException, Depends
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import logging
 from contextvars import ContextVar
 
@@ -104,10 +104,10 @@ def add_tenant_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
     location_id = get_current_location_id()
     
     if client_id:
-        filters["client_id"] = client_id
+        filters["clientId"] = client_id
     
     if location_id:
-        filters["location_id"] = location_id
+        filters["locationId"] = location_id
     
     return filters
 
@@ -184,64 +184,135 @@ class TenantMiddleware:
 
 # ===== PRISMA CLIENT EXTENSION =====
 
-class TenantAwarePrisma:
-    """Prisma client with automatic tenant scoping"""
+class TenantScopedModel:
+    """Prisma model delegate with tenant predicates injected into every action"""
     
-    def __init__(self, prisma_client):
-        self.prisma = prisma_client
+    READ_ACTIONS = (
+        "find_many", "find_first", "find_first_or_raise", "count", "aggregate", "group_by",
+        "update_many", "delete_many"
+    )
     
-    def _add_tenant_filters(self, where_clause: Dict[str, Any]) -> Dict[str, Any]:
-        """Add tenant filters to where clause"""
-        if not where_clause:
-            where_clause = {}
-        
+    def __init__(self, delegate, scope_columns: Tuple[str, ...]):
+        self._delegate = delegate
+        self._scope_columns = scope_columns
+    
+    def _scope(self) -> Dict[str, Any]:
         client_id = get_current_client_id()
+        if not client_id:
+            raise HTTPException(status_code=400, detail="Tenant context not set")
+        
+        scope = {"clientId": client_id}
         location_id = get_current_location_id()
+        if "locationId" in self._scope_columns and location_id:
+            scope["locationId"] = location_id
+        return scope
+    
+    def _scoped_where(self, where: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        scope = self._scope()
+        if not where:
+            return scope
+        return {"AND": [where, scope]}
+    
+    def _scoped_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        scope = self._scope()
+        for key, value in scope.items():
+            if key in data and data[key] != value:
+                raise HTTPException(status_code=403, detail="Access denied to this entity")
+        return {**data, **scope}
+    
+    def __getattr__(self, action):
+        method = getattr(self._delegate, action)
         
-        if client_id:
-            where_clause["client_id"] = client_id
+        if action in self.READ_ACTIONS:
+            async def scoped(*args, **kwargs):
+                kwargs["where"] = self._scoped_where(kwargs.get("where"))
+                return await method(*args, **kwargs)
+            return scoped
         
-        if location_id:
-            where_clause["location_id"] = location_id
+        if action in ("create", "create_many"):
+            async def scoped(data, **kwargs):
+                if isinstance(data, list):
+                    data = [self._scoped_data(row) for row in data]
+                else:
+                    data = self._scoped_data(data)
+                return await method(data, **kwargs)
+            return scoped
+        
+        if action in ("find_unique", "find_unique_or_raise", "update", "delete"):
+            # Unique lookups can't take extra filters, so check visibility first
+            async def scoped(*args, where: Dict[str, Any], **kwargs):
+                if any(key in kwargs.get("data", {}) for key in self._scope()):
+                    raise HTTPException(status_code=403, detail="Cannot move entity to another tenant")
+                visible = await self._delegate.find_first(where=self._scoped_where(where))
+                if visible is None:
+                    if action == "find_unique_or_raise":
+                        raise HTTPException(status_code=404, detail="Entity not found")
+                    return None
+                if action.startswith("find_unique"):
+                    return visible
+                return await method(*args, where=where, **kwargs)
+            return scoped
         
-        return where_clause
+        if action == "upsert":
+            # Update only a row this tenant can see; otherwise create inside the tenant
+            # (a unique key held by another tenant fails the create instead)
+            async def scoped(where: Dict[str, Any], data: Dict[str, Any], **kwargs):
+                if any(key in data.get("update", {}) for key in self._scope()):
+                    raise HTTPException(status_code=403, detail="Cannot move entity to another tenant")
+                visible = await self._delegate.find_first(where=self._scoped_where(where))
+                if visible is not None:
+                    return await self._delegate.update(where=where, data=data["update"], **kwargs)
+                return await self._delegate.create(data=self._scoped_data(data["create"]), **kwargs)
+            return scoped
+        
+        # Anything else (raw queries, new client actions) would bypass the scope
+        raise AttributeError(f"{action} is not available on tenant-scoped models")
+
+class TenantAwarePrisma:
+    """Prisma client with automatic tenant scoping for every tenant model"""
+    
+    def __init__(self, prisma_client):
+        self.prisma = prisma_client
+    
+    def __getattr__(self, name):
+        # Lazy import: the repository module reads this module's context helpers
+        from ..tenant_repository import TENANT_SCOPED_TABLES
+        
+        delegate = getattr(self.prisma, name)
+        scoped_models = {table.lower(): columns for table, columns in TENANT_SCOPED_TABLES.items()}
+        if name in scoped_models:
+            return TenantScopedModel(delegate, scoped_models[name])
+        return delegate
+    
+    def _add_tenant_filters(self, where_clause: Dict[str, Any]) -> Dict[str, Any]:
+        """Add tenant filters to where clause"""
+        return add_tenant_filters(dict(where_clause or {}))
     
     async def user_find_many(self, **kwargs):
         """Find users with tenant scoping"""
-        if "where" in kwargs:
-            kwargs["where"] = self._add_tenant_filters(kwargs["where"])
-        else:
-            kwargs["where"] = self._add_tenant_filters({})
-        
-        return await self.prisma.user.find_many(**kwargs)
+        return await self.user.find_many(**kwargs)
     
     async def truckjourney_find_many(self, **kwargs):
         """Find truck journeys with tenant scoping"""
-        if "where" in kwargs:
-            kwargs["where"] = self._add_tenant_filters(kwargs["where"])
-        else:
-            kwargs["where"] = self._add_tenant_filters({})
-        
-        return await self.prisma.truckjourney.find_many(**kwargs)
+        return await self.truckjourney.find_many(**kwargs)
     
     async def journeyentry_find_many(self, **kwargs):
         """Find journey entries with tenant scoping"""
         # Journey entries are scoped through the journey
+        where = kwargs.get("where") or {}
+        kwargs["where"] = {"AND": [where, {"journey": {"is": self._add_tenant_filters({})}}]}
         return await self.prisma.journeyentry.find_many(**kwargs)
     
     async def media_find_many(self, **kwargs):
         """Find media with tenant scoping"""
-        # Media is scoped through the linked entity
+        # Media is scoped through the linked journey
+        where = kwargs.get("where") or {}
+        kwargs["where"] = {"AND": [where, {"journey": {"is": self._add_tenant_filters({})}}]}
         return await self.prisma.media.find_many(**kwargs)
     
     async def auditentry_find_many(self, **kwargs):
         """Find audit entries with tenant scoping"""
-        if "where" in kwargs:
-            kwargs["where"] = self._add_tenant_filters(kwargs["where"])
-        else:
-            kwargs["where"] = self._add_tenant_filters({})
-        
-        return await self.prisma.auditentry.find_many(**kwargs)
+        return await self.auditentry.find_many(**kwargs)
 
 # ===== DEPENDENCY INJECTION =====
 
@@ -0,0 +1,36 @@
+"""
+Pagination Module
+C&C CRM - Opaque keyset cursors for newest-first listings
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+from fastapi import HTTPException
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    """Cursor pointing just past (timestamp, id) in a DESC listing"""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    """Inverse of encode_cursor; ``None`` starts from the newest row"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), row_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def page_of(rows: List[Dict[str, Any]], limit: int, timestamp_key: str, id_key: str = "id") -> Dict[str, Any]:
+    """Trim a ``limit + 1`` fetch into {"items", "nextCursor"}"""
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(last[timestamp_key], last[id_key])
+    return {"items": items, "nextCursor": next_cursor}
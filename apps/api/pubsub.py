@@ -0,0 +1,451 @@
+"""
+Pub/Sub Module
+C&C CRM - Journey and location event fan-out to WebSocket subscribers
+
+Publishers send an event to a channel ("journey:<id>", "location:<id>").
+The broker carries it to every API process: in-process by default, or over
+Redis PUBLISH/PSUBSCRIBE with PUBSUB_BACKEND=redis. Each process then
+delivers it to its local subscribers. The payload is encoded once per
+event, not once per socket.
+
+Each connection has a bounded send queue. Events with a coalesce key (for
+example the latest GPS position of a journey) replace their queued
+predecessor instead of queueing behind it. When the queue is full the oldest
+event is dropped. A subscriber that drops a whole queue's worth of events
+without once catching up, or whose socket doesn't accept a send within
+SEND_TIMEOUT_SECONDS, is disconnected
+so one slow client can't hold memory or stall the others.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Awaitable, Deque, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEND_QUEUE_SIZE = int(os.getenv("PUBSUB_SEND_QUEUE_SIZE", "256"))
+SEND_TIMEOUT_SECONDS = float(os.getenv("PUBSUB_SEND_TIMEOUT_SECONDS", "5"))
+HEARTBEAT_SECONDS = float(os.getenv("PUBSUB_HEARTBEAT_SECONDS", "25"))
+
+Deliver = Callable[[str, Optional[str], str], None]
+
+def journey_channel(journey_id: str) -> str:
+    return f"journey:{journey_id}"
+
+def location_channel(location_id: str) -> str:
+    return f"location:{location_id}"
+
+# ===== SUBSCRIBERS =====
+
+class Subscriber:
+    """One connection's bounded, coalescing send queue and sender loop"""
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        max_queue: int = SEND_QUEUE_SIZE,
+        send_timeout: float = SEND_TIMEOUT_SECONDS,
+        user: Optional[Dict[str, Any]] = None
+    ):
+        self._send = send
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.user = user or {}
+        self.channels: Set[str] = set()
+        # (coalesce key, payload); keyed entries read their payload from _latest
+        self._queue: Deque[Tuple[Optional[str], Optional[str]]] = deque()
+        self._latest: Dict[str, str] = {}
+        self._ready = asyncio.Event()
+        self._drops_since_caught_up = 0
+        self._sending_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[asyncio.TimerHandle] = None
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.last_sent = time.monotonic()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def offer(self, payload: str, coalesce_key: Optional[str] = None) -> None:
+        """Queue a payload without blocking the publisher"""
+        if self.closed:
+            return
+        if coalesce_key is not None and coalesce_key in self._latest:
+            self._latest[coalesce_key] = payload
+            self.coalesced += 1
+            return
+        if len(self._queue) >= self.max_queue:
+            key, _ = self._queue.popleft()
+            if key is not None:
+                self._latest.pop(key, None)
+            self.dropped += 1
+            self._drops_since_caught_up += 1
+            if self._drops_since_caught_up >= self.max_queue:
+                self.close("slow consumer")
+                return
+        if coalesce_key is None:
+            self._queue.append((None, payload))
+        else:
+            self._queue.append((coalesce_key, None))
+            self._latest[coalesce_key] = payload
+        self._ready.set()
+
+    def close(self, reason: str) -> None:
+        if not self.closed:
+            self.closed = True
+            self.close_reason = reason
+            self._queue.clear()
+            self._latest.clear()
+            self._ready.set()
+
+    async def run_sender(self) -> None:
+        """Drain the queue into the socket until closed or a send stalls"""
+        loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        while not self.closed:
+            await self._ready.wait()
+            # One watchdog per drain instead of wait_for per send, which
+            # would wrap every send in its own task
+            self._watchdog = loop.call_later(self.send_timeout, self._check_send)
+            try:
+                while self._queue and not self.closed:
+                    key, payload = self._queue.popleft()
+                    if key is not None:
+                        payload = self._latest.pop(key)
+                    self._sending_since = time.monotonic()
+                    try:
+                        await self._send(payload)
+                    except asyncio.CancelledError:
+                        if self.close_reason == "send timeout":
+                            return
+                        raise
+                    except Exception as e:
+                        self.close(f"send failed: {e}")
+                        return
+                    self._sending_since = None
+                    self.sent += 1
+                    self.last_sent = time.monotonic()
+            finally:
+                self._watchdog.cancel()
+            self._drops_since_caught_up = 0
+            self._ready.clear()
+
+    def _check_send(self) -> None:
+        if self._sending_since is None or self.closed:
+            return
+        remaining = self._sending_since + self.send_timeout - time.monotonic()
+        if remaining > 0:
+            self._watchdog = asyncio.get_running_loop().call_later(remaining, self._check_send)
+        else:
+            self.close("send timeout")
+            self._task.cancel()
+
+# ===== BROKERS =====
+
+def _encode(coalesce_key: Optional[str], payload: str) -> str:
+    # JSON payloads never contain a raw newline
+    return f"{coalesce_key or ''}\n{payload}"
+
+def _decode(data: str) -> Tuple[Optional[str], str]:
+    coalesce_key, payload = data.split("\n", 1)
+    return coalesce_key or None, payload
+
+class MemoryBroker:
+    """Delivers within this process only"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def attach(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, channel: str, coalesce_key: Optional[str], payload: str) -> None:
+        if self._deliver:
+            self._deliver(channel, coalesce_key, payload)
+
+class RedisBroker:
+    """Fans out across processes through any redis.asyncio-compatible client.
+
+    Every process, the publisher included, receives events from its
+    pattern subscription, so delivery order is the same everywhere.
+    """
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "cnc:events"):
+        self.client = client
+        self.prefix = prefix
+        self._deliver: Optional[Deliver] = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._pubsub = self.client.pubsub()
+            await self._pubsub.psubscribe(f"{self.prefix}:*")
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pubsub is not None:
+            await self._pubsub.punsubscribe()
+            self._pubsub = None
+
+    async def publish(self, channel: str, coalesce_key: Optional[str], payload: str) -> None:
+        await self.client.publish(f"{self.prefix}:{channel}", _encode(coalesce_key, payload))
+
+    async def _listen(self) -> None:
+        skip = len(self.prefix) + 1
+        async for message in self._pubsub.listen():
+            if message.get("type") != "pmessage" or self._deliver is None:
+                continue
+            channel, data = message["channel"], message["data"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            if isinstance(data, bytes):
+                data = data.decode()
+            try:
+                self._deliver(channel[skip:], *_decode(data))
+            except Exception as e:
+                logger.error(f"Failed to deliver event on {channel}: {e}")
+
+class FakeRedisPubSub:
+    """In-memory stand-in for the redis.asyncio PUBLISH/PSUBSCRIBE subset.
+
+    Clients created with the same ``server`` dict behave like separate
+    processes on one Redis server, so RedisBroker can run locally.
+    """
+
+    def __init__(self, server: Optional[Dict[str, Any]] = None):
+        self.server = server if server is not None else {"subscriptions": []}
+
+    async def publish(self, channel, message) -> int:
+        import fnmatch
+        channel = channel if isinstance(channel, bytes) else str(channel).encode()
+        message = message if isinstance(message, bytes) else str(message).encode()
+        receivers = 0
+        for subscription in list(self.server["subscriptions"]):
+            for pattern in subscription.patterns:
+                if fnmatch.fnmatchcase(channel.decode(), pattern):
+                    subscription.messages.put_nowait({
+                        "type": "pmessage", "pattern": pattern.encode(),
+                        "channel": channel, "data": message
+                    })
+                    receivers += 1
+                    break
+        return receivers
+
+    def pubsub(self) -> "_FakePubSub":
+        return _FakePubSub(self.server)
+
+class _FakePubSub:
+    def __init__(self, server: Dict[str, Any]):
+        self.server = server
+        self.patterns: List[str] = []
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    async def psubscribe(self, *patterns) -> None:
+        for pattern in patterns:
+            pattern = pattern.decode() if isinstance(pattern, bytes) else pattern
+            self.patterns.append(pattern)
+            self.messages.put_nowait({"type": "psubscribe", "pattern": None,
+                                      "channel": pattern.encode(), "data": len(self.patterns)})
+        if self not in self.server["subscriptions"]:
+            self.server["subscriptions"].append(self)
+
+    async def punsubscribe(self, *patterns) -> None:
+        self.patterns = [p for p in self.patterns if patterns and p not in patterns]
+        if not self.patterns and self in self.server["subscriptions"]:
+            self.server["subscriptions"].remove(self)
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+def create_broker_from_env():
+    """Build the broker selected by PUBSUB_BACKEND (memory or redis)"""
+    kind = os.getenv("PUBSUB_BACKEND", "memory").lower()
+    if kind == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+            client = redis_asyncio.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+            return RedisBroker(client, prefix=os.getenv("PUBSUB_PREFIX", "cnc:events"))
+        except ImportError:
+            logger.warning("PUBSUB_BACKEND=redis but the redis package is not installed; using in-process pub/sub")
+    return MemoryBroker()
+
+# ===== HUB =====
+
+class EventHub:
+    """Channel registry for this process's subscribers"""
+
+    def __init__(self, broker=None):
+        self.broker = broker or create_broker_from_env()
+        self.broker.attach(self._deliver)
+        self._channels: Dict[str, Set[Subscriber]] = {}
+        self._started = False
+        self.published = 0
+        self.delivered = 0
+        self.disconnected: Dict[str, int] = {}
+
+    async def start(self) -> None:
+        if not self._started:
+            await self.broker.start()
+            self._started = True
+
+    async def stop(self) -> None:
+        if self._started:
+            await self.broker.stop()
+            self._started = False
+
+    def subscribe(self, subscriber: Subscriber, channel: str) -> None:
+        self._channels.setdefault(channel, set()).add(subscriber)
+        subscriber.channels.add(channel)
+
+    def unsubscribe(self, subscriber: Subscriber, channel: str) -> None:
+        members = self._channels.get(channel)
+        if members is not None:
+            members.discard(subscriber)
+            if not members:
+                del self._channels[channel]
+        subscriber.channels.discard(channel)
+
+    def remove(self, subscriber: Subscriber) -> None:
+        registered = bool(subscriber.channels)
+        for channel in list(subscriber.channels):
+            self.unsubscribe(subscriber, channel)
+        if registered and subscriber.close_reason:
+            self.disconnected[subscriber.close_reason] = self.disconnected.get(subscriber.close_reason, 0) + 1
+
+    async def publish(self, channel: str, event: Dict[str, Any], coalesce_key: Optional[str] = None) -> None:
+        """Send ``event`` to every subscriber of ``channel`` in every process"""
+        await self.start()
+        payload = json.dumps({"channel": channel, **event}, default=str)
+        self.published += 1
+        await self.broker.publish(channel, coalesce_key, payload)
+
+    def _deliver(self, channel: str, coalesce_key: Optional[str], payload: str) -> None:
+        slow = []
+        for subscriber in self._channels.get(channel, ()):
+            subscriber.offer(payload, coalesce_key)
+            self.delivered += 1
+            if subscriber.closed:
+                slow.append(subscriber)
+        for subscriber in slow:
+            self.remove(subscriber)
+
+    def get_status(self) -> Dict[str, Any]:
+        subscribers = {s for members in self._channels.values() for s in members}
+        return {
+            "backend": self.broker.name,
+            "channels": len(self._channels),
+            "subscribers": len(subscribers),
+            "queued": sum(s.queued for s in subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": sum(s.dropped for s in subscribers),
+            "coalesced": sum(s.coalesced for s in subscribers),
+            "disconnected": dict(self.disconnected),
+        }
+
+# Global hub instance
+event_hub = EventHub()
+
+# ===== JOURNEY EVENTS =====
+
+class JourneyEventPublisher:
+    """The broadcaster interface routes/journey.py calls, backed by the hub"""
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+
+    async def _emit(self, journey_id: str, location_id: Optional[str], event: Dict[str, Any],
+                    coalesce_key: Optional[str] = None) -> None:
+        event = {**event, "journeyId": journey_id, "at": time.time()}
+        try:
+            await self.hub.publish(journey_channel(journey_id), event, coalesce_key)
+            if location_id:
+                await self.hub.publish(location_channel(location_id), event, coalesce_key)
+        except Exception as e:
+            # Live updates are best-effort; the write they describe has already committed
+            logger.error(f"Failed to publish {event.get('type')} for journey {journey_id}: {e}")
+
+    async def journey_created(self, journey: Dict[str, Any]) -> None:
+        await self._emit(journey["id"], journey.get("locationId"), {"type": "journey_created", "journey": journey})
+
+    async def journey_status_updated(self, journey_id: str, old_status: str, new_status: str,
+                                     user_id: str, location_id: Optional[str] = None) -> None:
+        await self._emit(journey_id, location_id, {
+            "type": "status_changed", "from": old_status, "to": new_status, "userId": user_id
+        })
+
+    async def entry_added(self, journey_id: str, entry: Dict[str, Any], user_id: str,
+                          location_id: Optional[str] = None) -> None:
+        await self._emit(journey_id, location_id, {"type": "entry_added", "entry": entry, "userId": user_id})
+
+    async def crew_assigned(self, journey_id: str, assignments: List[Dict[str, Any]], user_id: str,
+                            location_id: Optional[str] = None) -> None:
+        await self._emit(journey_id, location_id, {
+            "type": "crew_assigned", "assignments": assignments, "userId": user_id
+        })
+
+    async def media_uploaded(self, journey_id: str, media: Any, user_id: str,
+                             location_id: Optional[str] = None) -> None:
+        await self._emit(journey_id, location_id, {"type": "media_uploaded", "media": media, "userId": user_id})
+
+    async def messages_posted(self, journey_id: str, messages: List[Dict[str, Any]], user_id: str) -> None:
+        # Chat stays on the journey channel; location watchers don't need it
+        await self._emit(journey_id, None, {"type": "messages", "messages": messages, "userId": user_id})
+
+    async def position_updated(self, journey_id: str, location_id: Optional[str], position: Dict[str, Any]) -> None:
+        # Only the newest position matters to a client that is behind
+        await self._emit(journey_id, location_id, {"type": "position", "position": position},
+                         coalesce_key=f"position:{journey_id}")
+
+    async def dispatch_batch(self, journeys: List[Dict[str, Any]], user_id: str) -> None:
+        """One event per affected journey and one per affected location, however large the batch"""
+        at = time.time()
+        by_location: Dict[str, List[Dict[str, Any]]] = {}
+        for change in journeys:
+            if change.get("locationId"):
+                by_location.setdefault(change["locationId"], []).append(change)
+        publishes = [
+            self.hub.publish(journey_channel(change["journeyId"]),
+                             {"type": "dispatch_batch", **change, "userId": user_id, "at": at})
+            for change in journeys
+        ] + [
+            self.hub.publish(location_channel(location_id),
+                             {"type": "dispatch_batch", "journeys": changes, "userId": user_id, "at": at})
+            for location_id, changes in by_location.items()
+        ]
+        for result in await asyncio.gather(*publishes, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to publish dispatch batch event: {result}")
+
+journey_events = JourneyEventPublisher(event_hub)
@@ -0,0 +1,236 @@
+"""
+Response Cache Module
+C&C CRM - Tenant-aware caching for dashboard and analytics endpoints
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, Awaitable, Iterable, Tuple
+
+from .cache import Cache, get_cache
+
+logger = logging.getLogger(__name__)
+
+# ===== ROUTE POLICIES =====
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Freshness policy for a cached route.
+
+    ``ttl`` seconds the entry is served as fresh; for ``stale_ttl`` seconds
+    after that it is still served while a single background refresh runs.
+    """
+    ttl: float
+    stale_ttl: float = 0.0
+
+ROUTE_POLICIES: Dict[str, CachePolicy] = {
+    "dashboard.stats": CachePolicy(ttl=30, stale_ttl=90),
+    "operations.operational_status": CachePolicy(ttl=15, stale_ttl=45),
+    "operations.performance_metrics": CachePolicy(ttl=300, stale_ttl=900),
+    "financial.analytics_overview": CachePolicy(ttl=300, stale_ttl=900),
+    "customers.analytics_overview": CachePolicy(ttl=120, stale_ttl=600),
+}
+
+# Routes whose data changes when a given entity is written
+INVALIDATION_MAP: Dict[str, Tuple[str, ...]] = {
+    "journey": (
+        "dashboard.stats",
+        "operations.operational_status",
+        "operations.performance_metrics",
+    ),
+    "quote": (
+        "financial.analytics_overview",
+        "customers.analytics_overview",
+    ),
+    "invoice": (
+        "financial.analytics_overview",
+    ),
+    "customer": (
+        "customers.analytics_overview",
+    ),
+    "resource": (
+        "operations.performance_metrics",
+    ),
+}
+
+# ===== CACHE =====
+
+def make_cache_key(route: str, client_id: Optional[str], location_id: Optional[str], params: Optional[Dict[str, Any]] = None) -> str:
+    """Build a cache key from (route, clientId, locationId, params)"""
+    encoded = json.dumps(params or {}, sort_keys=True, default=str, separators=(",", ":"))
+    return f"{route}|{client_id or '-'}|{location_id or '-'}|{encoded}"
+
+def _tenant_tags(route: str, client_id: Optional[str], location_id: Optional[str]) -> Tuple[str, str]:
+    """Tags for a (route, clientId) and its (route, clientId, locationId) slice"""
+    tenant = f"{route}|{client_id or '-'}"
+    return tenant, f"{tenant}|{location_id or '-'}"
+
+class ResponseCache:
+    """Response cache with stale-while-revalidate and single-flight.
+
+    Entries live in the shared ``responses`` cache namespace, so they follow
+    the configured backend; in-flight refreshes and invalidation generations
+    are per process. Freshness uses wall-clock time because entries may be
+    read by other workers.
+    """
+
+    def __init__(self, policies: Optional[Dict[str, CachePolicy]] = None, clock: Callable[[], float] = time.time, cache: Optional[Cache] = None):
+        self.policies = policies if policies is not None else ROUTE_POLICIES
+        self._clock = clock
+        self._cache = cache
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Bumped on invalidation so refreshes started before a write are discarded
+        self._generations: Dict[Tuple[str, str], int] = {}
+
+    @property
+    def cache(self) -> Cache:
+        if self._cache is None:
+            self._cache = get_cache("responses")
+        return self._cache
+
+    async def get_or_compute(
+        self,
+        route: str,
+        client_id: Optional[str],
+        location_id: Optional[str],
+        params: Optional[Dict[str, Any]],
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return a cached response or compute it once for all concurrent callers"""
+        policy = self.policies.get(route)
+        if policy is None:
+            return await compute()
+
+        key = make_cache_key(route, client_id, location_id, params)
+        found, entry = await self.cache.get(key)
+
+        if found:
+            now = self._clock()
+            if now < entry["fresh_until"]:
+                return entry["value"]
+            if now < entry["stale_until"]:
+                if key not in self._inflight:
+                    self._start_refresh(key, route, client_id, location_id, policy, compute)
+                return entry["value"]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._start_refresh(key, route, client_id, location_id, policy, compute)
+        return await asyncio.shield(future)
+
+    def _start_refresh(self, key, route, client_id, location_id, policy: CachePolicy, compute) -> asyncio.Future:
+        future = asyncio.ensure_future(self._refresh(key, route, client_id, location_id, policy, compute))
+        future.add_done_callback(_consume_exception)
+        self._inflight[key] = future
+        return future
+
+    async def _refresh(self, key, route, client_id, location_id, policy: CachePolicy, compute) -> Any:
+        tenant = (route, client_id or "-")
+        generation = self._generations.get(tenant, 0)
+        try:
+            value = await compute()
+            if self._generations.get(tenant, 0) == generation:
+                now = self._clock()
+                entry = {"value": value, "fresh_until": now + policy.ttl, "stale_until": now + policy.ttl + policy.stale_ttl}
+                await self.cache.set(
+                    key, entry, ttl=policy.ttl + policy.stale_ttl,
+                    tags=(route, *_tenant_tags(route, client_id, location_id))
+                )
+            return value
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+
+    async def invalidate(self, client_id: Optional[str], routes: Iterable[str], location_id: Optional[str] = None) -> int:
+        """Drop cached responses for a tenant; ``location_id=None`` drops every location"""
+        tags = []
+        for route in routes:
+            tenant = (route, client_id or "-")
+            self._generations[tenant] = self._generations.get(tenant, 0) + 1
+            prefix = f"{route}|{client_id or '-'}|"
+            for key in list(self._inflight):
+                if key.startswith(prefix):
+                    del self._inflight[key]
+
+            client_tag, location_tag = _tenant_tags(route, client_id, location_id)
+            if location_id is None:
+                tags.append(client_tag)
+            else:
+                # Client-wide entries (no location) are affected by any location write
+                tags.extend((location_tag, _tenant_tags(route, client_id, None)[1]))
+        return await self.cache.invalidate_tags(*tags) if tags else 0
+
+    async def clear(self):
+        """Drop every cached response"""
+        self._inflight.clear()
+        await self.cache.invalidate_tags(*self.policies)
+
+def _consume_exception(future: asyncio.Future):
+    """Log refresh failures so background refreshes never leave unretrieved errors"""
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"Cache refresh failed: {future.exception()}")
+
+# Shared cache instance
+response_cache = ResponseCache()
+
+# ===== ENDPOINT DECORATOR =====
+
+def tenant_of(user: Any) -> Tuple[Optional[str], Optional[str]]:
+    """Read clientId/locationId from a User model or a JWT principal dict"""
+    if isinstance(user, dict):
+        return (
+            user.get("client_id") or user.get("clientId") or user.get("company_id"),
+            user.get("location_id") or user.get("locationId")
+        )
+    return getattr(user, "clientId", None), getattr(user, "locationId", None)
+
+def cached_endpoint(route: str, user_param: str = "current_user"):
+    """Cache a FastAPI endpoint's response under ROUTE_POLICIES[route].
+
+    The remaining endpoint arguments become the params part of the key.
+    functools.wraps keeps the signature so FastAPI dependency injection
+    still sees the original parameters.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            client_id, location_id = tenant_of(kwargs.get(user_param))
+            params = {k: v for k, v in kwargs.items() if k != user_param}
+            return await response_cache.get_or_compute(
+                route, client_id, location_id, params, lambda: func(*args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+# ===== INVALIDATION HOOKS =====
+
+async def invalidate_for_write(entity: str, client_id: Optional[str], location_id: Optional[str] = None) -> int:
+    """Invalidate cached responses affected by a write to ``entity``"""
+    routes = INVALIDATION_MAP.get(entity, ())
+    if not client_id or not routes:
+        return 0
+    return await response_cache.invalidate(client_id, routes, location_id)
+
+async def on_journey_write(client_id: Optional[str], location_id: Optional[str] = None) -> int:
+    """Hook for journey create/update/status/crew writes"""
+    return await invalidate_for_write("journey", client_id, location_id)
+
+async def on_quote_write(client_id: Optional[str], location_id: Optional[str] = None) -> int:
+    """Hook for quote create/update/approve writes"""
+    return await invalidate_for_write("quote", client_id, location_id)
+
+async def on_invoice_write(client_id: Optional[str], location_id: Optional[str] = None) -> int:
+    """Hook for invoice and payment writes"""
+    return await invalidate_for_write("invoice", client_id, location_id)
+
+async def on_customer_write(client_id: Optional[str], location_id: Optional[str] = None) -> int:
+    """Hook for customer create/update writes"""
+    return await invalidate_for_write("customer", client_id, location_id)
+
+async def on_resource_write(client_id: Optional[str], location_id: Optional[str] = None) -> int:
+    """Hook for fuel log and material usage writes"""
+    return await invalidate_for_write("resource", client_id, location_id)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Rollup Worker
+Recomputes daily rollups for days queued in "RollupDirtyDay"
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+from datetime import date, datetime
+from typing import Dict, Any, Optional
+
+from apps.api.database import get_database_connection
+from apps.api.rollups import available_rollups, claim_dirty_days, defer_dirty_day, recompute_day
+
+logger = logging.getLogger(__name__)
+
+class RollupWorker:
+    """Drains the rollup change feed in small transactional batches"""
+
+    def __init__(self, interval: float = 60, batch_size: int = 50):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.running = False
+        self.last_run: Optional[datetime] = None
+        self.days_recomputed = 0
+
+    async def run_batch(self, today: Optional[date] = None) -> int:
+        """Recompute one batch of dirty days; returns how many were processed.
+
+        Each day is rebuilt under its own savepoint. A day that fails goes
+        back on the queue with a backoff and the rest of the batch commits.
+        """
+        db = await get_database_connection()
+        try:
+            failed = 0
+            async with db.connection.transaction():
+                specs = await available_rollups(db.connection)
+                days = await claim_dirty_days(db.connection, today or date.today(), self.batch_size)
+                for client_id, location_id, day, attempts in days:
+                    try:
+                        async with db.connection.transaction():
+                            await recompute_day(db.connection, client_id, location_id, day, specs)
+                    except Exception as e:
+                        logger.error(f"Rollup recompute failed for {client_id}/{location_id}/{day}: {e}")
+                        await defer_dirty_day(db.connection, client_id, location_id, day, attempts + 1, str(e))
+                        failed += 1
+            self.days_recomputed += len(days) - failed
+            return len(days)
+        finally:
+            await db.close()
+
+    async def drain(self) -> int:
+        """Recompute every queued day before today"""
+        total = 0
+        while True:
+            processed = await self.run_batch()
+            total += processed
+            if processed < self.batch_size:
+                break
+        if total:
+            logger.info(f"Recomputed rollups for {total} days")
+        self.last_run = datetime.now()
+        return total
+
+    async def run_continuous(self):
+        """Drain the queue every ``interval`` seconds"""
+        logger.info(f"Starting rollup worker (every {self.interval} seconds)")
+        self.running = True
+
+        while self.running:
+            try:
+                await self.drain()
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                logger.info("Rollup worker cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Error in rollup worker: {e}")
+                await asyncio.sleep(self.interval)
+
+    def stop(self):
+        """Stop the worker"""
+        logger.info("Stopping rollup worker...")
+        self.running = False
+
+    async def get_status(self) -> Dict[str, Any]:
+        """Get current worker status"""
+        return {
+            "running": self.running,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "interval_seconds": self.interval,
+            "days_recomputed": self.days_recomputed
+        }
+
+# Global worker instance
+rollup_worker = None
+rollup_task = None
+
+async def start_rollup_worker():
+    """Start the rollup worker as a background task"""
+    global rollup_worker, rollup_task
+
+    try:
+        rollup_worker = RollupWorker(interval=float(os.getenv("ROLLUP_INTERVAL_SECONDS", "60")))
+        rollup_task = asyncio.create_task(rollup_worker.run_continuous())
+        logger.info("Rollup worker started successfully")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to start rollup worker: {e}")
+        return False
+
+async def stop_rollup_worker():
+    """Stop the rollup worker"""
+    if rollup_worker:
+        rollup_worker.stop()
+    if rollup_task:
+        rollup_task.cancel()
+        try:
+            await rollup_task
+        except asyncio.CancelledError:
+            pass
+    logger.info("Rollup worker stopped")
+    return True
+
+async def main():
+    """Run the rollup worker as a standalone process"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    worker = RollupWorker(interval=float(os.getenv("ROLLUP_INTERVAL_SECONDS", "60")))
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, shutting down...")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    if "--once" in sys.argv:
+        await worker.drain()
+    else:
+        await worker.run_continuous()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,379 @@
+"""
+Daily Rollups Module
+C&C CRM - Per-(clientId, locationId, day) rollups for analytics endpoints
+
+Triggers in prisma/daily_rollups.sql record every changed (clientId,
+locationId, day) in "RollupDirtyDay"; rollup_worker recomputes those days.
+Reads take settled days from the rollup tables and aggregate the raw tables
+only for today and for days still waiting to be recomputed, so results match
+a raw-table query without scanning the whole window.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ===== SPECS =====
+
+@dataclass(frozen=True)
+class RollupSpec:
+    """A rollup table and the raw aggregate it materializes.
+
+    ``measures`` pairs rollup columns with the raw aggregate that fills them;
+    reads always SUM the measures, so counts are stored as COUNT(*).
+    ``scope`` optionally restricts which raw rows are rolled up.
+    ``tables`` lists the tables ``raw_from`` reads; the worker skips a spec
+    while any of them is missing.
+    """
+    table: str
+    dimension: str
+    raw_dimension: str
+    measures: Tuple[Tuple[str, str], ...]
+    raw_from: str
+    client_column: str
+    location_column: str
+    time_column: str
+    tables: Tuple[str, ...]
+    scope: str = ""
+
+JOURNEYS = RollupSpec(
+    table="JourneyDailyRollup",
+    dimension="status",
+    raw_dimension="tj.status::text",
+    measures=(("journeyCount", "COUNT(*)"),),
+    raw_from='"TruckJourney" tj',
+    client_column='tj."clientId"',
+    location_column='tj."locationId"',
+    time_column="tj.date",
+    tables=("TruckJourney",),
+)
+
+FUEL = RollupSpec(
+    table="FuelDailyRollup",
+    dimension="truckNumber",
+    raw_dimension="COALESCE(tj.\"truckNumber\", 'Unknown')",
+    measures=(
+        ("litres", 'SUM(fl."fuelAmount")'),
+        ("cost", 'SUM(fl."fuelCost")'),
+        ("logCount", "COUNT(*)"),
+    ),
+    raw_from='"FuelLog" fl JOIN "TruckJourney" tj ON tj.id = fl."journeyId"',
+    client_column='tj."clientId"',
+    location_column='tj."locationId"',
+    time_column="tj.date",
+    tables=("FuelLog", "TruckJourney"),
+)
+
+MATERIALS = RollupSpec(
+    table="MaterialDailyRollup",
+    dimension="category",
+    raw_dimension="COALESCE(m.category, 'Unknown')",
+    measures=(
+        ("quantity", 'SUM(mu.quantity)'),
+        ("cost", 'SUM(mu."totalCost")'),
+        ("usageCount", "COUNT(*)"),
+    ),
+    raw_from=(
+        '"MaterialUsage" mu JOIN "TruckJourney" tj ON tj.id = mu."journeyId" '
+        'LEFT JOIN "CompanyMaterial" m ON m.id = mu."materialId"'
+    ),
+    client_column='tj."clientId"',
+    location_column='tj."locationId"',
+    time_column="tj.date",
+    tables=("MaterialUsage", "TruckJourney", "CompanyMaterial"),
+)
+
+INVOICES = RollupSpec(
+    table="InvoiceDailyRollup",
+    dimension="status",
+    raw_dimension="i.status::text",
+    measures=(
+        ("invoiceCount", "COUNT(*)"),
+        ("total", "SUM(i.total)"),
+    ),
+    raw_from='"Invoice" i',
+    client_column='i."clientId"',
+    location_column='i."locationId"',
+    time_column='i."createdAt"',
+    tables=("Invoice",),
+)
+
+# Completed journeys per crew member; a journey counts for everyone assigned
+CREW = RollupSpec(
+    table="CrewDailyRollup",
+    dimension="userId",
+    raw_dimension='ac."userId"',
+    measures=(
+        ("jobs", "COUNT(*)"),
+        ("onTimeJobs", "COUNT(*) FILTER (WHERE tj.\"startTime\" <= tj.date + interval '15 minutes')"),
+        ("timedJobs", 'COUNT(tj."startTime")'),
+        ("hours", 'COALESCE(SUM(EXTRACT(EPOCH FROM (tj."endTime" - tj."startTime")) / 3600), 0)'),
+        # journey_damage_count (prisma/crew_scoreboard.sql) is 0 while "DamageReport" doesn't exist
+        ("damageIncidents", "COALESCE(SUM(journey_damage_count(tj.id)), 0)"),
+        ("revenue", "COALESCE(SUM(q.totalAmount), 0)"),
+    ),
+    raw_from=(
+        '"AssignedCrew" ac JOIN "TruckJourney" tj ON tj.id = ac."journeyId" '
+        'LEFT JOIN "Quote" q ON q.id = tj.quoteId'
+    ),
+    client_column='tj."clientId"',
+    location_column='tj."locationId"',
+    time_column="tj.date",
+    tables=("AssignedCrew", "TruckJourney", "Quote"),
+    scope="tj.status = 'COMPLETED'",
+)
+
+ROLLUPS: Tuple[RollupSpec, ...] = (JOURNEYS, FUEL, MATERIALS, INVOICES, CREW)
+
+# ===== SQL BUILDERS =====
+
+_DIRTY = (
+    'SELECT 1 FROM "RollupDirtyDay" d '
+    'WHERE d."clientId" = {client} AND d."locationId" = {location} AND d.day = {day}'
+)
+
+def read_sql(spec: RollupSpec, by_location: bool, bounded: bool, by_day: bool = False) -> str:
+    """Window aggregate over settled rollup days plus raw rows for the rest.
+
+    Groups by the spec's dimension, or by day when ``by_day``. Parameters:
+    $1 clientId, $2 today, $3 end day, then $4 start day when ``bounded``
+    and the next one locationId when ``by_location``.
+    """
+    params = 3
+    start = location = None
+    if bounded:
+        params += 1
+        start = f"${params}::date"
+    if by_location:
+        params += 1
+        location = f"${params}"
+
+    rollup_filters = ['r."clientId" = $1', "r.day < $2", "r.day <= $3"]
+    raw_filters = [f"{spec.client_column} = $1", f"{spec.time_column} < ($3::date + 1)"]
+    if spec.scope:
+        raw_filters.append(spec.scope)
+    if start:
+        rollup_filters.append(f"r.day >= {start}")
+        raw_filters.append(f"{spec.time_column} >= {start}")
+    if location:
+        rollup_filters.append(f'r."locationId" = {location}')
+        raw_filters.append(f"{spec.location_column} = {location}")
+
+    rollup_filters.append("NOT EXISTS (" + _DIRTY.format(client='r."clientId"', location='r."locationId"', day="r.day") + ")")
+    raw_filters.append(
+        f"({spec.time_column} >= $2::date OR EXISTS ("
+        + _DIRTY.format(client=spec.client_column, location=spec.location_column, day=f"{spec.time_column}::date")
+        + "))"
+    )
+
+    columns = ", ".join(f'r."{name}"' for name, _ in spec.measures)
+    raw_columns = ", ".join(expression for _, expression in spec.measures)
+    totals = ", ".join(f'SUM(s."{name}") AS "{name}"' for name, _ in spec.measures)
+    dimension = "r.day" if by_day else f'r."{spec.dimension}"'
+    raw_dimension = f"{spec.time_column}::date" if by_day else spec.raw_dimension
+    return f"""
+        SELECT s.dimension, {totals}
+        FROM (
+            SELECT {dimension} AS dimension, {columns}
+            FROM "{spec.table}" r
+            WHERE {' AND '.join(rollup_filters)}
+            UNION ALL
+            SELECT {raw_dimension}, {raw_columns}
+            FROM {spec.raw_from}
+            WHERE {' AND '.join(raw_filters)}
+            GROUP BY 1
+        ) s
+        GROUP BY s.dimension
+    """
+
+def recompute_sql(spec: RollupSpec) -> Tuple[str, str]:
+    """(delete, insert) statements rebuilding one ($1 client, $2 location, $3 day)"""
+    delete = f'DELETE FROM "{spec.table}" WHERE "clientId" = $1 AND "locationId" = $2 AND day = $3'
+    names = ", ".join(f'"{name}"' for name, _ in spec.measures)
+    expressions = ", ".join(expression for _, expression in spec.measures)
+    scope = f"\n          AND {spec.scope}" if spec.scope else ""
+    insert = f"""
+        INSERT INTO "{spec.table}" ("clientId", "locationId", day, "{spec.dimension}", {names})
+        SELECT $1, $2, $3::date, {spec.raw_dimension}, {expressions}
+        FROM {spec.raw_from}
+        WHERE {spec.client_column} = $1 AND {spec.location_column} = $2
+          AND {spec.time_column} >= $3::date AND {spec.time_column} < ($3::date + 1){scope}
+        GROUP BY 4
+    """
+    return delete, insert
+
+# ===== READS =====
+
+def _number(value) -> float:
+    return float(value) if value is not None else 0.0
+
+async def read_rollup(
+    db,
+    spec: RollupSpec,
+    client_id: str,
+    end: date,
+    start: Optional[date] = None,
+    location_id: Optional[str] = None,
+    today: Optional[date] = None
+) -> Dict[str, Dict[str, float]]:
+    """{dimension: {measure: total}} for [start, end]; ``start=None`` means all history"""
+    args: List[Any] = [client_id, today or date.today(), end]
+    if start is not None:
+        args.append(start)
+    if location_id is not None:
+        args.append(location_id)
+
+    rows = await db.fetch_all(read_sql(spec, location_id is not None, start is not None), *args)
+    return {
+        row["dimension"]: {name: _number(row[name]) for name, _ in spec.measures}
+        for row in rows
+    }
+
+async def read_rollup_daily(
+    db,
+    spec: RollupSpec,
+    client_id: str,
+    end: date,
+    start: date,
+    location_id: Optional[str] = None,
+    today: Optional[date] = None
+) -> Dict[str, List[Any]]:
+    """Per-day totals as columns: {"day": [...], <measure>: [...]}, day-sorted.
+
+    Postgres builds the arrays, so a long window is one row on the wire
+    instead of one record per day.
+    """
+    args: List[Any] = [client_id, today or date.today(), end, start]
+    if location_id is not None:
+        args.append(location_id)
+
+    inner = read_sql(spec, location_id is not None, True, by_day=True)
+    arrays = ", ".join(
+        f'array_agg(d."{name}" ORDER BY d.dimension) AS "{name}"' for name, _ in spec.measures
+    )
+    row = await db.fetch_one(
+        f"SELECT array_agg(d.dimension ORDER BY d.dimension) AS day, {arrays} FROM ({inner}) d",
+        *args
+    )
+    columns = {"day": list((row or {}).get("day") or [])}
+    for name, _ in spec.measures:
+        columns[name] = [_number(value) for value in (row or {}).get(name) or []]
+    return columns
+
+async def read_raw(
+    db,
+    spec: RollupSpec,
+    client_id: str,
+    end: date,
+    start: date,
+    filters: Dict[str, Any]
+) -> Dict[str, Dict[str, float]]:
+    """Raw-table aggregate by dimension for filters the rollups don't keep.
+
+    ``filters`` maps trusted column expressions to values, e.g.
+    ``{'fl."journeyId"': journey_id}``.
+    """
+    args: List[Any] = [client_id, start, end]
+    conditions = [f"{spec.client_column} = $1", f"{spec.time_column} >= $2::date", f"{spec.time_column} < ($3::date + 1)"]
+    if spec.scope:
+        conditions.append(spec.scope)
+    for column, value in filters.items():
+        args.append(value)
+        conditions.append(f"{column} = ${len(args)}")
+
+    measures = ", ".join(f'{expression} AS "{name}"' for name, expression in spec.measures)
+    rows = await db.fetch_all(
+        f"""
+        SELECT {spec.raw_dimension} AS dimension, {measures}
+        FROM {spec.raw_from}
+        WHERE {' AND '.join(conditions)}
+        GROUP BY 1
+        """,
+        *args
+    )
+    return {
+        row["dimension"]: {name: _number(row[name]) for name, _ in spec.measures}
+        for row in rows
+    }
+
+# ===== RECOMPUTE =====
+
+async def claim_dirty_days(connection, before: date, limit: int) -> List[Tuple[str, str, date, int]]:
+    """Remove and return up to ``limit`` due dirty days earlier than ``before``.
+
+    Must run inside the transaction that recomputes them, so a failed
+    recompute leaves the days marked dirty. Returns (clientId, locationId,
+    day, attempts) with the failed attempts so far.
+    """
+    rows = await connection.fetch(
+        """
+        DELETE FROM "RollupDirtyDay"
+        WHERE ("clientId", "locationId", day) IN (
+            SELECT "clientId", "locationId", day FROM "RollupDirtyDay"
+            WHERE day < $1 AND "availableAt" <= NOW()
+            ORDER BY day
+            LIMIT $2
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING "clientId", "locationId", day, attempts
+        """,
+        before, limit
+    )
+    return [(row["clientId"], row["locationId"], row["day"], row["attempts"]) for row in rows]
+
+async def defer_dirty_day(connection, client_id: str, location_id: str, day: date, attempts: int, error: str):
+    """Put a day that failed to recompute back on the queue with a backoff.
+
+    Waits 2, 4, 8, ... minutes, capped at a day, so the rest of the queue
+    keeps draining while the day is looked at.
+    """
+    await connection.execute(
+        """
+        INSERT INTO "RollupDirtyDay" ("clientId", "locationId", day, attempts, "availableAt", error)
+        VALUES ($1, $2, $3, $4, NOW() + make_interval(mins => LEAST(power(2, $4)::int, 1440)), $5)
+        ON CONFLICT ("clientId", "locationId", day) DO UPDATE SET
+            attempts = EXCLUDED.attempts, "availableAt" = EXCLUDED."availableAt", error = EXCLUDED.error
+        """,
+        client_id, location_id, day, attempts, error
+    )
+
+async def available_rollups(connection) -> Tuple[RollupSpec, ...]:
+    """The specs whose source tables all exist"""
+    tables = sorted({table for spec in ROLLUPS for table in spec.tables})
+    rows = await connection.fetch(
+        "SELECT name FROM unnest($1::text[]) AS name WHERE to_regclass(quote_ident(name)) IS NOT NULL",
+        tables
+    )
+    present = {row["name"] for row in rows}
+    return tuple(spec for spec in ROLLUPS if present.issuperset(spec.tables))
+
+async def recompute_day(connection, client_id: str, location_id: str, day: date,
+                        specs: Tuple[RollupSpec, ...] = ROLLUPS):
+    """Rebuild the ``specs`` rollups for one (clientId, locationId, day)"""
+    for spec in specs:
+        delete, insert = recompute_sql(spec)
+        await connection.execute(delete, client_id, location_id, day)
+        await connection.execute(insert, client_id, location_id, day)
+
+async def mark_days_dirty(db, client_id: str, location_id: str, start: date, end: date) -> int:
+    """Queue a range of days for recompute (backfills and manual repairs)"""
+    days = (end - start).days + 1
+    if days <= 0:
+        return 0
+    await db.execute(
+        """
+        INSERT INTO "RollupDirtyDay" ("clientId", "locationId", day)
+        SELECT $1, $2, $3::date + offs FROM generate_series(0, $4 - 1) offs
+        ON CONFLICT DO NOTHING
+        """,
+        client_id, location_id, start, days
+    )
+    return days
+
+def window(start_date: Optional[date], end_date: Optional[date], default_days: int = 30) -> Tuple[date, date]:
+    """Analytics window with the routes' defaults: the last ``default_days`` days up to today"""
+    today = date.today()
+    return start_date or today - timedelta(days=default_days), end_date or today
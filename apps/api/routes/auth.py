@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Any, Optional
 import jwt
 import datetime
@@ -90,8 +91,28 @@ def create_access_token(data: dict, expires_delta: Optional[datetime.timedelta]
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
-    """Verify JWT token and return user info"""
+def _load_active_user(user_id: str) -> Optional[Dict[str, Any]]:
+    """Read an active user row for token verification"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(
+            "SELECT id, name, email, role, \"clientId\", \"locationId\", status FROM \"User\" WHERE id = %s AND status = 'ACTIVE'",
+            (user_id,)
+        )
+        user = cursor.fetchone()
+        cursor.close()
+        return dict(user) if user else None
+    finally:
+        conn.close()
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> Dict[str, Any]:
+    """Verify JWT token and return user info.
+
+    The user row is read on every request and never cached: role, tenant
+    and status are also written outside this API (the web app, syncs), so
+    a cached copy could keep a deactivated user authorized.
+    """
     try:
         token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -102,23 +123,15 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
             raise HTTPException(status_code=401, detail="Invalid token")
         
         # Get user from database
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cursor.execute(
-            "SELECT id, name, email, role, \"clientId\", \"locationId\", status FROM \"User\" WHERE id = %s AND status = 'ACTIVE'",
-            (user_id,)
-        )
-        
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        user = await run_in_threadpool(_load_active_user, user_id)
         
         if not user:
             raise HTTPException(status_code=401, detail="User not found or inactive")
         
         return dict(user)
         
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.PyJWTError:
@@ -8,6 +8,8 @@ and monitoring data synchronization.
 
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from typing import List, Dict, Any, Optional
+import functools
+import json
 from datetime import datetime, timedelta
 from prisma import Prisma
 from prisma.models import (
@@ -17,6 +19,7 @@ from prisma.models import (
 )
 from apps.api.services.company_sync_service import CompanySyncService
 from apps.api.middleware.super_admin_auth import get_current_super_admin
+from apps.api.cache import get_cache
 
 router = APIRouter()
 
@@ -29,6 +32,29 @@ async def get_db():
     finally:
         await db.disconnect()
 
+# Synced reference data only changes on sync or company edits
+REFERENCE_CACHE_TTL = 600
+
+def cached_reference(kind: str):
+    """Cache a company reference-data endpoint, tagged by company for invalidation"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(company_id: str, **kwargs):
+            params = {k: v for k, v in kwargs.items() if k not in ("db", "super_admin")}
+            key = f"{company_id}:{kind}:{json.dumps(params, sort_keys=True, default=str)}"
+            return await get_cache("company_reference").get_or_set(
+                key,
+                lambda: func(company_id, **kwargs),
+                ttl=REFERENCE_CACHE_TTL,
+                tags=[f"company:{company_id}"]
+            )
+        return wrapper
+    return decorator
+
+async def invalidate_company_reference(company_id: str):
+    """Drop cached reference data for a company"""
+    await get_cache("company_reference").invalidate_tags(f"company:{company_id}")
+
 @router.get("/companies", response_model=List[Dict[str, Any]])
 async def get_companies(
     db: Prisma = Depends(get_db),
@@ -154,6 +180,8 @@ async def update_company(
             }
         )
         
+        await invalidate_company_reference(company_id)
+        
         return {
             "id": company.id,
             "name": company.name,
@@ -181,6 +209,7 @@ async def delete_company(
     """Delete company integration"""
     try:
         await db.companyintegration.delete(where={"id": company_id})
+        await invalidate_company_reference(company_id)
         return {"message": "Company deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error deleting company: {str(e)}")
@@ -241,6 +270,7 @@ async def get_company_sync_logs(
     ]
 
 @router.get("/companies/{company_id}/branches", response_model=List[Dict[str, Any]])
+@cached_reference("branches")
 async def get_company_branches(
     company_id: str,
     db: Prisma = Depends(get_db),
@@ -275,6 +305,7 @@ async def get_company_branches(
     ]
 
 @router.get("/companies/{company_id}/materials", response_model=List[Dict[str, Any]])
+@cached_reference("materials")
 async def get_company_materials(
     company_id: str,
     category: Optional[str] = None,
@@ -314,6 +345,7 @@ async def get_company_materials(
     ]
 
 @router.get("/companies/{company_id}/service-types", response_model=List[Dict[str, Any]])
+@cached_reference("service_types")
 async def get_company_service_types(
     company_id: str,
     db: Prisma = Depends(get_db),
@@ -340,6 +372,7 @@ async def get_company_service_types(
     ]
 
 @router.get("/companies/{company_id}/move-sizes", response_model=List[Dict[str, Any]])
+@cached_reference("move_sizes")
 async def get_company_move_sizes(
     company_id: str,
     db: Prisma = Depends(get_db),
@@ -366,6 +399,7 @@ async def get_company_move_sizes(
     ]
 
 @router.get("/companies/{company_id}/room-types", response_model=List[Dict[str, Any]])
+@cached_reference("room_types")
 async def get_company_room_types(
     company_id: str,
     db: Prisma = Depends(get_db),
@@ -392,6 +426,7 @@ async def get_company_room_types(
     ]
 
 @router.get("/companies/{company_id}/users", response_model=List[Dict[str, Any]])
+@cached_reference("users")
 async def get_company_users(
     company_id: str,
     db: Prisma = Depends(get_db),
@@ -419,6 +454,7 @@ async def get_company_users(
     ]
 
 @router.get("/companies/{company_id}/referral-sources", response_model=List[Dict[str, Any]])
+@cached_reference("referral_sources")
 async def get_company_referral_sources(
     company_id: str,
     db: Prisma = Depends(get_db),
@@ -2,9 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 from pydantic import BaseModel
-from apps.api.dependencies import get_current_user
-from apps.api.models.user import User
+from apps.api.routes.auth import verify_token
 from prisma import Prisma
+from apps.api.response_cache import cached_endpoint, on_customer_write, on_quote_write
 
 router = APIRouter()
 
@@ -57,7 +57,7 @@ class QuoteCreate(BaseModel):
 @router.post("/")
 async def create_customer(
     customer: CustomerCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Create a new customer/lead"""
     try:
@@ -78,14 +78,15 @@ async def create_customer(
                 "notes": customer.notes,
                 "estimatedValue": customer.estimatedValue,
                 "status": "NEW",
-                "assignedTo": current_user.id,
-                "locationId": current_user.locationId,
-                "clientId": current_user.clientId,
-                "createdBy": current_user.id
+                "assignedTo": current_user["id"],
+                "locationId": current_user["locationId"],
+                "clientId": current_user["clientId"],
+                "createdBy": current_user["id"]
             }
         })
         
         await db.disconnect()
+        await on_customer_write(current_user["clientId"], current_user["locationId"])
         return {"success": True, "customer": new_customer}
         
     except Exception as e:
@@ -93,7 +94,7 @@ async def create_customer(
 
 @router.get("/")
 async def get_customers(
-    current_user: User = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(verify_token),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     search: Optional[str] = None,
@@ -107,8 +108,8 @@ async def get_customers(
         
         # Build where clause
         where_clause = {
-            "clientId": current_user.clientId,
-            "locationId": current_user.locationId
+            "clientId": current_user["clientId"],
+            "locationId": current_user["locationId"]
         }
         
         if search:
@@ -162,7 +163,7 @@ async def get_customers(
 @router.get("/{customer_id}")
 async def get_customer(
     customer_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Get customer details with full history"""
     try:
@@ -198,7 +199,7 @@ async def get_customer(
 async def update_customer(
     customer_id: str,
     customer_update: CustomerUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Update customer information"""
     try:
@@ -207,7 +208,7 @@ async def update_customer(
         
         # Verify customer exists and user has access
         existing = await db.customer.find_unique(
-            where={"id": customer_id, "clientId": current_user.clientId}
+            where={"id": customer_id, "clientId": current_user["clientId"]}
         )
         if not existing:
             raise HTTPException(status_code=404, detail="Customer not found")
@@ -217,12 +218,13 @@ async def update_customer(
             where={"id": customer_id},
             data={
                 **customer_update.dict(exclude_unset=True),
-                "updatedBy": current_user.id,
+                "updatedBy": current_user["id"],
                 "updatedAt": datetime.utcnow()
             }
         )
         
         await db.disconnect()
+        await on_customer_write(current_user["clientId"], current_user["locationId"])
         return {"success": True, "customer": updated}
         
     except Exception as e:
@@ -234,7 +236,7 @@ async def update_customer(
 async def create_quote(
     customer_id: str,
     quote: QuoteCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Create a quote for a customer"""
     try:
@@ -243,7 +245,7 @@ async def create_quote(
         
         # Verify customer exists
         customer = await db.customer.find_unique(
-            where={"id": customer_id, "clientId": current_user.clientId}
+            where={"id": customer_id, "clientId": current_user["clientId"]}
         )
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
@@ -267,13 +269,14 @@ async def create_quote(
                 "validUntil": quote.validUntil,
                 "notes": quote.notes,
                 "status": "DRAFT",
-                "createdBy": current_user.id,
-                "locationId": current_user.locationId,
-                "clientId": current_user.clientId
+                "createdBy": current_user["id"],
+                "locationId": current_user["locationId"],
+                "clientId": current_user["clientId"]
             }
         })
         
         await db.disconnect()
+        await on_quote_write(current_user["clientId"], current_user["locationId"])
         return {"success": True, "quote": new_quote}
         
     except Exception as e:
@@ -282,7 +285,7 @@ async def create_quote(
 @router.get("/{customer_id}/quotes")
 async def get_customer_quotes(
     customer_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Get all quotes for a customer"""
     try:
@@ -292,7 +295,7 @@ async def get_customer_quotes(
         quotes = await db.quote.find_many(
             where={
                 "customerId": customer_id,
-                "clientId": current_user.clientId
+                "clientId": current_user["clientId"]
             },
             order={"createdAt": "desc"}
         )
@@ -306,16 +309,17 @@ async def get_customer_quotes(
 # ===== CUSTOMER ANALYTICS =====
 
 @router.get("/analytics/overview")
+@cached_endpoint("customers.analytics_overview")
 async def get_customer_analytics(
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Get customer analytics overview"""
     try:
         db = Prisma()
         await db.connect()
         
-        location_id = current_user.locationId
-        client_id = current_user.clientId
+        location_id = current_user["locationId"]
+        client_id = current_user["clientId"]
         
         # Get various counts
         total_customers = await db.customer.count(
@@ -374,7 +378,7 @@ async def get_customer_analytics(
 
 @router.get("/analytics/sources")
 async def get_customer_sources(
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Get customer acquisition by source"""
     try:
@@ -384,7 +388,7 @@ async def get_customer_sources(
         # Get customers grouped by source
         sources = await db.customer.group_by(
             by=["source"],
-            where={"clientId": current_user.clientId},
+            where={"clientId": current_user["clientId"]},
             _count={"source": True}
         )
         
@@ -401,7 +405,7 @@ async def get_customer_sources(
 async def add_customer_note(
     customer_id: str,
     note: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Add a note to a customer"""
     try:
@@ -412,7 +416,7 @@ async def add_customer_note(
             "data": {
                 "customerId": customer_id,
                 "note": note,
-                "createdBy": current_user.id
+                "createdBy": current_user["id"]
             }
         })
         
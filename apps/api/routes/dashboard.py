@@ -1,108 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Dict, Any, Optional
 from datetime import datetime, date, timedelta
-from apps.api.dependencies import get_current_user
-from apps.api.models.user import User
+from apps.api.routes.auth import verify_token
 from prisma import Prisma
+from apps.api.response_cache import cached_endpoint
+from apps.api.stats_engine import get_dashboard_counts
+from apps.api.time_series import SERIES, get_series, last_days
 
 router = APIRouter()
 
 @router.get("/stats")
-async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
+@cached_endpoint("dashboard.stats")
+async def get_dashboard_stats(current_user: Dict[str, Any] = Depends(verify_token)):
     """Get dashboard statistics for the current user's location"""
     try:
-        db = Prisma()
-        await db.connect()
-        
-        # Get stats for the user's location
-        location_id = current_user.locationId
-        client_id = current_user.clientId
-        
-        # Count total users at this location
-        total_users = await db.user.count(
-            where={
-                "locationId": location_id,
-                "status": "ACTIVE"
-            }
-        )
-        
-        # Count active journeys today
-        today = date.today()
-        active_journeys = await db.truckjourney.count(
-            where={
-                "locationId": location_id,
-                "date": {
-                    "gte": datetime.combine(today, datetime.min.time()),
-                    "lt": datetime.combine(today, datetime.max.time())
-                },
-                "status": {
-                    "in": ["MORNING_PREP", "ON_ROAD", "ON_SITE", "RETURNING"]
-                }
-            }
-        )
-        
-        # Count completed journeys today
-        completed_today = await db.truckjourney.count(
-            where={
-                "locationId": location_id,
-                "date": {
-                    "gte": datetime.combine(today, datetime.min.time()),
-                    "lt": datetime.combine(today, datetime.max.time())
-                },
-                "status": "COMPLETED"
-            }
-        )
-        
-        # Count pending jobs (jobs without assignments)
-        pending_jobs = await db.job.count(
-            where={
-                "branch": {
-                    "locationId": location_id
-                },
-                "assignments": {
-                    "none": {}
-                }
-            }
-        )
-        
-        # Count total locations for this client
-        total_locations = await db.location.count(
-            where={
-                "clientId": client_id
-            }
-        )
-        
-        # Count active drivers (users with DRIVER role who are active)
-        active_drivers = await db.user.count(
-            where={
-                "locationId": location_id,
-                "role": "DRIVER",
-                "status": "ACTIVE"
-            }
-        )
-        
-        await db.disconnect()
+        counts = await get_dashboard_counts(current_user["clientId"], current_user["locationId"])
         
         return {
-            "totalUsers": total_users,
-            "activeJourneys": active_journeys,
-            "completedToday": completed_today,
-            "pendingJobs": pending_jobs,
-            "totalLocations": total_locations,
-            "activeDrivers": active_drivers
+            "totalUsers": counts["totalUsers"],
+            "activeJourneys": counts["activeJourneys"],
+            "completedToday": counts["completedToday"],
+            "pendingJobs": counts["pendingJobs"],
+            "totalLocations": counts["totalLocations"],
+            "activeDrivers": counts["activeDrivers"]
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching dashboard stats: {str(e)}")
 
+@router.get("/series/{metric}")
+async def get_dashboard_series(
+    metric: str,
+    current_user: Dict[str, Any] = Depends(verify_token),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    bucket: str = Query("day", regex="^(hour|day|week|month)$"),
+    group_by: Optional[str] = Query(None, regex="^(location|status)$")
+):
+    """Chart series (sync, journeys, quotes) for the current client.
+
+    Defaults to the 30 days before today; ``end_date`` is inclusive.
+    """
+    if metric not in SERIES:
+        raise HTTPException(status_code=404, detail=f"Unknown series: {metric}")
+    try:
+        start, end = last_days(30)
+        if start_date:
+            start = datetime.combine(start_date, datetime.min.time())
+        if end_date:
+            end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        
+        series = await get_series(metric, start, end, bucket, current_user["clientId"], group_by)
+        return {"metric": metric, "bucket": bucket, "groupBy": group_by, **series}
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching series: {str(e)}")
+
 @router.get("/recent-journeys")
-async def get_recent_journeys(current_user: User = Depends(get_current_user)):
+async def get_recent_journeys(current_user: Dict[str, Any] = Depends(verify_token)):
     """Get recent journeys for the current user's location"""
     try:
         db = Prisma()
         await db.connect()
         
-        location_id = current_user.locationId
+        location_id = current_user["locationId"]
         
         # Get recent journeys from the last 7 days
         seven_days_ago = datetime.now() - timedelta(days=7)
@@ -165,10 +128,10 @@ async def get_recent_journeys(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Error fetching recent journeys: {str(e)}")
 
 @router.get("/quick-actions")
-async def get_quick_actions(current_user: User = Depends(get_current_user)):
+async def get_quick_actions(current_user: Dict[str, Any] = Depends(verify_token)):
     """Get available quick actions based on user role"""
     try:
-        role = current_user.role
+        role = current_user["role"]
         
         # Define actions based on role
         actions = {
@@ -0,0 +1,124 @@
+"""
+Dispatch Routes
+C&C CRM - Where the current client's trucks are right now, and bulk
+crew assignment and status changes for the morning dispatch
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
+from apps.api.routes.auth import verify_token
+from apps.api.database import get_database_connection
+from apps.api.live_positions import find_nearest, find_within
+from apps.api.journey_batch import MAX_BATCH, DISPATCH_ROLES, BatchValidationError, apply_batch
+from apps.api.pubsub import journey_events
+from apps.api.response_cache import on_journey_write
+
+router = APIRouter()
+
+class BatchCrewAssignment(BaseModel):
+    journeyId: str
+    userId: str
+    role: str
+
+class BatchStatusTransition(BaseModel):
+    journeyId: str
+    status: str
+    notes: Optional[str] = None
+
+class DispatchBatch(BaseModel):
+    assignments: List[BatchCrewAssignment] = Field(default_factory=list, max_length=MAX_BATCH)
+    transitions: List[BatchStatusTransition] = Field(default_factory=list, max_length=MAX_BATCH)
+
+@router.get("/trucks/nearest")
+async def get_nearest_trucks(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    current_user: Dict[str, Any] = Depends(verify_token),
+    k: int = Query(5, ge=1, le=50),
+    radius_km: Optional[float] = Query(None, gt=0, le=500)
+):
+    """Closest trucks on active journeys to a point, nearest first"""
+    try:
+        db = await get_database_connection()
+        try:
+            result = await find_nearest(
+                db, current_user["clientId"], lat, lng, k,
+                radius_km * 1000 if radius_km else None
+            )
+        finally:
+            await db.close()
+        return {"success": True, "data": result["trucks"], "source": result["source"]}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finding nearest trucks: {str(e)}")
+
+@router.get("/trucks/within")
+async def get_trucks_within(
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    current_user: Dict[str, Any] = Depends(verify_token)
+):
+    """Trucks on active journeys inside a map viewport"""
+    if south > north or west > east:
+        raise HTTPException(status_code=400, detail="Bounding box must have south <= north and west <= east")
+    try:
+        db = await get_database_connection()
+        try:
+            result = await find_within(db, current_user["clientId"], south, west, north, east)
+        finally:
+            await db.close()
+        return {"success": True, "data": result["trucks"], "source": result["source"]}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error finding trucks in bounds: {str(e)}")
+
+@router.post("/batch")
+async def apply_dispatch_batch(
+    batch: DispatchBatch,
+    current_user: Dict[str, Any] = Depends(verify_token)
+):
+    """Assign crews and move journeys to their next stage in one request.
+
+    All or nothing: if any item is invalid the response is 422 with every
+    error, and nothing is written. Subscribers get one event per affected
+    journey and per affected location instead of one per item.
+    """
+    if current_user.get("role") not in DISPATCH_ROLES:
+        raise HTTPException(status_code=403, detail="Only dispatchers and managers can apply dispatch batches")
+    if not batch.assignments and not batch.transitions:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    try:
+        db = await get_database_connection()
+        try:
+            result = await apply_batch(
+                db.connection, current_user,
+                [item.model_dump() for item in batch.assignments],
+                [item.model_dump() for item in batch.transitions]
+            )
+        finally:
+            await db.close()
+
+        for location_id in {change["locationId"] for change in result["journeys"]}:
+            await on_journey_write(current_user["clientId"], location_id)
+        await journey_events.dispatch_batch(result["journeys"], current_user["id"])
+        return {
+            "success": True,
+            "data": result,
+            "message": f"Assigned {result['assigned']} crew members and moved {result['transitioned']} journeys"
+        }
+
+    except BatchValidationError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "errors": e.errors})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying dispatch batch: {str(e)}")
@@ -0,0 +1,136 @@
+"""
+Event Routes
+C&C CRM - Live journey and location events over WebSocket
+
+Connect to /events/ws?token=<access token>, then send
+{"action": "subscribe", "channel": "journey:<id>"} (or "location:<id>").
+The server sends {"type": "ping"} every PUBSUB_HEARTBEAT_SECONDS. Any client
+message, such as {"action": "pong"}, counts as a heartbeat. A client that
+stays silent for two intervals is disconnected.
+"""
+
+import asyncio
+import json
+import time
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query
+from fastapi.security import HTTPAuthorizationCredentials
+from typing import Dict, Any, Optional
+from apps.api.routes.auth import verify_token
+from apps.api.database import get_database_connection
+from apps.api.tenant_repository import TenantRepository
+from apps.api.pubsub import event_hub, Subscriber, HEARTBEAT_SECONDS
+
+router = APIRouter()
+
+MAX_CHANNELS_PER_CONNECTION = 100
+
+# Application close codes (4000-4999) so clients can tell why they were dropped
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_TIMEOUT = 4408
+
+CHANNEL_TABLES = {
+    "journey": "TruckJourney",
+    "location": "Location",
+}
+
+async def _can_subscribe(channel: str, user: Dict[str, Any]) -> Optional[str]:
+    """Return an error message, or None if the user's client owns the channel"""
+    kind, _, target = channel.partition(":")
+    table = CHANNEL_TABLES.get(kind)
+    if table is None or not target:
+        return f"Unknown channel: {channel}"
+    db = await get_database_connection()
+    try:
+        owned = await TenantRepository(db, user["clientId"]).count(table, {"id": target})
+    finally:
+        await db.close()
+    return None if owned else f"Not found: {channel}"
+
+@router.websocket("/ws")
+async def events_socket(websocket: WebSocket, token: str = Query(...)):
+    """Stream events for the channels this connection subscribes to"""
+    try:
+        # Browsers can't set headers on a WebSocket, so the token comes in the query
+        user = await verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+    except HTTPException as e:
+        await websocket.close(code=CLOSE_UNAUTHORIZED, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    subscriber = Subscriber(websocket.send_text, user=user)
+    last_heard = time.monotonic()
+
+    def reply(message: Dict[str, Any]) -> None:
+        subscriber.offer(json.dumps(message))
+
+    async def receive() -> None:
+        nonlocal last_heard
+        while True:
+            try:
+                raw = await websocket.receive_text()
+            except WebSocketDisconnect:
+                subscriber.close("client disconnected")
+                return
+            last_heard = time.monotonic()
+            try:
+                message = json.loads(raw)
+                action, channel = message.get("action"), message.get("channel")
+            except (ValueError, AttributeError):
+                reply({"type": "error", "message": "Messages must be JSON objects"})
+                continue
+            if action == "subscribe":
+                if channel in subscriber.channels:
+                    reply({"type": "subscribed", "channel": channel})
+                    continue
+                if len(subscriber.channels) >= MAX_CHANNELS_PER_CONNECTION:
+                    reply({"type": "error", "channel": channel,
+                           "message": f"At most {MAX_CHANNELS_PER_CONNECTION} channels per connection"})
+                    continue
+                try:
+                    error = await _can_subscribe(str(channel), user)
+                except Exception as e:
+                    error = f"Error checking channel access: {str(e)}"
+                if error:
+                    reply({"type": "error", "channel": channel, "message": error})
+                else:
+                    event_hub.subscribe(subscriber, channel)
+                    reply({"type": "subscribed", "channel": channel})
+            elif action == "unsubscribe":
+                event_hub.unsubscribe(subscriber, channel)
+                reply({"type": "unsubscribed", "channel": channel})
+            elif action != "pong":
+                reply({"type": "error", "message": f"Unknown action: {action}"})
+
+    async def heartbeat() -> None:
+        while not subscriber.closed:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            if time.monotonic() - last_heard > 2 * HEARTBEAT_SECONDS:
+                subscriber.close("heartbeat timeout")
+                return
+            # Coalesced so a backed-up queue holds at most one ping
+            subscriber.offer('{"type":"ping"}', coalesce_key="ping")
+
+    await event_hub.start()
+    tasks = [
+        asyncio.create_task(receive()),
+        asyncio.create_task(subscriber.run_sender()),
+        asyncio.create_task(heartbeat()),
+    ]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        subscriber.close("connection closed")
+        event_hub.remove(subscriber)
+        if subscriber.close_reason != "client disconnected":
+            try:
+                await websocket.close(code=CLOSE_TIMEOUT, reason=subscriber.close_reason)
+            except Exception:
+                pass
+
+@router.get("/status")
+async def get_event_status(current_user: Dict[str, Any] = Depends(verify_token)) -> Dict[str, Any]:
+    """Connection and queue counters for this API process"""
+    return {"success": True, "data": event_hub.get_status()}
@@ -2,9 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 from pydantic import BaseModel
-from apps.api.dependencies import get_current_user
-from apps.api.models.user import User
+from apps.api.routes.auth import verify_token
 from prisma import Prisma
+from apps.api.response_cache import cached_endpoint, on_quote_write, on_invoice_write, on_journey_write
+from apps.api.database import get_database_connection
+from apps.api.rollups import INVOICES, read_rollup
 
 router = APIRouter()
 
@@ -49,7 +51,7 @@ class PaymentCreate(BaseModel):
 
 @router.get("/quotes")
 async def get_quotes(
-    current_user: User = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(verify_token),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     status: Optional[str] = None,
@@ -60,7 +62,7 @@ async def get_quotes(
         db = Prisma()
         await db.connect()
         
-        where_clause = {"clientId": current_user.clientId}
+        where_clause = {"clientId": current_user["clientId"]}
         
         if status:
             where_clause["status"] = status
@@ -104,7 +106,7 @@ async def get_quotes(
 async def update_quote(
     quote_id: str,
     quote_update: QuoteUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Update quote status and details"""
     try:
@@ -113,7 +115,7 @@ async def update_quote(
         
         # Verify quote exists and user has access
         existing = await db.quote.find_unique(
-            where={"id": quote_id, "clientId": current_user.clientId}
+            where={"id": quote_id, "clientId": current_user["clientId"]}
         )
         if not existing:
             raise HTTPException(status_code=404, detail="Quote not found")
@@ -123,12 +125,13 @@ async def update_quote(
             where={"id": quote_id},
             data={
                 **quote_update.dict(exclude_unset=True),
-                "updatedBy": current_user.id,
+                "updatedBy": current_user["id"],
                 "updatedAt": datetime.utcnow()
             }
         )
         
         await db.disconnect()
+        await on_quote_write(current_user["clientId"], current_user["locationId"])
         return {"success": True, "quote": updated}
         
     except Exception as e:
@@ -137,7 +140,7 @@ async def update_quote(
 @router.post("/quotes/{quote_id}/approve")
 async def approve_quote(
     quote_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Approve a quote and convert to job"""
     try:
@@ -146,7 +149,7 @@ async def approve_quote(
         
         # Get quote with customer details
         quote = await db.quote.find_unique(
-            where={"id": quote_id, "clientId": current_user.clientId},
+            where={"id": quote_id, "clientId": current_user["clientId"]},
             include={"customer": True}
         )
         
@@ -161,9 +164,9 @@ async def approve_quote(
             where={"id": quote_id},
             data={
                 "status": "APPROVED",
-                "approvedBy": current_user.id,
+                "approvedBy": current_user["id"],
                 "approvedAt": datetime.utcnow(),
-                "updatedBy": current_user.id,
+                "updatedBy": current_user["id"],
                 "updatedAt": datetime.utcnow()
             }
         )
@@ -187,7 +190,7 @@ async def approve_quote(
                 "crewSize": quote.crewSize,
                 "specialRequirements": quote.specialRequirements,
                 "notes": quote.notes,
-                "createdBy": current_user.id,
+                "createdBy": current_user["id"],
                 "branch": {
                     "connect": {"id": quote.customer.locationId}
                 }
@@ -195,6 +198,8 @@ async def approve_quote(
         })
         
         await db.disconnect()
+        await on_quote_write(current_user["clientId"], current_user["locationId"])
+        await on_journey_write(current_user["clientId"], quote.customer.locationId)
         
         return {
             "success": True,
@@ -210,7 +215,7 @@ async def approve_quote(
 @router.post("/invoices")
 async def create_invoice(
     invoice: InvoiceCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Create an invoice from a quote"""
     try:
@@ -219,7 +224,7 @@ async def create_invoice(
         
         # Verify quote exists and is approved
         quote = await db.quote.find_unique(
-            where={"id": invoice.quoteId, "clientId": current_user.clientId}
+            where={"id": invoice.quoteId, "clientId": current_user["clientId"]}
         )
         
         if not quote:
@@ -242,13 +247,14 @@ async def create_invoice(
                 "total": invoice.total,
                 "notes": invoice.notes,
                 "status": "DRAFT",
-                "createdBy": current_user.id,
-                "locationId": current_user.locationId,
-                "clientId": current_user.clientId
+                "createdBy": current_user["id"],
+                "locationId": current_user["locationId"],
+                "clientId": current_user["clientId"]
             }
         })
         
         await db.disconnect()
+        await on_invoice_write(current_user["clientId"], current_user["locationId"])
         return {"success": True, "invoice": new_invoice}
         
     except Exception as e:
@@ -256,7 +262,7 @@ async def create_invoice(
 
 @router.get("/invoices")
 async def get_invoices(
-    current_user: User = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(verify_token),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
     status: Optional[str] = None
@@ -266,7 +272,7 @@ async def get_invoices(
         db = Prisma()
         await db.connect()
         
-        where_clause = {"clientId": current_user.clientId}
+        where_clause = {"clientId": current_user["clientId"]}
         
         if status:
             where_clause["status"] = status
@@ -308,7 +314,7 @@ async def get_invoices(
 @router.post("/job-costing")
 async def create_job_costing(
     costing: JobCostingCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Create job costing record for P&L tracking"""
     try:
@@ -346,7 +352,7 @@ async def create_job_costing(
                 "otherCostsTotal": other_costs,
                 "totalCost": total_cost,
                 "notes": costing.notes,
-                "createdBy": current_user.id
+                "createdBy": current_user["id"]
             }
         })
         
@@ -359,7 +365,7 @@ async def create_job_costing(
 @router.get("/job-costing/{job_id}")
 async def get_job_costing(
     job_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Get job costing and P&L data"""
     try:
@@ -404,7 +410,7 @@ async def get_job_costing(
 @router.post("/payments")
 async def create_payment(
     payment: PaymentCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Record a payment for an invoice"""
     try:
@@ -413,7 +419,7 @@ async def create_payment(
         
         # Verify invoice exists
         invoice = await db.invoice.find_unique(
-            where={"id": payment.invoiceId, "clientId": current_user.clientId}
+            where={"id": payment.invoiceId, "clientId": current_user["clientId"]}
         )
         
         if not invoice:
@@ -427,7 +433,7 @@ async def create_payment(
                 "paymentMethod": payment.paymentMethod,
                 "reference": payment.reference,
                 "notes": payment.notes,
-                "processedBy": current_user.id,
+                "processedBy": current_user["id"],
                 "processedAt": datetime.utcnow()
             }
         })
@@ -445,6 +451,7 @@ async def create_payment(
             )
         
         await db.disconnect()
+        await on_invoice_write(current_user["clientId"], current_user["locationId"])
         return {"success": True, "payment": new_payment}
         
     except Exception as e:
@@ -453,8 +460,9 @@ async def create_payment(
 # ===== FINANCIAL ANALYTICS =====
 
 @router.get("/analytics/overview")
+@cached_endpoint("financial.analytics_overview")
 async def get_financial_overview(
-    current_user: User = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(verify_token),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None
 ):
@@ -472,7 +480,7 @@ async def get_financial_overview(
         # Get quote metrics
         total_quotes = await db.quote.count(
             where={
-                "clientId": current_user.clientId,
+                "clientId": current_user["clientId"],
                 "createdAt": {
                     "gte": datetime.combine(start_date, datetime.min.time()),
                     "lte": datetime.combine(end_date, datetime.max.time())
@@ -482,7 +490,7 @@ async def get_financial_overview(
         
         approved_quotes = await db.quote.count(
             where={
-                "clientId": current_user.clientId,
+                "clientId": current_user["clientId"],
                 "status": "APPROVED",
                 "createdAt": {
                     "gte": datetime.combine(start_date, datetime.min.time()),
@@ -491,30 +499,21 @@ async def get_financial_overview(
             }
         )
         
-        # Get revenue metrics
-        total_revenue = await db.invoice.aggregate(
-            where={
-                "clientId": current_user.clientId,
-                "status": "PAID",
-                "createdAt": {
-                    "gte": datetime.combine(start_date, datetime.min.time()),
-                    "lte": datetime.combine(end_date, datetime.max.time())
-                }
-            },
-            _sum={"total": True}
-        )
+        await db.disconnect()
         
-        # Get outstanding invoices
-        outstanding_amount = await db.invoice.aggregate(
-            where={
-                "clientId": current_user.clientId,
-                "status": {"in": ["DRAFT", "SENT", "OVERDUE"]}
-            },
-            _sum={"total": True}
+        # Invoice totals by status come from the daily rollups
+        rollup_db = await get_database_connection()
+        try:
+            window_invoices = await read_rollup(rollup_db, INVOICES, current_user["clientId"], end_date, start_date)
+            all_invoices = await read_rollup(rollup_db, INVOICES, current_user["clientId"], date.today())
+        finally:
+            await rollup_db.close()
+        
+        total_revenue = window_invoices.get("PAID", {}).get("total", 0)
+        outstanding_amount = sum(
+            all_invoices.get(status, {}).get("total", 0) for status in ("DRAFT", "SENT", "OVERDUE")
         )
         
-        await db.disconnect()
-        
         return {
             "period": {
                 "startDate": start_date.isoformat(),
@@ -526,8 +525,8 @@ async def get_financial_overview(
                 "approvalRate": round((approved_quotes / total_quotes * 100), 2) if total_quotes > 0 else 0
             },
             "revenue": {
-                "total": total_revenue._sum.total or 0,
-                "outstanding": outstanding_amount._sum.total or 0
+                "total": total_revenue,
+                "outstanding": outstanding_amount
             }
         }
         
@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Header, Request, Response
 from typing import Dict, Any, List, Optional
-from pydantic import BaseModel
-from datetime import datetime, timedelta
+from pydantic import BaseModel, Field, validator
+from datetime import datetime, timedelta, timezone
 import sys
 import os
+import json
 import psycopg2
-from psycopg2.extras import RealDictCursor
 
 # Import authentication
 from .auth import verify_token
+from ..response_cache import on_journey_write, tenant_of
+from ..database import get_database_connection
+from ..tenant_repository import TenantRepository
+from ..journey_sync import ensure_fresh
+from ..gps_ingest import gps_buffer
+from ..live_positions import record_ingested
+from ..pubsub import journey_events
+from ..media_storage import media_storage, WRITE_BUFFER_BYTES
+from ..media_uploads import (
+    MEDIA_TYPES, ChecksumMismatch, OffsetMismatch, parse_checksum, upload_state, new_media_id,
+    create_upload, get_upload, write_chunk, record_chunk, abort_upload
+)
+from ..media_blobs import attach_media, delete_media
+from ..media_processing import list_variants
+from ..journey_chat import MAX_BATCH, post_messages, list_messages, mark_read, list_participants
+from ..gps_track import (
+    read_track, douglas_peucker, slice_track, encode_polyline, track_summary, iso_timestamps
+)
 
 # Add modules to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'modules'))
@@ -65,7 +83,7 @@ except ImportError as e:
     # Create placeholder instances
     journey_engine = None
     media_handler = None
-    journey_event_broadcaster = None
+    from ..pubsub import journey_events as journey_event_broadcaster
     gps_tracker = None
     location_service = None
     notification_service = None
@@ -113,6 +131,47 @@ class GPSUpdate(BaseModel):
     speed: Optional[float] = None
     accuracy: Optional[float] = None
 
+class GPSPoint(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    recordedAt: datetime
+    speed: Optional[float] = None
+    accuracy: Optional[float] = None
+    heading: Optional[float] = None
+
+    @validator('recordedAt')
+    def validate_recorded_at(cls, v):
+        # Devices without an offset report UTC; mixed naive and aware values can't be compared
+        if v.tzinfo is None:
+            return v.replace(tzinfo=timezone.utc)
+        return v.astimezone(timezone.utc)
+
+class GPSBatch(BaseModel):
+    # recordedAt (device time) identifies a point, so resending a batch is safe
+    points: List[GPSPoint] = Field(..., min_length=1, max_length=1000)
+
+class ChatMessage(BaseModel):
+    message: str = Field(..., min_length=1, max_length=4000)
+    type: str = "TEXT"
+    # Set by clients that may resend; a known id is not stored twice
+    clientMessageId: Optional[str] = Field(None, max_length=100)
+
+class ChatMessageBatch(BaseModel):
+    messages: List[ChatMessage] = Field(..., min_length=1, max_length=MAX_BATCH)
+
+class ChatReadReceipt(BaseModel):
+    seq: int = Field(..., ge=0)
+
+class MediaUploadRequest(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0)
+    mimeType: Optional[str] = None
+    mediaType: str = "PHOTO"
+    # Hex SHA-256 of the whole file, checked once it is assembled
+    checksum: Optional[str] = Field(None, pattern="^[0-9a-f]{64}$")
+    tags: Optional[List[str]] = None
+    notes: Optional[str] = None
+
 # ===== HELPER FUNCTIONS =====
 
 def get_db_connection():
@@ -145,6 +204,17 @@ def get_current_user(current_user: Dict[str, Any] = Depends(verify_token)) -> Di
     """Get current user from JWT token"""
     return current_user
 
+async def _require_journey(db, journey_id: str, current_user: Dict[str, Any]) -> None:
+    """404 unless the journey belongs to the caller's client"""
+    found = await TenantRepository(db, current_user["clientId"]).count("TruckJourney", {"id": journey_id})
+    if not found:
+        raise HTTPException(status_code=404, detail="Journey not found")
+
+async def invalidate_journey_caches(source: Optional[Dict[str, Any]]):
+    """Drop cached dashboard/operations responses for a journey's (or user's) tenant"""
+    if source:
+        await on_journey_write(*tenant_of(source))
+
 # ===== JOURNEY CRUD ENDPOINTS =====
 
 @router.get("/active")
@@ -154,55 +224,38 @@ async def get_active_journeys(current_user: Dict[str, Any] = Depends(verify_toke
     try:
         # Check if business logic modules are available
         if journey_engine is None:
-            # Try to sync SmartMoving data first, then fetch from database
+            # Serve synced journeys from the database; a stale watermark
+            # starts one background SmartMoving sync instead of blocking here
             try:
-                # Import SmartMoving sync service
-                from ..services.smartmoving_sync_service import SmartMovingSyncService
-                
-                # Sync SmartMoving jobs for today and tomorrow
-                async with SmartMovingSyncService() as sync_service:
-                    sync_result = await sync_service.sync_today_and_tomorrow_jobs()
-                    print(f"SmartMoving sync result: {sync_result}")
-                
-                # Now fetch the synced journeys from database
-                conn = get_db_connection()
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
-                
-                # Get journeys for the user's location
-                user_location_id = current_user.get("location_id")
-                user_company_id = current_user.get("company_id") or "clm_f55e13de_a5c4_4990_ad02_34bb07187daa"
-                
-                if user_location_id:
-                    # Filter by specific location
-                    cursor.execute("""
-                        SELECT * FROM "TruckJourney" 
-                        WHERE "locationId" = %s AND "clientId" = %s
-                        ORDER BY "date" DESC, "createdAt" DESC
-                    """, (user_location_id, user_company_id))
-                else:
-                    # Get all journeys for the company
-                    cursor.execute("""
-                        SELECT * FROM "TruckJourney" 
-                        WHERE "clientId" = %s
-                        ORDER BY "date" DESC, "createdAt" DESC
-                    """, (user_company_id,))
-                
-                real_journeys = cursor.fetchall()
-                conn.close()
+                db = await get_database_connection()
+                try:
+                    freshness = await ensure_fresh(db)
+                    
+                    # Journeys for the user's location, or the whole client without one
+                    repository = TenantRepository(db, current_user["clientId"], current_user.get("locationId"))
+                    real_journeys = await repository.find_many(
+                        "TruckJourney", order_by={"date": "desc", "createdAt": "desc"}
+                    )
+                finally:
+                    await db.close()
                 
                 return {
                     "success": True,
-                    "data": [dict(journey) for journey in real_journeys],
-                    "message": f"Retrieved {len(real_journeys)} SmartMoving journeys from database"
+                    "data": real_journeys,
+                    "message": f"Retrieved {len(real_journeys)} SmartMoving journeys from database",
+                    **freshness
                 }
                 
             except Exception as e:
-                print(f"Error syncing SmartMoving data: {e}")
-                # Return empty data if SmartMoving sync fails
+                print(f"Error reading SmartMoving journeys: {e}")
+                # Return empty data if the journeys can't be read
                 return {
                     "success": True,
                     "data": [],
-                    "message": "No SmartMoving journeys found"
+                    "message": "No SmartMoving journeys found",
+                    "dataAsOf": None,
+                    "stale": True,
+                    "syncInProgress": False
                 }
         
         # Handle super admin vs regular user
@@ -353,6 +406,8 @@ async def create_journey(journey: JourneyCreate) -> Dict[str, Any]:
             "message": message
         }
     
+    await invalidate_journey_caches(journey_data)
+    
     # Broadcast journey creation event
     await journey_event_broadcaster.journey_created(journey_data)
     
@@ -408,6 +463,7 @@ async def update_journey(journey_id: str, updates: JourneyUpdate) -> Dict[str, A
         journey[field] = value
     
     journey["updatedAt"] = datetime.utcnow().isoformat() + "Z"
+    await invalidate_journey_caches(journey)
     
     return {
         "success": True,
@@ -443,6 +499,8 @@ async def delete_journey(journey_id: str) -> Dict[str, Any]:
             "message": message
         }
     
+    await invalidate_journey_caches(current_user)
+    
     return {
         "success": True,
         "message": "Journey deleted successfully"
@@ -500,6 +558,8 @@ async def update_journey_status(journey_id: str, status_update: JourneyStatusUpd
             "message": message
         }
     
+    await invalidate_journey_caches(journey)
+    
     # Broadcast status update
     await journey_event_broadcaster.journey_status_updated(
         journey_id, old_status, status_update.status, current_user["id"]
@@ -606,6 +666,8 @@ async def assign_crew(journey_id: str, crew_assignment: CrewAssignment) -> Dict[
             "message": message
         }
     
+    await invalidate_journey_caches(journey)
+    
     # Broadcast crew assignment
     await journey_event_broadcaster.crew_assigned(
         journey_id, crew_assignment.crewAssignments, current_user["id"]
@@ -701,207 +763,390 @@ async def get_journey_crew(journey_id: str) -> Dict[str, Any]:
     }
 
 @router.get("/{journey_id}/messages")
-async def get_journey_messages(journey_id: str) -> Dict[str, Any]:
-    """Get chat messages for a journey"""
-    
-    # Return demo messages for now
-    demo_messages = [
-        {
-            "id": "msg_001",
-            "journeyId": journey_id,
-            "userId": "usr_dispatcher_001",
-            "userName": "Alex Thompson",
-            "userRole": "DISPATCHER",
-            "message": "Journey assigned. Please confirm crew availability.",
-            "timestamp": "2025-01-09T08:00:00Z",
-            "type": "TEXT",
-            "isRead": True
-        },
-        {
-            "id": "msg_002",
-            "journeyId": journey_id,
-            "userId": "usr_driver_001", 
-            "userName": "Mike Chen",
-            "userRole": "DRIVER",
-            "message": "Confirmed. Vehicle inspection complete, ready to depart.",
-            "timestamp": "2025-01-09T08:15:00Z",
-            "type": "TEXT",
-            "isRead": True
-        },
-        {
-            "id": "msg_003",
-            "journeyId": journey_id,
-            "userId": "usr_mover_001",
-            "userName": "Sarah Johnson", 
-            "userRole": "MOVER",
-            "message": "Equipment loaded and secured. ETA to pickup location: 30 minutes.",
-            "timestamp": "2025-01-09T08:30:00Z",
-            "type": "TEXT",
-            "isRead": False
+async def get_journey_messages(
+    journey_id: str,
+    current_user: Dict[str, Any] = Depends(verify_token),
+    since: Optional[int] = Query(None, ge=0, description="Return messages after this seq"),
+    before: Optional[int] = Query(None, ge=1, description="Return messages before this seq"),
+    limit: int = Query(50, ge=1, le=200)
+) -> Dict[str, Any]:
+    """Get chat messages for a journey.
+
+    Without a cursor this returns the newest page and the participants.
+    Clients then poll with since=<cursor> for new messages only.
+    """
+    try:
+        db = await get_database_connection()
+        try:
+            await _require_journey(db, journey_id, current_user)
+            page = await list_messages(db, journey_id, current_user["id"], since, before, limit)
+            if since is None and before is None:
+                page["participants"] = await list_participants(db, journey_id)
+        finally:
+            await db.close()
+        return {
+            "success": True,
+            "data": page,
+            "message": f"Retrieved {len(page['messages'])} messages for journey {journey_id}"
         }
-    ]
-    
-    return {
-        "success": True,
-        "data": {
-            "messages": demo_messages,
-            "totalMessages": len(demo_messages),
-            "unreadCount": sum(1 for msg in demo_messages if not msg["isRead"]),
-            "participants": [
-                {"userId": "usr_dispatcher_001", "name": "Alex Thompson", "role": "DISPATCHER"},
-                {"userId": "usr_driver_001", "name": "Mike Chen", "role": "DRIVER"},
-                {"userId": "usr_mover_001", "name": "Sarah Johnson", "role": "MOVER"}
-            ]
-        },
-        "message": f"Retrieved {len(demo_messages)} messages for journey {journey_id}"
-    }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting messages: {str(e)}")
+
+@router.post("/{journey_id}/messages")
+async def post_journey_messages(
+    journey_id: str,
+    batch: ChatMessageBatch,
+    current_user: Dict[str, Any] = Depends(verify_token)
+) -> Dict[str, Any]:
+    """Post one or more chat messages in order"""
+    try:
+        db = await get_database_connection()
+        try:
+            await _require_journey(db, journey_id, current_user)
+            result = await post_messages(
+                db.connection, journey_id, current_user, [m.model_dump() for m in batch.messages]
+            )
+        finally:
+            await db.close()
+        if result["created"]:
+            await journey_events.messages_posted(journey_id, result["messages"], current_user["id"])
+        return {
+            "success": True,
+            "data": result,
+            "message": f"Stored {result['created']} messages"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error posting messages: {str(e)}")
+
+@router.post("/{journey_id}/messages/read")
+async def mark_journey_messages_read(
+    journey_id: str,
+    receipt: ChatReadReceipt,
+    current_user: Dict[str, Any] = Depends(verify_token)
+) -> Dict[str, Any]:
+    """Mark messages up to seq as read for the current user"""
+    try:
+        db = await get_database_connection()
+        try:
+            await _require_journey(db, journey_id, current_user)
+            state = await mark_read(db, journey_id, current_user["id"], receipt.seq)
+        finally:
+            await db.close()
+        return {"success": True, "data": state}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error marking messages read: {str(e)}")
 
 # ===== MEDIA UPLOAD ENDPOINTS =====
 
+async def _read_file(file: UploadFile, length: int):
+    """Yield the next ``length`` bytes of an uploaded file in blocks"""
+    while length > 0:
+        block = await file.read(min(length, WRITE_BUFFER_BYTES))
+        if not block:
+            return
+        length -= len(block)
+        yield block
+
 @router.post("/{journey_id}/media")
 async def upload_media(
     journey_id: str,
     files: List[UploadFile] = File(...),
     media_type: str = Form(...),
     tags: Optional[str] = Form(None),
-    notes: Optional[str] = Form(None)
+    notes: Optional[str] = Form(None),
+    current_user: Dict[str, Any] = Depends(verify_token)
 ) -> Dict[str, Any]:
-    """Upload media files for a journey"""
-    current_user = get_current_user()
-    
-    # Validate permissions
-    if not business_logic_validator.validate_permissions(
-        current_user["role"], "upload", "media"
-    ):
+    """Upload media files for a journey in one request.
+
+    Fine for a few small files. Large photos and videos from the field
+    should use the resumable /uploads endpoints instead. Returns the
+    upload states; each file becomes media once the media worker has
+    assembled it (poll /uploads/{id} for status COMPLETE and mediaId).
+    """
+    metadata = {"tags": tags.split(",") if tags else [], "notes": notes}
+    uploads = []
+    try:
+        db = await get_database_connection()
+        try:
+            await _require_journey(db, journey_id, current_user)
+            for file in files:
+                upload = await create_upload(
+                    db, media_storage, journey_id, current_user["id"], file.filename,
+                    file.content_type, media_type.upper(), file.size or 0, metadata=metadata
+                )
+                state = None
+                for offset in range(0, upload["size"], upload["chunkSize"]):
+                    length = min(upload["chunkSize"], upload["size"] - offset)
+                    index, written = await write_chunk(media_storage, upload, offset, _read_file(file, length), None)
+                    state = await record_chunk(db, upload, index, written)
+                uploads.append(state)
+        finally:
+            await db.close()
+        
         return {
-            "success": False,
-            "error": "Permission denied",
-            "message": "User does not have permission to upload media"
-        }
-    
-    # Process files
-    file_data_list = []
-    for file in files:
-        file_data = {
-            "filename": file.filename,
-            "size": 0,  # Would get actual size in production
-            "mimeType": file.content_type or "application/octet-stream"
+            "success": True,
+            "data": uploads,
+            "message": f"Received {len(uploads)} files"
         }
         
-        # Validate file
-        is_valid, error_msg = media_handler._validate_file(file_data, MediaType(media_type))
-        if not is_valid:
-            return {
-                "success": False,
-                "error": "File validation failed",
-                "message": error_msg
-            }
-        
-        file_data_list.append(file_data)
-    
-    # Upload media
-    success, uploaded_media, message = media_handler.upload_media(
-        journey_id,
-        file_data_list,
-        MediaType(media_type),
-        current_user["id"],
-        tags=tags.split(",") if tags else None,
-        notes=notes
-    )
-    
-    if not success:
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading media: {str(e)}")
+
+# ===== RESUMABLE UPLOAD ENDPOINTS =====
+
+@router.post("/{journey_id}/uploads")
+async def create_media_upload(
+    journey_id: str,
+    request: MediaUploadRequest,
+    current_user: Dict[str, Any] = Depends(verify_token)
+) -> Dict[str, Any]:
+    """Start a resumable upload.
+
+    Send the file as PATCH requests of chunkSize bytes (the last may be
+    shorter) with Upload-Offset set to the chunk's byte offset. Chunks may
+    go in parallel. Add "Upload-Checksum: sha256 <base64>" to have each one
+    verified.
+
+    If checksum is sent and this client already stores that file, nothing
+    needs uploading: the response has status COMPLETE, deduplicated true and the
+    media item.
+    """
+    media_type = request.mediaType.upper()
+    metadata = {"tags": request.tags or [], "notes": request.notes}
+    try:
+        db = await get_database_connection()
+        try:
+            await _require_journey(db, journey_id, current_user)
+            attached = None
+            if request.checksum and media_type in MEDIA_TYPES:
+                attached = await attach_media(
+                    db, media_storage, request.checksum, journey_id, current_user["id"], new_media_id(),
+                    media_type, request.filename, {**metadata, "mimeType": request.mimeType},
+                    skipped_transfer=True, size=request.size, client_id=current_user["clientId"]
+                )
+            if attached:
+                media, duplicate = attached
+                if not duplicate:
+                    await journey_event_broadcaster.media_uploaded(journey_id, [media], current_user["id"])
+                return {
+                    "success": True,
+                    "data": {"status": "COMPLETE", "size": request.size, "mediaId": media["id"], "deduplicated": True},
+                    "media": media
+                }
+            upload = await create_upload(
+                db, media_storage, journey_id, current_user["id"], request.filename, request.mimeType,
+                media_type, request.size, request.checksum, metadata
+            )
+        finally:
+            await db.close()
         return {
-            "success": False,
-            "error": "Upload failed",
-            "message": message
-        }
-    
-    # Broadcast media upload
-    await journey_event_broadcaster.media_uploaded(
-        journey_id, uploaded_media, current_user["id"]
-    )
-    
-    # Send notification
-    notification_service.create_notification(
-        NotificationType.MEDIA_UPLOAD,
-        current_user["id"],
-        {
-            "journey_id": journey_id,
-            "media_count": len(uploaded_media)
+            "success": True,
+            "data": {**upload_state(upload, []), "uploadUrl": f"/journey/{journey_id}/uploads/{upload['id']}"}
         }
-    )
-    
-    return {
-        "success": True,
-        "data": uploaded_media,
-        "message": message
-    }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating upload: {str(e)}")
+
+async def _load_upload(journey_id: str, upload_id: str, current_user: Dict[str, Any]) -> Dict[str, Any]:
+    db = await get_database_connection()
+    try:
+        await _require_journey(db, journey_id, current_user)
+        upload = await get_upload(db, journey_id, upload_id)
+    finally:
+        await db.close()
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+@router.head("/{journey_id}/uploads/{upload_id}")
+async def head_media_upload(
+    journey_id: str,
+    upload_id: str,
+    current_user: Dict[str, Any] = Depends(verify_token)
+) -> Response:
+    """Where to resume: Upload-Offset is the contiguous prefix received"""
+    upload = await _load_upload(journey_id, upload_id, current_user)
+    state = upload_state(upload, upload["received"])
+    return Response(headers={
+        "Upload-Offset": str(state["offset"]),
+        "Upload-Length": str(state["size"]),
+        "Cache-Control": "no-store"
+    })
+
+@router.get("/{journey_id}/uploads/{upload_id}")
+async def get_media_upload(
+    journey_id: str,
+    upload_id: str,
+    current_user: Dict[str, Any] = Depends(verify_token)
+) -> Dict[str, Any]:
+    """Upload progress, including which chunks are still missing"""
+    upload = await _load_upload(journey_id, upload_id, current_user)
+    return {"success": True, "data": upload_state(upload, upload["received"])}
+
+@router.patch("/{journey_id}/uploads/{upload_id}")
+async def patch_media_upload(
+    journey_id: str,
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
+    current_user: Dict[str, Any] = Depends(verify_token)
+) -> Dict[str, Any]:
+    """Send one chunk of an upload.
+
+    After the last chunk the status is RECEIVED; poll GET until it is
+    COMPLETE (mediaId set) or FAILED.
+    """
+    upload = await _load_upload(journey_id, upload_id, current_user)
+    try:
+        checksum = parse_checksum(upload_checksum)
+        # No database connection is held while the body streams in
+        index, written = await write_chunk(media_storage, upload, upload_offset, request.stream(), checksum)
+        db = await get_database_connection()
+        try:
+            state = await record_chunk(db, upload, index, written)
+        finally:
+            await db.close()
+        response.headers["Upload-Offset"] = str(state["offset"])
+        return {"success": True, "data": state}
+        
+    except ChecksumMismatch as e:
+        # tus "Checksum Mismatch"
+        raise HTTPException(status_code=460, detail=str(e))
+    except OffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error storing chunk: {str(e)}")
+
+@router.delete("/{journey_id}/uploads/{upload_id}")
+async def delete_media_upload(
+    journey_id: str,
+    upload_id: str,
+    current_user: Dict[str, Any] = Depends(verify_token)
+) -> Dict[str, Any]:
+    """Abandon an unfinished upload"""
+    upload = await _load_upload(journey_id, upload_id, current_user)
+    if upload["status"] not in ("UPLOADING", "FAILED"):
+        raise HTTPException(status_code=409, detail=f"Upload is {upload['status'].lower()}")
+    try:
+        db = await get_database_connection()
+        try:
+            await abort_upload(db, media_storage, upload)
+        finally:
+            await db.close()
+        return {"success": True, "message": "Upload deleted"}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting upload: {str(e)}")
+
+@router.delete("/{journey_id}/media/{media_id}")
+async def delete_journey_media(
+    journey_id: str,
+    media_id: str,
+    current_user: Dict[str, Any] = Depends(verify_token)
+) -> Dict[str, Any]:
+    """Remove a media item; its stored file goes once nothing else uses it"""
+    try:
+        db = await get_database_connection()
+        try:
+            await _require_journey(db, journey_id, current_user)
+            deleted = await delete_media(db, journey_id, media_id)
+        finally:
+            await db.close()
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Media not found")
+        return {"success": True, "message": "Media deleted"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting media: {str(e)}")
 
 @router.get("/{journey_id}/media")
 async def get_journey_media(
     journey_id: str,
+    current_user: Dict[str, Any] = Depends(verify_token),
     media_type: Optional[str] = None,
     tags: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Get journey media files (simplified for demo)"""
-    
-    # Return demo media data for now
-    demo_media = [
-        {
-            "id": "media_001",
-            "journeyId": journey_id,
-            "type": "PHOTO",
-            "url": "/demo/photo1.jpg",
-            "filename": "vehicle_inspection.jpg",
-            "size": 245760,
-            "uploadedAt": "2025-01-09T08:15:00Z",
-            "uploadedBy": "usr_driver_001",
-            "userName": "Mike Chen",
-            "description": "Pre-journey vehicle inspection",
-            "tags": ["inspection", "vehicle", "safety"]
-        },
-        {
-            "id": "media_002", 
-            "journeyId": journey_id,
-            "type": "PHOTO",
-            "url": "/demo/photo2.jpg",
-            "filename": "customer_signature.jpg",
-            "size": 189340,
-            "uploadedAt": "2025-01-09T09:30:00Z",
-            "uploadedBy": "usr_mover_001",
-            "userName": "Sarah Johnson",
-            "description": "Customer approval signature",
-            "tags": ["signature", "customer", "approval"]
-        },
-        {
-            "id": "media_003",
-            "journeyId": journey_id,
-            "type": "VIDEO",
-            "url": "/demo/video1.mp4",
-            "filename": "loading_process.mp4",
-            "size": 1024000,
-            "uploadedAt": "2025-01-09T10:00:00Z",
-            "uploadedBy": "usr_mover_001",
-            "userName": "Sarah Johnson",
-            "description": "Loading process documentation",
-            "tags": ["loading", "process", "documentation"]
+    """Get journey media with thumbnail URLs.
+
+    thumbnailUrl and mediumUrl are null until the media worker has
+    processed an item. Galleries should show thumbnails and only fetch url
+    (the untouched original, EXIF included) on demand. exif carries the
+    capture time and camera but not the GPS position.
+    """
+    tag_list = [tag.strip().lower() for tag in tags.split(",") if tag.strip()] if tags else None
+    try:
+        db = await get_database_connection()
+        try:
+            await _require_journey(db, journey_id, current_user)
+            media = await db.fetch_all(
+                """
+                SELECT m.id, m."journeyId", m.type::text AS type, m.url, m.filename, m.size,
+                       m."createdAt" AS "uploadedAt", m."uploadedBy", u.name AS "userName",
+                       m.metadata->>'notes' AS description,
+                       COALESCE(m.metadata->'tags', '[]'::jsonb) AS tags,
+                       -- The EXIF position stays server-side (journey validation only)
+                       (m.metadata->'exif') - 'lat' - 'lng' AS exif, j.status AS "processingStatus"
+                FROM "Media" m
+                LEFT JOIN "User" u ON u.id = m."uploadedBy"
+                LEFT JOIN "MediaJob" j ON j."mediaId" = m.id
+                WHERE m."journeyId" = $1
+                  AND ($2::text IS NULL OR m.type::text = upper($2))
+                  AND ($3::text[] IS NULL OR EXISTS (
+                      SELECT 1 FROM jsonb_array_elements_text(COALESCE(m.metadata->'tags', '[]'::jsonb)) tag
+                      WHERE lower(tag) = ANY($3)
+                  ))
+                ORDER BY m."createdAt"
+                """,
+                journey_id, media_type, tag_list
+            )
+            variants = await list_variants(db, [m["id"] for m in media])
+        finally:
+            await db.close()
+        
+        for item in media:
+            item["tags"] = json.loads(item["tags"])
+            item["exif"] = json.loads(item["exif"]) if item["exif"] else None
+            item["variants"] = {}
+            for name, variant in variants.get(item["id"], {}).items():
+                key = variant.pop("storageKey")
+                item["variants"][name] = {**variant, "url": media_storage.url(key)}
+            item["thumbnailUrl"] = item["variants"].get("thumb", {}).get("url")
+            item["mediumUrl"] = item["variants"].get("medium", {}).get("url")
+        return {
+            "success": True,
+            "data": media,
+            "message": f"Retrieved {len(media)} media files for journey {journey_id}"
         }
-    ]
-    
-    # Filter by media type if specified
-    if media_type:
-        demo_media = [m for m in demo_media if m["type"].lower() == media_type.lower()]
-    
-    # Filter by tags if specified
-    if tags:
-        tag_list = [tag.strip().lower() for tag in tags.split(",")]
-        demo_media = [m for m in demo_media if any(tag in [t.lower() for t in m["tags"]] for tag in tag_list)]
-    
-    return {
-        "success": True,
-        "data": demo_media,
-        "message": f"Retrieved {len(demo_media)} media files for journey {journey_id}"
-    }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting media: {str(e)}")
 
 # ===== GPS TRACKING ENDPOINTS =====
 
@@ -969,32 +1214,100 @@ async def update_gps(journey_id: str, gps_update: GPSUpdate) -> Dict[str, Any]:
         "message": "GPS location updated successfully"
     }
 
+@router.post("/{journey_id}/gps/batch")
+async def ingest_gps_batch(
+    journey_id: str,
+    batch: GPSBatch,
+    current_user: Dict[str, Any] = Depends(verify_token)
+) -> Dict[str, Any]:
+    """Store a batch of GPS points for a journey.
+
+    Returns once the points are committed. Points already stored for the
+    same recordedAt are ignored, so clients can retry a batch freely.
+    """
+    try:
+        db = await get_database_connection()
+        try:
+            journey = await TenantRepository(db, current_user["clientId"]).find_first(
+                "TruckJourney", {"id": journey_id},
+                columns=("id", "clientId", "locationId", "truckNumber", "status")
+            )
+        finally:
+            await db.close()
+        if not journey:
+            raise HTTPException(status_code=404, detail="Journey not found")
+        
+        rows = [
+            (journey_id, point.recordedAt, point.latitude, point.longitude,
+             point.speed, point.accuracy, point.heading)
+            for point in batch.points
+        ]
+        await gps_buffer.submit(rows)
+        record_ingested(journey, rows)
+        latest = max(rows, key=lambda row: row[1])
+        await journey_events.position_updated(journey_id, journey["locationId"], {
+            "recordedAt": latest[1], "lat": latest[2], "lng": latest[3],
+            "speed": latest[4], "heading": latest[6]
+        })
+        
+        return {
+            "success": True,
+            "data": {"journeyId": journey_id, "accepted": len(batch.points)},
+            "message": f"Stored {len(batch.points)} GPS points"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error storing GPS points: {str(e)}")
+
 @router.get("/{journey_id}/gps")
-async def get_gps_tracking(journey_id: str) -> Dict[str, Any]:
-    """Get GPS tracking data for a journey"""
-    current_user = get_current_user()
-    
-    # Get tracking summary
-    summary = gps_tracker.get_track_summary(journey_id)
-    
-    if not summary:
+async def get_gps_tracking(
+    journey_id: str,
+    current_user: Dict[str, Any] = Depends(verify_token),
+    tolerance: float = Query(5.0, ge=0, le=500, description="Simplification tolerance in metres; 0 returns every point"),
+    format: str = Query("columns", regex="^(columns|polyline)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Get the GPS track for a journey.
+
+    ``columns`` returns parallel arrays (recordedAt, lat, lng, speed,
+    accuracy, heading); ``polyline`` returns a Google encoded polyline.
+    """
+    try:
+        db = await get_database_connection()
+        try:
+            journey = await TenantRepository(db, current_user["clientId"]).count("TruckJourney", {"id": journey_id})
+            if not journey:
+                raise HTTPException(status_code=404, detail="Journey not found")
+            track = await read_track(db, journey_id, start, end)
+        finally:
+            await db.close()
+        
+        kept = douglas_peucker(track["lat"], track["lng"], tolerance)
+        simplified = slice_track(track, kept)
+        data = {
+            "summary": {**track_summary(track), "returnedPoints": len(kept), "toleranceMeters": tolerance}
+        }
+        if format == "polyline":
+            data["polyline"] = encode_polyline(simplified["lat"], simplified["lng"])
+        else:
+            data["track"] = {
+                "recordedAt": iso_timestamps(simplified["t"]),
+                **{name: simplified[name] for name in ("lat", "lng", "speed", "accuracy", "heading")}
+            }
+        
         return {
-            "success": False,
-            "error": "GPS tracking not found",
-            "message": "No GPS tracking data available for this journey"
+            "success": True,
+            "data": data,
+            "message": "GPS tracking data retrieved successfully"
         }
-    
-    # Get tracking points
-    points = gps_tracker.get_track_points(journey_id, limit=100)
-    
-    return {
-        "success": True,
-        "data": {
-            "summary": summary,
-            "points": points
-        },
-        "message": "GPS tracking data retrieved successfully"
-    }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching GPS track: {str(e)}")
 
 # ===== JOURNEY ENTRIES ENDPOINTS =====
 
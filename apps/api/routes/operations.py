@@ -2,9 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
 from pydantic import BaseModel
-from apps.api.dependencies import get_current_user
-from apps.api.models.user import User
+from apps.api.routes.auth import verify_token
 from prisma import Prisma
+from apps.api.response_cache import cached_endpoint, on_resource_write
+from apps.api.stats_engine import StatsEngine, JOB_METRICS, day_bounds, get_operational_counts
+from apps.api.database import get_database_connection
+from apps.api.rollups import JOURNEYS, FUEL, MATERIALS, read_rollup, read_rollup_daily, read_raw, window
+from apps.api.columnar import bucket_columns, default_granularity
+from apps.api.pagination import decode_cursor, page_of
 
 router = APIRouter()
 
@@ -54,7 +59,7 @@ class PerformanceMetrics(BaseModel):
 @router.post("/fuel-log")
 async def create_fuel_log(
     fuel_log: FuelLogCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Log fuel consumption for a journey"""
     try:
@@ -63,7 +68,7 @@ async def create_fuel_log(
         
         # Verify journey exists
         journey = await db.truckjourney.find_unique(
-            where={"id": fuel_log.journeyId, "clientId": current_user.clientId}
+            where={"id": fuel_log.journeyId, "clientId": current_user["clientId"]}
         )
         
         if not journey:
@@ -79,77 +84,131 @@ async def create_fuel_log(
                 "fuelType": fuel_log.fuelType,
                 "location": fuel_log.location,
                 "notes": fuel_log.notes,
-                "loggedBy": current_user.id,
+                "loggedBy": current_user["id"],
                 "loggedAt": datetime.utcnow()
             }
         })
         
         await db.disconnect()
+        await on_resource_write(current_user["clientId"], current_user["locationId"])
         return {"success": True, "fuelLog": new_fuel_log}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating fuel log: {str(e)}")
 
+# Raw log listings are keyset-paginated newest first
+FUEL_LOG_PAGE_SQL = """
+    SELECT fl.*, tj."truckNumber", tj.date AS "journeyDate", tj.status AS "journeyStatus"
+    FROM "FuelLog" fl
+    JOIN "TruckJourney" tj ON tj.id = fl."journeyId"
+    WHERE tj."clientId" = $1 AND tj.date >= $2::date AND tj.date < ($3::date + 1)
+{filters}
+    ORDER BY fl."loggedAt" DESC, fl.id DESC
+    LIMIT {limit}
+"""
+
+MATERIAL_USAGE_PAGE_SQL = """
+    SELECT mu.*, tj."truckNumber", tj.date AS "journeyDate", m.name AS "materialName", m.category AS "materialCategory"
+    FROM "MaterialUsage" mu
+    JOIN "TruckJourney" tj ON tj.id = mu."journeyId"
+    LEFT JOIN "CompanyMaterial" m ON m.id = mu."materialId"
+    WHERE tj."clientId" = $1 AND tj.date >= $2::date AND tj.date < ($3::date + 1)
+{filters}
+    ORDER BY mu."loggedAt" DESC, mu.id DESC
+    LIMIT {limit}
+"""
+
+async def _fetch_page(db, sql: str, alias: str, client_id: str, start: date, end: date,
+                      journey_id: Optional[str], cursor: Optional[str], limit: int) -> Dict[str, Any]:
+    args: List[Any] = [client_id, start, end]
+    filters = []
+    if journey_id:
+        args.append(journey_id)
+        filters.append(f'      AND {alias}."journeyId" = ${len(args)}')
+    after = decode_cursor(cursor)
+    if after:
+        args.extend(after)
+        filters.append(f'      AND ({alias}."loggedAt", {alias}.id) < (${len(args) - 1}, ${len(args)})')
+    args.append(limit + 1)
+    sql = sql.format(filters="\n".join(filters), limit=f"${len(args)}")
+    rows = await db.fetch_all(sql, *args)
+    return page_of(rows, limit, "loggedAt")
+
+async def _fuel_log_page(db, client_id: str, start: date, end: date,
+                         journey_id: Optional[str], cursor: Optional[str], limit: int) -> Dict[str, Any]:
+    page = await _fetch_page(db, FUEL_LOG_PAGE_SQL, "fl", client_id, start, end, journey_id, cursor, limit)
+    for row in page["items"]:
+        row["journey"] = {
+            "truckNumber": row.pop("truckNumber"),
+            "date": row.pop("journeyDate"),
+            "status": row.pop("journeyStatus")
+        }
+    return page
+
+async def _material_usage_page(db, client_id: str, start: date, end: date,
+                               journey_id: Optional[str], cursor: Optional[str], limit: int) -> Dict[str, Any]:
+    page = await _fetch_page(db, MATERIAL_USAGE_PAGE_SQL, "mu", client_id, start, end, journey_id, cursor, limit)
+    for row in page["items"]:
+        row["journey"] = {"truckNumber": row.pop("truckNumber"), "date": row.pop("journeyDate")}
+        row["material"] = {"name": row.pop("materialName"), "category": row.pop("materialCategory")}
+    return page
+
+async def _series(db, spec, client_id: str, start: date, end: date, granularity: Optional[str],
+                  columns: Dict[str, str]) -> Optional[Dict[str, List]]:
+    """Time-bucketed totals; ``columns`` maps response names to rollup measures"""
+    granularity = granularity or default_granularity(start, end)
+    if not granularity:
+        return None
+    daily = await read_rollup_daily(db, spec, client_id, end, start)
+    return bucket_columns(daily["day"], {name: daily[measure] for name, measure in columns.items()}, granularity)
+
 @router.get("/fuel-analytics")
 async def get_fuel_analytics(
-    current_user: User = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(verify_token),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    journey_id: Optional[str] = None
+    journey_id: Optional[str] = None,
+    series: Optional[str] = Query(None, regex="^(daily|monthly)$"),
+    include_logs: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
 ):
-    """Get fuel consumption analytics"""
+    """Get fuel consumption analytics.
+
+    Totals are aggregated in SQL. Raw logs are only returned with
+    ``include_logs`` (one page; continue from GET /fuel-logs with
+    ``nextCursor``). Windows longer than three months also get a monthly
+    ``series`` unless another granularity is requested.
+    """
+    start_date, end_date = window(start_date, end_date)
     try:
-        db = Prisma()
-        await db.connect()
-        
-        # Set default date range if not provided
-        if not start_date:
-            start_date = date.today() - timedelta(days=30)
-        if not end_date:
-            end_date = date.today()
-        
-        # Build where clause
-        where_clause = {
-            "journey": {
-                "clientId": current_user.clientId,
-                "date": {
-                    "gte": datetime.combine(start_date, datetime.min.time()),
-                    "lte": datetime.combine(end_date, datetime.max.time())
-                }
-            }
+        db = await get_database_connection()
+        try:
+            if journey_id:
+                # The rollups don't keep journeys apart
+                by_truck = await read_raw(db, FUEL, current_user["clientId"], end_date, start_date,
+                                          {'fl."journeyId"': journey_id})
+                fuel_series = None
+            else:
+                by_truck = await read_rollup(db, FUEL, current_user["clientId"], end_date, start_date)
+                fuel_series = await _series(db, FUEL, current_user["clientId"], start_date, end_date, series,
+                                            {"fuel": "litres", "cost": "cost", "logs": "logCount"})
+            logs = None
+            if include_logs:
+                logs = await _fuel_log_page(db, current_user["clientId"], start_date, end_date,
+                                            journey_id, cursor, limit)
+        finally:
+            await db.close()
+        
+        truck_consumption = {
+            truck: {"fuel": row["litres"], "cost": row["cost"]}
+            for truck, row in by_truck.items()
         }
-        
-        if journey_id:
-            where_clause["journeyId"] = journey_id
-        
-        # Get fuel logs
-        fuel_logs = await db.fuellog.find_many(
-            where=where_clause,
-            include={
-                "journey": {
-                    "select": {"truckNumber": True, "date": True, "status": True}
-                }
-            },
-            order={"loggedAt": "desc"}
-        )
-        
-        # Calculate totals
-        total_fuel = sum(log.fuelAmount for log in fuel_logs)
-        total_cost = sum(log.fuelCost for log in fuel_logs)
+        total_fuel = sum(truck["fuel"] for truck in truck_consumption.values())
+        total_cost = sum(truck["cost"] for truck in truck_consumption.values())
         avg_cost_per_liter = total_cost / total_fuel if total_fuel > 0 else 0
         
-        # Get fuel consumption by truck
-        truck_consumption = {}
-        for log in fuel_logs:
-            truck = log.journey.truckNumber or "Unknown"
-            if truck not in truck_consumption:
-                truck_consumption[truck] = {"fuel": 0, "cost": 0}
-            truck_consumption[truck]["fuel"] += log.fuelAmount
-            truck_consumption[truck]["cost"] += log.fuelCost
-        
-        await db.disconnect()
-        
-        return {
+        response = {
             "period": {
                 "startDate": start_date.isoformat(),
                 "endDate": end_date.isoformat()
@@ -158,21 +217,53 @@ async def get_fuel_analytics(
                 "totalFuel": round(total_fuel, 2),
                 "totalCost": round(total_cost, 2),
                 "avgCostPerLiter": round(avg_cost_per_liter, 2),
-                "totalLogs": len(fuel_logs)
+                "totalLogs": int(sum(row["logCount"] for row in by_truck.values()))
             },
-            "truckConsumption": truck_consumption,
-            "fuelLogs": fuel_logs
+            "truckConsumption": truck_consumption
         }
-        
+        if fuel_series is not None:
+            response["series"] = fuel_series
+        if logs is not None:
+            response["fuelLogs"] = logs["items"]
+            response["nextCursor"] = logs["nextCursor"]
+        return response
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching fuel analytics: {str(e)}")
 
+@router.get("/fuel-logs")
+async def get_fuel_logs(
+    current_user: Dict[str, Any] = Depends(verify_token),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    journey_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Raw fuel logs, newest first, one keyset page at a time"""
+    start_date, end_date = window(start_date, end_date)
+    try:
+        db = await get_database_connection()
+        try:
+            page = await _fuel_log_page(db, current_user["clientId"], start_date, end_date,
+                                        journey_id, cursor, limit)
+        finally:
+            await db.close()
+        return {"fuelLogs": page["items"], "nextCursor": page["nextCursor"]}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching fuel logs: {str(e)}")
+
 # ===== MATERIAL TRACKING =====
 
 @router.post("/material-usage")
 async def create_material_usage(
     material_usage: MaterialUsageCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Log material usage for a journey"""
     try:
@@ -181,7 +272,7 @@ async def create_material_usage(
         
         # Verify journey exists
         journey = await db.truckjourney.find_unique(
-            where={"id": material_usage.journeyId, "clientId": current_user.clientId}
+            where={"id": material_usage.journeyId, "clientId": current_user["clientId"]}
         )
         
         if not journey:
@@ -196,12 +287,13 @@ async def create_material_usage(
                 "unitCost": material_usage.unitCost,
                 "totalCost": material_usage.totalCost,
                 "notes": material_usage.notes,
-                "loggedBy": current_user.id,
+                "loggedBy": current_user["id"],
                 "loggedAt": datetime.utcnow()
             }
         })
         
         await db.disconnect()
+        await on_resource_write(current_user["clientId"], current_user["locationId"])
         return {"success": True, "materialUsage": new_usage}
         
     except Exception as e:
@@ -209,79 +301,93 @@ async def create_material_usage(
 
 @router.get("/material-analytics")
 async def get_material_analytics(
-    current_user: User = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(verify_token),
     start_date: Optional[date] = None,
-    end_date: Optional[date] = None
+    end_date: Optional[date] = None,
+    series: Optional[str] = Query(None, regex="^(daily|monthly)$"),
+    include_logs: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
 ):
-    """Get material usage analytics"""
+    """Get material usage analytics.
+
+    Same shape rules as fuel analytics: SQL totals, opt-in raw page
+    (continue from GET /material-usage), ``series`` for long windows.
+    """
+    start_date, end_date = window(start_date, end_date)
     try:
-        db = Prisma()
-        await db.connect()
-        
-        # Set default date range if not provided
-        if not start_date:
-            start_date = date.today() - timedelta(days=30)
-        if not end_date:
-            end_date = date.today()
-        
-        # Get material usage
-        material_usage = await db.materialusage.find_many(
-            where={
-                "journey": {
-                    "clientId": current_user.clientId,
-                    "date": {
-                        "gte": datetime.combine(start_date, datetime.min.time()),
-                        "lte": datetime.combine(end_date, datetime.max.time())
-                    }
-                }
-            },
-            include={
-                "journey": {
-                    "select": {"truckNumber": True, "date": True}
-                },
-                "material": {
-                    "select": {"name": True, "category": True}
-                }
-            },
-            order={"loggedAt": "desc"}
-        )
-        
-        # Calculate totals
-        total_cost = sum(usage.totalCost for usage in material_usage)
-        
-        # Group by material category
-        category_usage = {}
-        for usage in material_usage:
-            category = usage.material.category or "Unknown"
-            if category not in category_usage:
-                category_usage[category] = {"cost": 0, "quantity": 0}
-            category_usage[category]["cost"] += usage.totalCost
-            category_usage[category]["quantity"] += usage.quantity
-        
-        await db.disconnect()
+        db = await get_database_connection()
+        try:
+            by_category = await read_rollup(db, MATERIALS, current_user["clientId"], end_date, start_date)
+            material_series = await _series(db, MATERIALS, current_user["clientId"], start_date, end_date, series,
+                                            {"quantity": "quantity", "cost": "cost", "usage": "usageCount"})
+            usage = None
+            if include_logs:
+                usage = await _material_usage_page(db, current_user["clientId"], start_date, end_date,
+                                                   None, cursor, limit)
+        finally:
+            await db.close()
+        
+        category_usage = {
+            category: {"cost": row["cost"], "quantity": row["quantity"]}
+            for category, row in by_category.items()
+        }
+        total_cost = sum(row["cost"] for row in by_category.values())
         
-        return {
+        response = {
             "period": {
                 "startDate": start_date.isoformat(),
                 "endDate": end_date.isoformat()
             },
             "summary": {
                 "totalCost": round(total_cost, 2),
-                "totalUsage": len(material_usage)
+                "totalUsage": int(sum(row["usageCount"] for row in by_category.values()))
             },
-            "categoryUsage": category_usage,
-            "materialUsage": material_usage
+            "categoryUsage": category_usage
         }
-        
+        if material_series is not None:
+            response["series"] = material_series
+        if usage is not None:
+            response["materialUsage"] = usage["items"]
+            response["nextCursor"] = usage["nextCursor"]
+        return response
+        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching material analytics: {str(e)}")
 
+@router.get("/material-usage")
+async def get_material_usage(
+    current_user: Dict[str, Any] = Depends(verify_token),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    journey_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Raw material usage records, newest first, one keyset page at a time"""
+    start_date, end_date = window(start_date, end_date)
+    try:
+        db = await get_database_connection()
+        try:
+            page = await _material_usage_page(db, current_user["clientId"], start_date, end_date,
+                                              journey_id, cursor, limit)
+        finally:
+            await db.close()
+        return {"materialUsage": page["items"], "nextCursor": page["nextCursor"]}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching material usage: {str(e)}")
+
 # ===== DAMAGE REPORTING =====
 
 @router.post("/damage-report")
 async def create_damage_report(
     damage_report: DamageReportCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Create a damage report for a journey"""
     try:
@@ -290,7 +396,7 @@ async def create_damage_report(
         
         # Verify journey exists
         journey = await db.truckjourney.find_unique(
-            where={"id": damage_report.journeyId, "clientId": current_user.clientId}
+            where={"id": damage_report.journeyId, "clientId": current_user["clientId"]}
         )
         
         if not journey:
@@ -307,7 +413,7 @@ async def create_damage_report(
                 "photos": damage_report.photos,
                 "reportedBy": damage_report.reportedBy,
                 "notes": damage_report.notes,
-                "createdBy": current_user.id,
+                "createdBy": current_user["id"],
                 "createdAt": datetime.utcnow()
             }
         })
@@ -320,7 +426,7 @@ async def create_damage_report(
 
 @router.get("/damage-analytics")
 async def get_damage_analytics(
-    current_user: User = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(verify_token),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None
 ):
@@ -339,7 +445,7 @@ async def get_damage_analytics(
         damage_reports = await db.damagereport.find_many(
             where={
                 "journey": {
-                    "clientId": current_user.clientId,
+                    "clientId": current_user["clientId"],
                     "date": {
                         "gte": datetime.combine(start_date, datetime.min.time()),
                         "lte": datetime.combine(end_date, datetime.max.time())
@@ -396,106 +502,37 @@ async def get_damage_analytics(
 # ===== PERFORMANCE METRICS =====
 
 @router.get("/performance-metrics")
+@cached_endpoint("operations.performance_metrics")
 async def get_performance_metrics(
-    current_user: User = Depends(get_current_user),
+    current_user: Dict[str, Any] = Depends(verify_token),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None
 ):
     """Get comprehensive performance metrics"""
     try:
-        db = Prisma()
-        await db.connect()
-        
-        # Set default date range if not provided
-        if not start_date:
-            start_date = date.today() - timedelta(days=30)
-        if not end_date:
-            end_date = date.today()
-        
-        location_id = current_user.locationId
-        client_id = current_user.clientId
-        
-        # Get journey metrics
-        total_journeys = await db.truckjourney.count(
-            where={
-                "clientId": client_id,
-                "locationId": location_id,
-                "date": {
-                    "gte": datetime.combine(start_date, datetime.min.time()),
-                    "lte": datetime.combine(end_date, datetime.max.time())
-                }
-            }
-        )
-        
-        completed_journeys = await db.truckjourney.count(
-            where={
-                "clientId": client_id,
-                "locationId": location_id,
-                "status": "COMPLETED",
-                "date": {
-                    "gte": datetime.combine(start_date, datetime.min.time()),
-                    "lte": datetime.combine(end_date, datetime.max.time())
-                }
-            }
-        )
-        
-        # Get job metrics
-        total_jobs = await db.job.count(
-            where={
-                "branch": {
-                    "locationId": location_id
-                },
-                "scheduledDate": {
-                    "gte": datetime.combine(start_date, datetime.min.time()),
-                    "lte": datetime.combine(end_date, datetime.max.time())
-                }
-            }
-        )
-        
-        completed_jobs = await db.job.count(
-            where={
-                "branch": {
-                    "locationId": location_id
-                },
-                "status": "Completed",
-                "scheduledDate": {
-                    "gte": datetime.combine(start_date, datetime.min.time()),
-                    "lte": datetime.combine(end_date, datetime.max.time())
-                }
-            }
-        )
-        
-        # Get fuel metrics
-        fuel_usage = await db.fuellog.aggregate(
-            where={
-                "journey": {
-                    "clientId": client_id,
-                    "locationId": location_id,
-                    "date": {
-                        "gte": datetime.combine(start_date, datetime.min.time()),
-                        "lte": datetime.combine(end_date, datetime.max.time())
-                    }
-                }
-            },
-            _sum={"fuelAmount": True, "fuelCost": True}
-        )
-        
-        # Get material usage
-        material_usage = await db.materialusage.aggregate(
-            where={
-                "journey": {
-                    "clientId": client_id,
-                    "locationId": location_id,
-                    "date": {
-                        "gte": datetime.combine(start_date, datetime.min.time()),
-                        "lte": datetime.combine(end_date, datetime.max.time())
-                    }
-                }
-            },
-            _sum={"totalCost": True}
-        )
-        
-        await db.disconnect()
+        start_date, end_date = window(start_date, end_date)
+        location_id = current_user["locationId"]
+        client_id = current_user["clientId"]
+        
+        db = await get_database_connection()
+        try:
+            # Journey, fuel and material totals come from the daily rollups
+            journeys = await read_rollup(db, JOURNEYS, client_id, end_date, start_date, location_id)
+            fuel = await read_rollup(db, FUEL, client_id, end_date, start_date, location_id)
+            materials = await read_rollup(db, MATERIALS, client_id, end_date, start_date, location_id)
+            
+            job_counts = await StatsEngine(db).run(JOB_METRICS, {
+                "client_id": client_id,
+                "window_start": day_bounds(start_date)[0],
+                "window_end": day_bounds(end_date)[1]
+            })
+        finally:
+            await db.close()
+        
+        total_journeys = int(sum(row["journeyCount"] for row in journeys.values()))
+        completed_journeys = int(journeys.get("COMPLETED", {}).get("journeyCount", 0))
+        total_jobs = job_counts["totalJobs"]
+        completed_jobs = job_counts["completedJobs"]
         
         # Calculate efficiency metrics
         journey_completion_rate = (completed_journeys / total_journeys * 100) if total_journeys > 0 else 0
@@ -517,9 +554,9 @@ async def get_performance_metrics(
                 "completionRate": round(job_completion_rate, 2)
             },
             "resourceMetrics": {
-                "fuelUsed": round(fuel_usage._sum.fuelAmount or 0, 2),
-                "fuelCost": round(fuel_usage._sum.fuelCost or 0, 2),
-                "materialCost": round(material_usage._sum.totalCost or 0, 2)
+                "fuelUsed": round(sum(row["litres"] for row in fuel.values()), 2),
+                "fuelCost": round(sum(row["cost"] for row in fuel.values()), 2),
+                "materialCost": round(sum(row["cost"] for row in materials.values()), 2)
             }
         }
         
@@ -529,64 +566,21 @@ async def get_performance_metrics(
 # ===== REAL-TIME OPERATIONAL STATUS =====
 
 @router.get("/operational-status")
+@cached_endpoint("operations.operational_status")
 async def get_operational_status(
-    current_user: User = Depends(get_current_user)
+    current_user: Dict[str, Any] = Depends(verify_token)
 ):
     """Get real-time operational status"""
     try:
-        db = Prisma()
-        await db.connect()
-        
-        location_id = current_user.locationId
-        client_id = current_user.clientId
-        
-        # Get active journeys
-        active_journeys = await db.truckjourney.count(
-            where={
-                "clientId": client_id,
-                "locationId": location_id,
-                "status": {"in": ["MORNING_PREP", "ON_ROAD", "ON_SITE", "RETURNING"]}
-            }
-        )
-        
-        # Get trucks on the road
-        trucks_on_road = await db.truckjourney.count(
-            where={
-                "clientId": client_id,
-                "locationId": location_id,
-                "status": {"in": ["ON_ROAD", "ON_SITE"]}
-            }
-        )
-        
-        # Get pending jobs
-        pending_jobs = await db.job.count(
-            where={
-                "branch": {
-                    "locationId": location_id
-                },
-                "status": "Scheduled"
-            }
-        )
-        
-        # Get crew availability
-        available_crew = await db.user.count(
-            where={
-                "clientId": client_id,
-                "locationId": location_id,
-                "status": "ACTIVE",
-                "role": {"in": ["DRIVER", "MOVER"]}
-            }
-        )
-        
-        await db.disconnect()
+        counts = await get_operational_counts(current_user["clientId"], current_user["locationId"])
         
         return {
             "timestamp": datetime.utcnow().isoformat(),
             "operationalStatus": {
-                "activeJourneys": active_journeys,
-                "trucksOnRoad": trucks_on_road,
-                "pendingJobs": pending_jobs,
-                "availableCrew": available_crew
+                "activeJourneys": counts["activeJourneys"],
+                "trucksOnRoad": counts["trucksOnRoad"],
+                "pendingJobs": counts["pendingJobs"],
+                "availableCrew": counts["availableCrew"]
             }
         }
         
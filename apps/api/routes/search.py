@@ -0,0 +1,48 @@
+"""
+Search Routes
+C&C CRM - One ranked search box over customers, leads and journeys
+"""
+
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Dict, Any, Optional
+from apps.api.routes.auth import verify_token
+from apps.api.database import get_database_connection
+from apps.api.search import ENTITIES, search
+
+router = APIRouter()
+
+@router.get("")
+async def search_all(
+    q: str = Query(..., min_length=2, max_length=100),
+    current_user: Dict[str, Any] = Depends(verify_token),
+    types: Optional[str] = Query(None, description="Comma-separated: customers,leads,journeys"),
+    limit: int = Query(20, ge=1, le=50)
+):
+    """Search names, emails, phones, quote and SmartMoving job numbers.
+
+    Matches word prefixes ("jo smi"), substrings ("4165550") and near-misses
+    ("jhon"), best match first.
+    """
+    selected = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    unknown = [t for t in selected or [] if t not in ENTITIES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown search types: {', '.join(unknown)}")
+    try:
+        started = time.perf_counter()
+        db = await get_database_connection()
+        try:
+            results = await search(db, current_user["clientId"], q, selected, limit)
+        finally:
+            await db.close()
+        return {
+            "success": True,
+            "query": q,
+            "results": results,
+            "tookMs": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching: {str(e)}")
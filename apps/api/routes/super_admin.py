@@ -17,6 +17,12 @@ from ..middleware.super_admin_auth import (
     get_current_super_admin, 
     require_super_admin_permission
 )
+from ..cache import cache_metrics
+from ..database import get_database_connection
+from ..analytics_views import VIEWS as ANALYTICS_VIEWS, refresh_view
+from ..customer_dedupe import dedupe_customers
+from ..media_storage import media_storage
+from ..media_blobs import storage_savings, collect_garbage
 
 router = APIRouter(tags=["Super Admin"])
 
@@ -615,6 +621,123 @@ async def get_analytics_overview(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get analytics: {str(e)}")
 
+@router.get("/analytics/cache")
+async def get_cache_analytics(
+    super_admin: Dict[str, Any] = Depends(require_super_admin_permission("VIEW_AUDIT_LOGS"))
+):
+    """Get cache hit ratios per backend and namespace"""
+    return {
+        "success": True,
+        "message": "Cache metrics retrieved successfully",
+        "data": cache_metrics()
+    }
+
+@router.get("/analytics/views")
+async def get_analytics_views(
+    super_admin: Dict[str, Any] = Depends(require_super_admin_permission("VIEW_AUDIT_LOGS"))
+):
+    """Get refresh state of the materialized CRM analytics views"""
+    try:
+        db = await get_database_connection()
+        try:
+            rows = await db.fetch_all(
+                'SELECT name, "refreshedAt", "durationMs", stale, "staleSince" FROM "AnalyticsViewRefresh" ORDER BY name'
+            )
+        finally:
+            await db.close()
+        return {
+            "success": True,
+            "message": "Analytics view state retrieved successfully",
+            "data": rows
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get analytics views: {str(e)}")
+
+@router.post("/analytics/views/refresh")
+async def refresh_analytics_views(
+    view: Optional[str] = None,
+    super_admin: Dict[str, Any] = Depends(require_super_admin_permission("VIEW_AUDIT_LOGS"))
+):
+    """Refresh one analytics view, or all of them, now"""
+    if view and view not in ANALYTICS_VIEWS:
+        raise HTTPException(status_code=404, detail=f"Unknown analytics view: {view}")
+    try:
+        db = await get_database_connection()
+        try:
+            refreshed = [
+                name for name in ([view] if view else ANALYTICS_VIEWS)
+                if await refresh_view(db.connection, name)
+            ]
+        finally:
+            await db.close()
+        return {
+            "success": True,
+            "message": f"Refreshed {len(refreshed)} analytics views",
+            "data": {"refreshed": refreshed}
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to refresh analytics views: {str(e)}")
+
+@router.post("/customers/dedupe")
+async def dedupe_company_customers(
+    company_id: Optional[str] = None,
+    dry_run: bool = True,
+    super_admin: Dict[str, Any] = Depends(require_super_admin_permission("UPDATE_COMPANIES"))
+):
+    """Merge customers sharing a normalized email or phone (dry run by default)"""
+    try:
+        db = await get_database_connection()
+        try:
+            result = await dedupe_customers(db.connection, company_id, dry_run=dry_run)
+        finally:
+            await db.close()
+        return {
+            "success": True,
+            "message": f"{'Found' if dry_run else 'Merged'} {sum(result['merged'].values())} duplicate customers",
+            "data": result
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to dedupe customers: {str(e)}")
+
+@router.get("/analytics/storage")
+async def get_storage_analytics(
+    super_admin: Dict[str, Any] = Depends(require_super_admin_permission("VIEW_AUDIT_LOGS"))
+):
+    """Get media bytes referenced versus stored, and uploads avoided by deduplication"""
+    try:
+        db = await get_database_connection()
+        try:
+            savings = await storage_savings(db)
+        finally:
+            await db.close()
+        return {
+            "success": True,
+            "message": "Storage analytics retrieved successfully",
+            "data": savings
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get storage analytics: {str(e)}")
+
+@router.post("/storage/gc")
+async def collect_media_garbage(
+    dry_run: bool = True,
+    super_admin: Dict[str, Any] = Depends(require_super_admin_permission("UPDATE_COMPANIES"))
+):
+    """Delete unreferenced media blobs past their grace period (dry run by default)"""
+    try:
+        db = await get_database_connection()
+        try:
+            result = await collect_garbage(db, media_storage, dry_run=dry_run)
+        finally:
+            await db.close()
+        return {
+            "success": True,
+            "message": f"{'Found' if dry_run else 'Deleted'} {result['blobs']} unreferenced media blobs",
+            "data": result
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to collect media garbage: {str(e)}")
+
 @router.get("/audit-logs")
 async def get_audit_logs(
     company_id: Optional[str] = None,
@@ -3,15 +3,18 @@ User Management API Routes
 Handles user CRUD operations, crew management, and multi-tenant user access
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from typing import Dict, Any, Optional, List
-from datetime import datetime
+from datetime import datetime, date
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import os
 
 # Import authentication
 from .auth import verify_token
+from ..crew_scoreboard import CREW_ROLES, get_scoreboard
+from ..database import get_database_connection
+from ..rollups import window
 
 router = APIRouter(tags=["Users"])
 
@@ -211,23 +214,58 @@ async def delete_user(user_id: str) -> Dict[str, Any]:
 @router.get("/crew/scoreboard")
 async def get_crew_scoreboard(
     client_id: Optional[str] = None,
-    location_id: Optional[str] = None
+    location_id: Optional[str] = None,
+    metric: str = Query("jobs", regex="^(jobs|onTimeRate|hours|revenue|damageIncidents)$"),
+    role: Optional[str] = Query(None, regex="^(DRIVER|MOVER)$"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: Dict[str, Any] = Depends(verify_token)
 ) -> Dict[str, Any]:
     """
     Get crew performance scoreboard
-    Shows metrics for drivers and movers
+    Ranks drivers and movers per location from the crew daily rollup
     """
     try:
-        # TODO: Replace with database aggregation queries
-        # This should calculate performance metrics from journey data
+        if current_user.get("user_type") != "super_admin":
+            # Regular users see their own client's boards, defaulting to their location
+            client_id = current_user.get("clientId")
+            location_id = location_id or current_user.get("locationId")
+        if not client_id:
+            return {
+                "success": False,
+                "error": "Missing tenant information",
+                "message": "client_id is required"
+            }
+        
+        start_date, end_date = window(start_date, end_date)
+        db = await get_database_connection()
+        try:
+            boards = await get_scoreboard(
+                db, client_id, start_date, end_date,
+                location_id=location_id,
+                metric=metric,
+                roles=(role,) if role else CREW_ROLES,
+                limit=limit
+            )
+        finally:
+            await db.close()
+        
         return {
-            "success": False,
-            "error": "Database integration needed",
-            "message": "Crew scoreboard not implemented - database integration required"
+            "success": True,
+            "data": {
+                "metric": metric,
+                "period": {
+                    "startDate": start_date.isoformat(),
+                    "endDate": end_date.isoformat()
+                },
+                "locations": boards
+            },
+            "message": f"Retrieved scoreboards for {len(boards)} locations"
         }
         
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve crew scoreboard: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
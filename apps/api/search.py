@@ -0,0 +1,141 @@
+"""
+Search Module
+C&C CRM - Ranked search over customers, leads and journeys
+
+Uses the generated columns from prisma/search_indexes.sql. A row matches
+when its tsvector matches every query word as a prefix, when the query is a
+close word-similarity match for its trigram text (typos), or when the query
+is a substring of that text (phone and job-number fragments). All of these
+are served by the GIN indexes; one UNION ALL statement searches every entity.
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+_WORDS = re.compile(r"[0-9a-z]+")
+
+# Substring matches need at least one trigram
+MIN_SUBSTRING_LENGTH = 3
+
+# ===== SPECS =====
+
+@dataclass(frozen=True)
+class SearchEntity:
+    """One searchable result type.
+
+    ``vector`` and ``text`` are the generated search columns, ``client``
+    the tenant column, ``key`` the result id; ``title`` and ``subtitle``
+    render the result.
+    """
+    name: str
+    source: str
+    key: str
+    client: str
+    vector: str
+    text: str
+    title: str
+    subtitle: str
+
+CUSTOMERS = SearchEntity(
+    name="customer",
+    source='"Customer" c',
+    key="c.id",
+    client="c.clientId",
+    vector="c.searchVector",
+    text="c.searchText",
+    title="c.firstName || ' ' || c.lastName",
+    subtitle="concat_ws(' · ', c.email, c.phone)",
+)
+
+LEADS = SearchEntity(
+    name="lead",
+    source='"Customer" c JOIN "Lead" l ON l.customerId = c.id',
+    key="l.id",
+    client="c.clientId",
+    vector="c.searchVector",
+    text="c.searchText",
+    title="c.firstName || ' ' || c.lastName",
+    subtitle="concat_ws(' · ', l.status, l.source)",
+)
+
+JOURNEYS = SearchEntity(
+    name="journey",
+    source='"TruckJourney" tj',
+    key="tj.id",
+    client='tj."clientId"',
+    vector='tj."searchVector"',
+    text='tj."searchText"',
+    title="COALESCE(tj.\"truckNumber\", tj.\"moveSourceId\", tj.id)",
+    subtitle="concat_ws(' · ', tj.status::text, to_char(tj.date, 'YYYY-MM-DD'), tj.\"moveSourceId\")",
+)
+
+ENTITIES: Dict[str, SearchEntity] = {
+    "customers": CUSTOMERS,
+    "leads": LEADS,
+    "journeys": JOURNEYS,
+}
+
+# ===== QUERY =====
+
+def prefix_tsquery(query: str) -> str:
+    """'john smi' -> 'john:* & smi:*' (words are [0-9a-z] only, so no escaping)"""
+    return " & ".join(f"{word}:*" for word in _WORDS.findall(query.lower()))
+
+def escape_like(text: str) -> str:
+    """Escape LIKE wildcards so user input only matches literally"""
+    return re.sub(r"([\\%_])", r"\\\1", text)
+
+def like_pattern(query: str) -> Optional[str]:
+    """Substring pattern for the trigram index, digits only for phone-like queries"""
+    text = query.lower().strip()
+    digits = re.sub(r"\D", "", text)
+    if len(digits) >= MIN_SUBSTRING_LENGTH and len(digits) >= len(re.sub(r"[\s()+.-]", "", text)):
+        text = digits
+    if len(text) < MIN_SUBSTRING_LENGTH:
+        return None
+    return f"%{escape_like(text)}%"
+
+def search_sql(entities: Sequence[SearchEntity], use_like: bool) -> str:
+    """Parameters: $1 clientId, $2 lower-cased query, $3 tsquery, $4 per-type limit, $5 LIKE pattern"""
+    branches = []
+    for entity in entities:
+        match = [f"{entity.vector} @@ to_tsquery('simple', $3)", f"$2 <% {entity.text}"]
+        if use_like:
+            match.append(f"{entity.text} LIKE $5")
+        branches.append(f"""
+            (SELECT '{entity.name}' AS "type", {entity.key} AS "id",
+                    {entity.title} AS "title", {entity.subtitle} AS "subtitle",
+                    ts_rank({entity.vector}, to_tsquery('simple', $3)) * 2 + word_similarity($2, {entity.text}) AS "score"
+             FROM {entity.source}
+             WHERE {entity.client} = $1 AND ({' OR '.join(match)})
+             ORDER BY "score" DESC
+             LIMIT $4)""")
+    return " UNION ALL ".join(branches) + ' ORDER BY "score" DESC'
+
+async def search(
+    db,
+    client_id: str,
+    query: str,
+    types: Optional[Sequence[str]] = None,
+    limit: int = 20
+) -> List[Dict[str, Any]]:
+    """Ranked matches for ``query`` across ``types`` (default: all entities)"""
+    entities = [ENTITIES[name] for name in (types or ENTITIES)]
+    tsquery = prefix_tsquery(query)
+    if not entities or not tsquery:
+        return []
+
+    pattern = like_pattern(query)
+    args: List[Any] = [client_id, query.lower().strip(), tsquery, limit]
+    if pattern:
+        args.append(pattern)
+
+    rows = await db.fetch_all(search_sql(entities, pattern is not None), *args)
+    return [
+        {**row, "score": round(float(row["score"]), 4)}
+        for row in rows[:limit]
+    ]
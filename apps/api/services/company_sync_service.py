@@ -19,6 +19,8 @@ from prisma.models import (
     CompanyRoomType, CompanyUser, CompanyReferralSource
 )
 
+from ..cache import get_cache
+
 logger = logging.getLogger(__name__)
 
 class CompanySyncService:
@@ -133,6 +135,10 @@ class CompanySyncService:
             await self.update_company_sync_status(company.id, "FAILED")
             
             return False
+        
+        finally:
+            # Partial syncs still write rows, so cached reference data is dropped either way
+            await get_cache("company_reference").invalidate_tags(f"company:{company.id}")
     
     async def sync_smartmoving_data(self, company: CompanyIntegration, sync_log_id: str) -> bool:
         """Sync SmartMoving API data"""
@@ -10,11 +10,26 @@ from decimal import Decimal
 import json
 import logging
 
+import asyncpg
+
 from ..database import get_database_connection
 from ..models.customer import CustomerCreate, CustomerUpdate, CustomerResponse
+from ..search import escape_like, like_pattern
 
 logger = logging.getLogger(__name__)
 
+# Per-customer counts as correlated subqueries: joining Lead and SalesActivity
+# together would multiply rows (leads x activities) before counting
+CUSTOMER_COUNTS = """
+    (SELECT COUNT(*) FROM "Lead" l WHERE l.customerId = c.id) as leadCount,
+    (SELECT COUNT(*) FROM "SalesActivity" sa WHERE sa.customerId = c.id) as activityCount"""
+
+# Unique indexes from prisma/customer_dedupe.sql
+DUPLICATE_MESSAGES = {
+    "idx_customer_unique_email": "Customer with this email already exists",
+    "idx_customer_unique_phone": "Customer with this phone already exists",
+}
+
 class CustomerService:
     def __init__(self, client_id: str, location_id: str):
         self.client_id = client_id
@@ -26,34 +41,39 @@ class CustomerService:
             self.db = await get_database_connection()
         return self.db
 
+    async def _check_duplicate(
+        self,
+        email: Optional[str],
+        phone: Optional[str],
+        exclude_id: Optional[str] = None
+    ) -> None:
+        """Raise if another active customer has the same normalized email or phone.
+
+        One lookup served by the per-client unique contact indexes.
+        """
+        db = await self._get_db()
+        existing = await db.fetch_one(
+            """
+            SELECT COALESCE(normalizedEmail = normalize_email($2), false) AS "emailMatch"
+            FROM "Customer"
+            WHERE clientId = $1 AND isActive = true AND id IS DISTINCT FROM $4
+              AND (normalizedEmail = normalize_email($2) OR normalizedPhone = normalize_phone($3))
+            ORDER BY 1 DESC
+            LIMIT 1
+            """,
+            self.client_id, email, phone, exclude_id
+        )
+        if existing:
+            raise ValueError(DUPLICATE_MESSAGES[
+                "idx_customer_unique_email" if existing["emailMatch"] else "idx_customer_unique_phone"
+            ])
+
     async def create_customer(self, customer_data: CustomerCreate, user_id: str) -> CustomerResponse:
         """Create a new customer"""
         try:
             db = await self._get_db()
             
-            # Validate email uniqueness within client
-            existing_customer = await db.fetch_one(
-                """
-                SELECT id FROM "Customer" 
-                WHERE email = $1 AND clientId = $2 AND isActive = true
-                """,
-                customer_data.email, self.client_id
-            )
-            
-            if existing_customer:
-                raise ValueError("Customer with this email already exists")
-
-            # Validate phone uniqueness within client
-            existing_customer = await db.fetch_one(
-                """
-                SELECT id FROM "Customer" 
-                WHERE phone = $1 AND clientId = $2 AND isActive = true
-                """,
-                customer_data.phone, self.client_id
-            )
-            
-            if existing_customer:
-                raise ValueError("Customer with this phone already exists")
+            await self._check_duplicate(customer_data.email, customer_data.phone)
 
             # Create customer
             customer_id = await db.fetch_val(
@@ -85,6 +105,9 @@ class CustomerService:
             # Return created customer
             return await self.get_customer(customer_id)
 
+        except asyncpg.UniqueViolationError as e:
+            # Lost a race with a concurrent create of the same contact
+            raise ValueError(DUPLICATE_MESSAGES.get(e.constraint_name, "Customer already exists"))
         except Exception as e:
             logger.error(f"Error creating customer: {str(e)}")
             raise
@@ -109,8 +132,9 @@ class CustomerService:
 
             if search:
                 param_count += 1
-                conditions.append(f"(firstName ILIKE ${param_count} OR lastName ILIKE ${param_count} OR email ILIKE ${param_count})")
-                params.append(f"%{search}%")
+                # Trigram-indexed haystack of name, email and phone digits
+                conditions.append(f"searchText LIKE ${param_count}")
+                params.append(like_pattern(search) or f"%{escape_like(search.lower().strip())}%")
 
             if lead_status:
                 param_count += 1
@@ -136,21 +160,21 @@ class CustomerService:
             params.append(limit)
 
             query = f"""
+                WITH page AS (
+                    SELECT * FROM "Customer"
+                    WHERE {where_clause}
+                    ORDER BY createdAt DESC
+                    LIMIT ${param_count - 1} OFFSET ${param_count}
+                )
                 SELECT 
                     c.id, c.firstName, c.lastName, c.email, c.phone, c.address,
                     c.leadSource, c.leadStatus, c.assignedTo, c.estimatedValue,
                     c.notes, c.tags, c.preferences, c.isActive, c.createdAt, c.updatedAt,
                     u.name as assignedUserName,
-                    COUNT(l.id) as leadCount,
-                    COUNT(sa.id) as activityCount
-                FROM "Customer" c
+                    {CUSTOMER_COUNTS}
+                FROM page c
                 LEFT JOIN "User" u ON c.assignedTo = u.id
-                LEFT JOIN "Lead" l ON c.id = l.customerId
-                LEFT JOIN "SalesActivity" sa ON c.id = sa.customerId
-                WHERE {where_clause}
-                GROUP BY c.id, u.name
                 ORDER BY c.createdAt DESC
-                LIMIT ${param_count - 1} OFFSET ${param_count}
             """
 
             rows = await db.fetch_all(query, *params)
@@ -198,14 +222,10 @@ class CustomerService:
                     c.leadSource, c.leadStatus, c.assignedTo, c.estimatedValue,
                     c.notes, c.tags, c.preferences, c.isActive, c.createdAt, c.updatedAt,
                     u.name as assignedUserName,
-                    COUNT(l.id) as leadCount,
-                    COUNT(sa.id) as activityCount
+                    """ + CUSTOMER_COUNTS + """
                 FROM "Customer" c
                 LEFT JOIN "User" u ON c.assignedTo = u.id
-                LEFT JOIN "Lead" l ON c.id = l.customerId
-                LEFT JOIN "SalesActivity" sa ON c.id = sa.customerId
                 WHERE c.id = $1 AND c.clientId = $2
-                GROUP BY c.id, u.name
                 """,
                 customer_id, self.client_id
             )
@@ -260,7 +280,7 @@ class CustomerService:
 
             # Build update query dynamically
             update_fields = []
-            params = [customer_id, user_id]
+            params = [customer_id, self.client_id]
             param_count = 2
 
             if customer_data.firstName is not None:
@@ -273,34 +293,15 @@ class CustomerService:
                 update_fields.append(f"lastName = ${param_count}")
                 params.append(customer_data.lastName)
 
+            if customer_data.email is not None or customer_data.phone is not None:
+                await self._check_duplicate(customer_data.email, customer_data.phone, customer_id)
+
             if customer_data.email is not None:
-                # Check email uniqueness
-                existing_email = await db.fetch_one(
-                    """
-                    SELECT id FROM "Customer" 
-                    WHERE email = $1 AND clientId = $2 AND id != $3 AND isActive = true
-                    """,
-                    customer_data.email, self.client_id, customer_id
-                )
-                if existing_email:
-                    raise ValueError("Customer with this email already exists")
-                
                 param_count += 1
                 update_fields.append(f"email = ${param_count}")
                 params.append(customer_data.email)
 
             if customer_data.phone is not None:
-                # Check phone uniqueness
-                existing_phone = await db.fetch_one(
-                    """
-                    SELECT id FROM "Customer" 
-                    WHERE phone = $1 AND clientId = $2 AND id != $3 AND isActive = true
-                    """,
-                    customer_data.phone, self.client_id, customer_id
-                )
-                if existing_phone:
-                    raise ValueError("Customer with this phone already exists")
-                
                 param_count += 1
                 update_fields.append(f"phone = ${param_count}")
                 params.append(customer_data.phone)
@@ -368,12 +369,13 @@ class CustomerService:
                 SET {', '.join(update_fields)}
                 WHERE id = $1 AND clientId = $2
             """
-            params.append(self.client_id)
 
             await db.execute(query, *params)
 
             return await self.get_customer(customer_id)
 
+        except asyncpg.UniqueViolationError as e:
+            raise ValueError(DUPLICATE_MESSAGES.get(e.constraint_name, "Customer already exists"))
         except Exception as e:
             logger.error(f"Error updating customer: {str(e)}")
             raise
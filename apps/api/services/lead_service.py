@@ -12,6 +12,7 @@ import logging
 
 from ..database import get_database_connection
 from ..models.customer import LeadCreate, LeadUpdate, LeadResponse
+from ..analytics_views import LEAD_BREAKDOWN, get_freshness
 
 logger = logging.getLogger(__name__)
 
@@ -378,92 +379,43 @@ class LeadService:
         try:
             db = await self._get_db()
             
-            # Get total leads
-            total_leads = await db.fetch_val(
-                """
-                SELECT COUNT(*) FROM "Lead" l
-                JOIN "Customer" c ON l.customerId = c.id
-                WHERE c.clientId = $1
-                """,
-                self.client_id
-            )
-
-            # Get leads by status
-            leads_by_status = await db.fetch_all(
-                """
-                SELECT l.status, COUNT(*) as count
-                FROM "Lead" l
-                JOIN "Customer" c ON l.customerId = c.id
-                WHERE c.clientId = $1
-                GROUP BY l.status
-                """,
-                self.client_id
-            )
-
-            # Get leads by priority
-            leads_by_priority = await db.fetch_all(
-                """
-                SELECT l.priority, COUNT(*) as count
-                FROM "Lead" l
-                JOIN "Customer" c ON l.customerId = c.id
-                WHERE c.clientId = $1
-                GROUP BY l.priority
-                """,
-                self.client_id
-            )
-
-            # Get leads by source
-            leads_by_source = await db.fetch_all(
-                """
-                SELECT l.source, COUNT(*) as count
-                FROM "Lead" l
-                JOIN "Customer" c ON l.customerId = c.id
-                WHERE c.clientId = $1
-                GROUP BY l.source
-                ORDER BY count DESC
-                LIMIT 10
-                """,
-                self.client_id
-            )
-
-            # Get conversion rate
-            won_leads = await db.fetch_val(
+            # Status, priority and source breakdowns come from one view read
+            rows = await db.fetch_all(
                 """
-                SELECT COUNT(*) FROM "Lead" l
-                JOIN "Customer" c ON l.customerId = c.id
-                WHERE c.clientId = $1 AND l.status = 'WON'
+                SELECT dimension, key, "leadCount", "scoreSum", "scoreCount"
+                FROM "LeadBreakdownView"
+                WHERE "clientId" = $1
                 """,
                 self.client_id
             )
-
-            total_active_leads = await db.fetch_val(
-                """
-                SELECT COUNT(*) FROM "Lead" l
-                JOIN "Customer" c ON l.customerId = c.id
-                WHERE c.clientId = $1 AND l.status IN ('NEW', 'CONTACTED', 'QUALIFIED', 'PROPOSAL_SENT', 'NEGOTIATION', 'WON')
-                """,
-                self.client_id
+            breakdown: Dict[str, Dict[str, int]] = {"status": {}, "priority": {}, "source": {}}
+            score_sum = score_count = 0
+            for row in rows:
+                breakdown[row["dimension"]][row["key"]] = row["leadCount"]
+                if row["dimension"] == "status":
+                    score_sum += row["scoreSum"]
+                    score_count += row["scoreCount"]
+
+            leads_by_status = breakdown["status"]
+            top_sources = sorted(breakdown["source"].items(), key=lambda item: item[1], reverse=True)[:10]
+
+            won_leads = leads_by_status.get('WON', 0)
+            total_active_leads = sum(
+                leads_by_status.get(status, 0)
+                for status in ('NEW', 'CONTACTED', 'QUALIFIED', 'PROPOSAL_SENT', 'NEGOTIATION', 'WON')
             )
 
             conversion_rate = (won_leads / total_active_leads * 100) if total_active_leads > 0 else 0
-
-            # Get average score
-            average_score = await db.fetch_val(
-                """
-                SELECT AVG(l.score) FROM "Lead" l
-                JOIN "Customer" c ON l.customerId = c.id
-                WHERE c.clientId = $1
-                """,
-                self.client_id
-            )
+            average_score = score_sum / score_count if score_count else 0
 
             return {
-                "totalLeads": total_leads,
-                "leadsByStatus": {row["status"]: row["count"] for row in leads_by_status},
-                "leadsByPriority": {row["priority"]: row["count"] for row in leads_by_priority},
-                "leadsBySource": {row["source"]: row["count"] for row in leads_by_source},
+                "totalLeads": sum(leads_by_status.values()),
+                "leadsByStatus": leads_by_status,
+                "leadsByPriority": breakdown["priority"],
+                "leadsBySource": dict(top_sources),
                 "conversionRate": round(conversion_rate, 2),
-                "averageScore": round(float(average_score) if average_score else 0, 2)
+                "averageScore": round(float(average_score), 2),
+                "freshness": await get_freshness(db, LEAD_BREAKDOWN)
             }
 
         except Exception as e:
@@ -12,9 +12,14 @@ import logging
 
 from ..database import get_database_connection
 from ..models.quote import QuoteCreate, QuoteUpdate, QuoteResponse
+from ..response_cache import on_quote_write, on_journey_write
+from ..analytics_views import QUOTE_PIPELINE, QUOTE_CONVERSION, get_freshness
 
 logger = logging.getLogger(__name__)
 
+# Item count per quote row, counted only for the quotes being returned
+QUOTE_ITEM_COUNT = '(SELECT COUNT(*) FROM "QuoteItem" qi WHERE qi.quoteId = q.id) as itemCount'
+
 class QuoteService:
     def __init__(self, client_id: str, location_id: str):
         self.client_id = client_id
@@ -68,6 +73,8 @@ class QuoteService:
                 quote_data.templateName
             )
 
+            await on_quote_write(self.client_id, self.location_id)
+
             # Return created quote
             return await self.get_quote(quote_id)
 
@@ -122,6 +129,12 @@ class QuoteService:
             params.append(limit)
 
             query = f"""
+                WITH page AS (
+                    SELECT * FROM "Quote"
+                    WHERE {where_clause}
+                    ORDER BY createdAt DESC
+                    LIMIT ${param_count - 1} OFFSET ${param_count}
+                )
                 SELECT 
                     q.id, q.customerId, q.clientId, q.locationId, q.createdBy,
                     q.status, q.totalAmount, q.currency, q.validUntil, q.terms,
@@ -132,16 +145,12 @@ class QuoteService:
                     c.email as customerEmail, c.phone as customerPhone,
                     u.name as createdUserName,
                     au.name as approvedUserName,
-                    COUNT(qi.id) as itemCount
-                FROM "Quote" q
+                    {QUOTE_ITEM_COUNT}
+                FROM page q
                 LEFT JOIN "Customer" c ON q.customerId = c.id
                 LEFT JOIN "User" u ON q.createdBy = u.id
                 LEFT JOIN "User" au ON q.approvedBy = au.id
-                LEFT JOIN "QuoteItem" qi ON q.id = qi.quoteId
-                WHERE {where_clause}
-                GROUP BY q.id, c.firstName, c.lastName, c.email, c.phone, u.name, au.name
                 ORDER BY q.createdAt DESC
-                LIMIT ${param_count - 1} OFFSET ${param_count}
             """
 
             rows = await db.fetch_all(query, *params)
@@ -200,14 +209,12 @@ class QuoteService:
                     c.email as customerEmail, c.phone as customerPhone,
                     u.name as createdUserName,
                     au.name as approvedUserName,
-                    COUNT(qi.id) as itemCount
+                    """ + QUOTE_ITEM_COUNT + """
                 FROM "Quote" q
                 LEFT JOIN "Customer" c ON q.customerId = c.id
                 LEFT JOIN "User" u ON q.createdBy = u.id
                 LEFT JOIN "User" au ON q.approvedBy = au.id
-                LEFT JOIN "QuoteItem" qi ON q.id = qi.quoteId
                 WHERE q.id = $1 AND q.clientId = $2
-                GROUP BY q.id, c.firstName, c.lastName, c.email, c.phone, u.name, au.name
                 """,
                 quote_id, self.client_id
             )
@@ -332,6 +339,7 @@ class QuoteService:
             params.append(self.client_id)
 
             await db.execute(query, *params)
+            await on_quote_write(self.client_id, self.location_id)
 
             return await self.get_quote(quote_id)
 
@@ -349,6 +357,7 @@ class QuoteService:
                 quote_id, self.client_id
             )
             
+            await on_quote_write(self.client_id, self.location_id)
             return result.rowcount > 0
 
         except Exception as e:
@@ -372,6 +381,8 @@ class QuoteService:
             if result.rowcount == 0:
                 return None
 
+            await on_quote_write(self.client_id, self.location_id)
+
             return await self.get_quote(quote_id)
 
         except Exception as e:
@@ -396,6 +407,8 @@ class QuoteService:
             if result.rowcount == 0:
                 return None
 
+            await on_quote_write(self.client_id, self.location_id)
+
             return await self.get_quote(quote_id)
 
         except Exception as e:
@@ -419,6 +432,8 @@ class QuoteService:
             if result.rowcount == 0:
                 return None
 
+            await on_quote_write(self.client_id, self.location_id)
+
             return await self.get_quote(quote_id)
 
         except Exception as e:
@@ -468,6 +483,9 @@ class QuoteService:
                 datetime.utcnow(), quote_id
             )
 
+            await on_quote_write(self.client_id, self.location_id)
+            await on_journey_write(self.client_id, quote.locationId)
+
             return {
                 "journeyId": journey_id,
                 "quoteId": quote_id,
@@ -529,6 +547,8 @@ class QuoteService:
                 new_quote_id, quote_id
             )
 
+            await on_quote_write(self.client_id, self.location_id)
+
             return await self.get_quote(new_quote_id)
 
         except Exception as e:
@@ -556,63 +576,47 @@ class QuoteService:
             logger.error(f"Error creating template: {str(e)}")
             raise
 
+    async def _pipeline(self, db) -> List[Dict[str, Any]]:
+        return await db.fetch_all(
+            """
+            SELECT status, "quoteCount", value
+            FROM "QuotePipelineView"
+            WHERE "clientId" = $1
+            ORDER BY 
+                CASE status
+                    WHEN 'DRAFT' THEN 1
+                    WHEN 'SENT' THEN 2
+                    WHEN 'VIEWED' THEN 3
+                    WHEN 'ACCEPTED' THEN 4
+                    WHEN 'CONVERTED' THEN 5
+                    WHEN 'REJECTED' THEN 6
+                    ELSE 7
+                END
+            """,
+            self.client_id
+        )
+
     async def get_analytics_overview(self) -> Dict[str, Any]:
         """Get quote analytics overview"""
         try:
             db = await self._get_db()
             
-            # Get total quotes
-            total_quotes = await db.fetch_val(
-                "SELECT COUNT(*) FROM \"Quote\" WHERE clientId = $1",
-                self.client_id
-            )
-
-            # Get quotes by status
-            quotes_by_status = await db.fetch_all(
-                """
-                SELECT status, COUNT(*) as count
-                FROM "Quote"
-                WHERE clientId = $1
-                GROUP BY status
-                """,
-                self.client_id
-            )
-
-            # Get total value
-            total_value = await db.fetch_val(
-                """
-                SELECT COALESCE(SUM(totalAmount), 0)
-                FROM "Quote"
-                WHERE clientId = $1 AND status IN ('SENT', 'VIEWED', 'ACCEPTED')
-                """,
-                self.client_id
-            )
-
-            # Get conversion rate
-            converted_quotes = await db.fetch_val(
-                """
-                SELECT COUNT(*) FROM "Quote"
-                WHERE clientId = $1 AND status = 'CONVERTED'
-                """,
-                self.client_id
-            )
-
-            sent_quotes = await db.fetch_val(
-                """
-                SELECT COUNT(*) FROM "Quote"
-                WHERE clientId = $1 AND status IN ('SENT', 'VIEWED', 'ACCEPTED', 'CONVERTED')
-                """,
-                self.client_id
-            )
+            # Status counts and values come from the pipeline view
+            pipeline = await self._pipeline(db)
+            counts = {row["status"]: row["quoteCount"] for row in pipeline}
+            total_value = sum(row["value"] for row in pipeline if row["status"] in ('SENT', 'VIEWED', 'ACCEPTED'))
+            converted_quotes = counts.get('CONVERTED', 0)
+            sent_quotes = sum(counts.get(status, 0) for status in ('SENT', 'VIEWED', 'ACCEPTED', 'CONVERTED'))
 
             conversion_rate = (converted_quotes / sent_quotes * 100) if sent_quotes > 0 else 0
 
             return {
-                "totalQuotes": total_quotes,
-                "quotesByStatus": {row["status"]: row["count"] for row in quotes_by_status},
+                "totalQuotes": sum(counts.values()),
+                "quotesByStatus": counts,
                 "totalValue": float(total_value) if total_value else 0,
                 "conversionRate": round(conversion_rate, 2),
-                "convertedQuotes": converted_quotes
+                "convertedQuotes": converted_quotes,
+                "freshness": await get_freshness(db, QUOTE_PIPELINE)
             }
 
         except Exception as e:
@@ -624,39 +628,18 @@ class QuoteService:
         try:
             db = await self._get_db()
             
-            # Get pipeline stages
-            pipeline_data = await db.fetch_all(
-                """
-                SELECT 
-                    status,
-                    COUNT(*) as count,
-                    COALESCE(SUM(totalAmount), 0) as value
-                FROM "Quote"
-                WHERE clientId = $1
-                GROUP BY status
-                ORDER BY 
-                    CASE status
-                        WHEN 'DRAFT' THEN 1
-                        WHEN 'SENT' THEN 2
-                        WHEN 'VIEWED' THEN 3
-                        WHEN 'ACCEPTED' THEN 4
-                        WHEN 'CONVERTED' THEN 5
-                        WHEN 'REJECTED' THEN 6
-                        ELSE 7
-                    END
-                """,
-                self.client_id
-            )
+            pipeline_data = await self._pipeline(db)
 
             return {
                 "pipeline": [
                     {
                         "stage": row["status"],
-                        "count": row["count"],
+                        "count": row["quoteCount"],
                         "value": float(row["value"]) if row["value"] else 0
                     }
                     for row in pipeline_data
-                ]
+                ],
+                "freshness": await get_freshness(db, QUOTE_PIPELINE)
             }
 
         except Exception as e:
@@ -668,17 +651,12 @@ class QuoteService:
         try:
             db = await self._get_db()
             
-            # Get conversion data by month
+            # Monthly conversion for the last 12 months from the conversion view
             conversion_data = await db.fetch_all(
                 """
-                SELECT 
-                    DATE_TRUNC('month', createdAt) as month,
-                    COUNT(*) as total_quotes,
-                    COUNT(CASE WHEN status = 'CONVERTED' THEN 1 END) as converted_quotes,
-                    COALESCE(SUM(CASE WHEN status = 'CONVERTED' THEN totalAmount ELSE 0 END), 0) as converted_value
-                FROM "Quote"
-                WHERE clientId = $1 AND createdAt >= NOW() - INTERVAL '12 months'
-                GROUP BY DATE_TRUNC('month', createdAt)
+                SELECT month, "totalQuotes", "convertedQuotes", "convertedValue"
+                FROM "QuoteConversionView"
+                WHERE "clientId" = $1 AND month >= DATE_TRUNC('month', NOW() - INTERVAL '11 months')
                 ORDER BY month DESC
                 """,
                 self.client_id
@@ -688,13 +666,14 @@ class QuoteService:
                 "conversionByMonth": [
                     {
                         "month": row["month"].strftime("%Y-%m"),
-                        "totalQuotes": row["total_quotes"],
-                        "convertedQuotes": row["converted_quotes"],
-                        "conversionRate": round((row["converted_quotes"] / row["total_quotes"] * 100), 2) if row["total_quotes"] > 0 else 0,
-                        "convertedValue": float(row["converted_value"]) if row["converted_value"] else 0
+                        "totalQuotes": row["totalQuotes"],
+                        "convertedQuotes": row["convertedQuotes"],
+                        "conversionRate": round((row["convertedQuotes"] / row["totalQuotes"] * 100), 2) if row["totalQuotes"] > 0 else 0,
+                        "convertedValue": float(row["convertedValue"]) if row["convertedValue"] else 0
                     }
                     for row in conversion_data
-                ]
+                ],
+                "freshness": await get_freshness(db, QUOTE_CONVERSION)
             }
 
         except Exception as e:
@@ -12,9 +12,44 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import os
+import time
+from dataclasses import dataclass, field
+
+from ..cache import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Seconds a pulled day of jobs is reused before SmartMoving is asked again
+TODAYS_JOBS_TTL = 60
+
+@dataclass
+class TodaysJobs:
+    """One pull of today's jobs, indexed by job id and job number"""
+    day: str
+    jobs: List[Dict[str, Any]]
+    fetched_at: float
+    by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    by_number: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for job in self.jobs:
+            self.by_id.setdefault(job["id"], job)
+            self.by_number.setdefault(job["jobNumber"], job)
+
+    def find(self, journey_id: str) -> Optional[Dict[str, Any]]:
+        """Exact id/job number lookup, then the partial match the routes accept"""
+        job = self.by_id.get(journey_id) or self.by_number.get(journey_id)
+        if job is not None:
+            return job
+        for job in self.jobs:
+            if journey_id in job["id"] or journey_id in job["jobNumber"]:
+                return job
+        return None
+
+# Shared across service instances: routes create one service per request
+_upstream_calls = SingleFlight()
+_todays_jobs: Optional[TodaysJobs] = None
+
 class RealSmartMovingService:
     """Service for fetching ONLY real SmartMoving data"""
     
@@ -32,7 +67,11 @@ class RealSmartMovingService:
         }
     
     async def make_request(self, endpoint: str, params: Dict = None) -> Dict[str, Any]:
-        """Make request to SmartMoving API"""
+        """Make request to SmartMoving API, sharing identical concurrent calls"""
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        return await _upstream_calls.do(key, lambda: self._make_request(endpoint, params))
+    
+    async def _make_request(self, endpoint: str, params: Dict = None) -> Dict[str, Any]:
         url = f"{self.api_base_url}/api/{endpoint}"
         headers = await self.get_headers()
         
@@ -47,11 +86,32 @@ class RealSmartMovingService:
     
     async def get_todays_jobs(self) -> List[Dict[str, Any]]:
         """Get ALL real jobs for today from SmartMoving"""
+        return (await self.get_todays_jobs_index()).jobs
+    
+    async def get_todays_jobs_index(self) -> TodaysJobs:
+        """Get today's jobs from the short-lived cache or one shared pull"""
         today = datetime.now().strftime("%Y%m%d")
+        cached = _todays_jobs
+        if cached is not None and cached.day == today and time.monotonic() - cached.fetched_at < TODAYS_JOBS_TTL:
+            return cached
+        return await _upstream_calls.do(("todays_jobs", today), lambda: self._pull_todays_jobs(today))
+    
+    async def _pull_todays_jobs(self, today: str) -> TodaysJobs:
+        global _todays_jobs
+        all_jobs, complete = await self._fetch_jobs_for_day(today)
+        snapshot = TodaysJobs(today, all_jobs, time.monotonic())
+        # Partial pulls are served to the waiting callers but never cached
+        if complete:
+            _todays_jobs = snapshot
+        return snapshot
+    
+    async def _fetch_jobs_for_day(self, today: str):
+        """Page through the customers endpoint; returns (jobs, completed_all_pages)"""
         logger.info(f"Fetching real jobs for {today}")
         
         all_jobs = []
         page = 1
+        complete = True
         
         while True:
             params = {
@@ -102,10 +162,11 @@ class RealSmartMovingService:
                 
             except Exception as e:
                 logger.error(f"Error fetching page {page}: {e}")
+                complete = False
                 break
         
         logger.info(f"Found {len(all_jobs)} real jobs for today")
-        return all_jobs
+        return all_jobs, complete
     
     async def get_job_details(self, job_id: str) -> Dict[str, Any]:
         """Get detailed information for a specific job"""
@@ -126,14 +187,8 @@ class RealSmartMovingService:
         """Get real journey data for a specific journey - NO FALLBACK DATA"""
         try:
             # First try to find this journey in today's jobs
-            todays_jobs = await self.get_todays_jobs()
-            
-            # Look for matching job
-            matching_job = None
-            for job in todays_jobs:
-                if journey_id in job["id"] or journey_id in job["jobNumber"]:
-                    matching_job = job
-                    break
+            todays_jobs = await self.get_todays_jobs_index()
+            matching_job = todays_jobs.find(journey_id)
             
             if not matching_job:
                 # Try to get job details directly
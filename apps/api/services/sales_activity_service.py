@@ -11,6 +11,7 @@ import json
 import logging
 
 from ..database import get_database_connection
+from ..analytics_views import ACTIVITY_BREAKDOWN, get_freshness
 from ..models.customer import SalesActivityCreate, SalesActivityUpdate, SalesActivityResponse
 
 logger = logging.getLogger(__name__)
@@ -63,8 +64,8 @@ class SalesActivityService:
                 INSERT INTO "SalesActivity" (
                     leadId, customerId, userId, type, subject, description,
                     outcome, nextAction, scheduledDate, completedDate,
-                    duration, cost, notes
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+                    duration, cost, notes, clientId
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
                 RETURNING id
                 """,
                 activity_data.leadId,
@@ -79,7 +80,8 @@ class SalesActivityService:
                 activity_data.completedDate,
                 activity_data.duration,
                 activity_data.cost,
-                activity_data.notes
+                activity_data.notes,
+                self.client_id
             )
 
             # Return created activity
@@ -102,7 +104,7 @@ class SalesActivityService:
             db = await self._get_db()
             
             # Build query conditions
-            conditions = ["(c.clientId = $1 OR l.customerId IN (SELECT id FROM \"Customer\" WHERE clientId = $1))"]
+            conditions = ["sa.clientId = $1"]
             params = [self.client_id]
             param_count = 1
 
@@ -141,7 +143,6 @@ class SalesActivityService:
                 FROM "SalesActivity" sa
                 LEFT JOIN "User" u ON sa.userId = u.id
                 LEFT JOIN "Customer" c ON sa.customerId = c.id
-                LEFT JOIN "Lead" l ON sa.leadId = l.id
                 WHERE {where_clause}
                 ORDER BY sa.createdAt DESC
                 LIMIT ${param_count - 1} OFFSET ${param_count}
@@ -216,8 +217,7 @@ class SalesActivityService:
                 FROM "SalesActivity" sa
                 LEFT JOIN "User" u ON sa.userId = u.id
                 LEFT JOIN "Customer" c ON sa.customerId = c.id
-                LEFT JOIN "Lead" l ON sa.leadId = l.id
-                WHERE sa.id = $1 AND (c.clientId = $2 OR l.customerId IN (SELECT id FROM "Customer" WHERE clientId = $2))
+                WHERE sa.id = $1 AND sa.clientId = $2
                 """,
                 activity_id, self.client_id
             )
@@ -267,8 +267,7 @@ class SalesActivityService:
                 """
                 SELECT sa.id FROM "SalesActivity" sa
                 LEFT JOIN "Customer" c ON sa.customerId = c.id
-                LEFT JOIN "Lead" l ON sa.leadId = l.id
-                WHERE sa.id = $1 AND (c.clientId = $2 OR l.customerId IN (SELECT id FROM "Customer" WHERE clientId = $2))
+                WHERE sa.id = $1 AND sa.clientId = $2
                 """,
                 activity_id, self.client_id
             )
@@ -368,76 +367,36 @@ class SalesActivityService:
         try:
             db = await self._get_db()
             
-            # Get total activities
-            total_activities = await db.fetch_val(
-                """
-                SELECT COUNT(*) FROM "SalesActivity" sa
-                LEFT JOIN "Customer" c ON sa.customerId = c.id
-                LEFT JOIN "Lead" l ON sa.leadId = l.id
-                WHERE c.clientId = $1 OR l.customerId IN (SELECT id FROM "Customer" WHERE clientId = $1)
-                """,
-                self.client_id
-            )
-
-            # Get activities by type
-            activities_by_type = await db.fetch_all(
-                """
-                SELECT sa.type, COUNT(*) as count
-                FROM "SalesActivity" sa
-                LEFT JOIN "Customer" c ON sa.customerId = c.id
-                LEFT JOIN "Lead" l ON sa.leadId = l.id
-                WHERE c.clientId = $1 OR l.customerId IN (SELECT id FROM "Customer" WHERE clientId = $1)
-                GROUP BY sa.type
-                """,
-                self.client_id
-            )
-
-            # Get activities by user
-            activities_by_user = await db.fetch_all(
+            # Type and user breakdowns come from one view read
+            rows = await db.fetch_all(
                 """
-                SELECT u.name, COUNT(*) as count
-                FROM "SalesActivity" sa
-                LEFT JOIN "User" u ON sa.userId = u.id
-                LEFT JOIN "Customer" c ON sa.customerId = c.id
-                LEFT JOIN "Lead" l ON sa.leadId = l.id
-                WHERE (c.clientId = $1 OR l.customerId IN (SELECT id FROM "Customer" WHERE clientId = $1))
-                GROUP BY u.name
-                ORDER BY count DESC
-                LIMIT 10
-                """,
-                self.client_id
-            )
-
-            # Get average duration
-            average_duration = await db.fetch_val(
-                """
-                SELECT AVG(sa.duration) FROM "SalesActivity" sa
-                LEFT JOIN "Customer" c ON sa.customerId = c.id
-                LEFT JOIN "Lead" l ON sa.leadId = l.id
-                WHERE (c.clientId = $1 OR l.customerId IN (SELECT id FROM "Customer" WHERE clientId = $1))
-                AND sa.duration IS NOT NULL
+                SELECT dimension, key, label, "activityCount", "durationSum", "durationCount", "costSum"
+                FROM "SalesActivityBreakdownView"
+                WHERE "clientId" = $1
                 """,
                 self.client_id
             )
+            by_type = [row for row in rows if row["dimension"] == "type"]
+            by_user = sorted(
+                (row for row in rows if row["dimension"] == "user"),
+                key=lambda row: row["activityCount"],
+                reverse=True
+            )[:10]
 
-            # Get total cost
-            total_cost = await db.fetch_val(
-                """
-                SELECT COALESCE(SUM(sa.cost), 0) FROM "SalesActivity" sa
-                LEFT JOIN "Customer" c ON sa.customerId = c.id
-                LEFT JOIN "Lead" l ON sa.leadId = l.id
-                WHERE (c.clientId = $1 OR l.customerId IN (SELECT id FROM "Customer" WHERE clientId = $1))
-                AND sa.cost IS NOT NULL
-                """,
-                self.client_id
-            )
+            duration_count = sum(row["durationCount"] for row in by_type)
+            average_duration = sum(row["durationSum"] for row in by_type) / duration_count if duration_count else 0
+            total_cost = sum(row["costSum"] for row in by_type)
 
             return {
-                "totalActivities": total_activities,
-                "activitiesByType": {row["type"]: row["count"] for row in activities_by_type},
-                "activitiesByUser": {row["name"]: row["count"] for row in activities_by_user},
-                "averageDuration": round(float(average_duration) if average_duration else 0, 2),
-                "totalCost": float(total_cost) if total_cost else 0
+                "totalActivities": sum(row["activityCount"] for row in by_type),
+                "activitiesByType": {row["key"]: row["activityCount"] for row in by_type},
+                # Keyed by user id; two reps can share a display name
+                "activitiesByUser": {
+                    row["key"]: {"name": row["label"], "count": row["activityCount"]} for row in by_user
+                },
+                "averageDuration": round(float(average_duration), 2),
+                "totalCost": float(total_cost) if total_cost else 0,
+                "freshness": await get_freshness(db, ACTIVITY_BREAKDOWN)
             }
 
         except Exception as e:
@@ -13,6 +13,8 @@ from typing import Dict, List, Any, Optional
 from prisma import Prisma
 from prisma.models import CompanyIntegration, CompanyDataSyncLog, TruckJourney, Location
 
+from ..time_series import get_series, last_days
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -407,30 +409,14 @@ class SmartMovingIntegrationService:
     async def get_integration_analytics(self) -> Dict[str, Any]:
         """Get SmartMoving integration analytics"""
         try:
-            # Get daily sync statistics for the last 30 days
-            thirty_days_ago = datetime.now() - timedelta(days=30)
+            # Daily sync counts for the 30 days before today, in one query
+            start, end = last_days(30)
+            series = await get_series("sync", start, end, bucket="day")
             
-            daily_stats = []
-            for i in range(30):
-                date = thirty_days_ago + timedelta(days=i)
-                start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-                end_of_day = start_of_day + timedelta(days=1)
-                
-                # Count jobs synced on this day
-                jobs_synced = await self.db.truckjourney.count(
-                    where={
-                        "dataSource": "SMARTMOVING",
-                        "lastSyncAt": {
-                            "gte": start_of_day,
-                            "lt": end_of_day
-                        }
-                    }
-                )
-                
-                daily_stats.append({
-                    "date": start_of_day.strftime("%Y-%m-%d"),
-                    "jobsSynced": jobs_synced
-                })
+            daily_stats = [
+                {"date": bucket[:10], "jobsSynced": count}
+                for bucket, count in zip(series["buckets"], series["values"])
+            ]
             
             return {
                 "success": True,
@@ -8,10 +8,12 @@ import asyncio
 import httpx
 import json
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from prisma import Prisma
 from prisma.models import TruckJourney, Location
+from ..journey_sync import record_sync
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -86,6 +88,7 @@ class SmartMovingSyncService:
         
         today = datetime.now()
         tomorrow = today + timedelta(days=1)
+        started = time.perf_counter()
         
         # Get all branches first
         all_branches = await self.get_all_smartmoving_branches()
@@ -125,6 +128,13 @@ class SmartMovingSyncService:
         )
         
         logger.info(f"Comprehensive SmartMoving sync completed: {sync_results['summary']}")
+        
+        # Only a sync of every location moves the dataAsOf watermark
+        if location_id is None:
+            try:
+                await record_sync(int((time.perf_counter() - started) * 1000))
+            except Exception as e:
+                logger.error(f"Failed to record sync watermark: {str(e)}")
         return sync_results
     
     async def sync_jobs_for_date(self, date: datetime, location_id: str = None) -> Dict[str, Any]:
@@ -0,0 +1,187 @@
+"""
+Stats Engine Module
+C&C CRM - Single-statement aggregate counts for dashboard and status endpoints
+
+Each table contributes one ``COUNT(*) FILTER (WHERE ...)`` aggregate over its
+tenant-scoped rows; the per-table aggregates are cross-joined so a whole
+stats panel is one round-trip.
+"""
+
+import re
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Dict, Any, List, Tuple, Sequence
+
+from .database import get_database_connection
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_JOURNEY_STATUSES = ("MORNING_PREP", "ON_ROAD", "ON_SITE", "RETURNING")
+ON_ROAD_STATUSES = ("ON_ROAD", "ON_SITE")
+
+# ===== SPECS =====
+
+@dataclass(frozen=True)
+class Count:
+    """A named count over the rows of a TableStats that match ``where``"""
+    name: str
+    where: str = "TRUE"
+
+@dataclass(frozen=True)
+class TableStats:
+    """One aggregate over ``source`` restricted by ``scope``.
+
+    SQL fragments reference parameters as ``:name``; values come from the
+    params dict given to ``StatsEngine.run``. Enum constants are inlined as
+    literals so Postgres can compare them against enum columns and indexes.
+    """
+    source: str
+    scope: str
+    counts: Tuple[Count, ...]
+
+_PARAM = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+def _literals(values: Sequence[str]) -> str:
+    return ", ".join("'" + value.replace("'", "''") + "'" for value in values)
+
+def compile_stats(tables: Sequence[TableStats], params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Compile table aggregates into one statement with positional parameters"""
+    args: List[Any] = []
+    positions: Dict[str, str] = {}
+
+    def bind(match: "re.Match") -> str:
+        name = match.group(1)
+        if name not in positions:
+            if name not in params:
+                raise KeyError(f"Missing stats parameter: {name}")
+            args.append(params[name])
+            positions[name] = f"${len(args)}"
+        return positions[name]
+
+    parts = []
+    for index, table in enumerate(tables):
+        columns = ", ".join(
+            f'COUNT(*) FILTER (WHERE {count.where}) AS "{count.name}"' for count in table.counts
+        )
+        parts.append(f"(SELECT {columns} FROM {table.source} WHERE {table.scope}) s{index}")
+
+    sql = f"SELECT * FROM {' CROSS JOIN '.join(parts)}"
+    return _PARAM.sub(bind, sql), args
+
+# ===== ENGINE =====
+
+class StatsEngine:
+    """Runs compiled stats specs on a DatabaseConnection"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def run(self, tables: Sequence[TableStats], params: Dict[str, Any]) -> Dict[str, int]:
+        """Return {count name: value} for every count in ``tables``"""
+        sql, args = compile_stats(tables, params)
+        row = await self.db.fetch_one(sql, *args)
+        return {name: int(value or 0) for name, value in (row or {}).items()}
+
+# ===== DASHBOARD / OPERATIONS SPECS =====
+
+# Jobs reach a tenant through their synced branch's company integration
+_TENANT_JOBS = (
+    '"Job" j JOIN "CompanyBranch" b ON b.id = j."branchId" '
+    'JOIN "CompanyIntegration" ci ON ci.id = b."companyIntegrationId"'
+)
+
+DASHBOARD_STATS: Tuple[TableStats, ...] = (
+    TableStats(
+        source='"User" u',
+        scope='u."clientId" = :client_id AND u."locationId" = :location_id',
+        counts=(
+            Count("totalUsers", "u.status = 'ACTIVE'"),
+            Count("activeDrivers", "u.status = 'ACTIVE' AND u.role = 'DRIVER'"),
+        ),
+    ),
+    TableStats(
+        source='"TruckJourney" tj',
+        scope='tj."clientId" = :client_id AND tj."locationId" = :location_id AND tj.date >= :day_start AND tj.date < :day_end',
+        counts=(
+            Count("activeJourneys", f"tj.status IN ({_literals(ACTIVE_JOURNEY_STATUSES)})"),
+            Count("completedToday", "tj.status = 'COMPLETED'"),
+        ),
+    ),
+    TableStats(
+        source=_TENANT_JOBS,
+        scope='ci."clientId" = :client_id',
+        counts=(
+            Count("pendingJobs", 'NOT EXISTS (SELECT 1 FROM "JobAssignment" ja WHERE ja."jobId" = j.id)'),
+        ),
+    ),
+    TableStats(
+        source='"Location" l',
+        scope='l."clientId" = :client_id',
+        counts=(Count("totalLocations"),),
+    ),
+)
+
+OPERATIONAL_STATUS: Tuple[TableStats, ...] = (
+    TableStats(
+        source='"TruckJourney" tj',
+        scope=f'tj."clientId" = :client_id AND tj."locationId" = :location_id AND tj.status IN ({_literals(ACTIVE_JOURNEY_STATUSES)})',
+        counts=(
+            Count("activeJourneys"),
+            Count("trucksOnRoad", f"tj.status IN ({_literals(ON_ROAD_STATUSES)})"),
+        ),
+    ),
+    TableStats(
+        source=_TENANT_JOBS,
+        scope='ci."clientId" = :client_id',
+        counts=(Count("pendingJobs", "j.status = 'Scheduled'"),),
+    ),
+    TableStats(
+        source='"User" u',
+        scope='u."clientId" = :client_id AND u."locationId" = :location_id',
+        counts=(Count("availableCrew", "u.status = 'ACTIVE' AND u.role IN ('DRIVER', 'MOVER')"),),
+    ),
+)
+
+# Jobs scheduled in [:window_start, :window_end)
+JOB_METRICS: Tuple[TableStats, ...] = (
+    TableStats(
+        source=_TENANT_JOBS,
+        scope='ci."clientId" = :client_id AND j."scheduledDate" >= :window_start AND j."scheduledDate" < :window_end',
+        counts=(
+            Count("totalJobs"),
+            Count("completedJobs", "j.status = 'Completed'"),
+        ),
+    ),
+)
+
+def day_bounds(day: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """[start, end) of a calendar day"""
+    day = day or date.today()
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+async def get_dashboard_counts(client_id: str, location_id: str, day: Optional[date] = None) -> Dict[str, int]:
+    """Counts for GET /dashboard/stats in one round-trip"""
+    day_start, day_end = day_bounds(day)
+    db = await get_database_connection()
+    try:
+        return await StatsEngine(db).run(DASHBOARD_STATS, {
+            "client_id": client_id,
+            "location_id": location_id,
+            "day_start": day_start,
+            "day_end": day_end,
+        })
+    finally:
+        await db.close()
+
+async def get_operational_counts(client_id: str, location_id: str) -> Dict[str, int]:
+    """Counts for GET /operations/operational-status in one round-trip"""
+    db = await get_database_connection()
+    try:
+        return await StatsEngine(db).run(OPERATIONAL_STATUS, {
+            "client_id": client_id,
+            "location_id": location_id,
+        })
+    finally:
+        await db.close()
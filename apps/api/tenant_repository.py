@@ -0,0 +1,260 @@
+"""
+Tenant Repository Module
+C&C CRM - Tenant-scoped reads and writes on top of the shared connection pool
+"""
+
+import re
+import logging
+from typing import Optional, Dict, Any, List, Tuple, Iterable
+
+from .database import DatabaseConnection
+
+logger = logging.getLogger(__name__)
+
+# ===== TENANT SCOPE REGISTRY =====
+
+# Tables that carry tenant columns, and which of them scope the table.
+# Every table listed here has a composite index leading on "clientId"
+# (see prisma/tenant_scope_indexes.sql) so scoped queries stay index-bounded.
+TENANT_SCOPED_TABLES: Dict[str, Tuple[str, ...]] = {
+    "User": ("clientId", "locationId"),
+    "Location": ("clientId",),
+    "TruckJourney": ("clientId", "locationId"),
+    "AuditEntry": ("clientId", "locationId"),
+    "MoveSource": ("clientId",),
+    "Customer": ("clientId",),
+    "Quote": ("clientId", "locationId"),
+}
+
+# CRM tables created with unquoted camelCase columns (folded to lower case by
+# Postgres, see prisma/unified_crm_schema.sql). Their columns must not be quoted.
+FOLDED_CASE_TABLES = {"Customer", "Lead", "SalesActivity", "Quote", "QuoteItem"}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_OPERATORS = {
+    "equals": "=",
+    "not": "<>",
+    "lt": "<",
+    "lte": "<=",
+    "gt": ">",
+    "gte": ">=",
+}
+
+
+class TenantScopeError(ValueError):
+    """Raised when a query would escape or rewrite the tenant scope"""
+
+
+def _quote(identifier: str) -> str:
+    """Quote a table/column identifier after validating it"""
+    if not _IDENTIFIER.match(identifier):
+        raise ValueError(f"Invalid SQL identifier: {identifier!r}")
+    return f'"{identifier}"'
+
+
+def _column(name: str, alias: Optional[str] = None, table: Optional[str] = None) -> str:
+    """Render a column reference using the table's identifier convention"""
+    if table in FOLDED_CASE_TABLES:
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"Invalid SQL identifier: {name!r}")
+        column = name
+    else:
+        column = _quote(name)
+    return f"{alias}.{column}" if alias else column
+
+
+class _Params:
+    """Positional parameter collector for asyncpg ($1, $2, ...)"""
+
+    def __init__(self, start: int = 0):
+        self.values: List[Any] = []
+        self._start = start
+
+    def add(self, value: Any) -> str:
+        self.values.append(value)
+        return f"${self._start + len(self.values)}"
+
+
+def _compile_where(
+    where: Optional[Dict[str, Any]],
+    params: _Params,
+    alias: Optional[str] = None,
+    table: Optional[str] = None
+) -> List[str]:
+    """Compile a Prisma-style where dict into SQL predicates"""
+    predicates = []
+    for field, value in (where or {}).items():
+        column = _column(field, alias, table)
+        if value is None:
+            predicates.append(f"{column} IS NULL")
+        elif isinstance(value, dict):
+            for op, operand in value.items():
+                if op == "in":
+                    predicates.append(f"{column} = ANY({params.add(list(operand))})")
+                elif op == "notIn":
+                    predicates.append(f"NOT ({column} = ANY({params.add(list(operand))}))")
+                elif op == "contains":
+                    predicates.append(f"{column} ILIKE {params.add(f'%{operand}%')}")
+                elif op in _OPERATORS:
+                    if operand is None:
+                        predicates.append(f"{column} IS {'NOT ' if op == 'not' else ''}NULL")
+                    else:
+                        predicates.append(f"{column} {_OPERATORS[op]} {params.add(operand)}")
+                else:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+        elif isinstance(value, (list, tuple, set)):
+            predicates.append(f"{column} = ANY({params.add(list(value))})")
+        else:
+            predicates.append(f"{column} = {params.add(value)}")
+    return predicates
+
+
+# ===== TENANT REPOSITORY =====
+
+class TenantRepository:
+    """Query helper that injects clientId/locationId into every statement.
+
+    Reads get tenant predicates ANDed into the WHERE clause, inserts get the
+    tenant columns filled in, and updates/deletes are bounded by the scope and
+    may not move rows to another tenant. ``location_id=None`` scopes to the
+    whole client (admins, client-wide reports).
+    """
+
+    def __init__(self, db: DatabaseConnection, client_id: str, location_id: Optional[str] = None):
+        if not client_id:
+            raise TenantScopeError("client_id is required for tenant-scoped queries")
+        self.db = db
+        self.client_id = client_id
+        self.location_id = location_id
+
+    # ----- scope helpers -----
+
+    def scope_values(self, table: str) -> Dict[str, str]:
+        """Tenant column values that apply to a table"""
+        columns = TENANT_SCOPED_TABLES.get(table)
+        if columns is None:
+            raise TenantScopeError(f"Table {table} is not registered as tenant-scoped")
+
+        values = {"clientId": self.client_id}
+        if "locationId" in columns and self.location_id:
+            values["locationId"] = self.location_id
+        return values
+
+    def tenant_predicate(self, table: str, alias: Optional[str] = None, start: int = 0) -> Tuple[str, List[Any]]:
+        """SQL predicate and params for hand-written queries.
+
+        ``start`` is the number of positional params already used by the
+        caller, so the returned placeholders continue from ``$start + 1``.
+        """
+        params = _Params(start)
+        if alias and not _IDENTIFIER.match(alias):
+            raise ValueError(f"Invalid SQL alias: {alias!r}")
+        predicates = _compile_where(self.scope_values(table), params, alias, table)
+        return " AND ".join(predicates), params.values
+
+    def _scoped_where(self, table: str, where: Optional[Dict[str, Any]], params: _Params) -> str:
+        scope = self.scope_values(table)
+        for key, value in scope.items():
+            if where and key in where and where[key] != value:
+                raise TenantScopeError(f"Filter on {key} conflicts with the tenant scope")
+        merged = {**(where or {}), **scope}
+        return " AND ".join(_compile_where(merged, params, table=table))
+
+    def _scoped_row(self, table: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        scope = self.scope_values(table)
+        for key, value in scope.items():
+            if key in data and data[key] != value:
+                raise TenantScopeError(f"Cannot write {key}={data[key]!r} outside the tenant scope")
+        return {**data, **scope}
+
+    # ----- reads -----
+
+    async def find_many(
+        self,
+        table: str,
+        where: Optional[Dict[str, Any]] = None,
+        columns: Iterable[str] = ("*",),
+        order_by: Optional[Dict[str, str]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Select rows of a tenant-scoped table"""
+        params = _Params()
+        select = ", ".join(c if c == "*" else _column(c, table=table) for c in columns)
+        query = f"SELECT {select} FROM {_quote(table)} WHERE {self._scoped_where(table, where, params)}"
+
+        if order_by:
+            direction = {"asc": "ASC", "desc": "DESC"}
+            query += " ORDER BY " + ", ".join(
+                f"{_column(field, table=table)} {direction[order.lower()]}" for field, order in order_by.items()
+            )
+        if limit is not None:
+            query += f" LIMIT {params.add(limit)}"
+        if offset:
+            query += f" OFFSET {params.add(offset)}"
+
+        return await self.db.fetch_many(query, *params.values)
+
+    async def find_first(self, table: str, where: Optional[Dict[str, Any]] = None, **kwargs) -> Optional[Dict[str, Any]]:
+        """Select the first matching row, or None"""
+        rows = await self.find_many(table, where, limit=1, **kwargs)
+        return rows[0] if rows else None
+
+    async def count(self, table: str, where: Optional[Dict[str, Any]] = None) -> int:
+        """Count rows of a tenant-scoped table"""
+        params = _Params()
+        query = f"SELECT COUNT(*) FROM {_quote(table)} WHERE {self._scoped_where(table, where, params)}"
+        return await self.db.fetch_val(query, *params.values)
+
+    # ----- writes -----
+
+    async def insert(self, table: str, data: Dict[str, Any], returning: str = "id") -> Any:
+        """Insert one row with tenant columns filled in"""
+        row = self._scoped_row(table, data)
+        params = _Params()
+        placeholders = [params.add(value) for value in row.values()]
+        query = (
+            f"INSERT INTO {_quote(table)} ({', '.join(_column(c, table=table) for c in row)}) "
+            f"VALUES ({', '.join(placeholders)}) RETURNING {_column(returning, table=table)}"
+        )
+        return await self.db.fetch_val(query, *params.values)
+
+    async def insert_many(self, table: str, rows: List[Dict[str, Any]]) -> str:
+        """Insert several rows in one multi-row statement"""
+        if not rows:
+            return "INSERT 0 0"
+
+        scoped = [self._scoped_row(table, row) for row in rows]
+        columns = list(scoped[0])
+        params = _Params()
+        values = []
+        for row in scoped:
+            if set(row) != set(columns):
+                raise ValueError("All rows passed to insert_many must have the same columns")
+            values.append("(" + ", ".join(params.add(row[c]) for c in columns) + ")")
+
+        column_list = ", ".join(_column(c, table=table) for c in columns)
+        query = f"INSERT INTO {_quote(table)} ({column_list}) VALUES {', '.join(values)}"
+        return await self.db.execute(query, *params.values)
+
+    async def update(self, table: str, where: Dict[str, Any], data: Dict[str, Any]) -> str:
+        """Update rows inside the tenant scope"""
+        if not data:
+            raise ValueError("No fields to update")
+        self._scoped_row(table, data)
+
+        params = _Params()
+        assignments = ", ".join(f"{_column(c, table=table)} = {params.add(v)}" for c, v in data.items())
+        query = f"UPDATE {_quote(table)} SET {assignments} WHERE {self._scoped_where(table, where, params)}"
+        return await self.db.execute(query, *params.values)
+
+    async def delete(self, table: str, where: Dict[str, Any]) -> str:
+        """Delete rows inside the tenant scope"""
+        if not where:
+            raise TenantScopeError("Refusing to delete without a filter")
+
+        params = _Params()
+        query = f"DELETE FROM {_quote(table)} WHERE {self._scoped_where(table, where, params)}"
+        return await self.db.execute(query, *params.values)
+
@@ -0,0 +1,170 @@
+"""
+Time Series Module
+C&C CRM - Time-bucketed count series for charts in one query
+
+A series is built with ``date_trunc`` over the matching rows and
+``generate_series`` over the window, so empty buckets come back as zeros
+without a query per bucket. Results are cached per (metric, window, bucket,
+group, tenant).
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
+
+from .cache import get_cache
+from .database import get_database_connection
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("hour", "day", "week", "month")
+
+# Hourly series are limited to this many days
+MAX_HOURLY_DAYS = 31
+
+# Windows ending in the past don't change; live windows are cached briefly
+LIVE_SERIES_TTL = 60
+SETTLED_SERIES_TTL = 3600
+
+# ===== SPECS =====
+
+@dataclass(frozen=True)
+class SeriesSpec:
+    """Rows counted into a series.
+
+    ``dimensions`` names the columns a series may be split by, e.g.
+    ``("location", 'tj."locationId"')`` for per-branch charts.
+    """
+    source: str
+    time_column: str
+    client_column: str
+    scope: str = ""
+    value: str = "COUNT(*)"
+    dimensions: Tuple[Tuple[str, str], ...] = ()
+
+SYNC_VOLUME = SeriesSpec(
+    source='"TruckJourney" tj',
+    time_column='tj."lastSyncAt"',
+    client_column='tj."clientId"',
+    scope="tj.\"dataSource\" = 'SMARTMOVING'",
+    dimensions=(("location", 'tj."locationId"'),),
+)
+
+JOURNEY_VOLUME = SeriesSpec(
+    source='"TruckJourney" tj',
+    time_column="tj.date",
+    client_column='tj."clientId"',
+    dimensions=(("location", 'tj."locationId"'), ("status", "tj.status::text")),
+)
+
+# "Quote" uses unquoted (case-folded) column names
+QUOTE_VOLUME = SeriesSpec(
+    source='"Quote" q',
+    time_column="q.createdAt",
+    client_column="q.clientId",
+    dimensions=(("location", "q.locationId"), ("status", "q.status::text")),
+)
+
+SERIES: Dict[str, SeriesSpec] = {
+    "sync": SYNC_VOLUME,
+    "journeys": JOURNEY_VOLUME,
+    "quotes": QUOTE_VOLUME,
+}
+
+# ===== SQL =====
+
+def series_sql(spec: SeriesSpec, bucket: str, group_by: Optional[str] = None, scoped: bool = True) -> str:
+    """One statement returning (bucket[, dimension], value) for every bucket.
+
+    Parameters: $1 window start, $2 window end (exclusive), then $3 clientId
+    when ``scoped``. With ``group_by`` every dimension value that has rows in
+    the window gets a full, zero-filled run of buckets.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unsupported bucket: {bucket}")
+    dimension = dict(spec.dimensions)[group_by] if group_by else None
+
+    filters = [f"{spec.time_column} >= $1", f"{spec.time_column} < $2"]
+    if spec.scope:
+        filters.insert(0, spec.scope)
+    if scoped:
+        filters.append(f"{spec.client_column} = $3")
+
+    grouped = f", {dimension} AS dimension" if dimension else ""
+    return f"""
+        WITH counts AS (
+            SELECT date_trunc('{bucket}', {spec.time_column}) AS bucket{grouped}, {spec.value} AS value
+            FROM {spec.source}
+            WHERE {' AND '.join(filters)}
+            GROUP BY 1{', 2' if dimension else ''}
+        )
+        SELECT b.bucket{', k.dimension' if dimension else ''}, COALESCE(c.value, 0) AS value
+        FROM generate_series(
+            date_trunc('{bucket}', $1::timestamp),
+            $2::timestamp - interval '1 microsecond',
+            interval '1 {bucket}'
+        ) b(bucket)
+        {'CROSS JOIN (SELECT DISTINCT dimension FROM counts) k' if dimension else ''}
+        LEFT JOIN counts c ON c.bucket = b.bucket{' AND c.dimension IS NOT DISTINCT FROM k.dimension' if dimension else ''}
+        ORDER BY {'k.dimension, ' if dimension else ''}b.bucket
+    """
+
+def _shape(rows: List[Dict[str, Any]], grouped: bool) -> Dict[str, Any]:
+    """Rows to {"buckets": [...], "values": [...]} or {"buckets", "series": {dimension: values}}"""
+    buckets: List[str] = []
+    if not grouped:
+        values = []
+        for row in rows:
+            buckets.append(row["bucket"].isoformat())
+            values.append(int(row["value"]))
+        return {"buckets": buckets, "values": values}
+
+    series: Dict[str, List[int]] = {}
+    for row in rows:
+        values = series.setdefault(str(row["dimension"]), [])
+        if len(series) == 1:
+            buckets.append(row["bucket"].isoformat())
+        values.append(int(row["value"]))
+    return {"buckets": buckets, "series": series}
+
+# ===== READS =====
+
+async def get_series(
+    metric: str,
+    start: datetime,
+    end: datetime,
+    bucket: str = "day",
+    client_id: Optional[str] = None,
+    group_by: Optional[str] = None,
+    now: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Series for ``metric`` over [start, end); ``client_id=None`` counts across tenants"""
+    spec = SERIES[metric]
+    if group_by and group_by not in dict(spec.dimensions):
+        raise ValueError(f"{metric} cannot be grouped by {group_by}")
+    if end <= start:
+        raise ValueError("Series window must end after it starts")
+    if bucket == "hour" and end - start > timedelta(days=MAX_HOURLY_DAYS):
+        raise ValueError(f"Hourly series are limited to {MAX_HOURLY_DAYS} days")
+
+    key = f"{metric}|{bucket}|{group_by or '-'}|{client_id or '*'}|{start.isoformat()}|{end.isoformat()}"
+    ttl = LIVE_SERIES_TTL if end > (now or datetime.now()) else SETTLED_SERIES_TTL
+
+    async def compute() -> Dict[str, Any]:
+        args: List[Any] = [start, end]
+        if client_id is not None:
+            args.append(client_id)
+        db = await get_database_connection()
+        try:
+            rows = await db.fetch_all(series_sql(spec, bucket, group_by, client_id is not None), *args)
+        finally:
+            await db.close()
+        return _shape(rows, group_by is not None)
+
+    return await get_cache("series").get_or_set(key, compute, ttl, tags=(metric,))
+
+def last_days(days: int, today: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """[midnight ``days`` days ago, midnight today)"""
+    midnight = (today or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight - timedelta(days=days), midnight
@@ -0,0 +1,67 @@
+-- Crew Scoreboard for C&C CRM
+-- Per-crew-member daily metrics over completed journeys, maintained by the
+-- daily rollup change feed (run after daily_rollups.sql). Read by
+-- apps/api/crew_scoreboard.py for the ranked leaderboards.
+
+CREATE TABLE IF NOT EXISTS "CrewDailyRollup" (
+    "clientId" TEXT NOT NULL,
+    "locationId" TEXT NOT NULL,
+    day DATE NOT NULL,
+    "userId" TEXT NOT NULL,
+    jobs INTEGER NOT NULL DEFAULT 0,
+    "onTimeJobs" INTEGER NOT NULL DEFAULT 0,
+    "timedJobs" INTEGER NOT NULL DEFAULT 0,
+    hours NUMERIC(10,2) NOT NULL DEFAULT 0,
+    "damageIncidents" INTEGER NOT NULL DEFAULT 0,
+    revenue NUMERIC(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY ("clientId", "locationId", day, "userId")
+);
+
+-- ===== CHANGE FEED =====
+-- Completion, timing and quote changes re-queue the journey's day; crew
+-- assignments and damage reports re-queue the day of their journey.
+
+DROP TRIGGER IF EXISTS rollup_journey_changed ON "TruckJourney";
+CREATE TRIGGER rollup_journey_changed
+    AFTER INSERT OR DELETE OR UPDATE OF status, date, "clientId", "locationId", "truckNumber",
+        "startTime", "endTime", quoteId ON "TruckJourney"
+    FOR EACH ROW EXECUTE FUNCTION rollup_journey_changed();
+
+DROP TRIGGER IF EXISTS rollup_crew_changed ON "AssignedCrew";
+CREATE TRIGGER rollup_crew_changed
+    AFTER INSERT OR UPDATE OR DELETE ON "AssignedCrew"
+    FOR EACH ROW EXECUTE FUNCTION rollup_journey_child_changed();
+
+-- "DamageReport" is written by /operations/damage-reports but isn't in
+-- schema.prisma, so it may not exist yet. Until it does, crews count zero
+-- damage incidents; re-run this migration once it is created.
+DO $$
+BEGIN
+    IF to_regclass('"DamageReport"') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS rollup_damage_changed ON "DamageReport";
+        CREATE TRIGGER rollup_damage_changed
+            AFTER INSERT OR UPDATE OR DELETE ON "DamageReport"
+            FOR EACH ROW EXECUTE FUNCTION rollup_journey_child_changed();
+    END IF;
+END $$;
+
+-- Used by the crew rollup (apps/api/rollups.py CREW). Dynamic SQL, so the
+-- function can be created and called before "DamageReport" exists.
+CREATE OR REPLACE FUNCTION journey_damage_count(journey_id TEXT) RETURNS BIGINT
+LANGUAGE plpgsql STABLE AS $$
+DECLARE
+    incidents BIGINT;
+BEGIN
+    IF to_regclass('"DamageReport"') IS NULL THEN
+        RETURN 0;
+    END IF;
+    EXECUTE 'SELECT COUNT(*) FROM "DamageReport" WHERE "journeyId" = $1' INTO incidents USING journey_id;
+    RETURN incidents;
+END $$;
+
+-- ===== BACKFILL =====
+
+INSERT INTO "RollupDirtyDay" ("clientId", "locationId", day)
+SELECT DISTINCT "clientId", "locationId", date::date FROM "TruckJourney"
+WHERE status = 'COMPLETED'
+ON CONFLICT DO NOTHING;
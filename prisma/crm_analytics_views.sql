@@ -0,0 +1,109 @@
+-- CRM Analytics Views for C&C CRM
+-- Per-client materialized summaries read by the quote, lead and sales
+-- activity analytics endpoints (see apps/api/analytics_views.py).
+-- Statement-level triggers flag a view stale on writes; the refresher
+-- rebuilds stale views with REFRESH MATERIALIZED VIEW CONCURRENTLY and
+-- records when each view was last refreshed.
+
+-- ===== VIEWS =====
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS "QuotePipelineView" AS
+SELECT q.clientId AS "clientId",
+       q.status::text AS status,
+       COUNT(*) AS "quoteCount",
+       COALESCE(SUM(q.totalAmount), 0) AS value
+FROM "Quote" q
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS "QuotePipelineView_key" ON "QuotePipelineView"("clientId", status);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS "QuoteConversionView" AS
+SELECT q.clientId AS "clientId",
+       DATE_TRUNC('month', q.createdAt) AS month,
+       COUNT(*) AS "totalQuotes",
+       COUNT(*) FILTER (WHERE q.status = 'CONVERTED') AS "convertedQuotes",
+       COALESCE(SUM(q.totalAmount) FILTER (WHERE q.status = 'CONVERTED'), 0) AS "convertedValue"
+FROM "Quote" q
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS "QuoteConversionView_key" ON "QuoteConversionView"("clientId", month);
+
+-- One row per (client, dimension, value) for status, priority and source
+CREATE MATERIALIZED VIEW IF NOT EXISTS "LeadBreakdownView" AS
+SELECT c.clientId AS "clientId",
+       CASE
+           WHEN GROUPING(l.status) = 0 THEN 'status'
+           WHEN GROUPING(l.priority) = 0 THEN 'priority'
+           ELSE 'source'
+       END AS dimension,
+       COALESCE(l.status::text, l.priority::text, l.source) AS key,
+       COUNT(*) AS "leadCount",
+       COALESCE(SUM(l.score), 0) AS "scoreSum",
+       COUNT(l.score) AS "scoreCount"
+FROM "Lead" l
+JOIN "Customer" c ON c.id = l.customerId
+GROUP BY c.clientId, GROUPING SETS ((l.status), (l.priority), (l.source))
+-- The columns are NOT NULL; a NULL group would clash with '' on the unique key
+HAVING COALESCE(l.status::text, l.priority::text, l.source) IS NOT NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS "LeadBreakdownView_key" ON "LeadBreakdownView"("clientId", dimension, key);
+
+-- One row per (client, dimension, value) for activity type and user.
+-- Tenant is "SalesActivity".clientId, added and kept in sync by
+-- prisma/sales_activity_client.sql (apply that first).
+CREATE MATERIALIZED VIEW IF NOT EXISTS "SalesActivityBreakdownView" AS
+SELECT sa.clientId AS "clientId",
+       CASE WHEN GROUPING(sa.type) = 0 THEN 'type' ELSE 'user' END AS dimension,
+       COALESCE(sa.type::text, sa.userId, '') AS key,
+       MAX(u.name) AS label,
+       COUNT(*) AS "activityCount",
+       COALESCE(SUM(sa.duration), 0) AS "durationSum",
+       COUNT(sa.duration) AS "durationCount",
+       COALESCE(SUM(sa.cost), 0) AS "costSum"
+FROM "SalesActivity" sa
+LEFT JOIN "User" u ON u.id = sa.userId
+WHERE sa.clientId IS NOT NULL
+GROUP BY sa.clientId, GROUPING SETS ((sa.type), (sa.userId));
+
+CREATE UNIQUE INDEX IF NOT EXISTS "SalesActivityBreakdownView_key" ON "SalesActivityBreakdownView"("clientId", dimension, key);
+
+-- ===== FRESHNESS =====
+
+CREATE TABLE IF NOT EXISTS "AnalyticsViewRefresh" (
+    name TEXT PRIMARY KEY,
+    "refreshedAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    "durationMs" INTEGER NOT NULL DEFAULT 0,
+    stale BOOLEAN NOT NULL DEFAULT FALSE,
+    "staleSince" TIMESTAMPTZ
+);
+
+INSERT INTO "AnalyticsViewRefresh" (name) VALUES
+    ('QuotePipelineView'), ('QuoteConversionView'), ('LeadBreakdownView'), ('SalesActivityBreakdownView')
+ON CONFLICT DO NOTHING;
+
+-- ===== CHANGE FEED =====
+
+CREATE OR REPLACE FUNCTION analytics_views_mark_stale()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE "AnalyticsViewRefresh"
+    SET stale = TRUE, "staleSince" = NOW()
+    WHERE name = ANY(TG_ARGV) AND NOT stale;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS analytics_quote_changed ON "Quote";
+CREATE TRIGGER analytics_quote_changed
+    AFTER INSERT OR UPDATE OR DELETE ON "Quote"
+    FOR EACH STATEMENT EXECUTE FUNCTION analytics_views_mark_stale('QuotePipelineView', 'QuoteConversionView');
+
+DROP TRIGGER IF EXISTS analytics_lead_changed ON "Lead";
+CREATE TRIGGER analytics_lead_changed
+    AFTER INSERT OR UPDATE OR DELETE ON "Lead"
+    FOR EACH STATEMENT EXECUTE FUNCTION analytics_views_mark_stale('LeadBreakdownView');
+
+DROP TRIGGER IF EXISTS analytics_activity_changed ON "SalesActivity";
+CREATE TRIGGER analytics_activity_changed
+    AFTER INSERT OR UPDATE OR DELETE ON "SalesActivity"
+    FOR EACH STATEMENT EXECUTE FUNCTION analytics_views_mark_stale('SalesActivityBreakdownView');
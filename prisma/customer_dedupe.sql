@@ -0,0 +1,63 @@
+-- Customer Contact Dedupe for C&C CRM
+-- Normalized contact columns on "Customer" so duplicate detection ignores
+-- formatting ("(416) 555-0100" = "+1 416 555 0100", "Jo@X.com" = "jo@x.com")
+-- and is a single indexed lookup. Read by CustomerService and
+-- apps/api/customer_dedupe.py.
+--
+-- The per-client unique indexes only build once existing duplicates are
+-- merged. If this migration reports duplicates, run
+--     python -m apps.api.customer_dedupe
+-- which merges them and then creates the indexes.
+
+-- ===== NORMALIZATION =====
+
+-- E.164, assuming North American numbers when no country code is given.
+-- Extensions ("x204", "ext. 204") are dropped.
+CREATE OR REPLACE FUNCTION normalize_phone(p_phone TEXT)
+RETURNS TEXT AS $$
+    SELECT CASE
+        WHEN digits = '' THEN NULL
+        WHEN international THEN '+' || regexp_replace(digits, '^00', '')
+        WHEN length(digits) = 10 THEN '+1' || digits
+        WHEN length(digits) = 11 AND left(digits, 1) = '1' THEN '+' || digits
+        ELSE '+' || digits
+    END
+    FROM (
+        SELECT regexp_replace(base, '\D', '', 'g') AS digits,
+               base ~ '^\s*(\+|00)' AS international
+        FROM (SELECT regexp_replace(coalesce(p_phone, ''), '\s*(x|ext\.?)\s*\d+\s*$', '', 'i') AS base) b
+    ) d;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION normalize_email(p_email TEXT)
+RETURNS TEXT AS $$
+    SELECT NULLIF(lower(btrim(coalesce(p_email, ''))), '');
+$$ LANGUAGE sql IMMUTABLE;
+
+ALTER TABLE "Customer" ADD COLUMN IF NOT EXISTS normalizedEmail TEXT
+    GENERATED ALWAYS AS (normalize_email(email)) STORED;
+ALTER TABLE "Customer" ADD COLUMN IF NOT EXISTS normalizedPhone TEXT
+    GENERATED ALWAYS AS (normalize_phone(phone)) STORED;
+
+-- Set on the duplicates deactivated by a merge
+ALTER TABLE "Customer" ADD COLUMN IF NOT EXISTS mergedIntoId TEXT;
+
+-- ===== INDEXES =====
+-- One active customer per normalized email and per normalized phone per
+-- client. Returns false, leaving the indexes absent, while duplicates remain.
+
+CREATE OR REPLACE FUNCTION ensure_customer_contact_indexes()
+RETURNS BOOLEAN AS $$
+BEGIN
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_customer_unique_email
+        ON "Customer"(clientId, normalizedEmail) WHERE isActive = true;
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_customer_unique_phone
+        ON "Customer"(clientId, normalizedPhone) WHERE isActive = true;
+    RETURN true;
+EXCEPTION WHEN unique_violation THEN
+    RAISE NOTICE 'Duplicate active customers remain; run python -m apps.api.customer_dedupe';
+    RETURN false;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_customer_contact_indexes();
@@ -0,0 +1,193 @@
+-- Daily Rollups for C&C CRM
+-- Per-(clientId, locationId, day) aggregates read by the analytics endpoints
+-- (see apps/api/rollups.py). Triggers queue every changed day in
+-- "RollupDirtyDay"; apps/api/rollup_worker.py recomputes queued days.
+-- Reads fall back to the raw tables for today and for queued days.
+-- "FuelLog", "MaterialUsage" and "Invoice" aren't in schema.prisma, so their
+-- triggers, backfill and indexes are only created when the table exists, and
+-- the worker skips their rollups until then; re-run this migration once they
+-- are created.
+
+-- ===== ROLLUP TABLES =====
+
+CREATE TABLE IF NOT EXISTS "JourneyDailyRollup" (
+    "clientId" TEXT NOT NULL,
+    "locationId" TEXT NOT NULL,
+    day DATE NOT NULL,
+    status TEXT NOT NULL,
+    "journeyCount" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY ("clientId", "locationId", day, status)
+);
+
+CREATE TABLE IF NOT EXISTS "FuelDailyRollup" (
+    "clientId" TEXT NOT NULL,
+    "locationId" TEXT NOT NULL,
+    day DATE NOT NULL,
+    "truckNumber" TEXT NOT NULL,
+    litres NUMERIC(14,2) NOT NULL DEFAULT 0,
+    cost NUMERIC(14,2) NOT NULL DEFAULT 0,
+    "logCount" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY ("clientId", "locationId", day, "truckNumber")
+);
+
+CREATE TABLE IF NOT EXISTS "MaterialDailyRollup" (
+    "clientId" TEXT NOT NULL,
+    "locationId" TEXT NOT NULL,
+    day DATE NOT NULL,
+    category TEXT NOT NULL,
+    quantity NUMERIC(14,2) NOT NULL DEFAULT 0,
+    cost NUMERIC(14,2) NOT NULL DEFAULT 0,
+    "usageCount" INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY ("clientId", "locationId", day, category)
+);
+
+CREATE TABLE IF NOT EXISTS "InvoiceDailyRollup" (
+    "clientId" TEXT NOT NULL,
+    "locationId" TEXT NOT NULL,
+    day DATE NOT NULL,
+    status TEXT NOT NULL,
+    "invoiceCount" INTEGER NOT NULL DEFAULT 0,
+    total NUMERIC(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY ("clientId", "locationId", day, status)
+);
+
+-- Days whose rollups are missing or out of date. A day that fails to
+-- recompute is retried after "availableAt" so it can't hold up the queue.
+CREATE TABLE IF NOT EXISTS "RollupDirtyDay" (
+    "clientId" TEXT NOT NULL,
+    "locationId" TEXT NOT NULL,
+    day DATE NOT NULL,
+    "markedAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    "availableAt" TIMESTAMP NOT NULL DEFAULT NOW(),
+    error TEXT,
+    PRIMARY KEY ("clientId", "locationId", day)
+);
+
+ALTER TABLE "RollupDirtyDay" ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE "RollupDirtyDay" ADD COLUMN IF NOT EXISTS "availableAt" TIMESTAMP NOT NULL DEFAULT NOW();
+ALTER TABLE "RollupDirtyDay" ADD COLUMN IF NOT EXISTS error TEXT;
+
+CREATE INDEX IF NOT EXISTS "RollupDirtyDay_day_idx" ON "RollupDirtyDay"(day);
+
+-- ===== CHANGE FEED =====
+
+CREATE OR REPLACE FUNCTION rollup_mark_dirty(p_client TEXT, p_location TEXT, p_day DATE)
+RETURNS VOID AS $$
+BEGIN
+    IF p_client IS NULL OR p_location IS NULL OR p_day IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO "RollupDirtyDay" ("clientId", "locationId", day)
+    VALUES (p_client, p_location, p_day)
+    ON CONFLICT DO NOTHING;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_journey_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM rollup_mark_dirty(OLD."clientId", OLD."locationId", OLD.date::date);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM rollup_mark_dirty(NEW."clientId", NEW."locationId", NEW.date::date);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fuel logs and material usage roll up under their journey's tenant and day
+CREATE OR REPLACE FUNCTION rollup_journey_child_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    journey RECORD;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT "clientId", "locationId", date INTO journey FROM "TruckJourney" WHERE id = OLD."journeyId";
+        IF FOUND THEN
+            PERFORM rollup_mark_dirty(journey."clientId", journey."locationId", journey.date::date);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT "clientId", "locationId", date INTO journey FROM "TruckJourney" WHERE id = NEW."journeyId";
+        IF FOUND THEN
+            PERFORM rollup_mark_dirty(journey."clientId", journey."locationId", journey.date::date);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_invoice_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM rollup_mark_dirty(OLD."clientId", OLD."locationId", OLD."createdAt"::date);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM rollup_mark_dirty(NEW."clientId", NEW."locationId", NEW."createdAt"::date);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS rollup_journey_changed ON "TruckJourney";
+CREATE TRIGGER rollup_journey_changed
+    AFTER INSERT OR DELETE OR UPDATE OF status, date, "clientId", "locationId", "truckNumber" ON "TruckJourney"
+    FOR EACH ROW EXECUTE FUNCTION rollup_journey_changed();
+
+DO $$
+BEGIN
+    IF to_regclass('"FuelLog"') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS rollup_fuel_changed ON "FuelLog";
+        CREATE TRIGGER rollup_fuel_changed
+            AFTER INSERT OR UPDATE OR DELETE ON "FuelLog"
+            FOR EACH ROW EXECUTE FUNCTION rollup_journey_child_changed();
+    END IF;
+
+    IF to_regclass('"MaterialUsage"') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS rollup_material_changed ON "MaterialUsage";
+        CREATE TRIGGER rollup_material_changed
+            AFTER INSERT OR UPDATE OR DELETE ON "MaterialUsage"
+            FOR EACH ROW EXECUTE FUNCTION rollup_journey_child_changed();
+    END IF;
+
+    IF to_regclass('"Invoice"') IS NOT NULL THEN
+        DROP TRIGGER IF EXISTS rollup_invoice_changed ON "Invoice";
+        CREATE TRIGGER rollup_invoice_changed
+            AFTER INSERT OR DELETE OR UPDATE OF status, total, "clientId", "locationId", "createdAt" ON "Invoice"
+            FOR EACH ROW EXECUTE FUNCTION rollup_invoice_changed();
+    END IF;
+END $$;
+
+-- ===== BACKFILL =====
+-- Queue every historical day; reads use raw rows for a day until the
+-- worker has rolled it up.
+
+INSERT INTO "RollupDirtyDay" ("clientId", "locationId", day)
+SELECT DISTINCT "clientId", "locationId", date::date FROM "TruckJourney"
+ON CONFLICT DO NOTHING;
+
+DO $$
+BEGIN
+    IF to_regclass('"Invoice"') IS NOT NULL THEN
+        INSERT INTO "RollupDirtyDay" ("clientId", "locationId", day)
+        SELECT DISTINCT "clientId", "locationId", "createdAt"::date FROM "Invoice"
+        ON CONFLICT DO NOTHING;
+    END IF;
+END $$;
+
+-- ===== DETAIL LISTINGS =====
+-- GET /operations/fuel-logs and /operations/material-usage page newest first
+-- on ("loggedAt", id)
+
+DO $$
+BEGIN
+    IF to_regclass('"FuelLog"') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS "FuelLog_loggedAt_id_idx" ON "FuelLog"("loggedAt" DESC, id DESC);
+    END IF;
+    IF to_regclass('"MaterialUsage"') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS "MaterialUsage_loggedAt_id_idx" ON "MaterialUsage"("loggedAt" DESC, id DESC);
+    END IF;
+END $$;
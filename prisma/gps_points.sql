@@ -0,0 +1,19 @@
+-- GPS Points for C&C CRM
+-- Append-only store for journey GPS pings, written in batches by
+-- apps/api/gps_ingest.py. A point is identified by its journey and the
+-- device timestamp, so a mobile retry of the same batch inserts nothing new.
+
+CREATE TABLE IF NOT EXISTS "GpsPoint" (
+    "journeyId" TEXT NOT NULL,
+    "recordedAt" TIMESTAMPTZ NOT NULL,
+    lat DOUBLE PRECISION NOT NULL,
+    lng DOUBLE PRECISION NOT NULL,
+    speed REAL,
+    accuracy REAL,
+    heading REAL,
+    "receivedAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY ("journeyId", "recordedAt")
+);
+
+-- Time-range scans (retention, backfills) without a second btree
+CREATE INDEX IF NOT EXISTS idx_gps_point_received ON "GpsPoint" USING brin ("receivedAt");
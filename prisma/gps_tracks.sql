@@ -0,0 +1,19 @@
+-- GPS Track Segments for C&C CRM
+-- Compacted journey tracks, one row per journey per hour. Closed hours of
+-- "GpsPoint" are folded in by apps/api/gps_track_worker.py and their raw rows
+-- deleted; track is the delta-encoded column format in apps/api/gps_track.py.
+
+CREATE TABLE IF NOT EXISTS "GpsTrackSegment" (
+    "journeyId" TEXT NOT NULL,
+    "segmentStart" TIMESTAMPTZ NOT NULL,
+    "firstAt" TIMESTAMPTZ NOT NULL,
+    "lastAt" TIMESTAMPTZ NOT NULL,
+    "pointCount" INTEGER NOT NULL,
+    track BYTEA NOT NULL,
+    "updatedAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY ("journeyId", "segmentStart")
+);
+
+-- compact_tracks looks up the closed hours still in "GpsPoint"; after each
+-- pass that range only holds points not yet compacted
+CREATE INDEX IF NOT EXISTS idx_gps_point_recorded ON "GpsPoint" ("recordedAt");
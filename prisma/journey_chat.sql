@@ -0,0 +1,50 @@
+-- Journey Chat for C&C CRM
+-- Messages are numbered per journey (seq 1, 2, 3, ...). "JourneyChat" holds
+-- the last number handed out. Writers lock that row, so a journey's messages
+-- commit in seq order and "seq > cursor" never skips a message that
+-- commits late. Each participant's read position is one watermark row, so
+-- unread = "lastSeq" - "lastReadSeq" without counting messages.
+-- Written and read by apps/api/journey_chat.py.
+
+CREATE TABLE IF NOT EXISTS "JourneyChat" (
+    "journeyId" TEXT PRIMARY KEY,
+    "lastSeq" BIGINT NOT NULL DEFAULT 0,
+    "lastMessageAt" TIMESTAMPTZ
+);
+
+-- Hash-partitioned by journey: a journey's history lives in one partition
+-- and every query filters on "journeyId"
+CREATE TABLE IF NOT EXISTS "JourneyMessage" (
+    "journeyId" TEXT NOT NULL,
+    seq BIGINT NOT NULL,
+    "userId" TEXT NOT NULL,
+    "clientMessageId" TEXT,
+    type TEXT NOT NULL DEFAULT 'TEXT',
+    message TEXT NOT NULL,
+    "createdAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY ("journeyId", seq)
+) PARTITION BY HASH ("journeyId");
+
+DO $$
+BEGIN
+    FOR i IN 0..7 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS "JourneyMessage_p%s" PARTITION OF "JourneyMessage" '
+            'FOR VALUES WITH (MODULUS 8, REMAINDER %s)', i, i
+        );
+    END LOOP;
+END $$;
+
+-- Mobile outboxes resend a batch after a dropped connection. Ids come from
+-- the sender's device, so they are only unique per sender.
+DROP INDEX IF EXISTS idx_journey_message_client_id;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_journey_message_sender_client_id
+    ON "JourneyMessage" ("journeyId", "userId", "clientMessageId");
+
+CREATE TABLE IF NOT EXISTS "JourneyChatRead" (
+    "journeyId" TEXT NOT NULL,
+    "userId" TEXT NOT NULL,
+    "lastReadSeq" BIGINT NOT NULL DEFAULT 0,
+    "readAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY ("journeyId", "userId")
+);
@@ -0,0 +1,53 @@
+-- Content-Addressed Media Blobs for C&C CRM
+-- Each distinct file (original upload or rendered variant) is stored once,
+-- as a "MediaBlob" keyed by its SHA-256. "refCount" counts the "Media" and
+-- "MediaVariant" rows that point at a blob. "MediaBlobRef" allows one
+-- "Media" row per blob per journey, so re-uploading a photo to the same
+-- journey returns the existing item. Blobs that stay unreferenced past a
+-- grace period are deleted by garbage collection (apps/api/media_blobs.py).
+
+CREATE TABLE IF NOT EXISTS "MediaBlob" (
+    sha256 TEXT PRIMARY KEY,
+    "storageKey" TEXT NOT NULL,
+    size BIGINT NOT NULL,
+    "mimeType" TEXT,
+    "refCount" INTEGER NOT NULL DEFAULT 0,
+    -- Uploads avoided: the client's hash matched, so nothing was sent
+    "transfersSkipped" INTEGER NOT NULL DEFAULT 0,
+    -- Uploads that arrived in full and turned out to be copies
+    "duplicatesDropped" INTEGER NOT NULL DEFAULT 0,
+    "createdAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    "lastReferencedAt" TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_media_blob_unreferenced
+    ON "MediaBlob" ("lastReferencedAt") WHERE "refCount" <= 0;
+
+CREATE TABLE IF NOT EXISTS "MediaBlobRef" (
+    sha256 TEXT NOT NULL,
+    "journeyId" TEXT NOT NULL,
+    "mediaId" TEXT NOT NULL UNIQUE,
+    "createdAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (sha256, "journeyId")
+);
+
+-- Existing originals and variants
+INSERT INTO "MediaBlob" (sha256, "storageKey", size, "mimeType", "refCount")
+SELECT metadata->>'sha256', MIN(metadata->>'storageKey'), MAX(size), MIN(metadata->>'mimeType'), COUNT(*)
+FROM "Media"
+WHERE metadata ? 'sha256' AND metadata ? 'storageKey'
+GROUP BY metadata->>'sha256'
+ON CONFLICT (sha256) DO NOTHING;
+
+INSERT INTO "MediaBlobRef" (sha256, "journeyId", "mediaId")
+SELECT DISTINCT ON (metadata->>'sha256', "journeyId") metadata->>'sha256', "journeyId", id
+FROM "Media"
+WHERE metadata ? 'sha256'
+ORDER BY metadata->>'sha256', "journeyId", "createdAt"
+ON CONFLICT DO NOTHING;
+
+INSERT INTO "MediaBlob" (sha256, "storageKey", size, "mimeType", "refCount")
+SELECT sha256, MIN("storageKey"), MAX(size), MIN("mimeType"), COUNT(*)
+FROM "MediaVariant"
+GROUP BY sha256
+ON CONFLICT (sha256) DO NOTHING;
@@ -0,0 +1,41 @@
+-- Media Processing for C&C CRM
+-- "MediaJob" is the queue behind apps/api/media_worker.py. A completed
+-- upload adds a row. Workers claim rows with SKIP LOCKED, and a claim that
+-- outlives "lockedUntil" is presumed dead and retried.
+-- "MediaVariant" lists the derived files per media item: thumbnails, an
+-- EXIF-free display copy and video posters. Variants are stored under their
+-- SHA-256, so identical outputs (a re-uploaded photo, say) share one object.
+
+CREATE TABLE IF NOT EXISTS "MediaJob" (
+    "mediaId" TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'PENDING',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    "availableAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    "lockedUntil" TIMESTAMPTZ,
+    error TEXT,
+    "createdAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    "finishedAt" TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_media_job_ready
+    ON "MediaJob" ("availableAt") WHERE status IN ('PENDING', 'RUNNING');
+
+CREATE TABLE IF NOT EXISTS "MediaVariant" (
+    "mediaId" TEXT NOT NULL,
+    name TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    "storageKey" TEXT NOT NULL,
+    "mimeType" TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    size INTEGER NOT NULL,
+    "createdAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY ("mediaId", name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_media_variant_sha256 ON "MediaVariant" (sha256);
+
+-- Media already uploaded before this migration
+INSERT INTO "MediaJob" ("mediaId")
+SELECT id FROM "Media" WHERE metadata ? 'storageKey'
+ON CONFLICT ("mediaId") DO NOTHING;
@@ -0,0 +1,49 @@
+-- Resumable Media Uploads for C&C CRM
+-- An upload is split into fixed-size chunks that clients send with
+-- PATCH /journey/{id}/uploads/{uploadId}. Chunks can arrive in any order and
+-- in parallel, and can be retried. A chunk counts once its row is here.
+-- When the last chunk lands the upload is RECEIVED; the media worker claims
+-- it (ASSEMBLING, leased until "lockedUntil") and turns it into a "Media" row.
+-- Used by apps/api/media_uploads.py.
+
+CREATE TABLE IF NOT EXISTS "MediaUpload" (
+    id TEXT PRIMARY KEY,
+    "journeyId" TEXT NOT NULL,
+    "uploadedBy" TEXT NOT NULL,
+    "mediaId" TEXT NOT NULL,
+    "mediaType" TEXT NOT NULL,
+    filename TEXT,
+    "mimeType" TEXT,
+    size BIGINT NOT NULL,
+    "chunkSize" INTEGER NOT NULL,
+    "chunkCount" INTEGER NOT NULL,
+    -- Optional SHA-256 (hex) of the whole file, checked on completion
+    checksum TEXT,
+    metadata JSONB,
+    "storageKey" TEXT NOT NULL,
+    "storageRef" TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'UPLOADING',
+    error TEXT,
+    "lockedUntil" TIMESTAMPTZ,
+    "createdAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    "expiresAt" TIMESTAMPTZ NOT NULL
+);
+
+ALTER TABLE "MediaUpload" ADD COLUMN IF NOT EXISTS "lockedUntil" TIMESTAMPTZ;
+
+-- The purge also removes failed uploads
+DROP INDEX IF EXISTS idx_media_upload_expires;
+CREATE INDEX IF NOT EXISTS idx_media_upload_purge
+    ON "MediaUpload" ("expiresAt") WHERE status IN ('UPLOADING', 'FAILED');
+
+CREATE INDEX IF NOT EXISTS idx_media_upload_assembly
+    ON "MediaUpload" ("createdAt") WHERE status IN ('RECEIVED', 'ASSEMBLING');
+
+CREATE TABLE IF NOT EXISTS "MediaUploadChunk" (
+    "uploadId" TEXT NOT NULL REFERENCES "MediaUpload"(id) ON DELETE CASCADE,
+    "chunkIndex" INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    token TEXT,
+    "receivedAt" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY ("uploadId", "chunkIndex")
+);
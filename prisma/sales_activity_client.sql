@@ -0,0 +1,71 @@
+-- Sales Activity tenant column for C&C CRM
+-- Denormalizes the owning client onto "SalesActivity" so tenant filters are
+-- a plain indexed equality instead of
+--   (c.clientId = $1 OR l.customerId IN (SELECT id FROM "Customer" WHERE clientId = $1))
+-- The client comes from the activity's customer, or else its lead's customer.
+
+ALTER TABLE "SalesActivity" ADD COLUMN IF NOT EXISTS clientId TEXT;
+
+-- ===== SYNC =====
+
+CREATE OR REPLACE FUNCTION sales_activity_client_id(p_customer TEXT, p_lead TEXT)
+RETURNS TEXT AS $$
+    SELECT COALESCE(
+        (SELECT c.clientId FROM "Customer" c WHERE c.id = p_customer),
+        (SELECT c.clientId FROM "Lead" l JOIN "Customer" c ON c.id = l.customerId WHERE l.id = p_lead)
+    );
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION sales_activity_set_client()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.clientId := sales_activity_client_id(NEW.customerId, NEW.leadId);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sales_activity_set_client ON "SalesActivity";
+CREATE TRIGGER sales_activity_set_client
+    BEFORE INSERT OR UPDATE OF customerId, leadId ON "SalesActivity"
+    FOR EACH ROW EXECUTE FUNCTION sales_activity_set_client();
+
+-- A customer moving client or a lead moving customer re-derives its activities
+CREATE OR REPLACE FUNCTION sales_activity_owner_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'Customer' THEN
+        UPDATE "SalesActivity" sa
+        SET clientId = sales_activity_client_id(sa.customerId, sa.leadId)
+        WHERE sa.customerId = NEW.id
+           OR sa.leadId IN (SELECT l.id FROM "Lead" l WHERE l.customerId = NEW.id);
+    ELSE
+        UPDATE "SalesActivity" sa
+        SET clientId = sales_activity_client_id(sa.customerId, sa.leadId)
+        WHERE sa.leadId = NEW.id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sales_activity_customer_changed ON "Customer";
+CREATE TRIGGER sales_activity_customer_changed
+    AFTER UPDATE OF clientId ON "Customer"
+    FOR EACH ROW WHEN (OLD.clientId IS DISTINCT FROM NEW.clientId)
+    EXECUTE FUNCTION sales_activity_owner_changed();
+
+DROP TRIGGER IF EXISTS sales_activity_lead_changed ON "Lead";
+CREATE TRIGGER sales_activity_lead_changed
+    AFTER UPDATE OF customerId ON "Lead"
+    FOR EACH ROW WHEN (OLD.customerId IS DISTINCT FROM NEW.customerId)
+    EXECUTE FUNCTION sales_activity_owner_changed();
+
+-- ===== BACKFILL =====
+
+UPDATE "SalesActivity" sa
+SET clientId = sales_activity_client_id(sa.customerId, sa.leadId)
+WHERE sa.clientId IS NULL;
+
+-- ===== INDEXES =====
+
+CREATE INDEX IF NOT EXISTS idx_sales_activity_client_created ON "SalesActivity"(clientId, createdAt DESC);
+CREATE INDEX IF NOT EXISTS idx_sales_activity_client_type ON "SalesActivity"(clientId, type);
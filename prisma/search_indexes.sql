@@ -0,0 +1,41 @@
+-- Search Indexes for C&C CRM
+-- Generated search columns and indexes read by apps/api/search.py:
+--   searchVector  tsvector for ranked word and prefix matches
+--   searchText    lower-cased haystack with a trigram index for substring
+--                 and typo-tolerant (word similarity) matches
+-- Leads are found through their customer's columns.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+-- ===== CUSTOMERS =====
+
+ALTER TABLE "Customer" ADD COLUMN IF NOT EXISTS searchVector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce(firstName, '') || ' ' || coalesce(lastName, '')), 'A') ||
+    setweight(to_tsvector('simple', replace(coalesce(email, ''), '@', ' ')), 'B') ||
+    setweight(to_tsvector('simple', regexp_replace(coalesce(phone, ''), '\D', '', 'g')), 'B')
+) STORED;
+
+ALTER TABLE "Customer" ADD COLUMN IF NOT EXISTS searchText TEXT GENERATED ALWAYS AS (
+    lower(coalesce(firstName, '') || ' ' || coalesce(lastName, '') || ' ' || coalesce(email, '') || ' ' ||
+          regexp_replace(coalesce(phone, ''), '\D', '', 'g'))
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_customer_search_vector ON "Customer" USING gin (clientId, searchVector);
+CREATE INDEX IF NOT EXISTS idx_customer_search_text ON "Customer" USING gin (clientId, searchText gin_trgm_ops);
+
+-- ===== JOURNEYS =====
+-- Truck number, SmartMoving job number (moveSourceId) and quote number.
+-- Quoted column names, like the rest of this Prisma table.
+
+ALTER TABLE "TruckJourney" ADD COLUMN IF NOT EXISTS "searchVector" tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', coalesce("truckNumber", '') || ' ' || coalesce("moveSourceId", '') || ' ' || coalesce(quoteId, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+) STORED;
+
+ALTER TABLE "TruckJourney" ADD COLUMN IF NOT EXISTS "searchText" TEXT GENERATED ALWAYS AS (
+    lower(coalesce("truckNumber", '') || ' ' || coalesce("moveSourceId", '') || ' ' || coalesce(quoteId, ''))
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_journey_search_vector ON "TruckJourney" USING gin ("clientId", "searchVector");
+CREATE INDEX IF NOT EXISTS idx_journey_search_text ON "TruckJourney" USING gin ("clientId", "searchText" gin_trgm_ops);
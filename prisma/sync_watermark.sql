@@ -0,0 +1,18 @@
+-- Sync Watermark for C&C CRM
+-- One row per external source recording when its last full sync finished.
+-- Journey reads report it as dataAsOf. "startedAt" is a lease: a sync
+-- claims the row by setting it, so only one runs across API processes,
+-- and a crashed sync stops blocking others once the lease expires.
+-- Read and written by apps/api/journey_sync.py.
+
+CREATE TABLE IF NOT EXISTS "SyncWatermark" (
+    source TEXT PRIMARY KEY,
+    "syncedAt" TIMESTAMPTZ,
+    "startedAt" TIMESTAMPTZ,
+    "durationMs" INTEGER,
+    "lastError" TEXT
+);
+
+INSERT INTO "SyncWatermark" (source, "syncedAt")
+SELECT 'smartmoving', MAX("lastSyncAt") FROM "TruckJourney" WHERE "dataSource" = 'SMARTMOVING'
+ON CONFLICT (source) DO NOTHING;
@@ -0,0 +1,23 @@
+-- Tenant Scope Indexes for C&C CRM
+-- Composite indexes leading on clientId for every table registered in
+-- apps/api/tenant_repository.py (TENANT_SCOPED_TABLES), so tenant-scoped
+-- reads and writes stay index-bounded as data grows.
+
+-- ===== CORE TABLES (Prisma-managed, quoted identifiers) =====
+
+CREATE INDEX IF NOT EXISTS "User_clientId_locationId_status_idx" ON "User"("clientId", "locationId", "status");
+CREATE INDEX IF NOT EXISTS "User_clientId_locationId_role_idx" ON "User"("clientId", "locationId", "role");
+
+CREATE INDEX IF NOT EXISTS "Location_clientId_idx" ON "Location"("clientId");
+
+CREATE INDEX IF NOT EXISTS "TruckJourney_clientId_locationId_date_idx" ON "TruckJourney"("clientId", "locationId", "date");
+CREATE INDEX IF NOT EXISTS "TruckJourney_clientId_locationId_status_idx" ON "TruckJourney"("clientId", "locationId", "status");
+
+CREATE INDEX IF NOT EXISTS "AuditEntry_clientId_locationId_timestamp_idx" ON "AuditEntry"("clientId", "locationId", "timestamp");
+
+CREATE INDEX IF NOT EXISTS "MoveSource_clientId_isActive_idx" ON "MoveSource"("clientId", "isActive");
+
+-- ===== CRM TABLES (unquoted identifiers) =====
+
+CREATE INDEX IF NOT EXISTS idx_customer_client_created ON "Customer"(clientId, createdAt DESC);
+CREATE INDEX IF NOT EXISTS idx_quote_client_location_created ON "Quote"(clientId, locationId, createdAt DESC);